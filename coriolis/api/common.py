@@ -1,12 +1,98 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from oslo_utils import strutils
+from oslo_utils import timeutils
+
+from coriolis import exception
 from coriolis import utils
 
+SORT_DIRS = ["asc", "desc"]
+
 
 def get_paging_params(req):
     marker = req.GET.get("marker")
     limit = req.GET.get("limit")
     if limit is not None:
         limit = utils.parse_int_value(limit)
+        if limit < 0:
+            raise exception.InvalidInput(
+                "The 'limit' must be a positive integer, got: %s" % limit)
     return marker, limit
+
+
+def get_refresh_param(req):
+    """ Returns whether the 'refresh' query parameter requests cached
+    resources to be listed anew.
+    """
+    return strutils.bool_from_string(req.GET.get("refresh", False))
+
+
+def get_sort_params(req, allowed_sort_keys):
+    """ Returns the lists of sort keys and directions given as comma
+    separated 'sort_key' and 'sort_dir' query parameters.
+
+    Directions which are not given default to 'asc'.
+    """
+    sort_keys = [
+        k.strip() for k in req.GET.get("sort_key", "").split(",")
+        if k.strip()]
+    sort_dirs = [
+        d.strip().lower() for d in req.GET.get("sort_dir", "").split(",")
+        if d.strip()]
+
+    invalid_keys = [k for k in sort_keys if k not in allowed_sort_keys]
+    if invalid_keys:
+        raise exception.InvalidInput(
+            "Invalid sort keys: %s. Allowed sort keys are: %s" % (
+                invalid_keys, allowed_sort_keys))
+    invalid_dirs = [d for d in sort_dirs if d not in SORT_DIRS]
+    if invalid_dirs:
+        raise exception.InvalidInput(
+            "Invalid sort directions: %s. Allowed sort directions are: "
+            "%s" % (invalid_dirs, SORT_DIRS))
+    if len(sort_dirs) > len(sort_keys):
+        raise exception.InvalidInput(
+            "More sort directions than sort keys were given.")
+
+    sort_dirs.extend(["asc"] * (len(sort_keys) - len(sort_dirs)))
+    return sort_keys, sort_dirs
+
+
+def get_list_filters(req, allowed_filters):
+    """ Returns a dict with the filters given as query parameters.
+
+    :param allowed_filters: dict mapping the names of the query parameters
+    to the names of the filters passed to the DB API. The 'created_after'
+    and 'created_before' parameters are parsed as ISO 8601 timestamps.
+    """
+    filters = {}
+    for param, filter_name in allowed_filters.items():
+        value = req.GET.get(param)
+        if value is None:
+            continue
+        if param in ("created_after", "created_before"):
+            try:
+                value = timeutils.normalize_time(
+                    timeutils.parse_isotime(value))
+            except ValueError:
+                raise exception.InvalidInput(
+                    "Invalid ISO 8601 timestamp for '%s': %s" % (
+                        param, value))
+        filters[filter_name] = value
+    return filters
+
+
+def get_list_params(req, allowed_sort_keys, allowed_filters):
+    """ Returns a dict with the filters, keyset pagination and sorting
+    parameters of a list request, as accepted by the list methods of the
+    DB API.
+    """
+    marker, limit = get_paging_params(req)
+    sort_keys, sort_dirs = get_sort_params(req, allowed_sort_keys)
+    return {
+        "filters": get_list_filters(req, allowed_filters),
+        "marker": marker,
+        "limit": limit,
+        "sort_keys": sort_keys,
+        "sort_dirs": sort_dirs}
@@ -1,6 +1,7 @@
 # Copyright 2018 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from coriolis.api import common
 from coriolis.api.v1.views import endpoint_options_view
 from coriolis.api import wsgi as api_wsgi
 from coriolis.endpoint_options import api
@@ -37,7 +38,8 @@ class EndpointDestinationOptionsController(api_wsgi.Controller):
 
         return endpoint_options_view.destination_options_collection(
             self._destination_options_api.get_endpoint_destination_options(
-                context, endpoint_id, env=env, option_names=options))
+                context, endpoint_id, env=env, option_names=options,
+                refresh=common.get_refresh_param(req)))
 
 
 def create_resource():
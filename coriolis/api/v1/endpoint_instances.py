@@ -31,10 +31,11 @@ class EndpointInstanceController(api_wsgi.Controller):
         else:
             env = {}
 
+        result = self._instance_api.search_endpoint_instances(
+            context, endpoint_id, env, marker, limit,
+            instance_name_pattern, refresh=common.get_refresh_param(req))
         return endpoint_resources_view.instances_collection(
-            self._instance_api.get_endpoint_instances(
-                context, endpoint_id, env, marker, limit,
-                instance_name_pattern))
+            result["instances"], synced_at=result["synced_at"])
 
     def show(self, req, endpoint_id, id):
         context = req.environ['coriolis.context']
@@ -1,6 +1,7 @@
 # Copyright 2018 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from coriolis.api import common
 from coriolis.api.v1.views import endpoint_resources_view
 from coriolis.api import wsgi as api_wsgi
 from coriolis.endpoint_resources import api
@@ -29,7 +30,8 @@ class EndpointStorageController(api_wsgi.Controller):
 
         return endpoint_resources_view.storage_collection(
             self._storage_api.get_endpoint_storage(
-                context, endpoint_id, env))
+                context, endpoint_id, env,
+                refresh=common.get_refresh_param(req)))
 
 
 def create_resource():
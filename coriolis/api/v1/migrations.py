@@ -1,6 +1,7 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from coriolis.api import common
 from coriolis.api.v1 import utils as api_utils
 from coriolis.api.v1.views import migration_view
 from coriolis.api import wsgi as api_wsgi
@@ -25,6 +26,16 @@ CONF.register_opts(MIGRATIONS_API_OPTS, 'api')
 
 LOG = logging.getLogger(__name__)
 
+MIGRATION_LIST_SORT_KEYS = [
+    "id", "created_at", "updated_at", "last_execution_status"]
+MIGRATION_LIST_FILTERS = {
+    "status": "last_execution_status",
+    "replica_id": "replica_id",
+    "origin_endpoint_id": "origin_endpoint_id",
+    "destination_endpoint_id": "destination_endpoint_id",
+    "created_after": "created_after",
+    "created_before": "created_before"}
+
 
 class MigrationController(api_wsgi.Controller):
     def __init__(self):
@@ -35,6 +46,15 @@ class MigrationController(api_wsgi.Controller):
     def show(self, req, id):
         context = req.environ["coriolis.context"]
         context.can(migration_policies.get_migrations_policy_label("show"))
+        fields, include_events = api_utils.get_status_projection_options(req)
+        if fields is not None or include_events:
+            migration = self._migration_api.get_migration_status(
+                context, id, include_events=include_events)
+            if fields:
+                # NOTE: the view moves the tasks out of the execution:
+                fields = fields + ["executions"]
+            return migration_view.single(migration, keys=fields)
+
         migration = self._migration_api.get_migration(
             context, id,
             include_task_info=CONF.api.include_task_info_in_migrations_api)
@@ -49,12 +69,15 @@ class MigrationController(api_wsgi.Controller):
         context = req.environ["coriolis.context"]
         context.show_deleted = show_deleted
         context.can(migration_policies.get_migrations_policy_label("list"))
+        list_params = common.get_list_params(
+            req, MIGRATION_LIST_SORT_KEYS, MIGRATION_LIST_FILTERS)
         return migration_view.collection(
             self._migration_api.get_migrations(
                 context,
                 include_tasks=CONF.api.include_task_info_in_migrations_api,
-                include_task_info=CONF.api.include_task_info_in_migrations_api
-            ))
+                include_task_info=(
+                    CONF.api.include_task_info_in_migrations_api),
+                **list_params))
 
     def index(self, req):
         return self._list(req)
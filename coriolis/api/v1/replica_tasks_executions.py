@@ -1,6 +1,8 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from coriolis.api import common
+from coriolis.api.v1 import utils as api_utils
 from coriolis.api.v1.views import replica_tasks_execution_view
 from coriolis.api import wsgi as api_wsgi
 from coriolis import exception
@@ -9,6 +11,14 @@ from coriolis.replica_tasks_executions import api
 
 from webob import exc
 
+EXECUTION_LIST_SORT_KEYS = [
+    "id", "created_at", "updated_at", "number", "status"]
+EXECUTION_LIST_FILTERS = {
+    "status": "status",
+    "type": "type",
+    "created_after": "created_after",
+    "created_before": "created_before"}
+
 
 class ReplicaTasksExecutionController(api_wsgi.Controller):
     def __init__(self):
@@ -19,6 +29,14 @@ class ReplicaTasksExecutionController(api_wsgi.Controller):
         context = req.environ["coriolis.context"]
         context.can(
             executions_policies.get_replica_executions_policy_label("show"))
+        fields, include_events = api_utils.get_status_projection_options(req)
+        if fields is not None or include_events:
+            # NOTE: the status projection avoids loading all the progress
+            # updates and events of the tasks for frequent status polls:
+            execution = self._replica_tasks_execution_api.get_execution_status(
+                context, replica_id, id, include_events=include_events)
+            return replica_tasks_execution_view.single(execution, keys=fields)
+
         execution = self._replica_tasks_execution_api.get_execution(
             context, replica_id, id)
         if not execution:
@@ -31,18 +49,22 @@ class ReplicaTasksExecutionController(api_wsgi.Controller):
         context.can(
             executions_policies.get_replica_executions_policy_label("list"))
 
+        list_params = common.get_list_params(
+            req, EXECUTION_LIST_SORT_KEYS, EXECUTION_LIST_FILTERS)
         return replica_tasks_execution_view.collection(
             self._replica_tasks_execution_api.get_executions(
-                context, replica_id, include_tasks=False))
+                context, replica_id, include_tasks=False, **list_params))
 
     def detail(self, req, replica_id):
         context = req.environ["coriolis.context"]
         context.can(
             executions_policies.get_replica_executions_policy_label("show"))
 
+        list_params = common.get_list_params(
+            req, EXECUTION_LIST_SORT_KEYS, EXECUTION_LIST_FILTERS)
         return replica_tasks_execution_view.collection(
             self._replica_tasks_execution_api.get_executions(
-                context, replica_id, include_tasks=True))
+                context, replica_id, include_tasks=True, **list_params))
 
     def create(self, req, replica_id, body):
         context = req.environ["coriolis.context"]
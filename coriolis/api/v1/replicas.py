@@ -1,6 +1,7 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from coriolis.api import common
 from coriolis.api.v1 import utils as api_utils
 from coriolis.api.v1.views import replica_tasks_execution_view
 from coriolis.api.v1.views import replica_view
@@ -25,6 +26,15 @@ CONF.register_opts(REPLICA_API_OPTS, 'api')
 
 LOG = logging.getLogger(__name__)
 
+REPLICA_LIST_SORT_KEYS = [
+    "id", "created_at", "updated_at", "last_execution_status"]
+REPLICA_LIST_FILTERS = {
+    "status": "last_execution_status",
+    "origin_endpoint_id": "origin_endpoint_id",
+    "destination_endpoint_id": "destination_endpoint_id",
+    "created_after": "created_after",
+    "created_before": "created_before"}
+
 
 class ReplicaController(api_wsgi.Controller):
     def __init__(self):
@@ -50,11 +60,13 @@ class ReplicaController(api_wsgi.Controller):
         context.show_deleted = show_deleted
         context.can(replica_policies.get_replicas_policy_label("list"))
         include_task_info = CONF.api.include_task_info_in_replicas_api
+        list_params = common.get_list_params(
+            req, REPLICA_LIST_SORT_KEYS, REPLICA_LIST_FILTERS)
         return replica_view.collection(
             self._replica_api.get_replicas(
                 context,
                 include_tasks_executions=include_task_info,
-                include_task_info=include_task_info))
+                include_task_info=include_task_info, **list_params))
 
     def index(self, req):
         return self._list(req)
@@ -29,6 +29,31 @@ def _get_show_deleted(val):
     return None
 
 
+def get_status_projection_options(req):
+    """ Parses the '?fields=' and '?include=' query parameters which select
+    the lightweight status projection of executions.
+
+    Returns a tuple with the list of requested fields (None if not given)
+    and whether the events of the tasks should be included.
+    """
+    fields = req.GET.get("fields")
+    if fields is not None:
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+
+    include_events = False
+    include = req.GET.get("include")
+    if include is not None:
+        includes = set(i.strip() for i in include.split(",") if i.strip())
+        unsupported = includes.difference(["events"])
+        if unsupported:
+            raise exc.HTTPBadRequest(
+                explanation="Unsupported values for 'include': %s" % (
+                    ", ".join(sorted(unsupported))))
+        include_events = "events" in includes
+
+    return fields, include_events
+
+
 def validate_network_map(network_map):
     """ Validates the JSON schema for the network_map. """
     try:
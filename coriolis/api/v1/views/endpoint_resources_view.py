@@ -8,10 +8,13 @@ def instance_single(instance, keys=None):
     return {"instance": view_utils.format_opt(instance, keys)}
 
 
-def instances_collection(instances, keys=None):
+def instances_collection(instances, keys=None, synced_at=None):
     formatted_instances = [view_utils.format_opt(m, keys)
                            for m in instances]
-    return {'instances': formatted_instances}
+    collection = {'instances': formatted_instances}
+    if synced_at is not None:
+        collection['synced_at'] = synced_at
+    return collection
 
 
 def network_single(network, keys=None):
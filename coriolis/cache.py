@@ -1,6 +1,13 @@
 # Copyright 2019 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import collections
+import hashlib
+import json
+import threading
+import time
+import uuid
+
 from coriolis import exception
 
 from oslo_cache import core as cache
@@ -11,17 +18,166 @@ opts = [
     cfg.IntOpt('cache_time', default=7200),
 ]
 
+endpoint_inventory_opts = [
+    cfg.BoolOpt('caching',
+                default=True,
+                help="Whether to cache the instances, networks, storage and "
+                     "options listed for endpoints, provided that caching "
+                     "is enabled in the '[cache]' section. A backend shared "
+                     "by all conductor services (e.g. memcached) must be "
+                     "used for endpoint updates to invalidate the cached "
+                     "inventories of all of them."),
+    cfg.IntOpt('cache_time',
+               default=600, min=1,
+               help="Number of seconds for which the inventory of an "
+                    "endpoint is cached."),
+]
+
 CONF = cfg.CONF
 CONF.register_opts(opts)
+CONF.register_opts(endpoint_inventory_opts, 'endpoint_inventory')
 cache.configure(CONF)
 cache_region = cache.create_region()
-cache.configure_cache_region(CONF, cache_region)
+
+_ENDPOINT_INVENTORY_GENERATION_KEY = "endpoint_inventory_generation:%s"
+_ENDPOINT_INVENTORY_KEY = "endpoint_inventory:%s:%s:%s:%s"
+
+_endpoint_inventory_stats = collections.defaultdict(lambda: {
+    "hits": 0,
+    "misses": 0,
+    "refreshes": 0})
+
+
+def _get_cache_region():
+    # NOTE: the region is only configured on first use, as the configuration
+    # files are not yet loaded when this module gets imported:
+    if not cache_region.is_configured:
+        cache.configure_cache_region(CONF, cache_region)
+    return cache_region
+
+
+class LocalTTLCache(object):
+    """ Size-bounded cache of values computed by this process, which expire
+    after a given number of seconds. The least recently used values are
+    evicted once the cache is full.
+
+    As opposed to the cache region, the values are never shared between
+    processes, which makes it suitable for values which must not be
+    serialized to a cache backend, such as credentials or sessions.
+    """
+
+    def __init__(self, max_entries=1024):
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, get_value, ttl):
+        """ Returns the value cached for the given key, calling 'get_value'
+        to compute it if missing or older than 'ttl' seconds. A 'ttl' of 0
+        disables caching.
+        """
+        if not ttl:
+            return get_value()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = get_value()
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate_matching(self, predicate):
+        """ Drops the values cached for all keys matching the predicate. """
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 
 def get_cache_decorator(provider):
     if type(provider) is not str or provider == "":
         raise exception.CoriolisException(
             "Invalid provider name")
+    _get_cache_region()
     MEMOIZE = cache.get_memoization_decorator(
         CONF, cache_region, provider)
     return MEMOIZE
+
+
+def _is_endpoint_inventory_caching_enabled():
+    return CONF.cache.enabled and CONF.endpoint_inventory.caching
+
+
+def _get_endpoint_inventory_generation(region, endpoint_id):
+    key = _ENDPOINT_INVENTORY_GENERATION_KEY % endpoint_id
+    generation = region.get(key, expiration_time=-1)
+    if generation is cache.NO_VALUE:
+        generation = str(uuid.uuid4())
+        region.set(key, generation)
+    return generation
+
+
+def get_endpoint_inventory(
+        endpoint_id, inventory_type, args, get_inventory, refresh=False):
+    """ Returns the given type of inventory of an endpoint from the cache,
+    calling 'get_inventory' to list it if not cached, expired or if a refresh
+    was requested.
+
+    :param args: JSON-serializable arguments the inventory was listed with
+    (environment, paging, filters, etc...), which are part of the cache key.
+    """
+    if not _is_endpoint_inventory_caching_enabled():
+        return get_inventory()
+
+    region = _get_cache_region()
+    args_hash = hashlib.sha256(
+        json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()
+    key = _ENDPOINT_INVENTORY_KEY % (
+        endpoint_id, _get_endpoint_inventory_generation(region, endpoint_id),
+        inventory_type, args_hash)
+
+    stats = _endpoint_inventory_stats[inventory_type]
+    if refresh:
+        stats["refreshes"] += 1
+    else:
+        inventory = region.get(
+            key, expiration_time=CONF.endpoint_inventory.cache_time)
+        if inventory is not cache.NO_VALUE:
+            stats["hits"] += 1
+            return inventory
+        stats["misses"] += 1
+
+    inventory = get_inventory()
+    region.set(key, inventory)
+    return inventory
+
+
+def invalidate_endpoint_inventory(endpoint_id):
+    """ Invalidates all the cached inventories of the given endpoint. """
+    if not _is_endpoint_inventory_caching_enabled():
+        return
+    # NOTE: the inventories are cached for all combinations of their
+    # arguments, so a new generation is set for the endpoint instead of
+    # deleting all of its keys:
+    _get_cache_region().set(
+        _ENDPOINT_INVENTORY_GENERATION_KEY % endpoint_id, str(uuid.uuid4()))
+
+
+def get_endpoint_inventory_stats():
+    """ Returns the endpoint inventory cache hits, misses and refreshes of
+    this process, per type of inventory.
+    """
+    return {
+        inventory_type: dict(stats)
+        for inventory_type, stats in _endpoint_inventory_stats.items()}
@@ -27,10 +27,11 @@ def main():
         worker_count = CONF.worker.worker_count
     utils.setup_logging()
 
+    endpoint = rpc_server.WorkerServerEndpoint()
     server = service.MessagingService(
-        constants.WORKER_MAIN_MESSAGING_TOPIC,
-        [rpc_server.WorkerServerEndpoint()],
-        rpc_server.VERSION, worker_count=worker_count, init_rpc=False)
+        constants.WORKER_MAIN_MESSAGING_TOPIC, [endpoint],
+        rpc_server.VERSION, worker_count=worker_count, init_rpc=False,
+        start_hooks=[endpoint.start_background_tasks])
     launcher = service.service.launch(
         CONF, server, workers=server.get_workers_count())
     launcher.wait()
@@ -1,6 +1,7 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
@@ -16,7 +17,28 @@ LOG = logging.getLogger(__name__)
 conductor_opts = [
     cfg.IntOpt("conductor_rpc_timeout",
                help="Number of seconds until RPC calls to the "
-                    "conductor timeout.")
+                    "conductor timeout."),
+    cfg.FloatOpt("task_events_batch_interval",
+                 default=2,
+                 min=0,
+                 help="Maximum number of seconds task events and progress "
+                      "updates are buffered for by the worker before being "
+                      "sent to the conductor in a single batch. Setting "
+                      "this to 0 sends each of them as soon as they occur."),
+    cfg.IntOpt("task_events_batch_size",
+               default=100,
+               min=1,
+               help="Maximum number of task events and progress updates "
+                    "buffered by the worker before they are sent to the "
+                    "conductor regardless of the batch interval."),
+    cfg.IntOpt("task_events_batch_send_attempts",
+               default=3,
+               min=1,
+               help="Number of times the worker attempts to send a batch of "
+                    "task events and progress updates to the conductor "
+                    "before dropping it. Failed batches are retried along "
+                    "with the events buffered meanwhile after the batch "
+                    "interval."),
 ]
 
 CONF = cfg.CONF
@@ -59,14 +81,30 @@ class ConductorClient(rpc.BaseRPCClient):
 
     def get_endpoint_instances(self, ctxt, endpoint_id, source_environment,
                                marker=None, limit=None,
-                               instance_name_pattern=None):
+                               instance_name_pattern=None, refresh=False):
         return self._call(
             ctxt, 'get_endpoint_instances',
             endpoint_id=endpoint_id,
             source_environment=source_environment,
             marker=marker,
             limit=limit,
-            instance_name_pattern=instance_name_pattern)
+            instance_name_pattern=instance_name_pattern,
+            refresh=refresh)
+
+    def search_endpoint_instances(
+            self, ctxt, endpoint_id, source_environment, marker=None,
+            limit=None, instance_name_pattern=None, refresh=False):
+        return self._call(
+            ctxt, 'search_endpoint_instances',
+            endpoint_id=endpoint_id,
+            source_environment=source_environment,
+            marker=marker,
+            limit=limit,
+            instance_name_pattern=instance_name_pattern,
+            refresh=refresh)
+
+    def sync_stale_endpoints_instances(self, ctxt):
+        self._cast(ctxt, 'sync_stale_endpoints_instances')
 
     def get_endpoint_instance(
             self, ctxt, endpoint_id, source_environment, instance_name):
@@ -77,30 +115,30 @@ class ConductorClient(rpc.BaseRPCClient):
             instance_name=instance_name)
 
     def get_endpoint_source_options(
-            self, ctxt, endpoint_id, env, option_names):
+            self, ctxt, endpoint_id, env, option_names, refresh=False):
         return self._call(
             ctxt, 'get_endpoint_source_options',
             endpoint_id=endpoint_id,
-            env=env, option_names=option_names)
+            env=env, option_names=option_names, refresh=refresh)
 
     def get_endpoint_destination_options(
-            self, ctxt, endpoint_id, env, option_names):
+            self, ctxt, endpoint_id, env, option_names, refresh=False):
         return self._call(
             ctxt, 'get_endpoint_destination_options',
             endpoint_id=endpoint_id,
-            env=env, option_names=option_names)
+            env=env, option_names=option_names, refresh=refresh)
 
-    def get_endpoint_networks(self, ctxt, endpoint_id, env):
+    def get_endpoint_networks(self, ctxt, endpoint_id, env, refresh=False):
         return self._call(
             ctxt, 'get_endpoint_networks',
             endpoint_id=endpoint_id,
-            env=env)
+            env=env, refresh=refresh)
 
-    def get_endpoint_storage(self, ctxt, endpoint_id, env):
+    def get_endpoint_storage(self, ctxt, endpoint_id, env, refresh=False):
         return self._call(
             ctxt, 'get_endpoint_storage',
             endpoint_id=endpoint_id,
-            env=env)
+            env=env, refresh=refresh)
 
     def validate_endpoint_connection(self, ctxt, endpoint_id):
         return self._call(
@@ -136,11 +174,14 @@ class ConductorClient(rpc.BaseRPCClient):
             shutdown_instances=shutdown_instances)
 
     def get_replica_tasks_executions(self, ctxt, replica_id,
-                                     include_tasks=False):
+                                     include_tasks=False, filters=None,
+                                     marker=None, limit=None,
+                                     sort_keys=None, sort_dirs=None):
         return self._call(
             ctxt, 'get_replica_tasks_executions',
             replica_id=replica_id,
-            include_tasks=include_tasks)
+            include_tasks=include_tasks, filters=filters, marker=marker,
+            limit=limit, sort_keys=sort_keys, sort_dirs=sort_dirs)
 
     def get_replica_tasks_execution(self, ctxt, replica_id, execution_id,
                                     include_task_info=False):
@@ -148,6 +189,13 @@ class ConductorClient(rpc.BaseRPCClient):
             ctxt, 'get_replica_tasks_execution', replica_id=replica_id,
             execution_id=execution_id, include_task_info=include_task_info)
 
+    def get_replica_tasks_execution_status(
+            self, ctxt, replica_id, execution_id, include_events=False):
+        return self._call(
+            ctxt, 'get_replica_tasks_execution_status',
+            replica_id=replica_id, execution_id=execution_id,
+            include_events=include_events)
+
     def delete_replica_tasks_execution(self, ctxt, replica_id, execution_id):
         return self._call(
             ctxt, 'delete_replica_tasks_execution', replica_id=replica_id,
@@ -184,11 +232,14 @@ class ConductorClient(rpc.BaseRPCClient):
             user_scripts=user_scripts)
 
     def get_replicas(self, ctxt, include_tasks_executions=False,
-                     include_task_info=False):
+                     include_task_info=False, filters=None, marker=None,
+                     limit=None, sort_keys=None, sort_dirs=None):
         return self._call(
             ctxt, 'get_replicas',
             include_tasks_executions=include_tasks_executions,
-            include_task_info=include_task_info)
+            include_task_info=include_task_info, filters=filters,
+            marker=marker, limit=limit, sort_keys=sort_keys,
+            sort_dirs=sort_dirs)
 
     def get_replica(self, ctxt, replica_id, include_task_info=False):
         return self._call(
@@ -204,16 +255,24 @@ class ConductorClient(rpc.BaseRPCClient):
             ctxt, 'delete_replica_disks', replica_id=replica_id)
 
     def get_migrations(self, ctxt, include_tasks=False,
-                       include_task_info=False):
+                       include_task_info=False, filters=None, marker=None,
+                       limit=None, sort_keys=None, sort_dirs=None):
         return self._call(
             ctxt, 'get_migrations', include_tasks=include_tasks,
-            include_task_info=include_task_info)
+            include_task_info=include_task_info, filters=filters,
+            marker=marker, limit=limit, sort_keys=sort_keys,
+            sort_dirs=sort_dirs)
 
     def get_migration(self, ctxt, migration_id, include_task_info=False):
         return self._call(
             ctxt, 'get_migration', migration_id=migration_id,
             include_task_info=include_task_info)
 
+    def get_migration_status(self, ctxt, migration_id, include_events=False):
+        return self._call(
+            ctxt, 'get_migration_status', migration_id=migration_id,
+            include_events=include_events)
+
     def migrate_instances(self, ctxt, origin_endpoint_id,
                           destination_endpoint_id, origin_minion_pool_id,
                           destination_minion_pool_id,
@@ -308,6 +367,9 @@ class ConductorClient(rpc.BaseRPCClient):
             new_current_step=new_current_step,
             new_total_steps=new_total_steps, new_message=new_message)
 
+    def add_task_events_batch(self, ctxt, task_events):
+        self._call(ctxt, 'add_task_events_batch', task_events=task_events)
+
     def create_replica_schedule(self, ctxt, replica_id,
                                 schedule, enabled, exp_date,
                                 shutdown_instance):
@@ -412,6 +474,12 @@ class ConductorClient(rpc.BaseRPCClient):
             ctxt, 'update_service', service_id=service_id,
             updated_values=updated_values)
 
+    def report_service_capacity(
+            self, ctxt, service_id, reporter_id, capacity):
+        self._cast(
+            ctxt, 'report_service_capacity', service_id=service_id,
+            reporter_id=reporter_id, capacity=capacity)
+
     def delete_service(self, ctxt, service_id):
         return self._call(
             ctxt, 'delete_service', service_id=service_id)
@@ -445,10 +513,23 @@ class ConductorClient(rpc.BaseRPCClient):
 
 
 class ConductorTaskRpcEventHandler(events.BaseEventHandler):
-    def __init__(self, ctxt, task_id):
+    def __init__(self, ctxt, task_id, batch_interval=None, batch_size=None):
         self._ctxt = ctxt
         self._task_id = task_id
         self._rpc_conductor_client_instance = None
+        self._batch_interval = batch_interval
+        if self._batch_interval is None:
+            self._batch_interval = CONF.conductor.task_events_batch_interval
+        self._batch_size = batch_size
+        if self._batch_size is None:
+            self._batch_size = CONF.conductor.task_events_batch_size
+        self._pending_task_events = []
+        self._task_events_flusher = None
+        self._task_events_flush_due = None
+        self._task_events_send_failures = 0
+        # NOTE: batches are sent one at a time, so that they are added in
+        # the order their events were buffered in:
+        self._task_events_send_lock = eventlet.semaphore.Semaphore()
 
     @property
     def _rpc_conductor_client(self):
@@ -463,11 +544,102 @@ class ConductorTaskRpcEventHandler(events.BaseEventHandler):
     def get_progress_update_identifier(self, progress_update):
         return progress_update['index']
 
+    def _send_task_events(self, requeue_on_error=True):
+        with self._task_events_send_lock:
+            task_events = self._pending_task_events
+            self._pending_task_events = []
+            if task_events:
+                LOG.debug(
+                    "Sending batch of %d events for task '%s' to conductor",
+                    len(task_events), self._task_id)
+                try:
+                    self._rpc_conductor_client.add_task_events_batch(
+                        self._ctxt, task_events)
+                except Exception:
+                    # NOTE: the failed batch is put back ahead of the events
+                    # buffered meanwhile, so they are still added in order:
+                    if requeue_on_error:
+                        self._pending_task_events = (
+                            task_events + self._pending_task_events)
+                    raise
+
+    def _schedule_task_events_flush(self):
+        if self._task_events_flusher is None:
+            self._task_events_flush_due = eventlet.event.Event()
+            self._task_events_flusher = eventlet.spawn(
+                self._flush_task_events_after_interval,
+                self._task_events_flush_due)
+
+    def _flush_task_events_after_interval(self, flush_due):
+        flush_due.wait(timeout=self._batch_interval)
+        # NOTE: the events buffered from now on get sent by a new flusher,
+        # which waits for this one's batch to be added before sending them:
+        if self._task_events_flush_due is flush_due:
+            self._task_events_flusher = None
+            self._task_events_flush_due = None
+        last_attempt = self._task_events_send_failures + 1 >= (
+            CONF.conductor.task_events_batch_send_attempts)
+        try:
+            self._send_task_events(requeue_on_error=not last_attempt)
+            self._task_events_send_failures = 0
+        except Exception as ex:
+            if last_attempt:
+                self._task_events_send_failures = 0
+                LOG.error(
+                    "Dropping batch of events for task '%s' after %d failed "
+                    "attempts to send it: %s", self._task_id,
+                    CONF.conductor.task_events_batch_send_attempts, ex)
+            else:
+                self._task_events_send_failures += 1
+                LOG.warn(
+                    "Failed to send batch of events for task '%s', retrying "
+                    "it after %s seconds: %s", self._task_id,
+                    self._batch_interval, ex)
+                self._schedule_task_events_flush()
+
+    def _buffer_task_event(self, item_type, **kwargs):
+        kwargs.update({"task_id": self._task_id, "type": item_type})
+        if item_type == (
+                constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE):
+            # NOTE: changes to the same progress update are merged, as only
+            # the latest values would be visible after the batch is applied:
+            # NOTE: a failed batch put back ahead of the pending events may
+            # also change the same progress update, so the latest change is
+            # the one merged into:
+            for item in reversed(self._pending_task_events):
+                if item["type"] == item_type and (
+                        item["progress_update_index"] == (
+                            kwargs["progress_update_index"])):
+                    item.update({
+                        k: v for (k, v) in kwargs.items() if v is not None})
+                    return
+        self._pending_task_events.append(kwargs)
+
+        self._schedule_task_events_flush()
+        if (len(self._pending_task_events) >= self._batch_size and
+                not self._task_events_flush_due.ready()):
+            self._task_events_flush_due.send()
+
+    def flush(self):
+        """ Sends the buffered events, waiting for the conductor to add them
+        as well as any batch which is already being sent.
+        """
+        self._send_task_events()
+
     def add_progress_update(
             self, message, initial_step=0, total_steps=0, return_event=False):
         LOG.info(
             "Sending progress update for task '%s' to conductor: %s",
             self._task_id, message)
+        if self._batch_interval and not return_event:
+            self._buffer_task_event(
+                constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE,
+                message=message, initial_step=initial_step,
+                total_steps=total_steps)
+            return
+        # NOTE: the previous events must be added before this progress update
+        # in order for its index to be the expected one:
+        self.flush()
         return self._rpc_conductor_client.add_task_progress_update(
             self._ctxt, self._task_id, message, initial_step=initial_step,
             total_steps=total_steps, return_event=return_event)
@@ -478,10 +650,22 @@ class ConductorTaskRpcEventHandler(events.BaseEventHandler):
         LOG.info(
             "Updating progress update '%s' for task '%s' with new step %s",
             update_identifier, self._task_id, new_current_step)
+        if self._batch_interval:
+            self._buffer_task_event(
+                constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE,
+                progress_update_index=update_identifier,
+                new_current_step=new_current_step,
+                new_total_steps=new_total_steps, new_message=new_message)
+            return
         self._rpc_conductor_client.update_task_progress_update(
             self._ctxt, self._task_id, update_identifier, new_current_step,
             new_total_steps=new_total_steps, new_message=new_message)
 
     def add_event(self, message, level=constants.TASK_EVENT_INFO):
+        if self._batch_interval:
+            self._buffer_task_event(
+                constants.TASK_EVENTS_BATCH_ITEM_EVENT,
+                level=level, message=message)
+            return
         self._rpc_conductor_client.add_task_event(
             self._ctxt, self._task_id, level, message)
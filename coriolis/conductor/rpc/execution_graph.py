@@ -0,0 +1,54 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import collections
+
+
+class ExecutionGraph(object):
+    """ Dependency graph of the tasks of an execution.
+
+    As the tasks of an execution never change once it was created, the graph
+    is compiled once and allows the state advancement following the status
+    change of a task to only evaluate the children of said task.
+
+    :param tasks: list of the tasks of the execution.
+    """
+
+    def __init__(self, tasks):
+        ordered_tasks = sorted(tasks, key=lambda task: task.index)
+        self.task_ids = [task.id for task in ordered_tasks]
+        self.indexes = {task.id: task.index for task in ordered_tasks}
+        self.instances = {task.id: task.instance for task in ordered_tasks}
+        self.parents = {
+            task.id: list(task.depends_on or []) for task in ordered_tasks}
+        self.on_error_task_ids = set(
+            task.id for task in ordered_tasks if task.on_error)
+
+        self.children = collections.defaultdict(list)
+        for task_id in self.task_ids:
+            for parent_id in self.parents[task_id]:
+                self.children[parent_id].append(task_id)
+
+    def matches(self, tasks):
+        """ Checks whether the graph was compiled for the given tasks. """
+        return len(tasks) == len(self.task_ids) and all(
+            task.id in self.indexes for task in tasks)
+
+    def get_task_ids(self, instance=None):
+        """ Returns the IDs of all the tasks (of the given instance) in the
+        order of their indexes.
+        """
+        return [
+            task_id for task_id in self.task_ids
+            if instance is None or self.instances[task_id] == instance]
+
+    def get_children(self, task_ids, instance=None):
+        """ Returns the IDs of the direct children of the given tasks (for
+        the given instance) in the order of their indexes.
+        """
+        children = set()
+        for task_id in task_ids:
+            children.update(
+                child_id for child_id in self.children.get(task_id, [])
+                if instance is None or self.instances[child_id] == instance)
+        return sorted(children, key=lambda task_id: self.indexes[task_id])
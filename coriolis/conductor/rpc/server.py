@@ -1,15 +1,23 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import collections
+import contextlib
 import copy
+import datetime
 import functools
+import hashlib
+import heapq
 import itertools
+import time
 import uuid
 
-from oslo_concurrency import lockutils
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import timeutils
 
+from coriolis import cache
+from coriolis.conductor.rpc import execution_graph
 from coriolis import constants
 from coriolis import context
 from coriolis.db import api as db_api
@@ -17,8 +25,11 @@ from coriolis.db.sqlalchemy import models
 from coriolis import exception
 from coriolis import keystone
 from coriolis.licensing import client as licensing_client
+from coriolis import locks
 from coriolis.minion_manager.rpc import client as rpc_minion_manager_client
 from coriolis.replica_cron.rpc import client as rpc_cron_client
+from coriolis import rpc
+from coriolis.scheduler.filters import capacity_filters
 from coriolis.scheduler.rpc import client as rpc_scheduler_client
 from coriolis import schemas
 from coriolis.tasks import factory as tasks_factory
@@ -35,7 +46,32 @@ CONDUCTOR_OPTS = [
                 default=False,
                 help="If set, any OSMorphing task which errors out will have "
                      "all of its following tasks unscheduled so as to allow "
-                     "for live debugging of the OSMorphing setup.")
+                     "for live debugging of the OSMorphing setup."),
+    cfg.BoolOpt("endpoint_instances_sync_enabled",
+                default=False,
+                help="If set, the instances of all endpoints are periodically "
+                     "synced into the database by the replica cron service, "
+                     "so that listing and searching them is served from the "
+                     "database instead of the source clouds while the sync "
+                     "is recent enough."),
+    cfg.IntOpt("endpoint_instances_sync_interval",
+               default=900, min=60,
+               help="Number of seconds after which the instances of an "
+                    "endpoint are synced again."),
+    cfg.IntOpt("endpoint_instances_sync_max_age",
+               default=3600, min=60,
+               help="Number of seconds after the last sync of the instances "
+                    "of an endpoint after which they are listed live from "
+                    "the endpoint instead."),
+    cfg.IntOpt("endpoint_instances_sync_timeout",
+               default=3600, min=60,
+               help="Number of seconds after which an unfinished sync of the "
+                    "instances of an endpoint is considered stalled and can "
+                    "be restarted."),
+    cfg.IntOpt("endpoint_instances_sync_page_size",
+               default=500, min=1,
+               help="Number of instances requested per page while syncing "
+                    "the instances of an endpoint."),
 ]
 
 CONF = cfg.CONF
@@ -45,13 +81,15 @@ TASK_DEADLOCK_ERROR_MESSAGE = (
     "A fatal deadlock has occurred. Further debugging is required. "
     "Please review the Conductor logs and contact support for assistance.")
 
+# maximum number of execution task graphs cached by each conductor process:
+EXECUTION_GRAPH_CACHE_SIZE = 256
+
 
 def endpoint_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, endpoint_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.ENDPOINT_LOCK_NAME_FORMAT % endpoint_id,
-            external=True)
+        @locks.synchronized(
+            constants.ENDPOINT_LOCK_NAME_FORMAT % endpoint_id)
         def inner():
             return func(self, ctxt, endpoint_id, *args, **kwargs)
         return inner()
@@ -61,9 +99,8 @@ def endpoint_synchronized(func):
 def replica_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, replica_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.REPLICA_LOCK_NAME_FORMAT % replica_id,
-            external=True)
+        @locks.synchronized(
+            constants.REPLICA_LOCK_NAME_FORMAT % replica_id)
         def inner():
             return func(self, ctxt, replica_id, *args, **kwargs)
         return inner()
@@ -73,9 +110,8 @@ def replica_synchronized(func):
 def schedule_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, replica_id, schedule_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.SCHEDULE_LOCK_NAME_FORMAT % schedule_id,
-            external=True)
+        @locks.synchronized(
+            constants.SCHEDULE_LOCK_NAME_FORMAT % schedule_id)
         def inner():
             return func(self, ctxt, replica_id, schedule_id, *args, **kwargs)
         return inner()
@@ -85,26 +121,65 @@ def schedule_synchronized(func):
 def task_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, task_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.TASK_LOCK_NAME_FORMAT % task_id,
-            external=True)
+        @locks.synchronized(
+            constants.TASK_LOCK_NAME_FORMAT % task_id)
         def inner():
             return func(self, ctxt, task_id, *args, **kwargs)
         return inner()
     return wrapper
 
 
+def _get_execution_instance_lock_name(execution_id, instance):
+    # NOTE: instance names may contain characters which are not allowed in
+    # the names of the lock files:
+    return constants.EXECUTION_INSTANCE_LOCK_NAME_FORMAT % (
+        execution_id,
+        hashlib.sha256(str(instance).encode('utf-8')).hexdigest())
+
+
+@contextlib.contextmanager
+def execution_lock(ctxt, execution_id):
+    """ Locks the given execution as a whole.
+
+    Besides the lock of the execution itself, the locks of all of its
+    instances are acquired (always in the same order), so no task state
+    changes which are only synchronized per instance happen meanwhile.
+    """
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(locks.lock(
+            constants.EXECUTION_LOCK_NAME_FORMAT % execution_id))
+        for instance in db_api.get_tasks_execution_instances(
+                ctxt, execution_id):
+            stack.enter_context(locks.lock(
+                _get_execution_instance_lock_name(execution_id, instance)))
+        yield
+
+
 def parent_tasks_execution_synchronized(func):
+    @functools.wraps(func)
+    def wrapper(self, ctxt, task_id, *args, **kwargs):
+        task = db_api.get_task(ctxt, task_id)
+        with execution_lock(ctxt, task.execution_id):
+            with locks.lock(
+                    constants.TASK_LOCK_NAME_FORMAT % task_id):
+                return func(self, ctxt, task_id, *args, **kwargs)
+    return wrapper
+
+
+def parent_tasks_instance_synchronized(func):
+    """ Only synchronizes on the instance of the task within its parent
+    execution, so that tasks of different instances of the same execution
+    can be handled in parallel.
+    """
     @functools.wraps(func)
     def wrapper(self, ctxt, task_id, *args, **kwargs):
         task = db_api.get_task(ctxt, task_id)
 
-        @lockutils.synchronized(
-            constants.EXECUTION_LOCK_NAME_FORMAT % task.execution_id,
-            external=True)
-        @lockutils.synchronized(
-            constants.TASK_LOCK_NAME_FORMAT % task_id,
-            external=True)
+        @locks.synchronized(
+            _get_execution_instance_lock_name(
+                task.execution_id, task.instance))
+        @locks.synchronized(
+            constants.TASK_LOCK_NAME_FORMAT % task_id)
         def inner():
             return func(self, ctxt, task_id, *args, **kwargs)
         return inner()
@@ -114,9 +189,8 @@ def parent_tasks_execution_synchronized(func):
 def migration_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, migration_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.MIGRATION_LOCK_NAME_FORMAT % migration_id,
-            external=True)
+        @locks.synchronized(
+            constants.MIGRATION_LOCK_NAME_FORMAT % migration_id)
         def inner():
             return func(self, ctxt, migration_id, *args, **kwargs)
         return inner()
@@ -126,21 +200,16 @@ def migration_synchronized(func):
 def tasks_execution_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, replica_id, execution_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.EXECUTION_LOCK_NAME_FORMAT % execution_id,
-            external=True)
-        def inner():
+        with execution_lock(ctxt, execution_id):
             return func(self, ctxt, replica_id, execution_id, *args, **kwargs)
-        return inner()
     return wrapper
 
 
 def region_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, region_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.REGION_LOCK_NAME_FORMAT % region_id,
-            external=True)
+        @locks.synchronized(
+            constants.REGION_LOCK_NAME_FORMAT % region_id)
         def inner():
             return func(self, ctxt, region_id, *args, **kwargs)
         return inner()
@@ -150,15 +219,33 @@ def region_synchronized(func):
 def service_synchronized(func):
     @functools.wraps(func)
     def wrapper(self, ctxt, service_id, *args, **kwargs):
-        @lockutils.synchronized(
-            constants.SERVICE_LOCK_NAME_FORMAT % service_id,
-            external=True)
+        @locks.synchronized(
+            constants.SERVICE_LOCK_NAME_FORMAT % service_id)
         def inner():
             return func(self, ctxt, service_id, *args, **kwargs)
         return inner()
     return wrapper
 
 
+def _invalidate_endpoint_secret(ctxt, endpoint):
+    """ Drops the payload of the secret of the given endpoint from the caches
+    of the worker services, so that its credentials are fetched anew.
+    """
+    connection_info = endpoint.connection_info if endpoint else None
+    if not isinstance(connection_info, dict):
+        return
+    secret_ref = connection_info.get("secret_ref")
+    if not secret_ref:
+        return
+    try:
+        rpc_worker_client.WorkerClient().invalidate_secret(ctxt, secret_ref)
+    except Exception:
+        LOG.warn(
+            "Failed to invalidate the cached payloads of secret '%s' on the "
+            "workers. They will be used until they expire. Error was: %s",
+            secret_ref, utils.get_exception_details())
+
+
 class ConductorServerEndpoint(object):
     def __init__(self):
         self._licensing_client = licensing_client.LicensingClient.from_env()
@@ -166,6 +253,7 @@ class ConductorServerEndpoint(object):
         self._scheduler_client_instance = None
         self._replica_cron_client_instance = None
         self._minion_manager_client_instance = None
+        self._execution_graphs = collections.OrderedDict()
 
     # NOTE(aznashwan): it is unsafe to fork processes with pre-instantiated
     # oslo_messaging clients as the underlying eventlet thread queues will
@@ -256,9 +344,17 @@ class ConductorServerEndpoint(object):
             region_sets=region_sets, enabled=enabled,
             random_choice=random_choice,
             raise_on_no_matches=raise_on_no_matches)
-        service = db_api.get_service(ctxt, selected_service["id"])
         return rpc_worker_client.WorkerClient.from_service_definition(
-            service)
+            selected_service)
+
+    def _invalidate_scheduler_cache(self, ctxt):
+        try:
+            self._scheduler_client.invalidate_topology_cache(ctxt)
+        except Exception:
+            LOG.warn(
+                "Failed to invalidate the scheduler's cache. Changes to "
+                "services and regions may not be taken into account until "
+                "it expires. Error was: %s", utils.get_exception_details())
 
     def _check_delete_reservation_for_transfer(self, transfer_action):
         action_id = transfer_action.base_id
@@ -376,7 +472,10 @@ class ConductorServerEndpoint(object):
         LOG.info(
             "Attempting to update endpoint '%s' with payload: %s",
             endpoint_id, updated_values)
+        original_endpoint = db_api.get_endpoint(ctxt, endpoint_id)
         db_api.update_endpoint(ctxt, endpoint_id, updated_values)
+        cache.invalidate_endpoint_inventory(endpoint_id)
+        _invalidate_endpoint_secret(ctxt, original_endpoint)
         LOG.info("Endpoint updated: %s", endpoint_id)
         return db_api.get_endpoint(ctxt, endpoint_id)
 
@@ -398,20 +497,192 @@ class ConductorServerEndpoint(object):
         if q_replicas_count is not 0:
             raise exception.NotAuthorized("%s replicas would be orphaned!" %
                                           q_replicas_count)
+        endpoint = db_api.get_endpoint(ctxt, endpoint_id)
+        sync = db_api.get_endpoint_instances_sync(ctxt, endpoint_id)
         db_api.delete_endpoint(ctxt, endpoint_id)
+        cache.invalidate_endpoint_inventory(endpoint_id)
+        _invalidate_endpoint_secret(ctxt, endpoint)
+        if sync and sync.trust_id:
+            self._delete_endpoint_instances_sync_trust(sync.trust_id)
 
-    def get_endpoint_instances(self, ctxt, endpoint_id, source_environment,
-                               marker, limit, instance_name_pattern):
-        endpoint = self.get_endpoint(ctxt, endpoint_id)
-
-        worker_rpc = self._get_worker_service_rpc_for_specs(
+    def _get_worker_rpc_for_endpoint_instances(self, ctxt, endpoint):
+        return self._get_worker_service_rpc_for_specs(
             ctxt, enabled=True,
             region_sets=[[reg.id for reg in endpoint.mapped_regions]],
             provider_requirements={
                 endpoint.type: [constants.PROVIDER_TYPE_ENDPOINT_INSTANCES]})
-        return worker_rpc.get_endpoint_instances(
-            ctxt, endpoint.type, endpoint.connection_info,
-            source_environment, marker, limit, instance_name_pattern)
+
+    def get_endpoint_instances(self, ctxt, endpoint_id, source_environment,
+                               marker, limit, instance_name_pattern,
+                               refresh=False):
+        endpoint = self.get_endpoint(ctxt, endpoint_id)
+
+        def _get_instances():
+            worker_rpc = self._get_worker_rpc_for_endpoint_instances(
+                ctxt, endpoint)
+            return worker_rpc.get_endpoint_instances(
+                ctxt, endpoint.type, endpoint.connection_info,
+                source_environment, marker, limit, instance_name_pattern)
+
+        return cache.get_endpoint_inventory(
+            endpoint_id, "instances",
+            [source_environment, marker, limit, instance_name_pattern],
+            _get_instances, refresh=refresh)
+
+    def search_endpoint_instances(
+            self, ctxt, endpoint_id, source_environment, marker, limit,
+            instance_name_pattern, refresh=False):
+        """ Lists the instances of an endpoint from their index if they were
+        recently synced, or live from the endpoint otherwise.
+
+        Returns a dict with the 'instances' and the time of the sync they
+        were listed from as 'synced_at', which is None if listed live.
+        """
+        if (CONF.conductor.endpoint_instances_sync_enabled and
+                not refresh and not source_environment):
+            # NOTE: checks that the endpoint exists and is accessible:
+            self.get_endpoint(ctxt, endpoint_id)
+            sync = db_api.get_endpoint_instances_sync(ctxt, endpoint_id)
+            if not sync or not sync.trust_id:
+                self._add_endpoint_instances_sync_trust(ctxt, endpoint_id)
+            max_age = datetime.timedelta(
+                seconds=CONF.conductor.endpoint_instances_sync_max_age)
+            if sync and sync.synced_at and (
+                    timeutils.utcnow() - sync.synced_at <= max_age):
+                return {
+                    "instances": db_api.get_indexed_endpoint_instances(
+                        ctxt, endpoint_id, marker=marker, limit=limit,
+                        name_pattern=instance_name_pattern),
+                    "synced_at": sync.synced_at}
+            LOG.debug(
+                "Instances of endpoint '%s' were not synced recently, "
+                "listing them live.", endpoint_id)
+
+        return {
+            "instances": self.get_endpoint_instances(
+                ctxt, endpoint_id, source_environment, marker, limit,
+                instance_name_pattern, refresh=refresh),
+            "synced_at": None}
+
+    def _add_endpoint_instances_sync_trust(self, ctxt, endpoint_id):
+        """ Creates the trust with which the instances of the endpoint are
+        synced, as credentials stored in Barbican or the caller's token
+        cannot be used with an admin context.
+        """
+        if ctxt.trust_id:
+            # NOTE: the trust of the request belongs to another resource
+            # and may get deleted along with it:
+            return
+        try:
+            keystone.create_trust(ctxt)
+            trust_id = ctxt.trust_id
+        except Exception:
+            LOG.warn(
+                "Failed to create the trust to sync the instances of "
+                "endpoint '%s' with: %s", endpoint_id,
+                utils.get_exception_details())
+            return
+        finally:
+            ctxt.trust_id = None
+
+        try:
+            trust_set = db_api.set_endpoint_instances_sync_trust(
+                ctxt, endpoint_id, trust_id)
+        except Exception:
+            trust_set = False
+            LOG.warn(
+                "Failed to set the trust to sync the instances of "
+                "endpoint '%s' with: %s", endpoint_id,
+                utils.get_exception_details())
+        if not trust_set:
+            self._delete_endpoint_instances_sync_trust(trust_id)
+
+    def _delete_endpoint_instances_sync_trust(self, trust_id):
+        try:
+            keystone.delete_trust(context.get_admin_context(trust_id=trust_id))
+        except Exception:
+            LOG.warn(
+                "Failed to delete the endpoint instances sync trust '%s': "
+                "%s", trust_id, utils.get_exception_details())
+
+    def _sync_endpoint_instances(self, ctxt, endpoint):
+        """ Syncs the indexed instances of the endpoint, unless they were
+        synced recently or are being synced by another conductor.
+
+        Returns False if the endpoint has no trust to be synced with.
+        """
+        sync = db_api.get_endpoint_instances_sync(ctxt, endpoint.id)
+        if not sync or not sync.trust_id:
+            # NOTE: the trust is only created on behalf of the user when the
+            # instances of the endpoint are first listed:
+            return False
+
+        now = timeutils.utcnow()
+        stale_before = now - datetime.timedelta(
+            seconds=CONF.conductor.endpoint_instances_sync_interval)
+        stalled_before = now - datetime.timedelta(
+            seconds=CONF.conductor.endpoint_instances_sync_timeout)
+        if not db_api.claim_endpoint_instances_sync(
+                ctxt, endpoint.id, stale_before, stalled_before):
+            LOG.debug(
+                "Instances of endpoint '%s' are recently synced or being "
+                "synced, skipping.", endpoint.id)
+            return True
+
+        LOG.info("Syncing the instances of endpoint '%s'", endpoint.id)
+        page_size = CONF.conductor.endpoint_instances_sync_page_size
+        synced_count = 0
+        trust_ctxt = context.get_admin_context(trust_id=sync.trust_id)
+        try:
+            worker_rpc = self._get_worker_rpc_for_endpoint_instances(
+                ctxt, endpoint)
+            marker = None
+            while True:
+                instances = worker_rpc.get_endpoint_instances(
+                    trust_ctxt, endpoint.type, endpoint.connection_info, {},
+                    marker, page_size, None)
+                db_api.update_endpoint_instances(
+                    ctxt, endpoint.id, instances, now)
+                synced_count += len(instances)
+                if len(instances) < page_size:
+                    break
+                # NOTE: guards against providers not paging their results:
+                last_id = instances[-1].get("id")
+                if not last_id or last_id == marker:
+                    break
+                marker = last_id
+        except Exception as ex:
+            db_api.complete_endpoint_instances_sync(
+                ctxt, endpoint.id, now, error=str(ex))
+            raise
+
+        db_api.complete_endpoint_instances_sync(ctxt, endpoint.id, now)
+        LOG.info(
+            "Synced %d instances of endpoint '%s'", synced_count, endpoint.id)
+        return True
+
+    def sync_stale_endpoints_instances(self, ctxt):
+        """ Syncs the indexed instances of all the endpoints which were not
+        synced within the configured interval.
+
+        Endpoints without a trust to be synced with are skipped, as their
+        instances were not yet listed by any user.
+        """
+        if not CONF.conductor.endpoint_instances_sync_enabled:
+            return
+        skipped_endpoint_ids = []
+        for endpoint in db_api.get_endpoints(ctxt):
+            try:
+                if not self._sync_endpoint_instances(ctxt, endpoint):
+                    skipped_endpoint_ids.append(endpoint.id)
+            except Exception:
+                LOG.warn(
+                    "Failed to sync the instances of endpoint '%s': %s",
+                    endpoint.id, utils.get_exception_details())
+        if skipped_endpoint_ids:
+            LOG.debug(
+                "Skipped syncing the instances of the endpoints without a "
+                "trust: %s", skipped_endpoint_ids)
 
     def get_endpoint_instance(
             self, ctxt, endpoint_id, source_environment, instance_name):
@@ -428,55 +699,74 @@ class ConductorServerEndpoint(object):
             source_environment, instance_name)
 
     def get_endpoint_source_options(
-            self, ctxt, endpoint_id, env, option_names):
+            self, ctxt, endpoint_id, env, option_names, refresh=False):
         endpoint = self.get_endpoint(ctxt, endpoint_id)
 
-        worker_rpc = self._get_worker_service_rpc_for_specs(
-            ctxt, enabled=True,
-            region_sets=[[reg.id for reg in endpoint.mapped_regions]],
-            provider_requirements={
-                endpoint.type: [
-                    constants.PROVIDER_TYPE_SOURCE_ENDPOINT_OPTIONS]})
-
-        return worker_rpc.get_endpoint_source_options(
-            ctxt, endpoint.type, endpoint.connection_info, env, option_names)
+        def _get_source_options():
+            worker_rpc = self._get_worker_service_rpc_for_specs(
+                ctxt, enabled=True,
+                region_sets=[[reg.id for reg in endpoint.mapped_regions]],
+                provider_requirements={
+                    endpoint.type: [
+                        constants.PROVIDER_TYPE_SOURCE_ENDPOINT_OPTIONS]})
+            return worker_rpc.get_endpoint_source_options(
+                ctxt, endpoint.type, endpoint.connection_info, env,
+                option_names)
+
+        return cache.get_endpoint_inventory(
+            endpoint_id, "source_options", [env, option_names],
+            _get_source_options, refresh=refresh)
 
     def get_endpoint_destination_options(
-            self, ctxt, endpoint_id, env, option_names):
+            self, ctxt, endpoint_id, env, option_names, refresh=False):
         endpoint = self.get_endpoint(ctxt, endpoint_id)
 
-        worker_rpc = self._get_worker_service_rpc_for_specs(
-            ctxt, enabled=True,
-            region_sets=[[reg.id for reg in endpoint.mapped_regions]],
-            provider_requirements={
-                endpoint.type: [
-                    constants.PROVIDER_TYPE_DESTINATION_ENDPOINT_OPTIONS]})
-        return worker_rpc.get_endpoint_destination_options(
-            ctxt, endpoint.type, endpoint.connection_info, env, option_names)
-
-    def get_endpoint_networks(self, ctxt, endpoint_id, env):
+        def _get_destination_options():
+            worker_rpc = self._get_worker_service_rpc_for_specs(
+                ctxt, enabled=True,
+                region_sets=[[reg.id for reg in endpoint.mapped_regions]],
+                provider_requirements={
+                    endpoint.type: [
+                        constants.PROVIDER_TYPE_DESTINATION_ENDPOINT_OPTIONS]})
+            return worker_rpc.get_endpoint_destination_options(
+                ctxt, endpoint.type, endpoint.connection_info, env,
+                option_names)
+
+        return cache.get_endpoint_inventory(
+            endpoint_id, "destination_options", [env, option_names],
+            _get_destination_options, refresh=refresh)
+
+    def get_endpoint_networks(self, ctxt, endpoint_id, env, refresh=False):
         endpoint = self.get_endpoint(ctxt, endpoint_id)
 
-        worker_rpc = self._get_worker_service_rpc_for_specs(
-            ctxt, enabled=True,
-            region_sets=[[reg.id for reg in endpoint.mapped_regions]],
-            provider_requirements={
-                endpoint.type: [constants.PROVIDER_TYPE_ENDPOINT_NETWORKS]})
+        def _get_networks():
+            worker_rpc = self._get_worker_service_rpc_for_specs(
+                ctxt, enabled=True,
+                region_sets=[[reg.id for reg in endpoint.mapped_regions]],
+                provider_requirements={
+                    endpoint.type: [
+                        constants.PROVIDER_TYPE_ENDPOINT_NETWORKS]})
+            return worker_rpc.get_endpoint_networks(
+                ctxt, endpoint.type, endpoint.connection_info, env)
 
-        return worker_rpc.get_endpoint_networks(
-            ctxt, endpoint.type, endpoint.connection_info, env)
+        return cache.get_endpoint_inventory(
+            endpoint_id, "networks", [env], _get_networks, refresh=refresh)
 
-    def get_endpoint_storage(self, ctxt, endpoint_id, env):
+    def get_endpoint_storage(self, ctxt, endpoint_id, env, refresh=False):
         endpoint = self.get_endpoint(ctxt, endpoint_id)
 
-        worker_rpc = self._get_worker_service_rpc_for_specs(
-            ctxt, enabled=True,
-            region_sets=[[reg.id for reg in endpoint.mapped_regions]],
-            provider_requirements={
-                endpoint.type: [constants.PROVIDER_TYPE_ENDPOINT_STORAGE]})
+        def _get_storage():
+            worker_rpc = self._get_worker_service_rpc_for_specs(
+                ctxt, enabled=True,
+                region_sets=[[reg.id for reg in endpoint.mapped_regions]],
+                provider_requirements={
+                    endpoint.type: [
+                        constants.PROVIDER_TYPE_ENDPOINT_STORAGE]})
+            return worker_rpc.get_endpoint_storage(
+                ctxt, endpoint.type, endpoint.connection_info, env)
 
-        return worker_rpc.get_endpoint_storage(
-            ctxt, endpoint.type, endpoint.connection_info, env)
+        return cache.get_endpoint_inventory(
+            endpoint_id, "storage", [env], _get_storage, refresh=refresh)
 
     def validate_endpoint_connection(self, ctxt, endpoint_id):
         endpoint = self.get_endpoint(ctxt, endpoint_id)
@@ -588,29 +878,97 @@ class ConductorServerEndpoint(object):
             "target_environment": action.destination_environment
         }
 
-    def _get_worker_service_rpc_for_task(
-            self, ctxt, task, origin_endpoint, destination_endpoint,
-            retry_count=5, retry_period=2, random_choice=True):
-        worker_service = None
+    def _get_worker_service_rpcs_for_tasks(
+            self, ctxt, tasks, origin_endpoint, destination_endpoint,
+            retry_count=5, retry_period=2):
+        """ Places all the given tasks on worker services within a single
+        scheduling request, and returns a dict of the form {
+            "<task_id>": <WorkerClient for the task's worker service>}
+        The tasks which could not be placed are marked as unscheduleable.
+        """
         try:
-            worker_service = (
-                self._scheduler_client.get_worker_service_for_task(
-                    ctxt, {"id": task.id, "task_type": task.task_type},
+            worker_services = (
+                self._scheduler_client.get_worker_services_for_tasks(
+                    ctxt, [{"id": task.id, "task_type": task.task_type}
+                           for task in tasks],
                     origin_endpoint, destination_endpoint,
                     retry_count=retry_count, retry_period=retry_period,
-                    random_choice=random_choice))
+                    raise_on_no_matches=False))
         except Exception as ex:
             LOG.debug(
-                "Failed to get worker service for task '%s'. Updating status "
-                "to unscheduleable. Error trace was: %s",
-                task.id, utils.get_exception_details())
-            db_api.set_task_status(
-                ctxt, task.id, constants.TASK_STATUS_FAILED_TO_SCHEDULE,
-                exception_details=str(ex))
+                "Failed to get worker services for tasks %s. Updating their "
+                "statuses to unscheduleable. Error trace was: %s",
+                [task.id for task in tasks], utils.get_exception_details())
+            for task in tasks:
+                db_api.set_task_status(
+                    ctxt, task.id, constants.TASK_STATUS_FAILED_TO_SCHEDULE,
+                    exception_details=str(ex))
             raise
 
-        return rpc_worker_client.WorkerClient.from_service_definition(
-            worker_service)
+        unplaced_tasks = [
+            task.id for task in tasks if not worker_services.get(task.id)]
+        if unplaced_tasks:
+            message = (
+                "Failed to schedule tasks %s after %d tries. This may "
+                "indicate that there are no Coriolis Worker services able to "
+                "perform the tasks on the platforms and in the Coriolis "
+                "Regions required by the selected source/destination "
+                "Coriolis Endpoints. Please review the Conductor and "
+                "Scheduler logs for more exact details." % (
+                    unplaced_tasks, retry_count))
+            for task_id in unplaced_tasks:
+                db_api.set_task_status(
+                    ctxt, task_id, constants.TASK_STATUS_FAILED_TO_SCHEDULE,
+                    exception_details=message)
+            raise exception.NoSuitableWorkerServiceError(message)
+
+        return {
+            task.id: rpc_worker_client.WorkerClient.from_service_definition(
+                worker_services[task.id])
+            for task in tasks}
+
+    def _start_tasks_on_workers(
+            self, ctxt, execution, tasks, task_infos, origin, destination,
+            origin_endpoint, destination_endpoint, scheduling_retry_count=5,
+            scheduling_retry_period=2):
+        """ Schedules and begins the given PENDING tasks, cancelling the
+        execution should any of them fail to start.
+        Returns the list of the IDs of the started tasks.
+        """
+        started_tasks = []
+        if not tasks:
+            return started_tasks
+
+        try:
+            worker_rpcs = self._get_worker_service_rpcs_for_tasks(
+                ctxt, tasks, origin_endpoint, destination_endpoint,
+                retry_count=scheduling_retry_count,
+                retry_period=scheduling_retry_period)
+            for task in tasks:
+                worker_rpcs[task.id].begin_task(
+                    ctxt,
+                    task_id=task.id,
+                    task_type=task.task_type,
+                    origin=origin,
+                    destination=destination,
+                    instance=task.instance,
+                    task_info=task_infos[task.id])
+                LOG.debug(
+                    "Successfully started task with ID '%s' (type '%s') "
+                    "for execution '%s'", task.id, task.task_type,
+                    execution.id)
+                started_tasks.append(task.id)
+        except Exception:
+            LOG.warn(
+                "Error occured while starting new tasks %s. Cancelling "
+                "execution '%s'. Error was: %s",
+                [task.id for task in tasks if task.id not in started_tasks],
+                execution.id, utils.get_exception_details())
+            self._cancel_tasks_execution(
+                ctxt, execution, requery=True)
+            raise
+
+        return started_tasks
 
     def _begin_tasks(
             self, ctxt, action, execution, task_info_override=None,
@@ -631,7 +989,7 @@ class ConductorServerEndpoint(object):
         destination_endpoint = db_api.get_endpoint(
             ctxt, action.destination_endpoint_id)
 
-        newly_started_tasks = []
+        tasks_to_start = []
         for task in execution.tasks:
             if (not task.depends_on and (
                     task.status == constants.TASK_STATUS_SCHEDULED)):
@@ -640,28 +998,15 @@ class ConductorServerEndpoint(object):
                     task.id, execution.id)
                 db_api.set_task_status(
                     ctxt, task.id, constants.TASK_STATUS_PENDING)
-                try:
-                    worker_rpc = self._get_worker_service_rpc_for_task(
-                        ctxt, task, origin_endpoint, destination_endpoint,
-                        retry_count=scheduling_retry_count,
-                        retry_period=scheduling_retry_period)
-                    worker_rpc.begin_task(
-                        ctxt,
-                        task_id=task.id,
-                        task_type=task.task_type,
-                        origin=origin,
-                        destination=destination,
-                        instance=task.instance,
-                        task_info=task_info.get(task.instance, {}))
-                except Exception:
-                    LOG.warn(
-                        "Error occured while starting new task '%s'. "
-                        "Cancelling execution '%s'. Error was: %s",
-                        task.id, execution.id, utils.get_exception_details())
-                    self._cancel_tasks_execution(
-                        ctxt, execution, requery=True)
-                    raise
-                newly_started_tasks.append(task.id)
+                tasks_to_start.append(task)
+
+        newly_started_tasks = self._start_tasks_on_workers(
+            ctxt, execution, tasks_to_start,
+            {task.id: task_info.get(task.instance, {})
+             for task in tasks_to_start},
+            origin, destination, origin_endpoint, destination_endpoint,
+            scheduling_retry_count=scheduling_retry_count,
+            scheduling_retry_period=scheduling_retry_period)
 
         if newly_started_tasks:
             LOG.info(
@@ -1030,18 +1375,34 @@ class ConductorServerEndpoint(object):
     @replica_synchronized
     def get_replica_tasks_executions(self, ctxt, replica_id,
                                      include_tasks=False,
-                                     include_task_info=False):
+                                     include_task_info=False, filters=None,
+                                     marker=None, limit=None,
+                                     sort_keys=None, sort_dirs=None):
         return db_api.get_replica_tasks_executions(
             ctxt, replica_id, include_tasks,
-            include_task_info=include_task_info, to_dict=True)
+            include_task_info=include_task_info, to_dict=True,
+            filters=filters, marker=marker, limit=limit,
+            sort_keys=sort_keys, sort_dirs=sort_dirs)
 
-    @tasks_execution_synchronized
     def get_replica_tasks_execution(self, ctxt, replica_id, execution_id,
                                     include_task_info=False):
+        # NOTE: the execution is only read, so it is not locked, as its
+        # status is frequently polled while its tasks are being run:
         return self._get_replica_tasks_execution(
             ctxt, replica_id, execution_id,
             include_task_info=include_task_info, to_dict=True)
 
+    def get_replica_tasks_execution_status(
+            self, ctxt, replica_id, execution_id, include_events=False):
+        execution = db_api.get_tasks_execution_status(
+            ctxt, replica_id, execution_id=execution_id,
+            include_events=include_events)
+        if not execution:
+            raise exception.NotFound(
+                "Execution with ID '%s' for Replica '%s' not found." % (
+                    execution_id, replica_id))
+        return execution
+
     @tasks_execution_synchronized
     def delete_replica_tasks_execution(self, ctxt, replica_id, execution_id):
         execution = self._get_replica_tasks_execution(
@@ -1082,10 +1443,13 @@ class ConductorServerEndpoint(object):
         return execution
 
     def get_replicas(self, ctxt, include_tasks_executions=False,
-                     include_task_info=False):
+                     include_task_info=False, filters=None, marker=None,
+                     limit=None, sort_keys=None, sort_dirs=None):
         return db_api.get_replicas(
             ctxt, include_tasks_executions,
-            include_task_info=include_task_info, to_dict=True)
+            include_task_info=include_task_info, to_dict=True,
+            filters=filters, marker=marker, limit=limit,
+            sort_keys=sort_keys, sort_dirs=sort_dirs)
 
     @replica_synchronized
     def get_replica(self, ctxt, replica_id, include_task_info=False):
@@ -1220,11 +1584,13 @@ class ConductorServerEndpoint(object):
         return replica
 
     def get_migrations(self, ctxt, include_tasks,
-                       include_task_info=False):
+                       include_task_info=False, filters=None, marker=None,
+                       limit=None, sort_keys=None, sort_dirs=None):
         return db_api.get_migrations(
             ctxt, include_tasks,
             include_task_info=include_task_info,
-            to_dict=True)
+            to_dict=True, filters=filters, marker=marker, limit=limit,
+            sort_keys=sort_keys, sort_dirs=sort_dirs)
 
     @migration_synchronized
     def get_migration(self, ctxt, migration_id, include_task_info=False):
@@ -1232,6 +1598,14 @@ class ConductorServerEndpoint(object):
             ctxt, migration_id, include_task_info=include_task_info,
             to_dict=True)
 
+    def get_migration_status(self, ctxt, migration_id, include_events=False):
+        migration = db_api.get_migration_status(
+            ctxt, migration_id, include_events=include_events)
+        if not migration:
+            raise exception.NotFound(
+                "Migration with ID '%s' not found." % migration_id)
+        return migration
+
     @staticmethod
     def _check_running_replica_migrations(ctxt, replica_id):
         migrations = db_api.get_replica_migrations(ctxt, replica_id)
@@ -1511,9 +1885,8 @@ class ConductorServerEndpoint(object):
                 migration.instance_osmorphing_minion_pool_mappings):
             # NOTE: we lock on the migration ID to ensure the minion
             # allocation confirmations don't come in too early:
-            with lockutils.lock(
-                    constants.MIGRATION_LOCK_NAME_FORMAT % migration.id,
-                    external=True):
+            with locks.lock(
+                    constants.MIGRATION_LOCK_NAME_FORMAT % migration.id):
                 (self._minion_manager_client
                      .allocate_minion_machines_for_migration(
                          ctxt, migration, include_transfer_minions=False,
@@ -2099,9 +2472,8 @@ class ConductorServerEndpoint(object):
         if uses_minion_pools:
             # NOTE: we lock on the migration ID to ensure the minion
             # allocation confirmations don't come in too early:
-            with lockutils.lock(
-                    constants.MIGRATION_LOCK_NAME_FORMAT % migration.id,
-                    external=True):
+            with locks.lock(
+                    constants.MIGRATION_LOCK_NAME_FORMAT % migration.id):
                 (self._minion_manager_client
                     .allocate_minion_machines_for_migration(
                         ctxt, migration, include_transfer_minions=True,
@@ -2152,9 +2524,7 @@ class ConductorServerEndpoint(object):
                 "Migration '%s' is already being cancelled. Please use the "
                 "force option if you'd like to force-cancel it.")
 
-        with lockutils.lock(
-                constants.EXECUTION_LOCK_NAME_FORMAT % execution.id,
-                external=True):
+        with execution_lock(ctxt, execution.id):
             self._cancel_tasks_execution(ctxt, execution, force=force)
         self._check_delete_reservation_for_transfer(migration)
 
@@ -2176,7 +2546,8 @@ class ConductorServerEndpoint(object):
                 "cancellation is '%s'", execution.id, execution.status)
             # mark execution as cancelling:
             self._set_tasks_execution_status(
-                ctxt, execution, constants.EXECUTION_STATUS_CANCELLING)
+                ctxt, execution, constants.EXECUTION_STATUS_CANCELLING,
+                expected_status=constants.EXECUTION_STATUS_RUNNING)
         elif execution.status == constants.EXECUTION_STATUS_CANCELLING and (
                 not force):
             LOG.info(
@@ -2192,6 +2563,21 @@ class ConductorServerEndpoint(object):
                 "Skipping re-cancellation.", execution.id, execution.status)
             return
 
+        def _set_task_status(task, new_status, **kwargs):
+            """ Sets the status of the task, unless it was concurrently
+            changed since the execution was fetched.
+            """
+            if not db_api.set_task_status(
+                    ctxt, task.id, new_status,
+                    expected_statuses=[task.status], **kwargs):
+                LOG.warn(
+                    "Task '%s' of execution '%s' was concurrently "
+                    "transitioned from '%s' during the cancellation of the "
+                    "execution. Leaving it as is.",
+                    task.id, execution.id, task.status)
+                return False
+            return True
+
         # iterate through and kill/cancel any non-error
         # tasks which are running/pending:
         for task in sorted(execution.tasks, key=lambda t: t.index):
@@ -2207,8 +2593,8 @@ class ConductorServerEndpoint(object):
                     task.id, task.status,
                     constants.TASK_STATUS_FORCE_CANCELED,
                     execution.id)
-                db_api.set_task_status(
-                    ctxt, task.id, constants.TASK_STATUS_FORCE_CANCELED,
+                _set_task_status(
+                    task, constants.TASK_STATUS_FORCE_CANCELED,
                     exception_details=(
                         "This task was force-canceled at user request. "
                         "Its state prior to its cancellation was '%s'. "
@@ -2228,8 +2614,8 @@ class ConductorServerEndpoint(object):
                     "cancellation of execution '%s'.",
                     task.status, task.id, constants.TASK_STATUS_UNSCHEDULED,
                     execution.id)
-                db_api.set_task_status(
-                    ctxt, task.id, constants.TASK_STATUS_UNSCHEDULED,
+                _set_task_status(
+                    task, constants.TASK_STATUS_UNSCHEDULED,
                     exception_details=(
                         "This task was unscheduled during the cancellation "
                         "of the parent tasks execution."))
@@ -2245,8 +2631,8 @@ class ConductorServerEndpoint(object):
                     "cancellation of execution '%s'",
                     task.status, task.id,
                     constants.TASK_STATUS_UNSCHEDULED, execution.id)
-                db_api.set_task_status(
-                    ctxt, task.id, constants.TASK_STATUS_UNSCHEDULED,
+                _set_task_status(
+                    task, constants.TASK_STATUS_UNSCHEDULED,
                     exception_details=(
                         "This task was already pending execution but was "
                         "unscheduled during the cancellation of the parent "
@@ -2260,8 +2646,9 @@ class ConductorServerEndpoint(object):
                         "Sending cancellation request for  %s non-error task  "
                         "'%s' as part of cancellation of execution '%s'",
                         task.status, task.id, execution.id)
-                    db_api.set_task_status(
-                        ctxt, task.id, constants.TASK_STATUS_CANCELLING)
+                    if not _set_task_status(
+                            task, constants.TASK_STATUS_CANCELLING):
+                        continue
                     try:
                         worker_rpc = rpc_worker_client.WorkerClient(
                             # NOTE: we intetionally lowball the timeout for the
@@ -2284,7 +2671,9 @@ class ConductorServerEndpoint(object):
                         db_api.set_task_status(
                             ctxt, task.id,
                             constants.TASK_STATUS_FAILED_TO_CANCEL,
-                            exception_details=msg)
+                            exception_details=msg,
+                            expected_statuses=[
+                                constants.TASK_STATUS_CANCELLING])
 
                 # let any on-error tasks run to completion but mark
                 # them as CANCELLING_AFTER_COMPLETION so they will
@@ -2296,8 +2685,8 @@ class ConductorServerEndpoint(object):
                         task.status, task.id,
                         constants.TASK_STATUS_CANCELLING_AFTER_COMPLETION,
                         execution.id)
-                    db_api.set_task_status(
-                        ctxt, task.id,
+                    _set_task_status(
+                        task,
                         constants.TASK_STATUS_CANCELLING_AFTER_COMPLETION,
                         exception_details=(
                             "Task will be marked as cancelled after completion"
@@ -2308,8 +2697,7 @@ class ConductorServerEndpoint(object):
                     "Marking on-error-only task '%s' as scheduled following "
                     "cancellation of execution '%s'",
                     task.id, execution.id)
-                db_api.set_task_status(
-                    ctxt, task.id, constants.TASK_STATUS_SCHEDULED)
+                _set_task_status(task, constants.TASK_STATUS_SCHEDULED)
             else:
                 LOG.debug(
                     "No action currently taken with respect to task '%s' "
@@ -2330,10 +2718,27 @@ class ConductorServerEndpoint(object):
                 "state advancement after cancellation.", execution.id)
 
     def _set_tasks_execution_status(
-            self, ctxt, execution, new_execution_status):
+            self, ctxt, execution, new_execution_status,
+            expected_status=None):
+        """ Sets the status of the execution, and handles its finalization.
+
+        If an 'expected_status' is given, nothing is done if the execution
+        is no longer in that status.
+        """
         previous_execution_status = execution.status
-        execution = db_api.set_execution_status(
-            ctxt, execution.id, new_execution_status)
+        expected_statuses = None
+        if expected_status is not None:
+            expected_statuses = [expected_status]
+        updated_execution = db_api.set_execution_status(
+            ctxt, execution.id, new_execution_status,
+            expected_statuses=expected_statuses)
+        if updated_execution is None:
+            LOG.info(
+                "Not transitioning execution '%s' to status '%s' as its "
+                "status was concurrently changed from '%s'.",
+                execution.id, new_execution_status, expected_status)
+            return
+        execution = updated_execution
         LOG.info(
             "Tasks execution %(id)s (action %(action)s) status updated "
             "from %(old_status)s to %(new_status)s",
@@ -2381,7 +2786,7 @@ class ConductorServerEndpoint(object):
                 execution.id, execution.type, execution.action_id,
                 new_execution_status)
 
-    @parent_tasks_execution_synchronized
+    @parent_tasks_instance_synchronized
     def set_task_host(self, ctxt, task_id, host):
         """ Saves the ID of the worker host which has accepted
         the task to the DB and marks the task as STARTING. """
@@ -2419,7 +2824,7 @@ class ConductorServerEndpoint(object):
             "Successfully set host for task with ID '%s' to '%s'",
             task_id, host)
 
-    @parent_tasks_execution_synchronized
+    @parent_tasks_instance_synchronized
     def set_task_process(self, ctxt, task_id, process_id):
         """ Sets the ID of the Worker-side process for the given task,
         and marks the task as actually 'RUNNING'. """
@@ -2450,7 +2855,8 @@ class ConductorServerEndpoint(object):
             task_id, process_id)
 
     def _check_clean_execution_deadlock(
-            self, ctxt, execution, task_statuses=None, requery=True):
+            self, ctxt, execution, task_statuses=None, requery=True,
+            instance=None):
         """ Checks whether an execution is deadlocked.
         Deadlocked executions have no currently running/pending tasks
         but some remaining scheduled tasks.
@@ -2458,6 +2864,10 @@ class ConductorServerEndpoint(object):
         as DEADLOCKED, and the execution is marked as such too.
         Returns the state of the execution when the check occured
         (either RUNNING or DEADLOCKED)
+
+        If an 'instance' is given, only its tasks are checked, as the tasks
+        of the other instances may be concurrently advanced. The execution is
+        then only marked as DEADLOCKED once none of its tasks are active.
         """
         if requery:
             execution = db_api.get_tasks_execution(ctxt, execution.id)
@@ -2465,6 +2875,13 @@ class ConductorServerEndpoint(object):
             task_statuses = {}
             for task in execution.tasks:
                 task_statuses[task.id] = task.status
+        if instance is not None:
+            instance_task_ids = set(
+                task.id for task in execution.tasks
+                if task.instance == instance)
+            task_statuses = {
+                task_id: stat for (task_id, stat) in task_statuses.items()
+                if task_id in instance_task_ids}
 
         determined_state = constants.EXECUTION_STATUS_RUNNING
         status_vals = task_statuses.values()
@@ -2472,9 +2889,10 @@ class ConductorServerEndpoint(object):
                 any([stat in status_vals
                      for stat in constants.ACTIVE_TASK_STATUSES])):
             LOG.warn(
-                "Execution '%s' is deadlocked. Cleaning up now. "
-                "Task statuses are: %s",
-                execution.id, task_statuses)
+                "Execution '%s' is deadlocked (for tasks of instance '%s'). "
+                "Cleaning up now. Task statuses are: %s",
+                execution.id, instance, task_statuses)
+            all_tasks_stranded = True
             for task_id, stat in task_statuses.items():
                 if stat in (
                         constants.TASK_STATUS_SCHEDULED,
@@ -2482,15 +2900,35 @@ class ConductorServerEndpoint(object):
                     LOG.warn(
                         "Marking deadlocked task '%s' as that (current "
                         "state: %s)", task_id, stat)
-                    db_api.set_task_status(
-                        ctxt, task_id,
-                        constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
-                        exception_details=TASK_DEADLOCK_ERROR_MESSAGE)
+                    if not db_api.set_task_status(
+                            ctxt, task_id,
+                            constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
+                            exception_details=TASK_DEADLOCK_ERROR_MESSAGE,
+                            expected_statuses=[
+                                constants.TASK_STATUS_SCHEDULED,
+                                constants.TASK_STATUS_ON_ERROR_ONLY]):
+                        LOG.warn(
+                            "Task '%s' of execution '%s' was concurrently "
+                            "transitioned from '%s' during deadlock cleanup. "
+                            "Leaving it as is.", task_id, execution.id, stat)
+                        all_tasks_stranded = False
+            if not all_tasks_stranded:
+                return determined_state
+            if instance is not None and self._get_execution_status(
+                    ctxt, execution, requery=True, instance=instance) != (
+                        constants.EXECUTION_STATUS_DEADLOCKED):
+                LOG.warn(
+                    "Tasks of instance '%s' of execution '%s' are "
+                    "deadlocked, but the tasks of its other instances are "
+                    "still being run. Not marking it as DEADLOCKED yet.",
+                    instance, execution.id)
+                return determined_state
             LOG.warn(
                 "Marking deadlocked execution '%s' as DEADLOCKED",
                 execution.id)
             self._set_tasks_execution_status(
-                ctxt, execution, constants.EXECUTION_STATUS_DEADLOCKED)
+                ctxt, execution, constants.EXECUTION_STATUS_DEADLOCKED,
+                expected_status=execution.status)
             LOG.error(
                 "Execution '%s' is deadlocked. Cleanup has been performed. "
                 "Task statuses at time of deadlock were: %s",
@@ -2498,7 +2936,8 @@ class ConductorServerEndpoint(object):
             determined_state = constants.EXECUTION_STATUS_DEADLOCKED
         return determined_state
 
-    def _get_execution_status(self, ctxt, execution, requery=False):
+    def _get_execution_status(
+            self, ctxt, execution, requery=False, instance=None):
         """ Returns the global status of an execution.
         RUNNING - at least one task is RUNNING, STARTING, PENDING or CANCELLING
         COMPLETED - all non-error-only tasks are COMPLETED
@@ -2506,35 +2945,56 @@ class ConductorServerEndpoint(object):
         CANCELIING - at least one task in CANCELLING status
         ERROR - not RUNNING and at least one is ERROR'd
         DEADLOCKED - has SCHEDULED tasks but none RUNNING/PENDING/CANCELLING
+
+        If the 'instance' whose lock is held is given, the SCHEDULED tasks
+        of the other instances may be about to be started by a concurrent
+        state advancement, so the execution keeps its current status instead.
+        It is then DEADLOCKED if tasks of some instances were deadlocked and
+        no tasks are active anymore, while the tasks of the other instances
+        keep it RUNNING until then.
         """
         is_running = False
         is_canceled = False
         is_cancelling = False
         is_errord = False
         has_scheduled_tasks = False
-        task_stat_map = {}
+        has_deadlocked_tasks = False
+        # NOTE: when requerying, only the number of tasks in each status is
+        # fetched from the DB instead of all the tasks of the execution:
         if requery:
-            execution = db_api.get_tasks_execution(ctxt, execution.id)
-        for task in execution.tasks:
-            task_stat_map[task.id] = task.status
-            if task.status in constants.ACTIVE_TASK_STATUSES:
+            task_status_counts = db_api.get_tasks_execution_status_counts(
+                ctxt, execution.id)
+        else:
+            task_status_counts = collections.Counter(
+                task.status for task in execution.tasks)
+        for task_status in task_status_counts:
+            if task_status in constants.ACTIVE_TASK_STATUSES:
                 is_running = True
-            if task.status in constants.CANCELED_TASK_STATUSES:
+            if task_status in constants.CANCELED_TASK_STATUSES and not (
+                    instance is not None and task_status == (
+                        constants.TASK_STATUS_CANCELED_FROM_DEADLOCK)):
                 is_canceled = True
-            if task.status in (
+            if task_status in (
                     constants.TASK_STATUS_ERROR,
                     constants.TASK_STATUS_FAILED_TO_SCHEDULE):
                 is_errord = True
-            if task.status in (
+            if task_status in (
                     constants.TASK_STATUS_CANCELLING,
                     constants.TASK_STATUS_CANCELLING_AFTER_COMPLETION):
                 is_cancelling = True
-            if task.status == constants.TASK_STATUS_SCHEDULED:
+            if task_status == constants.TASK_STATUS_SCHEDULED:
                 has_scheduled_tasks = True
+            if task_status == constants.TASK_STATUS_CANCELED_FROM_DEADLOCK:
+                has_deadlocked_tasks = True
 
         status = constants.EXECUTION_STATUS_COMPLETED
         if has_scheduled_tasks and not is_running:
             status = constants.EXECUTION_STATUS_DEADLOCKED
+            if instance is not None:
+                status = execution.status
+        elif instance is not None and has_deadlocked_tasks and (
+                not is_running):
+            status = constants.EXECUTION_STATUS_DEADLOCKED
         elif is_cancelling:
             status = constants.EXECUTION_STATUS_CANCELLING
         elif is_running:
@@ -2553,12 +3013,22 @@ class ConductorServerEndpoint(object):
 
         LOG.debug(
             "Overall status for Execution '%s' determined to be '%s'."
-            "Task statuses at time of decision: %s",
-            execution.id, status, task_stat_map)
+            "Task status counts at time of decision: %s",
+            execution.id, status, dict(task_status_counts))
         return status
 
+    def _get_execution_graph(self, execution):
+        graph = self._execution_graphs.pop(execution.id, None)
+        if graph is None or not graph.matches(execution.tasks):
+            graph = execution_graph.ExecutionGraph(execution.tasks)
+        self._execution_graphs[execution.id] = graph
+        while len(self._execution_graphs) > EXECUTION_GRAPH_CACHE_SIZE:
+            self._execution_graphs.popitem(last=False)
+        return graph
+
     def _advance_execution_state(
-            self, ctxt, execution, requery=True, instance=None):
+            self, ctxt, execution, requery=True, instance=None,
+            changed_task_ids=None):
         """ Advances the state of the execution by starting/refreshing
         the state of all child tasks.
         If the execution has finalized (either completed or error'd),
@@ -2566,6 +3036,9 @@ class ConductorServerEndpoint(object):
         Returns a list of all the tasks which were started.
         NOTE: should only be called with a lock on the Execution!
 
+        If 'changed_task_ids' are given, only the children of those tasks
+        are evaluated, instead of all the tasks (of the given instance).
+
         Requirements for a task to be started:
         - any SCHEDULED task with no deps will be instantly started
         - any task where all parent tasks got UNSCHEDULED will
@@ -2589,7 +3062,7 @@ class ConductorServerEndpoint(object):
                 execution.id, execution.status)
             if self._check_clean_execution_deadlock(
                     ctxt, execution, task_statuses=None,
-                    requery=not requery) == (
+                    requery=not requery, instance=instance) == (
                         constants.EXECUTION_STATUS_DEADLOCKED):
                 LOG.error(
                     "Execution '%s' deadlocked even before Replica state "
@@ -2614,78 +3087,104 @@ class ConductorServerEndpoint(object):
 
         origin = self._get_task_origin(ctxt, execution.action)
         destination = self._get_task_destination(ctxt, execution.action)
-        action = db_api.get_action(
-            ctxt, execution.action_id, include_task_info=True)
         origin_endpoint = db_api.get_endpoint(
             ctxt, execution.action.origin_endpoint_id)
         destination_endpoint = db_api.get_endpoint(
             ctxt, execution.action.destination_endpoint_id)
 
-        started_tasks = []
+        tasks_to_start = []
+        task_infos = {}
+        # NOTE: only the info of the instances of the started tasks is loaded:
+        instance_infos = {}
+
+        def _get_current_task_status(task):
+            current_status = db_api.get_task(ctxt, task.id).status
+            LOG.warn(
+                "Task '%s' of execution '%s' was concurrently transitioned "
+                "from '%s' to '%s' during state advancement. Leaving it as "
+                "is.",
+                task.id, execution.id, constants.TASK_STATUS_SCHEDULED,
+                current_status)
+            return current_status
+
+        def _unschedule_task(task, exception_details):
+            if not db_api.set_task_status(
+                    ctxt, task.id, constants.TASK_STATUS_UNSCHEDULED,
+                    exception_details=exception_details,
+                    expected_statuses=[constants.TASK_STATUS_SCHEDULED]):
+                return _get_current_task_status(task)
+            return constants.TASK_STATUS_UNSCHEDULED
 
         def _start_task(task):
-            task_info = None
-            if task.instance not in action.info:
+            """ Marks the task as PENDING, with all the tasks marked during
+            the state advancement being scheduled and begun together.
+            """
+            # NOTE: tasks which were concurrently started or unscheduled
+            # by another state advancement are skipped:
+            if not db_api.set_task_status(
+                    ctxt, task.id, constants.TASK_STATUS_PENDING,
+                    expected_statuses=[constants.TASK_STATUS_SCHEDULED]):
+                return _get_current_task_status(task)
+
+            if task.instance not in instance_infos:
+                instance_infos[task.instance] = (
+                    db_api.get_transfer_action_info_for_instance(
+                        ctxt, execution.action_id, task.instance))
+            task_info = instance_infos[task.instance]
+            if task_info is None:
                 LOG.error(
                     "No info present for instance '%s' in action '%s' for task"
                     " '%s' (type '%s') of execution '%s' (type '%s'). "
                     "Defaulting to empty dict." %
-                    (task.instance, action.id, task.id, task.task_type,
-                     execution.id, execution.type))
+                    (task.instance, execution.action_id, task.id,
+                     task.task_type, execution.id, execution.type))
                 task_info = {}
-            else:
-                task_info = action.info[task.instance]
-            db_api.set_task_status(
-                ctxt, task.id, constants.TASK_STATUS_PENDING)
-            try:
-                worker_rpc = self._get_worker_service_rpc_for_task(
-                    ctxt, task, origin_endpoint, destination_endpoint)
-                worker_rpc.begin_task(
-                    ctxt,
-                    task_id=task.id,
-                    task_type=task.task_type,
-                    origin=origin,
-                    destination=destination,
-                    instance=task.instance,
-                    task_info=task_info)
-                LOG.debug(
-                    "Successfully started task with ID '%s' (type '%s') "
-                    "for execution '%s'", task.id, task.task_type,
-                    execution.id)
-                started_tasks.append(task.id)
-                return constants.TASK_STATUS_PENDING
-            except Exception:
-                LOG.warn(
-                    "Error occured while starting new task '%s'. "
-                    "Cancelling execution '%s'. Error was: %s",
-                    task.id, execution.id, utils.get_exception_details())
-                self._cancel_tasks_execution(
-                    ctxt, execution, requery=True)
-                raise
+            task_infos[task.id] = task_info
+            tasks_to_start.append(task)
+            return constants.TASK_STATUS_PENDING
 
         # aggregate all tasks and statuses:
-        task_statuses = {}
-        task_deps = {}
-        on_error_tasks = []
-        for task in execution.tasks:
-            task_statuses[task.id] = task.status
-
-            if task.depends_on:
-                task_deps[task.id] = task.depends_on
-            else:
-                task_deps[task.id] = []
-
-            if task.on_error:
-                on_error_tasks.append(task.id)
+        graph = self._get_execution_graph(execution)
+        tasks_by_id = {task.id: task for task in execution.tasks}
+        task_statuses = {task.id: task.status for task in execution.tasks}
+        task_deps = graph.parents
+        on_error_tasks = graph.on_error_task_ids
 
         LOG.debug(
             "All task statuses before execution '%s' lifecycle iteration "
             "(for tasks of instance '%s'): %s",
             execution.id, instance, task_statuses)
 
-        # NOTE: the tasks are saved in a random order in the DB, which
-        # complicates the processing logic so we just pre-sort:
-        for task in sorted(tasks_to_process, key=lambda t: t.index):
+        if changed_task_ids is None:
+            task_ids_to_process = graph.get_task_ids(instance=instance)
+        else:
+            task_ids_to_process = graph.get_children(
+                changed_task_ids, instance=instance)
+        task_queue = [
+            (graph.indexes[task_id], task_id)
+            for task_id in task_ids_to_process]
+        heapq.heapify(task_queue)
+        queued_task_ids = set(task_ids_to_process)
+
+        def _iter_tasks_to_process():
+            """ Yields the tasks to process in the order of their indexes.
+            When only processing the children of the changed tasks, the
+            children of any task which gets unscheduled are processed too.
+            """
+            while task_queue:
+                _, task_id = heapq.heappop(task_queue)
+                yield tasks_by_id[task_id]
+                if changed_task_ids is None or task_statuses[task_id] != (
+                        constants.TASK_STATUS_UNSCHEDULED):
+                    continue
+                for child_id in graph.get_children(
+                        [task_id], instance=instance):
+                    if child_id not in queued_task_ids:
+                        queued_task_ids.add(child_id)
+                        heapq.heappush(
+                            task_queue, (graph.indexes[child_id], child_id))
+
+        for task in _iter_tasks_to_process():
 
             if task_statuses[task.id] == constants.TASK_STATUS_SCHEDULED:
 
@@ -2709,12 +3208,10 @@ class ConductorServerEndpoint(object):
                         "Unscheduling task '%s' as all parent "
                         "tasks got unscheduled: %s",
                         task.id, parent_task_statuses)
-                    db_api.set_task_status(
-                        ctxt, task.id, constants.TASK_STATUS_UNSCHEDULED,
-                        exception_details=(
-                            "Unscheduled due to the unscheduling of all "
-                            "parent tasks."))
-                    task_statuses[task.id] = constants.TASK_STATUS_UNSCHEDULED
+                    task_statuses[task.id] = _unschedule_task(
+                        task,
+                        "Unscheduled due to the unscheduling of all parent "
+                        "tasks.")
                     continue
 
                 # check all parents have finalized:
@@ -2742,14 +3239,10 @@ class ConductorServerEndpoint(object):
                                 "Unscheduling plain task '%s' as not all "
                                 "parent tasks completed successfully: %s",
                                 task.id, parent_task_statuses)
-                            db_api.set_task_status(
-                                ctxt, task.id,
-                                constants.TASK_STATUS_UNSCHEDULED,
-                                exception_details=(
-                                    "Unscheduled due to some parent tasks not "
-                                    "having completed successfully."))
-                            task_statuses[task.id] = (
-                                constants.TASK_STATUS_UNSCHEDULED)
+                            task_statuses[task.id] = _unschedule_task(
+                                task,
+                                "Unscheduled due to some parent tasks not "
+                                "having completed successfully.")
 
                     # handle on-error tasks:
                     else:
@@ -2790,14 +3283,10 @@ class ConductorServerEndpoint(object):
                                 "completed successfully: %s",
                                 task.id, list(non_error_parents.keys()),
                                 parent_task_statuses)
-                            db_api.set_task_status(
-                                ctxt, task.id,
-                                constants.TASK_STATUS_UNSCHEDULED,
-                                exception_details=(
-                                    "Unscheduled due to no non-error parent "
-                                    "tasks having completed successfully."))
-                            task_statuses[task.id] = (
-                                constants.TASK_STATUS_UNSCHEDULED)
+                            task_statuses[task.id] = _unschedule_task(
+                                task,
+                                "Unscheduled due to no non-error parent "
+                                "tasks having completed successfully.")
 
                 else:
                     LOG.debug(
@@ -2811,6 +3300,9 @@ class ConductorServerEndpoint(object):
                     "'%s' as it is not in a position to be scheduled: %s",
                     task.id, execution.id, task_statuses[task.id])
 
+        started_tasks = self._start_tasks_on_workers(
+            ctxt, execution, tasks_to_start, task_infos, origin, destination,
+            origin_endpoint, destination_endpoint)
         if started_tasks:
             LOG.debug(
                 "Started the following tasks for execution '%s': %s",
@@ -2818,7 +3310,8 @@ class ConductorServerEndpoint(object):
         else:
             # check for deadlock:
             if self._check_clean_execution_deadlock(
-                    ctxt, execution, task_statuses=task_statuses) == (
+                    ctxt, execution, task_statuses=task_statuses,
+                    instance=instance) == (
                         constants.EXECUTION_STATUS_DEADLOCKED):
                 LOG.error(
                     "Execution '%s' deadlocked after Replica state advancement"
@@ -2830,15 +3323,19 @@ class ConductorServerEndpoint(object):
 
         # check if execution status has changed:
         latest_execution_status = self._get_execution_status(
-            ctxt, execution, requery=True)
+            ctxt, execution, requery=True, instance=instance)
         if latest_execution_status != execution.status:
             LOG.info(
                 "Execution '%s' transitioned from status %s to %s "
                 "following the updated task statuses: %s",
                 execution.id, execution.status,
                 latest_execution_status, task_statuses)
+            # NOTE: as the tasks of other instances may be advanced in
+            # parallel, the execution's status is only updated if it was not
+            # already concurrently updated:
             self._set_tasks_execution_status(
-                ctxt, execution, latest_execution_status)
+                ctxt, execution, latest_execution_status,
+                expected_status=execution.status)
         else:
             LOG.debug(
                 "Execution '%s' has remained in status '%s' following "
@@ -2859,9 +3356,8 @@ class ConductorServerEndpoint(object):
         migration = db_api.get_migration(ctxt, migration_id)
         replica_id = migration.replica_id
 
-        with lockutils.lock(
-                constants.REPLICA_LOCK_NAME_FORMAT % replica_id,
-                external=True):
+        with locks.lock(
+                constants.REPLICA_LOCK_NAME_FORMAT % replica_id):
             LOG.debug(
                 "Updating volume_info in replica due to snapshot "
                 "restore during migration. replica id: %s", replica_id)
@@ -2951,9 +3447,8 @@ class ConductorServerEndpoint(object):
                 constants.TASK_TYPE_UPDATE_SOURCE_REPLICA,
                 constants.TASK_TYPE_UPDATE_DESTINATION_REPLICA):
             # NOTE: remember to update the `volumes_info`:
-            # NOTE: considering this method is only called with a lock on the
-            # `execution.action_id` (in a Replica update tasks' case that's the
-            # ID of the Replica itself) we can safely call
+            # NOTE: considering the info of each instance of the Replica is
+            # stored and updated separately, we can safely call
             # `_update_replica_volumes_info` below:
             self._update_replica_volumes_info(
                 ctxt, execution.action_id, task.instance,
@@ -3071,11 +3566,11 @@ class ConductorServerEndpoint(object):
                 "No post-task actions required for task '%s' of type '%s'",
                 task.id, task_type)
 
-    @parent_tasks_execution_synchronized
-    def task_completed(self, ctxt, task_id, task_result):
-        LOG.info("Task completed: %s", task_id)
-
-        task = db_api.get_task(ctxt, task_id)
+    def _get_completed_task_status(self, task):
+        """ Returns the final status of the given just-completed task along
+        with its exception details, or (None, None) if the task was already
+        finalized and its result should not be processed.
+        """
         if task.status == constants.TASK_STATUS_CANCELLING_AFTER_COMPLETION:
             if not task.on_error:
                 LOG.warn(
@@ -3086,13 +3581,12 @@ class ConductorServerEndpoint(object):
                 "On-error task '%s' which was '%s' has just completed "
                 "successfully.  Marking it as '%s' as a final status, "
                 "but processing its result as if it completed successfully.",
-                task_id, task.status,
+                task.id, task.status,
                 constants.TASK_STATUS_CANCELED_AFTER_COMPLETION)
-            db_api.set_task_status(
-                ctxt, task_id, constants.TASK_STATUS_CANCELED_AFTER_COMPLETION,
-                exception_details=(
-                    "This is a cleanup task so it was allowed to run to "
-                    "completion after user-cancellation."))
+            return (
+                constants.TASK_STATUS_CANCELED_AFTER_COMPLETION,
+                "This is a cleanup task so it was allowed to run to "
+                "completion after user-cancellation.")
         elif task.status == constants.TASK_STATUS_CANCELLING:
             LOG.error(
                 "Received confirmation that presumably cancelling task '%s' "
@@ -3105,16 +3599,13 @@ class ConductorServerEndpoint(object):
                 "successfully.",
                 task.id, task.status, task.host,
                 constants.TASK_STATUS_CANCELED_AFTER_COMPLETION)
-            db_api.set_task_status(
-                ctxt, task_id,
+            return (
                 constants.TASK_STATUS_CANCELED_AFTER_COMPLETION,
-                exception_details=(
-                    "The worker host for this task ('%s') has either failed "
-                    "at cancelling it or the cancellation request arrived "
-                    "after it was already completed so this task was run to "
-                    "completion. Please review the worker logs for "
-                    "more relevant details." % (
-                        task.host)))
+                "The worker host for this task ('%s') has either failed "
+                "at cancelling it or the cancellation request arrived "
+                "after it was already completed so this task was run to "
+                "completion. Please review the worker logs for "
+                "more relevant details." % task.host)
         elif task.status == constants.TASK_STATUS_FAILED_TO_CANCEL:
             LOG.error(
                 "Received confirmation '%s' task '%s' has presumably just "
@@ -3122,15 +3613,13 @@ class ConductorServerEndpoint(object):
                 "result as if it had completed normally.",
                 task.status, task.id,
                 constants.TASK_STATUS_CANCELED_AFTER_COMPLETION)
-            db_api.set_task_status(
-                ctxt, task_id, constants.TASK_STATUS_CANCELED_AFTER_COMPLETION,
-                exception_details=(
-                    "The worker host for this task ('%s') had not either not "
-                    "accepted task cancellation request when it was asked to "
-                    "or had failed to receive the request, so this task was "
-                    "run to completion. Please review the worker logs for "
-                    "more relevant details." % (
-                        task.host)))
+            return (
+                constants.TASK_STATUS_CANCELED_AFTER_COMPLETION,
+                "The worker host for this task ('%s') had not either not "
+                "accepted task cancellation request when it was asked to "
+                "or had failed to receive the request, so this task was "
+                "run to completion. Please review the worker logs for "
+                "more relevant details." % task.host)
         elif task.status in constants.FINALIZED_TASK_STATUSES:
             LOG.error(
                 "Received confirmation that presumably finalized task '%s' "
@@ -3140,69 +3629,85 @@ class ConductorServerEndpoint(object):
                 "Check the rest of the logs for further details. "
                 "The results of this task will NOT be processed.",
                 task.id, task.status, task.host)
-            return
+            return None, None
         else:
             if task.status != constants.TASK_STATUS_RUNNING:
                 LOG.warn(
                     "Just-completed task '%s' was in '%s' state instead of "
                     "the expected '%s' state. Marking as '%s' anyway.",
-                    task_id, task.status, constants.TASK_STATUS_RUNNING,
+                    task.id, task.status, constants.TASK_STATUS_RUNNING,
                     constants.TASK_STATUS_COMPLETED)
-            db_api.set_task_status(
-                ctxt, task_id, constants.TASK_STATUS_COMPLETED)
+            return constants.TASK_STATUS_COMPLETED, None
+
+    @parent_tasks_instance_synchronized
+    def task_completed(self, ctxt, task_id, task_result):
+        LOG.info("Task completed: %s", task_id)
+
+        while True:
+            task = db_api.get_task(ctxt, task_id)
+            final_status, exception_details = (
+                self._get_completed_task_status(task))
+            if final_status is None:
+                return
+            # NOTE: the status is only set if the task has not been
+            # concurrently transitioned (e.g. cancelled) in the meantime:
+            if db_api.set_task_status(
+                    ctxt, task_id, final_status,
+                    exception_details=exception_details,
+                    expected_statuses=[task.status]):
+                break
+            LOG.warn(
+                "Status of task '%s' has changed from '%s' while its "
+                "completion was being processed. Re-evaluating.",
+                task_id, task.status)
 
         execution = db_api.get_tasks_execution(ctxt, task.execution_id)
-        with lockutils.lock(
-                constants.EXECUTION_TYPE_TO_ACTION_LOCK_NAME_FORMAT_MAP[
-                    execution.type] % execution.action_id,
-                external=True):
-            action_id = execution.action_id
-            action = db_api.get_action(
-                ctxt, action_id, include_task_info=True)
-
-            updated_task_info = None
-            if task_result:
-                LOG.info(
-                    "Setting task %(task_id)s (type %(task_type)s)result for "
-                    "instance %(instance)s into action %(action_id)s info: "
-                    "%(task_result)s", {
-                        "task_id": task_id,
-                        "instance": task.instance,
-                        "task_type": task.task_type,
-                        "action_id": action_id,
-                        "task_result": utils.sanitize_task_info(
-                            task_result)})
-                updated_task_info = (
-                    db_api.update_transfer_action_info_for_instance(
-                        ctxt, action_id, task.instance, task_result))
-            else:
-                action = db_api.get_action(
-                    ctxt, action_id, include_task_info=True)
-                updated_task_info = action.info[task.instance]
-                LOG.info(
-                    "Task '%s' for instance '%s' of transfer action '%s' "
-                    "has completed successfuly but has not returned "
-                    "any result.", task.id, task.instance, action_id)
+        action_id = execution.action_id
 
-            # NOTE: refresh the execution just in case:
-            execution = db_api.get_tasks_execution(ctxt, task.execution_id)
-            self._handle_post_task_actions(
-                ctxt, task, execution, updated_task_info)
+        updated_task_info = None
+        if task_result:
+            LOG.info(
+                "Setting task %(task_id)s (type %(task_type)s)result for "
+                "instance %(instance)s into action %(action_id)s info: "
+                "%(task_result)s", {
+                    "task_id": task_id,
+                    "instance": task.instance,
+                    "task_type": task.task_type,
+                    "action_id": action_id,
+                    "task_result": utils.sanitize_task_info(
+                        task_result)})
+            updated_task_info = (
+                db_api.update_transfer_action_info_for_instance(
+                    ctxt, action_id, task.instance, task_result))
+        else:
+            updated_task_info = (
+                db_api.get_transfer_action_info_for_instance(
+                    ctxt, action_id, task.instance))
+            LOG.info(
+                "Task '%s' for instance '%s' of transfer action '%s' "
+                "has completed successfuly but has not returned "
+                "any result.", task.id, task.instance, action_id)
 
-            newly_started_tasks = self._advance_execution_state(
-                ctxt, execution, instance=task.instance, requery=False)
-            if newly_started_tasks:
-                LOG.info(
-                    "The following tasks were started for execution '%s' "
-                    "following the completion of task '%s' for instance %s: "
-                    "%s" % (
-                        execution.id, task.id, task.instance,
-                        newly_started_tasks))
-            else:
-                LOG.debug(
-                    "No new tasks started for execution '%s' for instance "
-                    "'%s' following the successful completion of task '%s'.",
-                    execution.id, task.instance, task.id)
+        # NOTE: refresh the execution just in case:
+        execution = db_api.get_tasks_execution(ctxt, task.execution_id)
+        self._handle_post_task_actions(
+            ctxt, task, execution, updated_task_info)
+
+        newly_started_tasks = self._advance_execution_state(
+            ctxt, execution, instance=task.instance, requery=False,
+            changed_task_ids=[task.id])
+        if newly_started_tasks:
+            LOG.info(
+                "The following tasks were started for execution '%s' "
+                "following the completion of task '%s' for instance %s: "
+                "%s" % (
+                    execution.id, task.id, task.instance,
+                    newly_started_tasks))
+        else:
+            LOG.debug(
+                "No new tasks started for execution '%s' for instance "
+                "'%s' following the successful completion of task '%s'.",
+                execution.id, task.instance, task.id)
 
     def _cancel_execution_for_osmorphing_debugging(self, ctxt, execution):
         # go through all scheduled tasks and cancel them:
@@ -3378,10 +3883,9 @@ class ConductorServerEndpoint(object):
 
         action_id = execution.action_id
         action = db_api.get_action(ctxt, action_id, include_task_info=True)
-        with lockutils.lock(
+        with locks.lock(
                 constants.EXECUTION_TYPE_TO_ACTION_LOCK_NAME_FORMAT_MAP[
-                    execution.type] % action_id,
-                external=True):
+                    execution.type] % action_id):
             if task.task_type == constants.TASK_TYPE_OS_MORPHING and (
                     CONF.conductor.debug_os_morphing_errors):
                 LOG.debug(
@@ -3466,6 +3970,43 @@ class ConductorServerEndpoint(object):
             ctxt, task_id, progress_update_index, new_current_step,
             new_total_steps=new_total_steps, new_message=new_message)
 
+    def add_task_events_batch(self, ctxt, task_events):
+        """ Applies a batch of task events, progress updates and progress
+        update changes for one or more tasks, under a single lock per task and
+        within a single DB transaction.
+        """
+        task_ids = sorted(set(item["task_id"] for item in task_events))
+        LOG.info(
+            "Adding batch of %d events and progress updates for tasks: %s",
+            len(task_events), task_ids)
+        with contextlib.ExitStack() as stack:
+            # NOTE: the locks are always acquired in the same order to avoid
+            # deadlocking with other batches for the same tasks:
+            for task_id in task_ids:
+                stack.enter_context(locks.lock(
+                    constants.TASK_LOCK_NAME_FORMAT % task_id))
+
+            refused_task_ids = set()
+            for task_id in task_ids:
+                task = db_api.get_task(ctxt, task_id)
+                if not task or (
+                        task.status not in constants.ACTIVE_TASK_STATUSES):
+                    LOG.warn(
+                        "Task with ID '%s' is not running (status '%s') but "
+                        "it has received a batch of events from its task "
+                        "host. Refusing its new events and progress updates.",
+                        task_id, task.status if task else None)
+                    refused_task_ids.add(task_id)
+
+            # NOTE: changes to existing progress updates are always accepted,
+            # like their non-batched counterparts:
+            accepted_events = [
+                item for item in task_events
+                if item["task_id"] not in refused_task_ids or item["type"] == (
+                    constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE)]
+            if accepted_events:
+                db_api.add_task_events_batch(ctxt, accepted_events)
+
     def _get_replica_schedule(self, ctxt, replica_id,
                               schedule_id, expired=True):
         schedule = db_api.get_replica_schedule(
@@ -3646,6 +4187,10 @@ class ConductorServerEndpoint(object):
 
     def get_diagnostics(self, ctxt):
         diagnostics = utils.get_diagnostics_info()
+        diagnostics['locks'] = locks.get_lock_stats()
+        diagnostics['rpc'] = rpc.get_rpc_stats()
+        diagnostics['endpoint_inventory_cache'] = (
+            cache.get_endpoint_inventory_stats())
         if self._licensing_client:
             diagnostics['licensing_status'] = (
                 self._licensing_client.get_licence_status())
@@ -3665,6 +4210,7 @@ class ConductorServerEndpoint(object):
         region.description = description
         region.enabled = enabled
         db_api.add_region(ctxt, region)
+        self._invalidate_scheduler_cache(ctxt)
         return self.get_region(ctxt, region.id)
 
     def get_regions(self, ctxt):
@@ -3684,6 +4230,7 @@ class ConductorServerEndpoint(object):
             "Attempting to update region '%s' with payload: %s",
             region_id, updated_values)
         db_api.update_region(ctxt, region_id, updated_values)
+        self._invalidate_scheduler_cache(ctxt)
         LOG.info("Region '%s' successfully updated", region_id)
         return db_api.get_region(ctxt, region_id)
 
@@ -3692,6 +4239,7 @@ class ConductorServerEndpoint(object):
         # TODO(aznashwan): add checks for endpoints/services
         # associated to the region before deletion:
         db_api.delete_region(ctxt, region_id)
+        self._invalidate_scheduler_cache(ctxt)
 
     def register_service(
             self, ctxt, host, binary, topic, enabled, mapped_regions=None,
@@ -3742,6 +4290,7 @@ class ConductorServerEndpoint(object):
                 db_api.delete_service(ctxt, service.id)
                 raise
 
+        self._invalidate_scheduler_cache(ctxt)
         return self.get_service(ctxt, service.id)
 
     def check_service_registered(self, ctxt, host, binary, topic):
@@ -3764,11 +4313,18 @@ class ConductorServerEndpoint(object):
         service = db_api.get_service(ctxt, service_id)
         worker_rpc = rpc_worker_client.WorkerClient(host=service.host)
         status = worker_rpc.get_service_status(ctxt)
+        specs = copy.deepcopy(status["specs"] or {})
+        # NOTE: the capacity reports are only ever recorded through
+        # 'report_service_capacity', so they must outlive the refresh:
+        capacity = (service.specs or {}).get("capacity")
+        if capacity is not None:
+            specs["capacity"] = capacity
         updated_values = {
             "providers": status["providers"],
-            "specs": status["specs"],
+            "specs": specs,
             "status": constants.SERVICE_STATUS_UP}
         db_api.update_service(ctxt, service_id, updated_values)
+        self._invalidate_scheduler_cache(ctxt)
         LOG.debug("Successfully refreshed status of service '%s'", service_id)
         return db_api.get_service(ctxt, service_id)
 
@@ -3789,9 +4345,44 @@ class ConductorServerEndpoint(object):
             "Attempting to update service '%s' with payload: %s",
             service_id, updated_values)
         db_api.update_service(ctxt, service_id, updated_values)
+        self._invalidate_scheduler_cache(ctxt)
         LOG.info("Successfully updated service '%s'", service_id)
         return db_api.get_service(ctxt, service_id)
 
+    @service_synchronized
+    def report_service_capacity(
+            self, ctxt, service_id, reporter_id, capacity):
+        """ Records the given capacity report from one of the processes of a
+        service within its specs, dropping the stale reports of others.
+        """
+        service = db_api.get_service(ctxt, service_id)
+        if not service:
+            raise exception.NotFound(
+                "Service with ID '%s' not found." % service_id)
+
+        specs = copy.deepcopy(service.specs or {})
+        now = time.time()
+        reports = {
+            rid: report
+            for (rid, report) in (specs.get("capacity") or {}).items()
+            if not capacity_filters.is_capacity_report_stale(
+                report, now=now)}
+        reports[reporter_id] = capacity
+        specs["capacity"] = reports
+        db_api.update_service(ctxt, service_id, {"specs": specs})
+        # NOTE: capacity reports are far too frequent to invalidate the
+        # scheduler's cache, so they are patched into it instead:
+        try:
+            self._scheduler_client.update_service_capacity(
+                ctxt, service_id, reports)
+        except Exception:
+            LOG.warn(
+                "Failed to update the capacity of service '%s' within the "
+                "scheduler's cache. It will only be taken into account once "
+                "the cache expires. Error was: %s",
+                service_id, utils.get_exception_details())
+
     @service_synchronized
     def delete_service(self, ctxt, service_id):
         db_api.delete_service(ctxt, service_id)
+        self._invalidate_scheduler_cache(ctxt)
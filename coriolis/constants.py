@@ -254,6 +254,10 @@ TASK_EVENT_INFO = "INFO"
 TASK_EVENT_WARNING = "WARNING"
 TASK_EVENT_ERROR = "ERROR"
 
+TASK_EVENTS_BATCH_ITEM_EVENT = "event"
+TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE = "progress_update"
+TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE = "progress_update_change"
+
 MINION_POOL_EVENT_INFO = "INFO"
 MINION_POOL_EVENT_WARNING = "WARNING"
 MINION_POOL_EVENT_ERROR = "ERROR"
@@ -275,10 +279,14 @@ TMP_DIRS_KEY = "__tmp_dirs"
 
 COMPRESSION_FORMAT_GZIP = "gzip"
 COMPRESSION_FORMAT_ZLIB = "zlib"
+COMPRESSION_FORMAT_ZSTD = "zstd"
+COMPRESSION_FORMAT_LZ4 = "lz4"
 
 VALID_COMPRESSION_FORMATS = [
     COMPRESSION_FORMAT_GZIP,
-    COMPRESSION_FORMAT_ZLIB
+    COMPRESSION_FORMAT_ZLIB,
+    COMPRESSION_FORMAT_ZSTD,
+    COMPRESSION_FORMAT_LZ4
 ]
 
 TRANSFER_ACTION_TYPE_MIGRATION = "migration"
@@ -302,6 +310,7 @@ EXECUTION_TYPE_MINION_POOL_DEALLOCATE_MINIONS = (
 TASK_LOCK_NAME_FORMAT = "task-%s"
 TASKFLOW_LOCK_NAME_FORMAT = "taskflow-%s"
 EXECUTION_LOCK_NAME_FORMAT = "execution-%s"
+EXECUTION_INSTANCE_LOCK_NAME_FORMAT = "execution-%s-instance-%s"
 ENDPOINT_LOCK_NAME_FORMAT = "endpoint-%s"
 MIGRATION_LOCK_NAME_FORMAT = "migration-%s"
 REPLICA_LOCK_NAME_FORMAT = "replica-%s"
@@ -7,6 +7,7 @@ import stat
 import struct
 import zlib
 
+from eventlet import tpool
 import requests
 import requests_unixsocket
 
@@ -17,6 +18,16 @@ from urllib import parse
 from coriolis import constants
 from coriolis import exception
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
 compressor_opts = [
     cfg.StrOpt('compressor_address',
                default=None,
@@ -24,6 +35,20 @@ compressor_opts = [
                     'will be done through this service. This value can be '
                     'either a unix socket path (/var/run/compressor.sock '
                     'or an IP:PORT.'),
+    cfg.BoolOpt('compress_in_native_threads',
+                default=True,
+                help='Run the built-in gzip/zlib compression in a pool of '
+                     'native threads, which allows chunks to be compressed '
+                     'in parallel on multiple CPU cores. The size of the '
+                     'thread pool is set through the '
+                     'EVENTLET_THREADPOOL_SIZE environment variable.'),
+    cfg.BoolOpt('adaptive_transfer_compression',
+                default=True,
+                help='Estimate how well each disk chunk compresses from a '
+                     'small sample before compressing it. Chunks which are '
+                     'incompressible are sent as they are, and chunks which '
+                     'barely compress use the fastest of the compression '
+                     'formats supported by the disk writer.'),
 ]
 
 CONF = cfg.CONF
@@ -35,6 +60,61 @@ _COMPRESS_FUNC = {
     constants.COMPRESSION_FORMAT_GZIP: gzip.compress,
     constants.COMPRESSION_FORMAT_ZLIB: zlib.compress,
 }
+if zstandard:
+    _COMPRESS_FUNC[constants.COMPRESSION_FORMAT_ZSTD] = (
+        lambda data: zstandard.ZstdCompressor().compress(data))
+if lz4:
+    _COMPRESS_FUNC[constants.COMPRESSION_FORMAT_LZ4] = lz4.frame.compress
+
+# formats the coriolis-compressor service knows about:
+_COMPRESSOR_SERVICE_FORMATS = [
+    constants.COMPRESSION_FORMAT_GZIP,
+    constants.COMPRESSION_FORMAT_ZLIB,
+]
+
+# from fastest to slowest:
+_COMPRESSION_FORMATS_BY_SPEED = [
+    constants.COMPRESSION_FORMAT_LZ4,
+    constants.COMPRESSION_FORMAT_ZSTD,
+    constants.COMPRESSION_FORMAT_ZLIB,
+    constants.COMPRESSION_FORMAT_GZIP,
+]
+
+# IDs of the formats in the top bits of the inflated size of write_data
+# messages. Zero is zlib, for backwards compatibility:
+_WRITE_DATA_FORMAT_IDS = {
+    constants.COMPRESSION_FORMAT_ZLIB: 0,
+    constants.COMPRESSION_FORMAT_ZSTD: 1,
+    constants.COMPRESSION_FORMAT_LZ4: 2,
+}
+_WRITE_DATA_FORMAT_ID_SHIFT = 28
+# format ID of messages asking write_data to zero out a range:
+_WRITE_DATA_ZERO_FORMAT_ID = 15
+
+# granularity of zero block detection:
+ZERO_BLOCK_SIZE = 64 * 1024
+_ZERO_BLOCK = bytes(ZERO_BLOCK_SIZE)
+
+_ADAPTIVE_SAMPLE_COUNT = 4
+_ADAPTIVE_SAMPLE_SLICE_SIZE = 16 * 1024
+# minimum space saving percentages for compressing a chunk at all, and
+# for compressing it with the preferred format instead of the fastest one:
+_ADAPTIVE_MIN_SAVING = 10.0
+_ADAPTIVE_PREFERRED_FORMAT_MIN_SAVING = 50.0
+
+
+def get_available_compression_formats():
+    return [fmt for fmt in constants.VALID_COMPRESSION_FORMATS
+            if fmt in _COMPRESS_FUNC]
+
+
+def _compress(content, fmt):
+    compress_func = _COMPRESS_FUNC[fmt]
+    if CONF.compress_in_native_threads:
+        # NOTE: zlib releases the GIL while compressing, so running it in
+        # native threads (as opposed to greenthreads) makes use of all cores:
+        return tpool.execute(compress_func, content)
+    return compress_func(content)
 
 
 def _get_session_and_address():
@@ -63,9 +143,11 @@ def compression_proxy(content, fmt):
         raise exception.CoriolisException(
             "Invalid compression format requested: %s" % fmt)
     data = content
-    sess, url = _get_session_and_address()
+    sess, url = None, None
+    if fmt in _COMPRESSOR_SERVICE_FORMATS:
+        sess, url = _get_session_and_address()
     if None in (sess, url):
-        compressed_data = _COMPRESS_FUNC[fmt](data)
+        compressed_data = _compress(data, fmt)
     else:
         try:
             headers = {
@@ -79,7 +161,7 @@ def compression_proxy(content, fmt):
             LOG.exception(
                 "failed to compress using coriolis-compressor: %s" % err)
             LOG.info("falling back to built-in compressor")
-            compressed_data = _COMPRESS_FUNC[fmt](content)
+            compressed_data = _compress(content, fmt)
         finally:
             sess.close()
 
@@ -98,23 +180,89 @@ def compression_proxy(content, fmt):
     return data, compress
 
 
-def encode_data(msg_id, path, offset, content, compress=True):
+def _get_compression_sample(content):
+    # NOTE: sample evenly spaced slices, so that a zeroed or otherwise
+    # uniform region at the start of the chunk does not skew the estimate:
+    step = len(content) // _ADAPTIVE_SAMPLE_COUNT
+    return b"".join(
+        content[i * step:i * step + _ADAPTIVE_SAMPLE_SLICE_SIZE]
+        for i in range(_ADAPTIVE_SAMPLE_COUNT))
+
+
+def _select_compression_format(content, formats):
+    """Returns the format from the given ones to compress the content with,
+    or None if it is not worth compressing, based on how well a sample of it
+    compresses with the fastest of the formats.
+    """
+    fastest_fmt = min(formats, key=_COMPRESSION_FORMATS_BY_SPEED.index)
+    sample = _get_compression_sample(content)
+    compressed_sample = _COMPRESS_FUNC[fastest_fmt](sample)
+    saving = 100.0 * (1 - float(len(compressed_sample)) / len(sample))
+    LOG.trace(
+        "Estimated compression space saving using %s: %.02f%%",
+        fastest_fmt, saving)
+
+    if saving < _ADAPTIVE_MIN_SAVING:
+        return None
+    if saving < _ADAPTIVE_PREFERRED_FORMAT_MIN_SAVING:
+        return fastest_fmt
+    return formats[0]
+
+
+def compress_chunk(content, formats, adaptive=None):
+    """Compresses the content using the first available format out of the
+    given ones, which should be in order of preference.
+
+    Returns a tuple with the resulting data and the format used, which is
+    None if the data was left uncompressed.
+    """
+    formats = [fmt for fmt in formats if fmt in _COMPRESS_FUNC]
+    if not formats:
+        return content, None
+
+    if adaptive is None:
+        adaptive = CONF.adaptive_transfer_compression
+    fmt = formats[0]
+    if adaptive and len(content) > (
+            _ADAPTIVE_SAMPLE_COUNT * _ADAPTIVE_SAMPLE_SLICE_SIZE):
+        fmt = _select_compression_format(content, formats)
+        if fmt is None:
+            return content, None
+
+    data, compressed = compression_proxy(content, fmt)
+    if not compressed:
+        return data, None
+    return data, fmt
+
+
+def encode_data(msg_id, path, offset, content, compress=True,
+                compression_formats=None):
     inflated_content = (path.encode() + b'\0' +
                         struct.pack("<Q", offset) +
                         content)
 
     data_len_inflated = len(inflated_content)
 
-    compressed = False
-    if compress:
-        data_content, compressed = compression_proxy(
-            inflated_content, constants.COMPRESSION_FORMAT_ZLIB)
+    if compression_formats is None:
+        compression_formats = [constants.COMPRESSION_FORMAT_ZLIB]
+    compression_formats = [
+        fmt for fmt in compression_formats if fmt in _WRITE_DATA_FORMAT_IDS]
+
+    fmt = None
+    if compress and compression_formats:
+        data_content, fmt = compress_chunk(
+            inflated_content, compression_formats)
         data_len = len(data_content)
 
-    if not compressed:
+    if fmt is None:
         data_len = data_len_inflated
         data_len_inflated = 0
         data_content = inflated_content
+    else:
+        # NOTE: the inflated size is always far below 2^28, so the top
+        # bits are used to tell write_data what format to decompress:
+        data_len_inflated |= (
+            _WRITE_DATA_FORMAT_IDS[fmt] << _WRITE_DATA_FORMAT_ID_SHIFT)
 
     return (struct.pack("<I", msg_id) +
             struct.pack("<I", data_len) +
@@ -122,5 +270,53 @@ def encode_data(msg_id, path, offset, content, compress=True):
             data_content)
 
 
+def get_data_extents(data, min_zero_length=0):
+    """Splits the given data into extents which hold data and extents which
+    are made up only of zeros, at `ZERO_BLOCK_SIZE` granularity.
+
+    Runs of zeros shorter than `min_zero_length` bytes are kept within the
+    data extents around them, unless the data is made up only of zeros.
+
+    Returns a list of (offset, length, is_zero) tuples, with the offsets
+    relative to the start of the data.
+    """
+    view = memoryview(data)
+    extents = []
+    for start in range(0, len(view), ZERO_BLOCK_SIZE):
+        block = view[start:start + ZERO_BLOCK_SIZE]
+        # NOTE: comparing bytes is a memcmp, which is much faster than
+        # comparing memoryviews element by element:
+        is_zero = block.tobytes() == _ZERO_BLOCK[:len(block)]
+        if extents and extents[-1][2] == is_zero:
+            offset, length, _ = extents[-1]
+            extents[-1] = (offset, length + len(block), is_zero)
+        else:
+            extents.append((start, len(block), is_zero))
+
+    if len(extents) > 1 and min_zero_length:
+        merged = []
+        for offset, length, is_zero in extents:
+            is_zero = is_zero and length >= min_zero_length
+            if merged and not merged[-1][2] and not is_zero:
+                offset, prev_length, _ = merged[-1]
+                merged[-1] = (offset, prev_length + length, False)
+            else:
+                merged.append((offset, length, is_zero))
+        extents = merged
+    return extents
+
+
+def encode_zero(msg_id, path, offset, length):
+    content = (path.encode() + b'\0' +
+               struct.pack("<Q", offset) +
+               struct.pack("<Q", length))
+
+    return (struct.pack("<I", msg_id) +
+            struct.pack("<I", len(content)) +
+            struct.pack("<I", (
+                _WRITE_DATA_ZERO_FORMAT_ID << _WRITE_DATA_FORMAT_ID_SHIFT)) +
+            content)
+
+
 def encode_eod(msg_id):
     return struct.pack("<I", msg_id) + struct.pack("<I", 0)
@@ -1,19 +1,26 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import collections
+import datetime
+import functools
 import uuid
 
 from oslo_config import cfg
 from oslo_db import api as db_api
+from oslo_db import exception as db_exc
 from oslo_db import options as db_options
 from oslo_db.sqlalchemy import enginefacade
+from oslo_db.sqlalchemy import utils as sqlalchemyutils
 from oslo_log import log as logging
 from oslo_utils import timeutils
+from sqlalchemy import and_
 from sqlalchemy import func
 from sqlalchemy import or_
 from sqlalchemy import orm
 from sqlalchemy.sql import null
 
+from coriolis import constants
 from coriolis.db.sqlalchemy import models
 from coriolis import exception
 from coriolis import utils
@@ -272,22 +279,255 @@ def delete_endpoint(context, endpoint_id):
     # association ourselves:
     for reg in endpoint.mapped_regions:
         delete_endpoint_region_mapping(context, endpoint_id, reg.id)
+    # the indexed instances of the endpoint are of no further use:
+    _model_query(context, models.EndpointInstance).filter_by(
+        endpoint_id=endpoint_id).delete(synchronize_session=False)
+    _model_query(context, models.EndpointInstancesSync).filter_by(
+        endpoint_id=endpoint_id).delete(synchronize_session=False)
+
+
+@enginefacade.reader
+def get_endpoint_instances_sync(context, endpoint_id):
+    return _model_query(context, models.EndpointInstancesSync).filter_by(
+        endpoint_id=endpoint_id).first()
+
+
+@enginefacade.writer
+def _claim_endpoint_instances_sync(
+        context, endpoint_id, stale_before, stalled_before):
+    now = timeutils.utcnow()
+    sync = models.EndpointInstancesSync
+    count = _model_query(context, sync).filter(
+        sync.endpoint_id == endpoint_id,
+        or_(sync.synced_at == null(), sync.synced_at < stale_before),
+        or_(sync.sync_started_at == null(),
+            sync.sync_started_at < stalled_before)).update(
+                {"sync_started_at": now, "updated_at": now},
+                synchronize_session=False)
+    if count:
+        return True
+    if get_endpoint_instances_sync(context, endpoint_id):
+        return False
+    _session(context).add(sync(endpoint_id=endpoint_id, sync_started_at=now))
+    return True
+
+
+def claim_endpoint_instances_sync(
+        context, endpoint_id, stale_before, stalled_before):
+    """ Claims the sync of the instances of the given endpoint, provided its
+    last sync completed before 'stale_before' and no sync was started since
+    'stalled_before'.
+
+    Returns whether the sync was claimed.
+    """
+    try:
+        return _claim_endpoint_instances_sync(
+            context, endpoint_id, stale_before, stalled_before)
+    except db_exc.DBDuplicateEntry:
+        return False
+
+
+@enginefacade.writer
+def _set_endpoint_instances_sync_trust(context, endpoint_id, trust_id):
+    sync = models.EndpointInstancesSync
+    count = _model_query(context, sync).filter(
+        sync.endpoint_id == endpoint_id, sync.trust_id == null()).update(
+            {"trust_id": trust_id, "updated_at": timeutils.utcnow()},
+            synchronize_session=False)
+    if count:
+        return True
+    if get_endpoint_instances_sync(context, endpoint_id):
+        return False
+    _session(context).add(sync(endpoint_id=endpoint_id, trust_id=trust_id))
+    return True
+
+
+def set_endpoint_instances_sync_trust(context, endpoint_id, trust_id):
+    """ Sets the trust with which the instances of the given endpoint are
+    synced, provided it has none already.
+
+    Returns whether the trust was set.
+    """
+    try:
+        return _set_endpoint_instances_sync_trust(
+            context, endpoint_id, trust_id)
+    except db_exc.DBDuplicateEntry:
+        return False
+
+
+def _get_endpoint_instance_id(instance_info):
+    return (
+        instance_info.get("id") or instance_info.get("instance_name") or
+        instance_info["name"])
+
+
+@enginefacade.writer
+def update_endpoint_instances(context, endpoint_id, instances_info,
+                              synced_at):
+    """ Adds or updates the given page of instances of an endpoint in its
+    index, marking them as seen by the sync started at 'synced_at'.
+    """
+    instances_info = {
+        _get_endpoint_instance_id(info): info for info in instances_info}
+    if not instances_info:
+        return
+
+    existing = _model_query(context, models.EndpointInstance).filter(
+        models.EndpointInstance.endpoint_id == endpoint_id,
+        models.EndpointInstance.instance_id.in_(
+            list(instances_info.keys()))).all()
+    unchanged_ids = []
+    for instance in existing:
+        info = instances_info.pop(instance.instance_id)
+        if instance.info == info:
+            unchanged_ids.append(instance.instance_id)
+            continue
+        instance.name = info.get("name") or instance.instance_id
+        instance.info = info
+        instance.synced_at = synced_at
+    if unchanged_ids:
+        _model_query(context, models.EndpointInstance).filter(
+            models.EndpointInstance.endpoint_id == endpoint_id,
+            models.EndpointInstance.instance_id.in_(unchanged_ids)).update(
+                {"synced_at": synced_at}, synchronize_session=False)
+
+    session = _session(context)
+    for instance_id, info in instances_info.items():
+        session.add(models.EndpointInstance(
+            endpoint_id=endpoint_id, instance_id=instance_id,
+            name=info.get("name") or instance_id, info=info,
+            synced_at=synced_at))
+
+
+@enginefacade.writer
+def complete_endpoint_instances_sync(
+        context, endpoint_id, synced_at, error=None):
+    """ Records the end of the sync of the instances of an endpoint which
+    started at 'synced_at', removing the instances which it did not see.
+    If the sync failed, the previously indexed instances are kept.
+    """
+    values = {"sync_started_at": None, "last_error": error}
+    if not error:
+        _model_query(context, models.EndpointInstance).filter(
+            models.EndpointInstance.endpoint_id == endpoint_id,
+            models.EndpointInstance.synced_at < synced_at).delete(
+                synchronize_session=False)
+        values["synced_at"] = synced_at
+    _model_query(context, models.EndpointInstancesSync).filter_by(
+        endpoint_id=endpoint_id).update(values, synchronize_session=False)
+
+
+def _get_like_pattern(name_pattern):
+    """ Returns the SQL LIKE pattern for the given name pattern, in which
+    '*' matches any characters (e.g. 'web*' for a prefix search). Patterns
+    without any '*' match the names containing them.
+    """
+    escaped = name_pattern.replace("\\", "\\\\").replace(
+        "%", "\\%").replace("_", "\\_")
+    if "*" not in escaped:
+        return "%%%s%%" % escaped
+    return escaped.replace("*", "%")
+
+
+@enginefacade.reader
+def get_indexed_endpoint_instances(
+        context, endpoint_id, marker=None, limit=None, name_pattern=None):
+    """ Returns the info of the indexed instances of an endpoint, sorted by
+    name and optionally filtered by a case-insensitive name pattern.
+
+    :param marker: ID of the instance after which to return instances.
+    """
+    q = _model_query(context, models.EndpointInstance).filter(
+        models.EndpointInstance.endpoint_id == endpoint_id)
+    if name_pattern:
+        q = q.filter(models.EndpointInstance.name.ilike(
+            _get_like_pattern(name_pattern), escape="\\"))
+
+    marker_obj = None
+    if marker:
+        marker_obj = _model_query(context, models.EndpointInstance).filter(
+            models.EndpointInstance.endpoint_id == endpoint_id,
+            models.EndpointInstance.instance_id == marker).first()
+        if not marker_obj:
+            raise exception.InvalidInput(
+                "No indexed instance found for marker: %s" % marker)
+    q = sqlalchemyutils.paginate_query(
+        q, models.EndpointInstance, limit, ["name", "instance_id"],
+        marker=marker_obj, sort_dirs=["asc", "asc"])
+    return [instance.info for instance in q.all()]
+
+
+def _apply_list_filters(query, model, filters):
+    """ Applies the given filters to the given query.
+
+    Besides equality filters on the columns of the model, the
+    'created_after' and 'created_before' filters are supported.
+    """
+    for key, value in (filters or {}).items():
+        if key == "created_after":
+            query = query.filter(model.created_at >= value)
+        elif key == "created_before":
+            query = query.filter(model.created_at < value)
+        elif hasattr(model, key):
+            query = query.filter(getattr(model, key) == value)
+        else:
+            raise exception.InvalidInput(
+                "Invalid filter for %s: %s" % (model.__name__, key))
+    return query
+
+
+def _paginate_query(query, model, marker=None, limit=None,
+                    sort_keys=None, sort_dirs=None):
+    """ Applies keyset pagination to the given query, only returning
+    the entries sorted after the one with the 'marker' ID.
+
+    The entries are sorted by creation date by default, with their ID
+    always being used as the last sort key for the sorting to be stable.
+    The marker is looked up through the given query itself, so that it is
+    subject to the same project and parent resource filters.
+    """
+    sort_keys = list(sort_keys or ["created_at"])
+    sort_dirs = list(sort_dirs or ["asc"] * len(sort_keys))
+    if "id" not in sort_keys:
+        sort_keys.append("id")
+        sort_dirs.append(sort_dirs[-1])
+
+    marker_obj = None
+    if marker:
+        marker_obj = query.filter(model.id == marker).first()
+        if not marker_obj:
+            raise exception.InvalidInput(
+                "No %s found for marker: %s" % (model.__name__, marker))
+
+    try:
+        return sqlalchemyutils.paginate_query(
+            query, model, limit, sort_keys, marker=marker_obj,
+            sort_dirs=sort_dirs)
+    except db_exc.InvalidSortKey as ex:
+        raise exception.InvalidInput(str(ex))
 
 
 @enginefacade.reader
 def get_replica_tasks_executions(context, replica_id, include_tasks=False,
-                                 include_task_info=False, to_dict=False):
+                                 include_task_info=False, to_dict=False,
+                                 filters=None, marker=None, limit=None,
+                                 sort_keys=None, sort_dirs=None):
     q = _soft_delete_aware_query(context, models.TasksExecution)
     q = q.join(models.Replica)
     if include_task_info:
-        q = q.options(orm.joinedload('action').undefer('info'))
+        q = q.options(
+            orm.joinedload('action').selectinload('instance_infos'),
+            orm.joinedload('action').undefer('legacy_info'))
     if include_tasks:
         q = _get_tasks_with_details_options(q)
     if is_user_context(context):
         q = q.filter(models.Replica.project_id == context.project_id)
 
-    db_result = q.filter(
-        models.Replica.id == replica_id).all()
+    q = q.filter(models.Replica.id == replica_id)
+    q = _apply_list_filters(q, models.TasksExecution, filters)
+    db_result = _paginate_query(
+        q, models.TasksExecution, marker=marker, limit=limit,
+        sort_keys=sort_keys, sort_dirs=sort_dirs).all()
     if to_dict:
         return [e.to_dict() for e in db_result]
     return db_result
@@ -299,7 +539,9 @@ def get_replica_tasks_execution(context, replica_id, execution_id,
     q = _soft_delete_aware_query(context, models.TasksExecution).join(
         models.Replica)
     if include_task_info:
-        q = q.options(orm.joinedload('action').undefer('info'))
+        q = q.options(
+            orm.joinedload('action').selectinload('instance_infos'),
+            orm.joinedload('action').undefer('legacy_info'))
     q = _get_tasks_with_details_options(q)
     if is_user_context(context):
         q = q.filter(models.Replica.project_id == context.project_id)
@@ -419,6 +661,12 @@ def add_replica_schedule(context, schedule, post_create_callable=None):
         post_create_callable(context, schedule)
 
 
+def _get_transfer_action_info_options(q):
+    return q.options(
+        orm.selectinload('instance_infos'),
+        orm.undefer('legacy_info'))
+
+
 def _get_replica_with_tasks_executions_options(q):
     return q.options(orm.joinedload(models.Replica.executions))
 
@@ -427,17 +675,22 @@ def _get_replica_with_tasks_executions_options(q):
 def get_replicas(context,
                  include_tasks_executions=False,
                  include_task_info=False,
-                 to_dict=False):
+                 to_dict=False,
+                 filters=None, marker=None, limit=None,
+                 sort_keys=None, sort_dirs=None):
     q = _soft_delete_aware_query(context, models.Replica)
     if include_tasks_executions:
         q = _get_replica_with_tasks_executions_options(q)
     if include_task_info:
-        q = q.options(orm.undefer('info'))
+        q = _get_transfer_action_info_options(q)
     q = q.filter()
     if is_user_context(context):
         q = q.filter(
             models.Replica.project_id == context.project_id)
-    db_result = q.all()
+    q = _apply_list_filters(q, models.Replica, filters)
+    db_result = _paginate_query(
+        q, models.Replica, marker=marker, limit=limit,
+        sort_keys=sort_keys, sort_dirs=sort_dirs).all()
     if to_dict:
         return [
             i.to_dict(
@@ -452,7 +705,7 @@ def get_replica(context, replica_id, include_task_info=False, to_dict=False):
     q = _soft_delete_aware_query(context, models.Replica)
     q = _get_replica_with_tasks_executions_options(q)
     if include_task_info:
-        q = q.options(orm.undefer('info'))
+        q = _get_transfer_action_info_options(q)
     if is_user_context(context):
         q = q.filter(
             models.Replica.project_id == context.project_id)
@@ -478,10 +731,19 @@ def get_endpoint_replicas_count(context, endpoint_id):
     return q_origin_count + q_destination_count
 
 
+def _set_transfer_action_instance_infos(action):
+    action.instance_infos = {
+        instance: models.TransferActionInstanceInfo(
+            instance=instance, info=instance_info)
+        for instance, instance_info in action.info.items()}
+    action.legacy_info = {}
+
+
 @enginefacade.writer
 def add_replica(context, replica):
     replica.user_id = context.user
     replica.project_id = context.project_id
+    _set_transfer_action_instance_infos(replica)
     _session(context).add(replica)
 
 
@@ -518,19 +780,24 @@ def get_replica_migrations(context, replica_id):
 
 @enginefacade.reader
 def get_migrations(context, include_tasks=False,
-                   include_task_info=False, to_dict=False):
+                   include_task_info=False, to_dict=False,
+                   filters=None, marker=None, limit=None,
+                   sort_keys=None, sort_dirs=None):
     q = _soft_delete_aware_query(context, models.Migration)
     if include_tasks:
         q = _get_migration_task_query_options(q)
     else:
         q = q.options(orm.joinedload("executions"))
     if include_task_info:
-        q = q.options(orm.undefer('info'))
+        q = _get_transfer_action_info_options(q)
 
     args = {}
     if is_user_context(context):
         args["project_id"] = context.project_id
-    result = q.filter_by(**args).all()
+    q = _apply_list_filters(q.filter_by(**args), models.Migration, filters)
+    result = _paginate_query(
+        q, models.Migration, marker=marker, limit=limit,
+        sort_keys=sort_keys, sort_dirs=sort_dirs).all()
     if to_dict:
         return [i.to_dict(
             include_task_info=include_task_info,
@@ -565,7 +832,7 @@ def get_migration(context, migration_id, include_task_info=False,
     q = _soft_delete_aware_query(context, models.Migration)
     q = _get_migration_task_query_options(q)
     if include_task_info:
-        q = q.options(orm.undefer('info'))
+        q = _get_transfer_action_info_options(q)
     args = {"id": migration_id}
     if is_user_context(context):
         args["project_id"] = context.project_id
@@ -580,6 +847,7 @@ def get_migration(context, migration_id, include_task_info=False,
 def add_migration(context, migration):
     migration.user_id = context.user
     migration.project_id = context.project_id
+    _set_transfer_action_instance_infos(migration)
     _session(context).add(migration)
 
 
@@ -590,18 +858,34 @@ def delete_migration(context, migration_id):
 
 @enginefacade.writer
 def set_execution_status(
-        context, execution_id, status, update_action_status=True):
+        context, execution_id, status, update_action_status=True,
+        expected_statuses=None):
+    """ Sets the status of the given execution.
+
+    If 'expected_statuses' are provided, the execution's row is locked and
+    its status is only set if it is still in one of them, with None being
+    returned otherwise.
+    """
     execution = _soft_delete_aware_query(
         context, models.TasksExecution).join(
             models.TasksExecution.action)
     if is_user_context(context):
         execution = execution.filter(
             models.BaseTransferAction.project_id == context.project_id)
+    if expected_statuses is not None:
+        execution = execution.with_for_update()
     execution = execution.filter(
         models.TasksExecution.id == execution_id).first()
     if not execution:
         raise exception.NotFound(
             "Tasks execution not found: %s" % execution_id)
+    if expected_statuses is not None and (
+            execution.status not in expected_statuses):
+        LOG.debug(
+            "Not setting status '%s' for execution '%s' as its status is "
+            "'%s' instead of any of the expected statuses: %s",
+            status, execution_id, execution.status, expected_statuses)
+        return None
 
     execution.status = status
     if update_action_status:
@@ -611,11 +895,14 @@ def set_execution_status(
 
 
 @enginefacade.reader
-def get_action(context, action_id, include_task_info=False):
+def get_action(context, action_id, include_task_info=False,
+               for_update=False):
     action = _soft_delete_aware_query(
         context, models.BaseTransferAction)
     if include_task_info:
-        action = action.options(orm.undefer('info'))
+        action = _get_transfer_action_info_options(action)
+    if for_update:
+        action = action.with_for_update()
     if is_user_context(context):
         action = action.filter(
             models.BaseTransferAction.project_id == context.project_id)
@@ -634,6 +921,30 @@ def set_action_last_execution_status(
     action.last_execution_status = last_execution_status
 
 
+def _get_transfer_action_instance_info(context, action_id, instance):
+    return _session(context).query(
+        models.TransferActionInstanceInfo).filter(
+            models.TransferActionInstanceInfo.action_id == action_id,
+            models.TransferActionInstanceInfo.instance == instance).first()
+
+
+@enginefacade.reader
+def get_transfer_action_info_for_instance(context, action_id, instance):
+    """ Returns the info of the given instance of the action without loading
+    the info of its other instances, or None if the action has no info for
+    the instance.
+    """
+    action = get_action(context, action_id)
+    instance_info = _get_transfer_action_instance_info(
+        context, action_id, instance)
+    if instance_info is not None:
+        return instance_info.info
+    if action.instance_infos:
+        return None
+    # NOTE: actions whose info was never split per instance:
+    return (action.legacy_info or {}).get(instance)
+
+
 @enginefacade.writer
 def update_transfer_action_info_for_instance(
         context, action_id, instance, new_instance_info):
@@ -641,19 +952,21 @@ def update_transfer_action_info_for_instance(
     Returns the updated value.
     Sub-fields of the dict already in the info will get overwritten entirely!
     """
-    action = get_action(context, action_id, include_task_info=True)
+    action = get_action(context, action_id)
+    db_instance_info = _get_transfer_action_instance_info(
+        context, action_id, instance)
+    instance_info_old = {}
+    if db_instance_info is not None:
+        instance_info_old = db_instance_info.info
+    elif not action.instance_infos:
+        instance_info_old = (action.legacy_info or {}).get(instance, {})
+
     if not new_instance_info:
         LOG.debug(
             "No new info provided for action '%s' and instance '%s'. "
             "Nothing to update in the DB.",
             action_id, instance)
-        return action.info.get(instance, {})
-
-    # Copy is needed, otherwise sqlalchemy won't save the changes
-    action_info = action.info.copy()
-    instance_info_old = {}
-    if instance in action_info:
-        instance_info_old = action_info[instance]
+        return instance_info_old
 
     old_keys = set(instance_info_old.keys())
     new_keys = set(new_instance_info.keys())
@@ -670,12 +983,22 @@ def update_transfer_action_info_for_instance(
             "'%s' in action with ID '%s': %s",
             instance, action_id, newly_added_keys)
 
+    # Copy is needed, otherwise sqlalchemy won't save the changes
     instance_info_old_copy = instance_info_old.copy()
     instance_info_old_copy.update(new_instance_info)
-    action_info[instance] = instance_info_old_copy
-    action.info = action_info
+    if db_instance_info is None:
+        if not action.instance_infos:
+            # NOTE: split the info of the other instances of actions whose
+            # info was never split per instance before adding this one:
+            _set_transfer_action_instance_infos(action)
+        db_instance_info = action.instance_infos.get(instance)
+    if db_instance_info is None:
+        db_instance_info = models.TransferActionInstanceInfo(
+            instance=instance)
+        action.instance_infos[instance] = db_instance_info
+    db_instance_info.info = instance_info_old_copy
 
-    return action_info[instance]
+    return instance_info_old_copy
 
 
 @enginefacade.writer
@@ -683,7 +1006,9 @@ def set_transfer_action_result(context, action_id, instance, result):
     """ Adds the result for the given 'instance' in the 'transfer_result'
     JSON in the 'base_transfer_action' table.
     """
-    action = get_action(context, action_id)
+    # NOTE: the action's row is locked as the results of its instances may
+    # be set concurrently:
+    action = get_action(context, action_id, for_update=True)
 
     transfer_result = {}
     if action.transfer_result:
@@ -720,10 +1045,31 @@ def _get_task(context, task_id):
 
 
 @enginefacade.writer
-def set_task_status(context, task_id, status, exception_details=None):
-    task = _get_task(context, task_id)
-    task.status = status
-    task.exception_details = exception_details
+def set_task_status(context, task_id, status, exception_details=None,
+                    expected_statuses=None):
+    """ Sets the status of the given task.
+
+    If 'expected_statuses' are provided, the status is only set if the task
+    is still in one of them, as a single compare-and-set UPDATE.
+    Returns whether the status of the task was set.
+    """
+    if expected_statuses is None:
+        task = _get_task(context, task_id)
+        task.status = status
+        task.exception_details = exception_details
+        return True
+
+    count = _soft_delete_aware_query(context, models.Task).filter(
+        models.Task.id == task_id,
+        models.Task.status.in_(expected_statuses)).update(
+            {"status": status, "exception_details": exception_details},
+            synchronize_session=False)
+    if not count:
+        LOG.debug(
+            "Not setting status '%s' for task '%s' as it is no longer in "
+            "any of the expected statuses: %s",
+            status, task_id, expected_statuses)
+    return count > 0
 
 
 @enginefacade.writer
@@ -735,6 +1081,154 @@ def set_task_host_properties(context, task_id, host=None, process_id=None):
         task.process_id = process_id
 
 
+def _get_tasks_progress_percentages(context, execution_id):
+    """ Returns a dict with the progress percentage given by the latest
+    progress update of each task of the given execution.
+    """
+    last_indexes = _soft_delete_aware_query(
+        context, models.TaskProgressUpdate.task_id,
+        func.max(models.TaskProgressUpdate.index).label("index")).join(
+            models.Task,
+            models.Task.id == models.TaskProgressUpdate.task_id).filter(
+                models.Task.execution_id == execution_id).group_by(
+                    models.TaskProgressUpdate.task_id).subquery()
+    progress_updates = _soft_delete_aware_query(
+        context, models.TaskProgressUpdate.task_id,
+        models.TaskProgressUpdate.current_step,
+        models.TaskProgressUpdate.total_steps).join(
+            last_indexes, and_(
+                models.TaskProgressUpdate.task_id == (
+                    last_indexes.c.task_id),
+                models.TaskProgressUpdate.index == (
+                    last_indexes.c.index))).all()
+
+    percentages = {}
+    for task_id, current_step, total_steps in progress_updates:
+        percentage = None
+        if total_steps:
+            percentage = min(100, int(current_step * 100 / total_steps))
+        percentages[task_id] = percentage
+    return percentages
+
+
+@enginefacade.reader
+def get_tasks_execution_status(context, action_id, execution_id=None,
+                               include_events=False):
+    """ Returns a dict with the status of the given execution of the given
+    action (or of its latest execution), along with the status, host and
+    progress percentage of each of its tasks.
+
+    As opposed to 'get_tasks_execution', the progress updates of the tasks
+    are not loaded, and neither are their events unless 'include_events'
+    is set.
+    Returns None if the execution does not exist.
+    """
+    q = _soft_delete_aware_query(context, models.TasksExecution).join(
+        models.BaseTransferAction).filter(
+            models.TasksExecution.action_id == action_id)
+    if is_user_context(context):
+        q = q.filter(
+            models.BaseTransferAction.project_id == context.project_id)
+    if execution_id:
+        q = q.filter(models.TasksExecution.id == execution_id)
+    else:
+        q = q.order_by(models.TasksExecution.number.desc())
+    execution = q.first()
+    if not execution:
+        return None
+
+    tasks = _soft_delete_aware_query(
+        context, models.Task.id, models.Task.instance, models.Task.task_type,
+        models.Task.index, models.Task.status, models.Task.host).filter(
+            models.Task.execution_id == execution.id).order_by(
+                models.Task.index).all()
+    percentages = _get_tasks_progress_percentages(context, execution.id)
+    task_events = {}
+    if include_events:
+        events = _soft_delete_aware_query(context, models.TaskEvent).join(
+            models.Task, models.Task.id == models.TaskEvent.task_id).filter(
+                models.Task.execution_id == execution.id).order_by(
+                    models.TaskEvent.index)
+        for event in events:
+            task_events.setdefault(event.task_id, []).append(
+                event.to_dict())
+
+    result = {
+        "id": execution.id,
+        "action_id": execution.action_id,
+        "status": execution.status,
+        "number": execution.number,
+        "type": execution.type,
+        "created_at": execution.created_at,
+        "updated_at": execution.updated_at,
+        "tasks": []}
+    for task in tasks:
+        task_dict = {
+            "id": task.id,
+            "instance": task.instance,
+            "task_type": task.task_type,
+            "index": task.index,
+            "status": task.status,
+            "host": task.host,
+            "progress_percentage": percentages.get(task.id)}
+        if include_events:
+            task_dict["events"] = task_events.get(task.id, [])
+        result["tasks"].append(task_dict)
+    return result
+
+
+@enginefacade.reader
+def get_migration_status(context, migration_id, include_events=False):
+    """ Returns a dict with the status of the given migration and of its
+    execution, as returned by 'get_tasks_execution_status'.
+
+    Returns None if the migration does not exist.
+    """
+    q = _soft_delete_aware_query(
+        context, models.BaseTransferAction.last_execution_status).filter(
+            models.BaseTransferAction.base_id == migration_id,
+            models.BaseTransferAction.type == "migration")
+    if is_user_context(context):
+        q = q.filter(
+            models.BaseTransferAction.project_id == context.project_id)
+    migration = q.first()
+    if not migration:
+        return None
+
+    execution = get_tasks_execution_status(
+        context, migration_id, include_events=include_events)
+    return {
+        "id": migration_id,
+        "last_execution_status": migration.last_execution_status,
+        "executions": [execution] if execution else []}
+
+
+@enginefacade.reader
+def get_tasks_execution_status_counts(context, execution_id):
+    """ Returns a dict with the number of tasks of the given execution in
+    each status.
+    """
+    q = _soft_delete_aware_query(
+        context, models.Task.status, func.count(models.Task.id))
+    if is_user_context(context):
+        q = q.join(models.TasksExecution).join(
+            models.BaseTransferAction).filter(
+                models.BaseTransferAction.project_id == context.project_id)
+    q = q.filter(models.Task.execution_id == execution_id).group_by(
+        models.Task.status)
+    return dict(q.all())
+
+
+@enginefacade.reader
+def get_tasks_execution_instances(context, execution_id):
+    """ Returns the sorted list of the instances which the tasks of the
+    given execution are for.
+    """
+    q = _soft_delete_aware_query(context, models.Task.instance).filter(
+        models.Task.execution_id == execution_id).distinct()
+    return sorted(row[0] for row in q.all())
+
+
 @enginefacade.reader
 def get_task(context, task_id):
     q = _soft_delete_aware_query(context, models.Task)
@@ -742,13 +1236,15 @@ def get_task(context, task_id):
 
 
 @enginefacade.writer
-def add_task_event(context, task_id, level, message):
+def add_task_event(context, task_id, level, message, index=None):
     task_event = models.TaskEvent()
     task_event.id = str(uuid.uuid4())
-    task_event.index = 0
-    last_event = _get_last_task_event(context, task_id)
-    if last_event:
-        task_event.index = last_event.index + 1
+    if index is None:
+        index = 0
+        last_event = _get_last_task_event(context, task_id)
+        if last_event:
+            index = last_event.index + 1
+    task_event.index = index
     task_event.task_id = task_id
     task_event.level = level
     task_event.message = message
@@ -766,6 +1262,61 @@ def _get_last_task_event(context, task_id):
     return last_event
 
 
+class _ProgressUpdateIndexAllocator(object):
+    """ Allocates the indexes of new progress updates from in-memory
+    counters, so adding a progress update does not have to look up the last
+    index in the DB every time.
+
+    The counter of a task or minion pool is seeded from the DB on first use.
+    Counters made stale by progress updates added by other processes are
+    detected through the unique constraint on the indexes, following which
+    the counters must be reset.
+    """
+
+    def __init__(self, max_entries=1024):
+        self._max_entries = max_entries
+        self._next_indexes = collections.OrderedDict()
+
+    def allocate(self, key, get_next_index):
+        """ Returns the next index for the given key, calling the given
+        function to get it from the DB if it is not tracked yet.
+        """
+        index = self._next_indexes.pop(key, None)
+        if index is None:
+            index = get_next_index()
+        self._next_indexes[key] = index + 1
+        while len(self._next_indexes) > self._max_entries:
+            self._next_indexes.popitem(last=False)
+        return index
+
+    def reset(self):
+        self._next_indexes.clear()
+
+
+_task_progress_update_indexes = _ProgressUpdateIndexAllocator()
+_minion_pool_progress_update_indexes = _ProgressUpdateIndexAllocator()
+
+
+def _retry_on_progress_update_index_conflict(allocator):
+    """ Retries the decorated DB API call once with the counters of the given
+    allocator reset if it failed over a progress update index being already
+    in use.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except db_exc.DBDuplicateEntry:
+                LOG.debug(
+                    "Conflicting progress update index in '%s', retrying "
+                    "with the indexes reloaded from the DB.", func.__name__)
+                allocator.reset()
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 @enginefacade.reader
 def _get_last_task_progress_update(context, task_id):
     q = _soft_delete_aware_query(
@@ -813,13 +1364,16 @@ def add_minion_pool_event(context, pool_id, level, message):
     return pool_event
 
 
-def _get_minion_pool_progress_update(context, pool_id, index):
-    q = _soft_delete_aware_query(context, models.MinionPoolProgressUpdate)
-    return q.filter(
-        models.MinionPoolProgressUpdate.pool_id == pool_id,
-        models.MinionPoolProgressUpdate.index == index).first()
+def _get_next_minion_pool_progress_update_index(context, pool_id):
+    last_progress_update = _get_last_minion_pool_progress_update(
+        context, pool_id)
+    if last_progress_update:
+        return last_progress_update.index + 1
+    return 0
 
 
+@_retry_on_progress_update_index_conflict(
+    _minion_pool_progress_update_indexes)
 @enginefacade.writer
 def add_minion_pool_progress_update(
         context, pool_id, message, initial_step=0, total_steps=0):
@@ -829,11 +1383,10 @@ def add_minion_pool_progress_update(
     pool_progress_update.current_step = initial_step
     pool_progress_update.total_steps = total_steps
     pool_progress_update.message = message
-    pool_progress_update.index = 0
-    last_progress_update = _get_last_minion_pool_progress_update(
-        context, pool_id)
-    if last_progress_update:
-        pool_progress_update.index = last_progress_update.index + 1
+    pool_progress_update.index = (
+        _minion_pool_progress_update_indexes.allocate(
+            pool_id, lambda: _get_next_minion_pool_progress_update_index(
+                context, pool_id)))
 
     _session(context).add(pool_progress_update)
     return pool_progress_update
@@ -843,31 +1396,25 @@ def add_minion_pool_progress_update(
 def update_minion_pool_progress_update(
         context, pool_id, update_index, new_current_step,
         new_total_steps=None, new_message=None):
-    pool_progress_update = _get_minion_pool_progress_update(
-        context, pool_id, update_index)
-    if not pool_progress_update:
-        raise exception.NotFound(
-            "Could not find progress update for minion pool with ID '%s' and "
-            "index %s in the DB for updating." % (pool_id, update_index))
-
-    pool_progress_update.current_step = new_current_step
+    values = {"current_step": new_current_step}
     if new_total_steps is not None:
-        pool_progress_update.total_steps = new_total_steps
+        values["total_steps"] = new_total_steps
     if new_message is not None:
-        pool_progress_update.message = new_message
-    return pool_progress_update
-
+        values["message"] = new_message
 
-def _get_progress_update(context, task_id, index):
-    q = _soft_delete_aware_query(context, models.TaskProgressUpdate)
-    return q.filter(
-        models.TaskProgressUpdate.task_id == task_id,
-        models.TaskProgressUpdate.index == index).first()
+    q = _soft_delete_aware_query(context, models.MinionPoolProgressUpdate)
+    updated = q.filter(
+        models.MinionPoolProgressUpdate.pool_id == pool_id,
+        models.MinionPoolProgressUpdate.index == update_index).update(
+            values, synchronize_session=False)
+    if not updated:
+        raise exception.NotFound(
+            "Could not find progress update for minion pool with ID '%s' and "
+            "index %s in the DB for updating." % (pool_id, update_index))
 
 
-@enginefacade.writer
-def add_task_progress_update(
-        context, task_id, message, initial_step=0, total_steps=0):
+def _add_task_progress_update(
+        context, task_id, message, index, initial_step=0, total_steps=0):
     task_progress_update = models.TaskProgressUpdate()
     task_event_id = str(uuid.uuid4())
     task_progress_update.id = task_event_id
@@ -882,40 +1429,112 @@ def add_task_progress_update(
             f"Original message was: '{message}'")
         message = f"{message[:max_msg_len-len('...')]}..."
     task_progress_update.message = message
-
-    task_progress_update.index = 0
-    last_progress_update = _get_last_task_progress_update(context, task_id)
-    if last_progress_update:
-        task_progress_update.index = last_progress_update.index + 1
+    task_progress_update.index = index
 
     _session(context).add(task_progress_update)
     return task_progress_update
 
 
+def _allocate_task_progress_update_index(context, task_id):
+    return _task_progress_update_indexes.allocate(
+        task_id, lambda: _get_next_task_progress_update_index(
+            context, task_id))
+
+
+@_retry_on_progress_update_index_conflict(_task_progress_update_indexes)
+@enginefacade.writer
+def add_task_progress_update(
+        context, task_id, message, initial_step=0, total_steps=0):
+    return _add_task_progress_update(
+        context, task_id, message,
+        _allocate_task_progress_update_index(context, task_id),
+        initial_step=initial_step, total_steps=total_steps)
+
+
 @enginefacade.writer
 def update_task_progress_update(
         context, task_id, update_index, new_current_step,
         new_total_steps=None, new_message=None):
-    task_progress_update = _get_progress_update(
-        context, task_id, update_index)
-    if not task_progress_update:
-        raise exception.NotFound(
-            "Could not find progress update for task with ID '%s' and "
-            "index %s in the DB for updating." % (task_id, update_index))
-
-    task_progress_update.current_step = new_current_step
+    values = {"current_step": new_current_step}
     if new_total_steps is not None:
-        task_progress_update.total_steps = new_total_steps
+        values["total_steps"] = new_total_steps
     if new_message is not None:
         max_msg_len = models.MAX_EVENT_MESSAGE_LENGHT
         if len(new_message) > max_msg_len:
-            task_event_id = task_progress_update.id
             LOG.warn(
-                f"Progress message for task '{task_id}' with ID "
-                f"'{task_event_id}' is too long. Truncating before insertion."
+                f"Progress message for task '{task_id}' with index "
+                f"'{update_index}' is too long. Truncating before insertion."
                 f" Original message was: '{new_message}'")
             new_message = f"{new_message[:max_msg_len-len('...')]}..."
-        task_progress_update.message = new_message
+        values["message"] = new_message
+
+    q = _soft_delete_aware_query(context, models.TaskProgressUpdate)
+    updated = q.filter(
+        models.TaskProgressUpdate.task_id == task_id,
+        models.TaskProgressUpdate.index == update_index).update(
+            values, synchronize_session=False)
+    if not updated:
+        raise exception.NotFound(
+            "Could not find progress update for task with ID '%s' and "
+            "index %s in the DB for updating." % (task_id, update_index))
+
+
+def _get_next_task_event_index(context, task_id):
+    last_event = _get_last_task_event(context, task_id)
+    if last_event:
+        return last_event.index + 1
+    return 0
+
+
+def _get_next_task_progress_update_index(context, task_id):
+    last_progress_update = _get_last_task_progress_update(context, task_id)
+    if last_progress_update:
+        return last_progress_update.index + 1
+    return 0
+
+
+@_retry_on_progress_update_index_conflict(_task_progress_update_indexes)
+@enginefacade.writer
+def add_task_events_batch(context, task_events):
+    """ Adds the given task events and progress updates and applies the given
+    progress update changes in order, all within the same transaction.
+    The indexes of the new events of each task are only looked up once per
+    batch.
+
+    :param task_events: list(dict): each with the 'task_id' and 'type' (one
+    of 'constants.TASK_EVENTS_BATCH_ITEM_*') of the item, alongside the
+    arguments of 'add_task_event', 'add_task_progress_update' or
+    'update_task_progress_update' respectively.
+    """
+    next_event_indexes = {}
+    for item in task_events:
+        task_id = item["task_id"]
+        item_type = item["type"]
+        if item_type == constants.TASK_EVENTS_BATCH_ITEM_EVENT:
+            if task_id not in next_event_indexes:
+                next_event_indexes[task_id] = _get_next_task_event_index(
+                    context, task_id)
+            add_task_event(
+                context, task_id, item["level"], item["message"],
+                index=next_event_indexes[task_id])
+            next_event_indexes[task_id] += 1
+        elif item_type == constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE:
+            _add_task_progress_update(
+                context, task_id, item["message"],
+                _allocate_task_progress_update_index(context, task_id),
+                initial_step=item.get("initial_step", 0),
+                total_steps=item.get("total_steps", 0))
+        elif item_type == (
+                constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE):
+            update_task_progress_update(
+                context, task_id, item["progress_update_index"],
+                item["new_current_step"],
+                new_total_steps=item.get("new_total_steps"),
+                new_message=item.get("new_message"))
+        else:
+            raise exception.InvalidInput(
+                "Invalid type '%s' for task events batch item for task "
+                "'%s'." % (item_type, task_id))
 
 
 @enginefacade.writer
@@ -1481,3 +2100,76 @@ def update_minion_pool(context, minion_pool_id, updated_values):
     # the oslo_db library uses this method for both the `created_at` and
     # `updated_at` fields
     setattr(lifecycle, 'updated_at', timeutils.utcnow())
+
+
+def _get_database_time(context):
+    """ Returns the current time of the database server. """
+    return _session(context).query(func.now()).scalar()
+
+
+@enginefacade.writer
+def _acquire_lock(context, name, holder, lease_time):
+    # NOTE: the leases are computed with the time of the database server,
+    # so that the clocks of the hosts sharing the locks need not be in sync:
+    db_now = _get_database_time(context)
+    expires_at = db_now + datetime.timedelta(seconds=lease_time)
+    # take over the lock if its holder stopped refreshing its lease:
+    count = _model_query(context, models.DistributedLock).filter(
+        models.DistributedLock.name == name,
+        models.DistributedLock.expires_at < db_now).update(
+            {"holder": holder, "expires_at": expires_at,
+             "updated_at": timeutils.utcnow()},
+            synchronize_session=False)
+    if count:
+        LOG.warn(
+            "Took over the expired lock '%s' for holder '%s'.", name, holder)
+        return
+
+    _session(context).add(models.DistributedLock(
+        name=name, holder=holder, expires_at=expires_at))
+
+
+def acquire_lock(context, name, holder, lease_time):
+    """ Attempts to acquire the lock with the given name for the given
+    holder, for the given number of seconds.
+
+    Returns whether the lock was acquired.
+    """
+    try:
+        _acquire_lock(context, name, holder, lease_time)
+    except db_exc.DBDuplicateEntry:
+        return False
+    return True
+
+
+@enginefacade.writer
+def refresh_lock(context, name, holder, lease_time):
+    """ Extends the lease of the given lock by the given number of seconds.
+
+    Returns False if the lock is no longer held by the given holder.
+    """
+    db_now = _get_database_time(context)
+    count = _model_query(context, models.DistributedLock).filter(
+        models.DistributedLock.name == name,
+        models.DistributedLock.holder == holder).update(
+            {"expires_at": db_now + datetime.timedelta(seconds=lease_time),
+             "updated_at": timeutils.utcnow()},
+            synchronize_session=False)
+    return count > 0
+
+
+@enginefacade.writer
+def release_lock(context, name, holder):
+    """ Releases the given lock.
+
+    Returns False if the lock was no longer held by the given holder.
+    """
+    count = _model_query(context, models.DistributedLock).filter(
+        models.DistributedLock.name == name,
+        models.DistributedLock.holder == holder).delete(
+            synchronize_session=False)
+    if not count:
+        LOG.warn(
+            "Lock '%s' was no longer held by '%s' upon its release.",
+            name, holder)
+    return count > 0
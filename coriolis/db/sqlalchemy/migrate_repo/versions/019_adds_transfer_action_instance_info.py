@@ -0,0 +1,81 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import uuid
+
+from oslo_utils import timeutils
+import sqlalchemy
+
+from coriolis.db.sqlalchemy import types
+
+# NOTE: the info of the actions can be quite large, so it is split in
+# batches of actions instead of being loaded all at once:
+MIGRATION_BATCH_SIZE = 100
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData()
+    meta.bind = migrate_engine
+
+    # NOTE: the 'info' column is redeclared so its contents get decoded:
+    base_transfer_action = sqlalchemy.Table(
+        'base_transfer_action', meta,
+        sqlalchemy.Column("info", types.Bson, nullable=False),
+        autoload=True)
+
+    transfer_action_instance_info = sqlalchemy.Table(
+        'transfer_action_instance_info', meta,
+        sqlalchemy.Column(
+            "id", sqlalchemy.String(36),
+            default=lambda: str(uuid.uuid4()),
+            primary_key=True),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        sqlalchemy.Column(
+            "action_id", sqlalchemy.String(36),
+            sqlalchemy.ForeignKey('base_transfer_action.base_id'),
+            nullable=False),
+        sqlalchemy.Column("instance", sqlalchemy.Text, nullable=False),
+        sqlalchemy.Column("info", types.Bson, nullable=False),
+        sqlalchemy.Index(
+            "ix_transfer_action_instance_info_action_id_instance",
+            "action_id", "instance", unique=True,
+            mysql_length={"instance": 255}),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+
+    transfer_action_instance_info.create()
+    try:
+        # split the info of all existing actions per instance:
+        now = timeutils.utcnow()
+        last_action_id = None
+        while True:
+            query = sqlalchemy.select([
+                base_transfer_action.c.base_id,
+                base_transfer_action.c.info]).order_by(
+                    base_transfer_action.c.base_id).limit(
+                        MIGRATION_BATCH_SIZE)
+            if last_action_id is not None:
+                query = query.where(
+                    base_transfer_action.c.base_id > last_action_id)
+            actions = migrate_engine.execute(query).fetchall()
+            if not actions:
+                break
+
+            instance_infos = [
+                {"id": str(uuid.uuid4()), "created_at": now,
+                 "action_id": action_id, "instance": instance,
+                 "info": instance_info}
+                for (action_id, action_info) in actions
+                for (instance, instance_info) in (action_info or {}).items()]
+            if instance_infos:
+                migrate_engine.execute(
+                    transfer_action_instance_info.insert(), instance_infos)
+            last_action_id = actions[-1][0]
+    except Exception:
+        # drop the new table so the migration can be safely retried, as the
+        # old info column is only cleared once all of it was copied over:
+        transfer_action_instance_info.drop()
+        raise
+
+    migrate_engine.execute(base_transfer_action.update().values(info={}))
@@ -0,0 +1,21 @@
+import sqlalchemy
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData()
+    meta.bind = migrate_engine
+
+    distributed_lock = sqlalchemy.Table(
+        'distributed_lock', meta,
+        sqlalchemy.Column(
+            "name", sqlalchemy.String(255), primary_key=True),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        sqlalchemy.Column(
+            "holder", sqlalchemy.String(255), nullable=False),
+        sqlalchemy.Column(
+            "expires_at", sqlalchemy.DateTime, nullable=False, index=True),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+
+    distributed_lock.create()
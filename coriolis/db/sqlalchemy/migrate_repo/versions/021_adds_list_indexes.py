@@ -0,0 +1,31 @@
+import sqlalchemy
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData()
+    meta.bind = migrate_engine
+
+    base_transfer_action = sqlalchemy.Table(
+        'base_transfer_action', meta, autoload=True)
+    tasks_execution = sqlalchemy.Table(
+        'tasks_execution', meta, autoload=True)
+
+    # indexes backing the filtering and keyset pagination of the lists of
+    # replicas, migrations and executions:
+    indexes = [
+        sqlalchemy.Index(
+            "ix_base_transfer_action_project_id_created_at",
+            base_transfer_action.c.project_id,
+            base_transfer_action.c.created_at),
+        sqlalchemy.Index(
+            "ix_base_transfer_action_last_execution_status",
+            base_transfer_action.c.last_execution_status),
+        sqlalchemy.Index(
+            "ix_tasks_execution_action_id_created_at",
+            tasks_execution.c.action_id,
+            tasks_execution.c.created_at),
+        sqlalchemy.Index(
+            "ix_tasks_execution_status",
+            tasks_execution.c.status)]
+    for index in indexes:
+        index.create(migrate_engine)
@@ -0,0 +1,58 @@
+import uuid
+
+import sqlalchemy
+
+from coriolis.db.sqlalchemy import types
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData()
+    meta.bind = migrate_engine
+
+    sqlalchemy.Table('endpoint', meta, autoload=True)
+
+    endpoint_instance = sqlalchemy.Table(
+        'endpoint_instance', meta,
+        sqlalchemy.Column(
+            "id", sqlalchemy.String(36),
+            default=lambda: str(uuid.uuid4()),
+            primary_key=True),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        sqlalchemy.Column(
+            "endpoint_id", sqlalchemy.String(36),
+            sqlalchemy.ForeignKey('endpoint.id'), nullable=False),
+        sqlalchemy.Column(
+            "instance_id", sqlalchemy.String(255), nullable=False),
+        sqlalchemy.Column("name", sqlalchemy.String(255), nullable=False),
+        sqlalchemy.Column("info", types.Json, nullable=False),
+        sqlalchemy.Column("synced_at", sqlalchemy.DateTime, nullable=False),
+        sqlalchemy.UniqueConstraint("endpoint_id", "instance_id"),
+        sqlalchemy.Index(
+            "ix_endpoint_instance_endpoint_id_name", "endpoint_id", "name"),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+
+    endpoint_instances_sync = sqlalchemy.Table(
+        'endpoint_instances_sync', meta,
+        sqlalchemy.Column(
+            "endpoint_id", sqlalchemy.String(36),
+            sqlalchemy.ForeignKey('endpoint.id'), primary_key=True),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        sqlalchemy.Column("synced_at", sqlalchemy.DateTime, nullable=True),
+        sqlalchemy.Column(
+            "sync_started_at", sqlalchemy.DateTime, nullable=True),
+        sqlalchemy.Column("last_error", sqlalchemy.Text, nullable=True),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8')
+
+    tables = [endpoint_instance, endpoint_instances_sync]
+    for index, table in enumerate(tables):
+        try:
+            table.create()
+        except Exception:
+            # If an error occurs, drop all tables created so far to return
+            # to the previously existing state.
+            meta.drop_all(tables=tables[:index])
+            raise
@@ -0,0 +1,14 @@
+import sqlalchemy
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData()
+    meta.bind = migrate_engine
+
+    # add 'trust_id' column to 'endpoint_instances_sync':
+    endpoint_instances_sync = sqlalchemy.Table(
+        'endpoint_instances_sync', meta, autoload=True)
+
+    trust_id = sqlalchemy.Column(
+        "trust_id", sqlalchemy.String(255), nullable=True)
+    endpoint_instances_sync.create_column(trust_id)
@@ -7,6 +7,7 @@ from oslo_db.sqlalchemy import models
 import sqlalchemy
 from sqlalchemy.ext import declarative
 from sqlalchemy import orm
+from sqlalchemy.orm import collections
 from sqlalchemy import schema
 
 from coriolis import constants
@@ -207,6 +208,11 @@ class Task(BASE, models.TimestampMixin, models.SoftDeleteMixin,
 class TasksExecution(BASE, models.TimestampMixin, models.ModelBase,
                      models.SoftDeleteMixin):
     __tablename__ = 'tasks_execution'
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_tasks_execution_action_id_created_at",
+            "action_id", "created_at"),
+        sqlalchemy.Index("ix_tasks_execution_status", "status"))
 
     id = sqlalchemy.Column(sqlalchemy.String(36),
                            default=lambda: str(uuid.uuid4()),
@@ -239,9 +245,36 @@ class TasksExecution(BASE, models.TimestampMixin, models.ModelBase,
         return result
 
 
+class TransferActionInstanceInfo(BASE, models.TimestampMixin,
+                                 models.ModelBase):
+    __tablename__ = 'transfer_action_instance_info'
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_transfer_action_instance_info_action_id_instance",
+            "action_id", "instance", unique=True,
+            mysql_length={"instance": 255}),)
+
+    id = sqlalchemy.Column(sqlalchemy.String(36),
+                           default=lambda: str(uuid.uuid4()),
+                           primary_key=True)
+    action_id = sqlalchemy.Column(
+        sqlalchemy.String(36),
+        sqlalchemy.ForeignKey('base_transfer_action.base_id'),
+        nullable=False)
+    instance = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    info = sqlalchemy.Column(types.Bson, nullable=False)
+
+
 class BaseTransferAction(BASE, models.TimestampMixin, models.ModelBase,
                          models.SoftDeleteMixin):
     __tablename__ = 'base_transfer_action'
+    __table_args__ = (
+        sqlalchemy.Index(
+            "ix_base_transfer_action_project_id_created_at",
+            "project_id", "created_at"),
+        sqlalchemy.Index(
+            "ix_base_transfer_action_last_execution_status",
+            "last_execution_status"))
 
     base_id = sqlalchemy.Column(sqlalchemy.String(36),
                                 default=lambda: str(uuid.uuid4()),
@@ -260,7 +293,15 @@ class BaseTransferAction(BASE, models.TimestampMixin, models.ModelBase,
         sqlalchemy.String(255), nullable=False,
         default=lambda: constants.EXECUTION_STATUS_UNEXECUTED)
     reservation_id = sqlalchemy.Column(sqlalchemy.String(36), nullable=True)
-    info = orm.deferred(sqlalchemy.Column(types.Bson, nullable=False))
+    # NOTE: the task info of each instance is stored separately in the
+    # 'transfer_action_instance_info' table, with the old 'info' column only
+    # being read for actions which have no per-instance info:
+    legacy_info = orm.deferred(sqlalchemy.Column(
+        "info", types.Bson, nullable=False, default=lambda: {}))
+    instance_infos = orm.relationship(
+        TransferActionInstanceInfo, cascade="all,delete-orphan",
+        collection_class=collections.attribute_mapped_collection(
+            'instance'))
     notes = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
     origin_endpoint_id = sqlalchemy.Column(
         sqlalchemy.String(36),
@@ -287,6 +328,31 @@ class BaseTransferAction(BASE, models.TimestampMixin, models.ModelBase,
         'polymorphic_on': type,
     }
 
+    @property
+    def info(self):
+        """ Dict of the form {"<instance>": <instance_info>} with the task
+        info of all the instances of the action.
+
+        Changes made to the returned dict are only persisted for new actions,
+        with the info of existing actions being updated through
+        'db_api.update_transfer_action_info_for_instance'.
+        """
+        info = self.__dict__.get('_info')
+        if info is None:
+            if self.instance_infos:
+                info = {
+                    instance: instance_info.info
+                    for instance, instance_info in (
+                        self.instance_infos.items())}
+            else:
+                info = dict(self.legacy_info or {})
+            self._info = info
+        return info
+
+    @info.setter
+    def info(self, value):
+        self._info = value
+
     def to_dict(self, include_task_info=True, include_executions=True):
         result = {
             "base_id": self.base_id,
@@ -678,3 +744,59 @@ class ReplicaSchedule(BASE, models.TimestampMixin, models.ModelBase,
     shutdown_instance = sqlalchemy.Column(
         sqlalchemy.Boolean, nullable=False, default=False)
     trust_id = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
+
+
+class DistributedLock(BASE, models.TimestampMixin, models.ModelBase):
+    __tablename__ = "distributed_lock"
+
+    name = sqlalchemy.Column(sqlalchemy.String(255), primary_key=True)
+    holder = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
+    expires_at = sqlalchemy.Column(
+        sqlalchemy.types.DateTime, nullable=False, index=True)
+
+
+class EndpointInstance(BASE, models.TimestampMixin, models.ModelBase):
+    """ Instance of an endpoint as indexed by the background sync of the
+    endpoint's instances.
+    """
+    __tablename__ = "endpoint_instance"
+    __table_args__ = (
+        schema.UniqueConstraint("endpoint_id", "instance_id"),
+        sqlalchemy.Index(
+            "ix_endpoint_instance_endpoint_id_name", "endpoint_id", "name"))
+
+    id = sqlalchemy.Column(sqlalchemy.String(36),
+                           default=lambda: str(uuid.uuid4()),
+                           primary_key=True)
+    endpoint_id = sqlalchemy.Column(
+        sqlalchemy.String(36), sqlalchemy.ForeignKey('endpoint.id'),
+        nullable=False)
+    instance_id = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
+    name = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
+    info = sqlalchemy.Column(types.Json, nullable=False)
+    synced_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
+
+
+class EndpointInstancesSync(BASE, models.TimestampMixin, models.ModelBase):
+    __tablename__ = "endpoint_instances_sync"
+
+    endpoint_id = sqlalchemy.Column(
+        sqlalchemy.String(36), sqlalchemy.ForeignKey('endpoint.id'),
+        primary_key=True)
+    # time at which the last complete sync of the instances started:
+    synced_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+    sync_started_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+    last_error = sqlalchemy.Column(sqlalchemy.Text, nullable=True)
+    # trust with which the instances are synced on behalf of the user:
+    trust_id = sqlalchemy.Column(sqlalchemy.String(255), nullable=True)
+
+    def to_dict(self):
+        return {
+            "endpoint_id": self.endpoint_id,
+            "synced_at": self.synced_at,
+            "sync_started_at": self.sync_started_at,
+            "last_error": self.last_error,
+            "trust_id": self.trust_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
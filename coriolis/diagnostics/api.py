@@ -1,3 +1,4 @@
+from coriolis import rpc
 from coriolis import utils
 
 from coriolis.conductor.rpc import client as conductor_rpc
@@ -14,5 +15,6 @@ class API(object):
     def get(self, ctxt):
         diag = self._conductor_cli.get_all_diagnostics(ctxt)
         api = utils.get_diagnostics_info()
+        api['rpc'] = rpc.get_rpc_stats()
         diag.append(api)
         return diag
@@ -12,14 +12,16 @@ class API(object):
         self._rpc_conductor_client = rpc_conductor_client.ConductorClient()
 
     def get_endpoint_source_options(
-            self, ctxt, endpoint_id, env=None, option_names=None):
+            self, ctxt, endpoint_id, env=None, option_names=None,
+            refresh=False):
         return self._rpc_conductor_client.get_endpoint_source_options(
-            ctxt, endpoint_id, env, option_names)
+            ctxt, endpoint_id, env, option_names, refresh=refresh)
 
     def get_endpoint_destination_options(
-            self, ctxt, endpoint_id, env=None, option_names=None):
+            self, ctxt, endpoint_id, env=None, option_names=None,
+            refresh=False):
         return self._rpc_conductor_client.get_endpoint_destination_options(
-            ctxt, endpoint_id, env, option_names)
+            ctxt, endpoint_id, env, option_names, refresh=refresh)
 
     def get_endpoint_source_minion_pool_options(
             self, ctxt, endpoint_id, env=None, option_names=None):
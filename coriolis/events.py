@@ -4,24 +4,50 @@
 import abc
 import collections
 import copy
+import weakref
 
+import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 from six import with_metaclass
 
 from coriolis import constants
 
 
+events_opts = [
+    cfg.FloatOpt('progress_update_interval',
+                 default=5,
+                 min=0,
+                 help='Minimum number of seconds between two updates of the '
+                      'same percentage progress update. Intermediary values '
+                      'are coalesced into the latest one, which is sent '
+                      'asynchronously. Setting this to 0 sends every update '
+                      'synchronously.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(events_opts)
+
 LOG = logging.getLogger(__name__)
 
+# all EventManagers with progress updates which might still be pending:
+_EVENT_MANAGERS = weakref.WeakSet()
+
 _PercStepData = collections.namedtuple(
     "_PercStepData", "progress_update_id last_perc last_value total_steps")
 
 
 class EventManager(object, with_metaclass(abc.ABCMeta)):
 
-    def __init__(self, event_handler):
+    def __init__(self, event_handler, progress_update_interval=None):
         self._event_handler = event_handler
         self._perc_steps = {}
+        self._progress_update_interval = progress_update_interval
+        if self._progress_update_interval is None:
+            self._progress_update_interval = CONF.progress_update_interval
+        self._pending_progress_updates = {}
+        self._progress_update_senders = {}
+        _EVENT_MANAGERS.add(self)
 
     def _call_event_handler(self, method_name, *args, **kwargs):
         if self._event_handler:
@@ -32,7 +58,72 @@ class EventManager(object, with_metaclass(abc.ABCMeta)):
                         method_name, type(self._event_handler)))
             return method_obj(*args, **kwargs)
 
+    def _send_progress_update(self, progress_update_id, new_current_step):
+        self._call_event_handler(
+            'update_progress_update', progress_update_id, new_current_step)
+
+    def _progress_update_sender(self, progress_update_id, flushed):
+        try:
+            while progress_update_id in self._pending_progress_updates:
+                new_current_step = self._pending_progress_updates.pop(
+                    progress_update_id)
+                try:
+                    self._send_progress_update(
+                        progress_update_id, new_current_step)
+                except Exception as ex:
+                    LOG.warn(
+                        "Failed to send progress update %s: %s",
+                        progress_update_id, ex)
+                # NOTE: flushing cuts the interval short, so that the latest
+                # value gets sent right away:
+                flushed.wait(timeout=self._progress_update_interval)
+        finally:
+            sender = self._progress_update_senders.get(progress_update_id)
+            if sender and sender[1] is flushed:
+                self._progress_update_senders.pop(progress_update_id)
+
+    def _queue_progress_update(self, progress_update_id, new_current_step):
+        if not self._progress_update_interval:
+            self._send_progress_update(progress_update_id, new_current_step)
+            return
+
+        # NOTE: only the latest value is kept, and sent by the step's sender
+        # as soon as the interval since the previous update elapses:
+        self._pending_progress_updates[progress_update_id] = new_current_step
+        if progress_update_id not in self._progress_update_senders:
+            flushed = eventlet.event.Event()
+            self._progress_update_senders[progress_update_id] = (
+                eventlet.spawn(
+                    self._progress_update_sender, progress_update_id,
+                    flushed),
+                flushed)
+
+    def flush_progress_updates(self, progress_update_id=None):
+        """ Synchronously sends the latest values of the pending progress
+        updates, either for the given step or for all of them.
+        """
+        update_ids = list(self._progress_update_senders)
+        if progress_update_id is not None:
+            update_ids = [
+                i for i in update_ids if i == progress_update_id]
+
+        for update_id in update_ids:
+            sender, flushed = self._progress_update_senders.pop(update_id)
+            # NOTE: the senders are never killed, as they may be in the
+            # middle of an RPC call. They are signaled instead, and waited
+            # for while they send the latest value:
+            flushed.send()
+            sender.wait()
+
+    def flush_events(self):
+        """ Sends the pending progress updates, as well as any events
+        buffered by the event handler.
+        """
+        self.flush_progress_updates()
+        self._call_event_handler('flush')
+
     def add_percentage_step(self, message, total_steps, initial_step=0):
+        self.flush_progress_updates()
         if total_steps < 0:
             LOG.warn(
                 "Max percentage value was negative (%s). Reset to 0",
@@ -76,9 +167,10 @@ class EventManager(object, with_metaclass(abc.ABCMeta)):
             perc = int(new_current_step * 100 // perc_step.total_steps)
 
         if self._call_event_handler and perc > perc_step.last_perc:
-            self._call_event_handler(
-                'update_progress_update', step.progress_update_id,
-                new_current_step)
+            self._queue_progress_update(
+                step.progress_update_id, new_current_step)
+            if perc >= 100:
+                self.flush_progress_updates(step.progress_update_id)
             perc_id = copy.copy(step.progress_update_id)
             total_steps = perc_step.total_steps
             del self._perc_steps[step.progress_update_id]
@@ -87,22 +179,39 @@ class EventManager(object, with_metaclass(abc.ABCMeta)):
                 perc_id, perc, 0, total_steps)
 
     def progress_update(self, message):
+        self.flush_progress_updates()
         self._call_event_handler(
             'add_progress_update', message, return_event=False)
 
     def info(self, message):
+        self.flush_progress_updates()
         self._call_event_handler(
             'add_event', message, level=constants.TASK_EVENT_INFO)
 
     def warn(self, message):
+        self.flush_progress_updates()
         self._call_event_handler(
             'add_event', message, level=constants.TASK_EVENT_WARNING)
 
     def error(self, message):
+        self.flush_progress_updates()
         self._call_event_handler(
             'add_event', message, level=constants.TASK_EVENT_ERROR)
 
 
+def flush_events():
+    """ Sends the pending progress updates and buffered events of all
+    EventManagers.
+    """
+    for event_manager in list(_EVENT_MANAGERS):
+        event_manager.flush_events()
+
+
+def reset_event_managers():
+    """ Forgets about all the EventManagers created so far. """
+    _EVENT_MANAGERS.clear()
+
+
 class BaseEventHandler(object, with_metaclass(abc.ABCMeta)):
 
     @abc.abstractmethod
@@ -126,3 +235,7 @@ class BaseEventHandler(object, with_metaclass(abc.ABCMeta)):
     @abc.abstractmethod
     def add_event(self, message, level=constants.TASK_EVENT_INFO):
         pass
+
+    def flush(self):
+        """ Sends any events or progress updates buffered by the handler. """
+        pass
@@ -245,6 +245,12 @@ class ExecutionDeadlockException(CoriolisException):
     message = _("Execution is bound to be deadlocked.")
 
 
+class LockLost(CoriolisException):
+    message = _(
+        "Lock '%(name)s' was lost while being held, as its lease could not "
+        "be refreshed in time.")
+
+
 class TaskParametersException(CoriolisException):
     message = _("Execution task parameters are missing.")
 
@@ -1,6 +1,9 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import hashlib
+import json
+
 from keystoneauth1 import exceptions as ks_exceptions
 from keystoneauth1 import loading
 from keystoneauth1 import session as ks_session
@@ -8,6 +11,7 @@ from keystoneclient.v3 import client as kc_v3
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from coriolis import cache
 from coriolis import exception
 
 opts = [
@@ -22,6 +26,16 @@ opts = [
     cfg.BoolOpt('allow_untrusted',
                 default=False,
                 help='Allow untrusted SSL/TLS certificates.'),
+    cfg.IntOpt('session_cache_time',
+               default=600, min=0,
+               help='Number of seconds for which the Keystone sessions '
+                    'authenticated with a trust or with the caller\'s token '
+                    'are reused by each process, with 0 disabling their '
+                    'reuse.'),
+    cfg.IntOpt('session_cache_size',
+               default=128, min=1,
+               help='Maximum number of Keystone sessions kept for reuse by '
+                    'each process.'),
 ]
 
 CONF = cfg.CONF
@@ -32,6 +46,21 @@ LOG = logging.getLogger(__name__)
 TRUSTEE_CONF_GROUP = 'trustee'
 loading.register_auth_conf_options(CONF, TRUSTEE_CONF_GROUP, )
 
+_sessions = None
+
+
+def _get_sessions_cache():
+    global _sessions
+    if _sessions is None:
+        _sessions = cache.LocalTTLCache(
+            max_entries=CONF.keystone.session_cache_size)
+    return _sessions
+
+
+def clear_sessions_cache():
+    """ Drops all the cached Keystone sessions. """
+    _get_sessions_cache().clear()
+
 
 def _get_trusts_auth_plugin(trust_id=None):
     return loading.load_auth_from_conf_options(
@@ -96,15 +125,47 @@ def delete_trust(ctxt):
             client.trusts.delete(ctxt.trust_id)
         except ks_exceptions.NotFound:
             LOG.warn("Trust id not found: %s", ctxt.trust_id)
+        trust_id = ctxt.trust_id
+        _get_sessions_cache().invalidate_matching(
+            lambda key: key[:2] == ("trust", trust_id))
         ctxt.trust_id = None
 
 
+def _get_session_cache_key(ctxt, connection_info, verify):
+    """ Returns the key under which the session is reused, or None for the
+    sessions authenticated with credentials from the connection info.
+    """
+    if connection_info.get("username"):
+        return None
+    if ctxt.trust_id:
+        return ("trust", ctxt.trust_id, verify)
+    # NOTE: the token is hashed along with all the other auth parameters so
+    # that it is never kept in clear within the key:
+    token_hash = hashlib.sha256(json.dumps(
+        [ctxt.auth_token, connection_info, ctxt.project_name,
+         ctxt.project_domain_name, ctxt.project_domain_id],
+        sort_keys=True, default=str).encode()).hexdigest()
+    return ("token", token_hash, verify)
+
+
 def create_keystone_session(ctxt, connection_info={}):
     allow_untrusted = connection_info.get(
         "allow_untrusted", CONF.keystone.allow_untrusted)
     # TODO(alexpilotti): add "ca_cert" to connection_info
     verify = not allow_untrusted
 
+    # NOTE: reusing the sessions authenticated with a trust or token spares
+    # requesting a new Keystone token for every session:
+    cache_key = _get_session_cache_key(ctxt, connection_info, verify)
+    if cache_key is None:
+        return _create_keystone_session(ctxt, connection_info, verify)
+    return _get_sessions_cache().get(
+        cache_key,
+        lambda: _create_keystone_session(ctxt, connection_info, verify),
+        CONF.keystone.session_cache_time)
+
+
+def _create_keystone_session(ctxt, connection_info, verify):
     username = connection_info.get("username")
     auth = None
 
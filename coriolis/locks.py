@@ -0,0 +1,237 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+""" Locks synchronizing operations across Coriolis services.
+
+The locks are provided by a configurable backend:
+    - 'file': oslo_concurrency external locks within the configured
+      '[oslo_concurrency] lock_path', which requires all services sharing
+      the locks to run on the same host.
+    - 'database': rows of the Coriolis database, which allows the services
+      to be spread across multiple hosts. Held locks are leased and
+      periodically refreshed, so the locks of crashed services can be taken
+      over once their lease expires. As the lease of a held lock can be
+      lost, holders should call the 'check' method of the lock yielded by
+      'lock' before committing changes synchronized by it, which raises
+      LockLost if the lease was lost.
+"""
+
+import collections
+import contextlib
+import functools
+import os
+import re
+import time
+import uuid
+
+import eventlet
+from oslo_concurrency import lockutils
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from coriolis import context
+from coriolis.db import api as db_api
+from coriolis import exception
+from coriolis import utils
+
+LOCK_BACKEND_FILE = "file"
+LOCK_BACKEND_DATABASE = "database"
+
+lock_opts = [
+    cfg.StrOpt("backend",
+               default=LOCK_BACKEND_FILE,
+               choices=[LOCK_BACKEND_FILE, LOCK_BACKEND_DATABASE],
+               help="Backend for the locks synchronizing operations across "
+                    "services. The 'file' backend requires all services "
+                    "sharing the locks to run on the same host, while the "
+                    "'database' backend allows them to run on multiple "
+                    "hosts."),
+    cfg.IntOpt("database_lock_lease_time",
+               default=60, min=3,
+               help="Number of seconds after which a database lock which "
+                    "was not refreshed by its holder is considered stale "
+                    "and can be taken over. Held locks are refreshed every "
+                    "third of this interval."),
+    cfg.FloatOpt("database_lock_poll_interval",
+                 default=0.2, min=0.01,
+                 help="Number of seconds between the attempts to acquire a "
+                      "database lock held by another service."),
+    cfg.FloatOpt("lock_wait_warning_threshold",
+                 default=10, min=0,
+                 help="Number of seconds spent waiting for a lock after "
+                      "which a warning is logged, with 0 disabling it."),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(lock_opts, 'locks')
+
+LOG = logging.getLogger(__name__)
+
+# NOTE: the IDs within the lock names are replaced so the wait statistics
+# are aggregated per type of lock:
+_LOCK_NAME_ID_REGEX = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|"
+    r"[0-9a-f]{64}")
+
+_lock_stats = collections.defaultdict(lambda: {
+    "acquired": 0,
+    "total_wait": 0.,
+    "max_wait": 0.,
+    "total_held": 0.})
+
+
+def _get_lock_type(name):
+    return _LOCK_NAME_ID_REGEX.sub("*", name)
+
+
+def get_lock_stats():
+    """ Returns the wait and hold times of the locks acquired by this
+    process, aggregated per type of lock.
+    """
+    return {
+        lock_type: dict(stats) for lock_type, stats in _lock_stats.items()}
+
+
+class _LockutilsLock(object):
+    """ Lock held through oslo_concurrency, which cannot be lost while it is
+    being held.
+    """
+
+    def check(self):
+        pass
+
+
+class _DatabaseLock(object):
+    def __init__(self, name):
+        self._name = name
+        self._holder = "%s:%s:%s" % (
+            utils.get_hostname(), os.getpid(), uuid.uuid4())
+        self._refresher = None
+        self._lost = False
+
+    def _refresh(self):
+        lease_time = CONF.locks.database_lock_lease_time
+        last_refreshed = time.time()
+        while True:
+            time.sleep(lease_time / 3.)
+            try:
+                if not db_api.refresh_lock(
+                        context.get_admin_context(), self._name,
+                        self._holder, lease_time):
+                    LOG.error(
+                        "Database lock '%s' held by '%s' was taken over "
+                        "after its lease expired.", self._name,
+                        self._holder)
+                    self._lost = True
+                    return
+                last_refreshed = time.time()
+            except Exception:
+                LOG.warn(
+                    "Failed to refresh the lease of database lock '%s': %s",
+                    self._name, utils.get_exception_details())
+                # NOTE: the lock may be taken over as soon as its lease
+                # expires, so it must be considered lost from then on:
+                if time.time() - last_refreshed >= lease_time:
+                    LOG.error(
+                        "The lease of database lock '%s' held by '%s' has "
+                        "expired.", self._name, self._holder)
+                    self._lost = True
+                    return
+
+    def acquire(self):
+        while not db_api.acquire_lock(
+                context.get_admin_context(), self._name, self._holder,
+                CONF.locks.database_lock_lease_time):
+            time.sleep(CONF.locks.database_lock_poll_interval)
+        self._lost = False
+        self._refresher = eventlet.spawn(self._refresh)
+
+    def check(self):
+        """ Raises LockLost if the lease of the lock was lost while it was
+        being held, as others might have acquired it meanwhile.
+        """
+        if self._lost:
+            raise exception.LockLost(name=self._name)
+
+    def release(self):
+        if self._refresher:
+            self._refresher.kill()
+            self._refresher = None
+        released = db_api.release_lock(
+            context.get_admin_context(), self._name, self._holder)
+        # NOTE: raising here would mask any exception of the holder, and
+        # any changes synchronized by the lock were already committed, so
+        # the loss is only reported:
+        if self._lost or not released:
+            LOG.error(
+                "Database lock '%s' held by '%s' was lost before being "
+                "released, so others might have acquired it meanwhile.",
+                self._name, self._holder)
+
+
+@contextlib.contextmanager
+def _database_lock(name):
+    # NOTE: the in-process lock avoids having all threads of this process
+    # polling the database for the same lock:
+    with lockutils.lock(name):
+        db_lock = _DatabaseLock(name)
+        db_lock.acquire()
+        try:
+            yield db_lock
+        finally:
+            db_lock.release()
+
+
+@contextlib.contextmanager
+def _lockutils_lock(name, external):
+    if external:
+        lock_context = lockutils.lock(name, external=True)
+    else:
+        lock_context = lockutils.lock(name)
+    with lock_context:
+        yield _LockutilsLock()
+
+
+def _get_backend_lock(name, external):
+    if external and CONF.locks.backend == LOCK_BACKEND_DATABASE:
+        return _database_lock(name)
+    return _lockutils_lock(name, external)
+
+
+@contextlib.contextmanager
+def lock(name, external=True):
+    """ Context manager acquiring the lock with the given name, yielding the
+    held lock whose 'check' method raises LockLost if it was lost meanwhile.
+
+    :param external: whether the lock is shared with other processes through
+    the configured backend, or only synchronizes the threads of this process.
+    """
+    start_time = time.time()
+    with _get_backend_lock(name, external) as held_lock:
+        acquired_time = time.time()
+        wait_time = acquired_time - start_time
+        threshold = CONF.locks.lock_wait_warning_threshold
+        if threshold and wait_time > threshold:
+            LOG.warn(
+                "Waited %.3f seconds to acquire lock '%s'.", wait_time, name)
+        try:
+            yield held_lock
+        finally:
+            stats = _lock_stats[_get_lock_type(name)]
+            stats["acquired"] += 1
+            stats["total_wait"] += wait_time
+            stats["max_wait"] = max(stats["max_wait"], wait_time)
+            stats["total_held"] += time.time() - acquired_time
+
+
+def synchronized(name, external=True):
+    """ Decorator running the decorated function while holding the lock with
+    the given name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with lock(name, external=external):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
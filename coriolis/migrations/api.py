@@ -45,10 +45,17 @@ class API(object):
         self._rpc_client.cancel_migration(ctxt, migration_id, force)
 
     def get_migrations(self, ctxt, include_tasks=False,
-                       include_task_info=False):
+                       include_task_info=False, filters=None, marker=None,
+                       limit=None, sort_keys=None, sort_dirs=None):
         return self._rpc_client.get_migrations(
-            ctxt, include_tasks, include_task_info=include_task_info)
+            ctxt, include_tasks, include_task_info=include_task_info,
+            filters=filters, marker=marker, limit=limit,
+            sort_keys=sort_keys, sort_dirs=sort_dirs)
 
     def get_migration(self, ctxt, migration_id, include_task_info=False):
         return self._rpc_client.get_migration(
             ctxt, migration_id, include_task_info=include_task_info)
+
+    def get_migration_status(self, ctxt, migration_id, include_events=False):
+        return self._rpc_client.get_migration_status(
+            ctxt, migration_id, include_events=include_events)
@@ -21,9 +21,11 @@ from coriolis.db import api as db_api
 from coriolis.db.sqlalchemy import models
 from coriolis import exception
 from coriolis import keystone
+from coriolis import locks
 from coriolis.minion_manager.rpc import client as rpc_minion_manager_client
 from coriolis.minion_manager.rpc import tasks as minion_mgr_tasks
 from coriolis.minion_manager.rpc import utils as minion_manager_utils
+from coriolis import rpc
 from coriolis.scheduler.rpc import client as rpc_scheduler_client
 from coriolis.taskflow import runner as taskflow_runner
 from coriolis.taskflow import utils as taskflow_utils
@@ -216,7 +218,10 @@ class MinionManagerServerEndpoint(object):
         return self._minion_manager_client_instance
 
     def get_diagnostics(self, ctxt):
-        return utils.get_diagnostics_info()
+        diagnostics = utils.get_diagnostics_info()
+        diagnostics['locks'] = locks.get_lock_stats()
+        diagnostics['rpc'] = rpc.get_rpc_stats()
+        return diagnostics
 
     def get_endpoint_source_minion_pool_options(
             self, ctxt, endpoint_id, env, option_names):
@@ -3,13 +3,12 @@
 
 import functools
 
-from oslo_concurrency import lockutils
-
 from coriolis import constants
+from coriolis import locks
 
 
 def get_minion_pool_lock(minion_pool_id, external=True):
-    return lockutils.lock(
+    return locks.lock(
         constants.MINION_POOL_LOCK_NAME_FORMAT % minion_pool_id,
         external=external)
 
@@ -17,9 +16,8 @@ def get_minion_pool_lock(minion_pool_id, external=True):
 def minion_pool_synchronized(minion_pool_id, func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        @lockutils.synchronized(
-            constants.MINION_POOL_LOCK_NAME_FORMAT % minion_pool_id,
-            external=True)
+        @locks.synchronized(
+            constants.MINION_POOL_LOCK_NAME_FORMAT % minion_pool_id)
         def inner():
             return func(*args, **kwargs)
         return inner()
@@ -37,10 +35,9 @@ def minion_pool_synchronized_op(func):
 def minion_machine_synchronized(minion_pool_id, minion_machine_id, func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        @lockutils.synchronized(
+        @locks.synchronized(
             constants.MINION_MACHINE_LOCK_NAME_FORMAT % (
-                minion_pool_id, minion_machine_id),
-            external=True)
+                minion_pool_id, minion_machine_id))
         def inner():
             return func(*args, **kwargs)
         return inner()
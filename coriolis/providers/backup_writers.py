@@ -2,12 +2,14 @@
 # All Rights Reserved.
 
 import abc
+import collections
 import contextlib
 import copy
 import datetime
 import errno
 import os
 import shutil
+import struct
 import tempfile
 import threading
 import time
@@ -15,11 +17,14 @@ import uuid
 
 import eventlet
 from oslo_config import cfg
+from oslo_config import types
 from oslo_log import log as logging
+from oslo_utils import units
 import paramiko
 import requests
 from six import with_metaclass
 
+from coriolis import conf
 from coriolis import constants
 from coriolis import data_transfer
 from coriolis import exception
@@ -31,8 +36,84 @@ opts = [
     cfg.BoolOpt('compress_transfers',
                 default=True,
                 help='Use compression if possible during disk transfers'),
+    cfg.IntOpt('ssh_writer_ack_window',
+               default=8,
+               min=1,
+               help='Maximum number of messages sent to the SSH disk '
+                    'writer helper which may be awaiting acknowledgement '
+                    'at any given time. A value of 1 means every message '
+                    'is acknowledged before the next one is sent.'),
+    cfg.IntOpt('transfer_compression_workers',
+               default=3,
+               min=1,
+               help='Number of chunks of each disk which may be compressed '
+                    'in parallel during disk transfers. See the '
+                    '\'compress_in_native_threads\' option as well.'),
+    cfg.ListOpt('ssh_writer_compression_formats',
+                item_type=types.String(choices=[
+                    constants.COMPRESSION_FORMAT_ZLIB,
+                    constants.COMPRESSION_FORMAT_ZSTD,
+                    constants.COMPRESSION_FORMAT_LZ4]),
+                default=[constants.COMPRESSION_FORMAT_ZLIB],
+                help='Compression formats the write_data helper used by '
+                     'the SSH backup writer may receive, in order of '
+                     'preference. Formats whose Python libraries '
+                     '(\'zstandard\' and \'lz4\') are not installed are '
+                     'skipped. The zstd and lz4 formats also require a '
+                     'write_data helper built with the respective codec '
+                     '(see the WITH_ZSTD and WITH_LZ4 makefile options).'),
+    cfg.ListOpt('http_writer_compression_formats',
+                item_type=types.String(choices=[
+                    constants.COMPRESSION_FORMAT_GZIP,
+                    constants.COMPRESSION_FORMAT_ZSTD,
+                    constants.COMPRESSION_FORMAT_LZ4]),
+                default=[constants.COMPRESSION_FORMAT_GZIP],
+                help='Compression formats the coriolis-writer used by the '
+                     'HTTP backup writer accepts as Content-Encoding, in '
+                     'order of preference. Formats whose Python libraries '
+                     'are not installed are skipped.'),
+    cfg.BoolOpt('ssh_writer_zero_extents',
+                default=False,
+                help='Detect all-zero blocks within the data written through '
+                     'the SSH backup writer and ask the write_data helper '
+                     'to zero out those ranges instead of sending them. As '
+                     'the helper is not uploaded again to the hosts which '
+                     'already have it, those hosts must have a write_data '
+                     'helper which supports zero messages.'),
+    cfg.IntOpt('zero_extents_min_length',
+               default=units.Mi,
+               min=0,
+               help='Minimum length in bytes of the runs of zeros which '
+                    'the backup writers zero out instead of sending them, '
+                    'when detecting all-zero blocks is enabled. Shorter '
+                    'runs are sent along with the data around them, so '
+                    'that fragmented data does not get split into many '
+                    'small messages.'),
+    cfg.BoolOpt('http_writer_zero_extents',
+                default=False,
+                help='Detect all-zero blocks within the data written through '
+                     'the HTTP backup writer and ask the coriolis-writer to '
+                     'zero out those ranges instead of sending them. The '
+                     'coriolis-writer must support the '
+                     '\'X-Write-Zero-Length\' header.'),
+    cfg.IntOpt('http_writer_senders',
+               default=3,
+               min=1,
+               help='Number of chunks of each disk which may be sent in '
+                    'parallel to the coriolis-writer by the HTTP backup '
+                    'writer, each over its own connection.'),
+    cfg.IntOpt('http_writer_pool_size',
+               default=10,
+               min=1,
+               help='Maximum number of keep-alive connections to the '
+                    'coriolis-writer kept open by the HTTP backup writer. '
+                    'The connections are reused across all the disks it '
+                    'writes, so that TLS handshakes are not repeated.'),
 ]
 CONF.register_opts(opts)
+# NOTE: the timeout of the requests of the HTTP backup writer is a common
+# option, which is otherwise only registered by the service commands:
+conf.init_common_opts()
 _CORIOLIS_HTTP_WRITER_CMD = "coriolis-writer"
 
 LOG = logging.getLogger(__name__)
@@ -64,6 +145,9 @@ _WRITER_ERR_MAP = {
     13: "ERR_ZLIB",
     14: "ERR_WRITE_MSG_ID",
     15: "ERR_OUT_OF_BOUDS",
+    16: "ERR_COMPRESSION_FORMAT",
+    17: "ERR_DECOMPRESS",
+    18: "ERR_IO_ZERO",
 }
 
 
@@ -127,6 +211,22 @@ def _check_deserialize_key(key):
     return res
 
 
+def _get_write_extents(data):
+    """Returns (offset, data, length) tuples for the extents of the given
+    data, where the data is None for extents which only hold zeros.
+    """
+    extents = data_transfer.get_data_extents(
+        data, min_zero_length=CONF.zero_extents_min_length)
+    if len(extents) == 1 and not extents[0][2]:
+        return [(0, data, len(data))]
+
+    view = memoryview(data)
+    return [
+        (offset, None if is_zero else view[offset:offset + length].tobytes(),
+         length)
+        for offset, length, is_zero in extents]
+
+
 class BackupWritersFactory(object):
 
     def __init__(self, writer_connection_info, volumes_info):
@@ -256,17 +356,26 @@ class FileBackupWriter(BaseBackupWriter):
 
 class SSHBackupWriterImpl(BaseBackupWriterImpl):
     def __init__(self, path, disk_id, compress_transfer=None,
-                 encoder_count=3):
+                 encoder_count=None, ack_window=None):
+        if encoder_count is None:
+            encoder_count = CONF.transfer_compression_workers
         self._msg_id = None
         self._stdin = None
         self._stdout = None
         self._stderr = None
         self._offset = None
         self._ssh = None
-        self._sender_q = eventlet.Queue(maxsize=5)
-        self._enc_q = eventlet.Queue(maxsize=5)
+        # NOTE: the queues are bounded so that writers block instead of
+        # piling up chunks while the encoders or the sender are busy:
+        self._sender_q = eventlet.Queue(maxsize=encoder_count + 2)
+        self._enc_q = eventlet.Queue(maxsize=encoder_count + 2)
         self._sender_evt = None
         self._encoder_evt = []
+        self._ack_reader_evt = None
+        if ack_window is None:
+            ack_window = CONF.ssh_writer_ack_window
+        self._ack_window = eventlet.Semaphore(ack_window)
+        self._unacked_msg_ids = collections.deque()
         self._encoder_cnt = encoder_count
         self._exception = None
         self._closing = False
@@ -290,7 +399,8 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
         msg = data_transfer.encode_data(
             msg_id, self._path,
             offset, content,
-            compress=self._compress_transfer)
+            compress=self._compress_transfer,
+            compression_formats=CONF.ssh_writer_compression_formats)
 
         LOG.debug(
             "Guest path: %(path)s, offset: %(offset)d, content len: "
@@ -301,14 +411,20 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
              "msg_len": len(msg)})
         return msg
 
+    def _encode_zero(self, offset, length, msg_id):
+        msg = data_transfer.encode_zero(msg_id, self._path, offset, length)
+        LOG.debug(
+            "Guest path: %(path)s, offset: %(offset)d, zeroed len: "
+            "%(length)d", {"path": self._path, "offset": offset,
+                           "length": length})
+        return msg
+
     def _encode_eod(self):
         msg = data_transfer.encode_eod(self._msg_id)
         LOG.debug("EOD message len: %d", len(msg))
         return msg
 
-    @utils.retry_on_error()
-    def _send_msg(self, data):
-        # check if write_data is still alive
+    def _check_helper_status(self):
         if self._stdout.channel.exit_status_ready():
             ret_val = self._stdout.channel.recv_exit_status()
             if int(ret_val) > 0:
@@ -316,12 +432,60 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
                     "write_data exited with error code %r (%s)" % (
                         ret_val, _WRITER_ERR_MAP.get(int(ret_val))))
 
+    def _send_msg(self, msg_id, data):
+        # check if write_data is still alive
+        self._check_helper_status()
+
+        # NOTE: up to `ack_window` messages may be in flight, their
+        # acknowledgements being consumed by the `_ack_reader`:
+        while not self._ack_window.acquire(timeout=1):
+            if self._exception:
+                raise exception.CoriolisException(
+                    "Failed to send data while waiting for "
+                    "acknowledgements.") from self._exception
+
+        # NOTE: as opposed to when each message was acknowledged before
+        # sending the next one, failed writes are not retried: a message
+        # which was partially written cannot be resent without corrupting
+        # the messages pipelined after it, nor can the acknowledgements of
+        # the messages in flight be read back again. Errors are recorded
+        # instead and fail the transfer of the whole disk.
+        self._unacked_msg_ids.append(msg_id)
         self._stdin.write(data)
         self._stdin.flush()
-        self._stdout.read(4)
+
+    def _ack_reader(self):
+        while True:
+            try:
+                ack = self._stdout.read(4)
+                if not ack and self._closing and not self._unacked_msg_ids:
+                    # write_data exits after acknowledging the EOD message
+                    return
+                if len(ack) != 4:
+                    self._check_helper_status()
+                    raise exception.CoriolisException(
+                        "write_data output was closed while %d message(s) "
+                        "were awaiting acknowledgement" % (
+                            len(self._unacked_msg_ids)))
+
+                msg_id = struct.unpack("<I", ack)[0]
+                expected_msg_id = None
+                if self._unacked_msg_ids:
+                    expected_msg_id = self._unacked_msg_ids.popleft()
+                if msg_id != expected_msg_id:
+                    raise exception.CoriolisException(
+                        "write_data acknowledged message %s while expecting "
+                        "an acknowledgement for message %s" % (
+                            msg_id, expected_msg_id))
+                self._ack_window.release()
+            except BaseException as err:
+                self._exception = err
+                raise
 
     def _open(self):
         self._exec_helper_cmd()
+        self._ack_reader_evt = eventlet.spawn(
+            self._ack_reader)
         self._sender_evt = eventlet.spawn(
             self._sender)
         for _ in range(self._encoder_cnt):
@@ -336,9 +500,9 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
 
     def _sender(self):
         while True:
-            data = self._sender_q.get()
+            msg_id, data = self._sender_q.get()
             try:
-                self._send_msg(data)
+                self._send_msg(msg_id, data)
             except BaseException as err:
                 self._exception = err
                 raise
@@ -350,11 +514,17 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
         while True:
             payload = self._enc_q.get()
             try:
-                data = self._encode_data(
-                    payload["data"],
-                    payload["offset"],
-                    payload["msg_id"])
-                self._sender_q.put(data)
+                if payload["data"] is None:
+                    data = self._encode_zero(
+                        payload["offset"],
+                        payload["length"],
+                        payload["msg_id"])
+                else:
+                    data = self._encode_data(
+                        payload["data"],
+                        payload["offset"],
+                        payload["msg_id"])
+                self._sender_q.put((payload["msg_id"], data))
             except BaseException as err:
                 self._exception = err
                 raise
@@ -371,20 +541,26 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
                 "Failed to write data. See log "
                 "for details.") from self._exception
 
-        payload = {
-            "offset": self._offset,
-            "data": data,
-            "msg_id": self._msg_id,
-        }
-        self._enc_q.put(payload)
+        extents = [(0, data, len(data))]
+        if CONF.ssh_writer_zero_extents:
+            extents = _get_write_extents(data)
+        for extent_offset, extent_data, extent_length in extents:
+            payload = {
+                "offset": self._offset + extent_offset,
+                "data": extent_data,
+                "length": extent_length,
+                "msg_id": self._msg_id,
+            }
+            self._enc_q.put(payload)
+            self._msg_id += 1
         self._offset += len(data)
-        self._msg_id += 1
 
     def _wait_for_queues(self):
         LOG.info("Waiting for unfinished transfers to complete")
         timeout = datetime.datetime.now() + datetime.timedelta(seconds=600)
         while (self._enc_q.unfinished_tasks or
-               self._sender_q.unfinished_tasks) and not self._exception:
+               self._sender_q.unfinished_tasks or
+               self._unacked_msg_ids) and not self._exception:
             time.sleep(0.5)
             now = datetime.datetime.now()
             if now >= timeout:
@@ -402,13 +578,21 @@ class SSHBackupWriterImpl(BaseBackupWriterImpl):
                 "Check logs for more details.") from self._exception
 
         if self._ssh:
-            self._send_msg(self._encode_eod())
+            self._send_msg(self._msg_id, self._encode_eod())
+            self._wait_for_queues()
+            if self._exception:
+                raise exception.CoriolisException(
+                    "Exception occurred while finishing data transfer. "
+                    "Check logs for more details.") from self._exception
             self._ssh.exec_command("sudo sync")
             self._ssh.close()
             self._ssh = None
         if self._sender_evt:
             eventlet.kill(self._sender_evt)
             self._sender_evt = None
+        if self._ack_reader_evt:
+            eventlet.kill(self._ack_reader_evt)
+            self._ack_reader_evt = None
 
         for i in self._encoder_evt:
             eventlet.kill(i)
@@ -537,9 +721,15 @@ class SSHBackupWriter(BaseBackupWriter):
 
 class HTTPBackupWriterImpl(BaseBackupWriterImpl):
     def __init__(self, path, disk_id,
-                 compress_transfer=None, compressor_count=3):
+                 compress_transfer=None, compressor_count=None,
+                 sender_count=None):
+        if compressor_count is None:
+            compressor_count = CONF.transfer_compression_workers
+        if sender_count is None:
+            sender_count = CONF.http_writer_senders
         self._offset = None
         self._session = None
+        self._owns_session = True
         self._ip = None
         self._port = None
         self._crt = None
@@ -550,8 +740,9 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
         self._id = None
         self._exception = None
         self._compressor_count = compressor_count
-        self._comp_q = eventlet.Queue(maxsize=5)
-        self._sender_q = eventlet.Queue(maxsize=5)
+        self._sender_count = sender_count
+        self._comp_q = eventlet.Queue(maxsize=compressor_count + 2)
+        self._sender_q = eventlet.Queue(maxsize=sender_count + 2)
 
         self._sender_evt = None
         self._compressor_evt = None
@@ -572,6 +763,9 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
                     self._key, self._ca, self._id]):
             raise exception.CoriolisException(
                 "Missing required info when creating HTTPBackupWriter")
+        if info.get("session"):
+            self._session = info["session"]
+            self._owns_session = False
 
     @property
     def _uri(self):
@@ -602,6 +796,10 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
         resp.raise_for_status()
 
     def _init_session(self):
+        if not self._owns_session:
+            # NOTE: shared sessions are left as they are, as other disks may
+            # be using them and their pools discard broken connections:
+            return
         if self._session:
             self._session.close()
         sess = requests.Session()
@@ -615,9 +813,10 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
         self._closing = False
         self._init_session()
         self._acquire()
-        self._sender_evt = eventlet.spawn(self._sender)
-        if self._compressor_count is None or self._compressor_count == 0:
-            self._compressor_count = 1
+        self._sender_evt = []
+        for _ in range(self._sender_count):
+            self._sender_evt.append(
+                eventlet.spawn(self._sender))
         self._compressor_evt = []
         for _ in range(self._compressor_count):
             self._compressor_evt.append(
@@ -645,12 +844,14 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
                 "offset": payload["offset"],
             }
             chunk = payload["data"]
-            if self._compress_transfer:
+            if chunk is None:
+                send_payload["zero_length"] = payload["length"]
+                chunk = b""
+            elif self._compress_transfer:
                 try:
-                    chunk, compressed = data_transfer.compression_proxy(
-                        chunk, constants.COMPRESSION_FORMAT_GZIP)
-                    if compressed:
-                        send_payload["encoding"] = 'gzip'
+                    chunk, fmt = data_transfer.compress_chunk(
+                        chunk, CONF.http_writer_compression_formats)
+                    send_payload["encoding"] = fmt
                 except BaseException as err:
                     LOG.exception(err)
                     self._exception = err
@@ -671,6 +872,8 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
             if payload.get("encoding", None):
                 enc = copy.copy(payload["encoding"])
                 headers["content-encoding"] = enc
+            if payload.get("zero_length") is not None:
+                headers["X-Write-Zero-Length"] = str(payload["zero_length"])
 
             @utils.retry_on_error()
             def send():
@@ -720,11 +923,16 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
         if self._exception:
             raise exception.CoriolisException(self._exception)
 
-        payload = {
-            "offset": self._offset,
-            "data": data,
-        }
-        self._comp_q.put(payload)
+        extents = [(0, data, len(data))]
+        if CONF.http_writer_zero_extents:
+            extents = _get_write_extents(data)
+        for extent_offset, extent_data, extent_length in extents:
+            payload = {
+                "offset": self._offset + extent_offset,
+                "data": extent_data,
+                "length": extent_length,
+            }
+            self._comp_q.put(payload)
         self._offset += len(data)
 
     def _wait_for_queues(self):
@@ -748,11 +956,12 @@ class HTTPBackupWriterImpl(BaseBackupWriterImpl):
             raise exception.CoriolisException(self._exception)
 
         self._release()
-        if self._session:
+        if self._session and self._owns_session:
             self._session.close()
-            self._session = None
+        self._session = None
         if self._sender_evt:
-            eventlet.kill(self._sender_evt)
+            for i in self._sender_evt:
+                eventlet.kill(i)
             self._sender_evt = None
         if self._compressor_evt:
             for i in self._compressor_evt:
@@ -953,7 +1162,8 @@ class HTTPBackupWriterBootstrapper(object):
 class HTTPBackupWriter(BaseBackupWriter):
 
     def __init__(self, ip, port, volumes_info, certificates,
-                 compressor_count=3):
+                 compressor_count=None):
+        self._session = None
         self._ip = ip
         self._port = port
         self._volumes_info = volumes_info
@@ -1010,6 +1220,9 @@ class HTTPBackupWriter(BaseBackupWriter):
         return cls(ip, port, volumes_info, certs)
 
     def __del__(self):
+        if self._session:
+            self._session.close()
+            self._session = None
         if self._crt_dir and os.path.isdir(self._crt_dir):
             try:
                 shutil.rmtree(self._crt_dir)
@@ -1046,6 +1259,21 @@ class HTTPBackupWriter(BaseBackupWriter):
         }
         return self._cert_paths
 
+    def _get_session(self, cert_paths):
+        if self._session:
+            return self._session
+
+        sess = requests.Session()
+        sess.cert = (
+            cert_paths["client_crt"],
+            cert_paths["client_key"])
+        sess.verify = cert_paths["ca_crt"]
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=CONF.http_writer_pool_size)
+        sess.mount("https://", adapter)
+        self._session = sess
+        return self._session
+
     def _get_impl(self, path, disk_id):
         cert_paths = self._write_cert_files()
         self._wait_for_conn()
@@ -1063,5 +1291,6 @@ class HTTPBackupWriter(BaseBackupWriter):
             "client_key": cert_paths["client_key"],
             "ca_crt": cert_paths["ca_crt"],
             "id": self._id,
+            "session": self._get_session(cert_paths),
         })
         return impl
@@ -1,12 +1,14 @@
 # Copyright 2019 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import collections
 import json
 import os
 import shutil
 import tempfile
 import time
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import units
@@ -39,12 +41,95 @@ replicator_opts = [
     cfg.IntOpt('default_requests_timeout',
                default=60,
                help='Number of seconds for HTTP request timeouts.'),
+    cfg.IntOpt('chunk_download_concurrency',
+               default=4,
+               min=1,
+               help='Maximum number of chunks which are concurrently '
+                    'downloaded from the replicator for the disks of an '
+                    'instance. Downloaded chunks are handed off to the '
+                    'backup writer in order, so this also bounds the '
+                    'number of chunks held in memory at any given time.'),
+    cfg.IntOpt('coalesce_chunks_max_gap',
+               default=0,
+               min=0,
+               help='Maximum number of bytes between two changed chunks '
+                    'for them to still be downloaded in a single ranged '
+                    'request. The data in between is downloaded but '
+                    'never written. Zero means only strictly adjacent '
+                    'chunks get coalesced.'),
+    cfg.IntOpt('coalesce_chunks_max_span',
+               min=0,
+               max=96 * units.Mi,
+               help='Maximum size in bytes of a ranged request resulting '
+                    'from coalescing changed chunks. Defaults to 4 times '
+                    'the chunk size of the replicator. Up to '
+                    'chunk_download_concurrency times this many bytes are '
+                    'held in memory at any given time. Set to zero to '
+                    'disable chunk coalescing.'),
 ]
 
+# NOTE: the default maximum span of the coalesced chunks, relative to the
+# chunk size of the replicator:
+DEFAULT_COALESCE_CHUNKS_MAX_SPAN_CHUNKS = 4
+
 CONF = cfg.CONF
 CONF.register_opts(replicator_opts, 'replicator')
 
 
+def _coalesce_chunks(chunks, max_gap=0, max_span=0):
+    """ Groups the given chunks into ranges which can be read in one go.
+
+    Chunks which are at most `max_gap` bytes apart are merged as long as the
+    resulting range does not exceed `max_span` bytes. Returns a list of dicts
+    with the "offset" and "length" of each range, as well as the "chunks"
+    it covers.
+    """
+    ranges = []
+    current = None
+    for chunk in sorted(chunks, key=lambda c: int(c["offset"])):
+        offset = int(chunk["offset"])
+        end = offset + int(chunk["length"])
+        if current is not None:
+            current_end = current["offset"] + current["length"]
+            if (0 <= offset - current_end <= max_gap and
+                    end - current["offset"] <= max_span):
+                current["length"] = end - current["offset"]
+                current["chunks"].append(chunk)
+                continue
+        current = {
+            "offset": offset,
+            "length": end - offset,
+            "chunks": [chunk],
+        }
+        ranges.append(current)
+    return ranges
+
+
+def _split_range_data(chunks_range, data):
+    """ Yields (offset, data) tuples for each run of contiguous chunks
+    within the data downloaded for a range returned by `_coalesce_chunks`,
+    skipping any gaps between them.
+    """
+    run_start = None
+    run_end = None
+    for chunk in chunks_range["chunks"]:
+        offset = int(chunk["offset"])
+        end = offset + int(chunk["length"])
+        if run_start is not None and offset == run_end:
+            run_end = end
+            continue
+        if run_start is not None:
+            yield run_start, data[
+                run_start - chunks_range["offset"]:
+                run_end - chunks_range["offset"]]
+        run_start = offset
+        run_end = end
+    if run_start is not None:
+        yield run_start, data[
+            run_start - chunks_range["offset"]:
+            run_end - chunks_range["offset"]]
+
+
 class Client(object):
 
     def __init__(self, ip, port, credentials, ssh_conn_info,
@@ -162,6 +247,11 @@ class Client(object):
             self._creds["client_cert"],
             self._creds["client_key"])
         sess.verify = self._creds["ca_cert"]
+        # NOTE: chunks are downloaded concurrently, so the connection pool
+        # must be able to hold a connection for each parallel download:
+        adapter = requests.adapters.HTTPAdapter(
+            pool_maxsize=CONF.replicator.chunk_download_concurrency)
+        sess.mount("https://", adapter)
         return sess
 
     @utils.retry_on_error()
@@ -251,6 +341,8 @@ class Replicator(object):
         self._credentials = None
         self._cli = None
         self._use_tunnel = use_tunnel
+        self._download_pool = eventlet.GreenPool(
+            CONF.replicator.chunk_download_concurrency)
 
     def __del__(self):
         if self._cert_dir is not None:
@@ -757,6 +849,43 @@ class Replicator(object):
                 return vol
         return None
 
+    def _get_chunk_ranges(self, chunks):
+        max_span = CONF.replicator.coalesce_chunks_max_span
+        if max_span is None:
+            max_span = min(
+                self._chunk_size * DEFAULT_COALESCE_CHUNKS_MAX_SPAN_CHUNKS,
+                96 * units.Mi)
+        return _coalesce_chunks(
+            chunks, max_gap=CONF.replicator.coalesce_chunks_max_gap,
+            max_span=max_span)
+
+    def _download_chunks(self, disk, chunks):
+        """ Yields (chunk, data) tuples for the given chunks, in order.
+        The chunks may also be ranges returned by `_coalesce_chunks`.
+
+        Downloads are spread across the green thread pool of this Replicator,
+        which is shared between all the disks of the instance. At most
+        `chunk_download_concurrency` chunks are being downloaded or waiting
+        to be consumed at any given time.
+        """
+        pending = collections.deque()
+        try:
+            for chunk in chunks:
+                pending.append((
+                    chunk, self._download_pool.spawn(
+                        self._cli.download_chunk, disk, chunk)))
+                if len(pending) >= self._download_pool.size:
+                    done, download = pending.popleft()
+                    yield done, download.wait()
+            while pending:
+                done, download = pending.popleft()
+                yield done, download.wait()
+        finally:
+            # NOTE: if the consumer bailed out early, there is no point in
+            # finishing the remaining downloads:
+            for _, download in pending:
+                download.kill()
+
     def replicate_disks(self, source_volumes_info, backup_writer):
         """
         Fetch the block diff and send it to the backup_writer.
@@ -816,6 +945,10 @@ class Replicator(object):
                 return self._repl_state
 
             size = self._get_size_from_chunks(chunks)
+            chunk_ranges = self._get_chunk_ranges(chunks)
+            LOG.debug(
+                "Coalesced %d chunks of disk %s into %d ranged reads",
+                len(chunks), devName, len(chunk_ranges))
 
             msg = (
                 "Replicating changed data for disk \"%s\" (device \"%s\", "
@@ -826,12 +959,13 @@ class Replicator(object):
 
             total = 0
             with backup_writer.open("", volume['disk_id']) as destination:
-                for chunk in chunks:
-                    offset = int(chunk["offset"])
-                    destination.seek(offset)
-                    data = self._cli.download_chunk(devName, chunk)
-                    destination.write(data)
-                    total += 1
+                for chunk_range, data in self._download_chunks(
+                        devName, chunk_ranges):
+                    for offset, run_data in _split_range_data(
+                            chunk_range, data):
+                        destination.seek(offset)
+                        destination.write(run_data)
+                    total += len(chunk_range["chunks"])
                     self._event_manager.set_percentage_step(
                         perc_step, total)
             dst_vol["replica_state"] = state_for_vol
@@ -872,15 +1006,15 @@ class Replicator(object):
             perc_step = self._event_manager.add_percentage_step(
                 "Downloading spart disk /dev/%s (%s MB)" % (
                     disk, size_from_chunks), len(chunks))
-            for chunk in chunks:
-                offset = int(chunk["offset"])
-                # seek to offset
-                fp.seek(offset)
-
-                data = self._cli.download_chunk(disk, chunk)
-                fp.write(data)
-
-                total += 1
+            chunk_ranges = self._get_chunk_ranges(chunks)
+            for chunk_range, data in self._download_chunks(
+                    disk, chunk_ranges):
+                for offset, run_data in _split_range_data(chunk_range, data):
+                    # seek to offset
+                    fp.seek(offset)
+                    fp.write(run_data)
+
+                total += len(chunk_range["chunks"])
                 self._event_manager.set_percentage_step(
                     perc_step, total)
 
@@ -10,6 +10,7 @@ from coriolis.conductor.rpc import client as rpc_client
 from coriolis import context
 from coriolis.cron import cron
 from coriolis import exception
+from coriolis import rpc
 from coriolis import utils
 
 LOG = logging.getLogger(__name__)
@@ -29,6 +30,10 @@ def _trigger_replica(ctxt, conductor_client, replica_id, shutdown_instance):
         LOG.info("A replica or migration already running")
 
 
+def _sync_endpoints_instances(ctxt, conductor_client):
+    conductor_client.sync_stale_endpoints_instances(ctxt)
+
+
 class ReplicaCronServerEndpoint(object):
 
     def __init__(self):
@@ -78,6 +83,12 @@ class ReplicaCronServerEndpoint(object):
                 # of an invalid schedule that managed to creep its
                 # way into the DB, or just ignore that one schedule?
                 LOG.exception(err)
+        # NOTE: the conductor only syncs the instances of the endpoints if
+        # enabled, and once their sync interval elapsed:
+        self._cron.register(cron.CronJob(
+            "endpoint-instances-sync", "Sync of the instances of endpoints",
+            {}, True, None, None, None, _sync_endpoints_instances,
+            self._admin_ctx, self._rpc_client))
         self._cron.start()
 
     def _get_all_schedules(self):
@@ -97,4 +108,6 @@ class ReplicaCronServerEndpoint(object):
         self._cron.unregister(schedule_id)
 
     def get_diagnostics(self, ctxt):
-        return utils.get_diagnostics_info()
+        diagnostics = utils.get_diagnostics_info()
+        diagnostics['rpc'] = rpc.get_rpc_stats()
+        return diagnostics
@@ -20,10 +20,19 @@ class API(object):
         self._rpc_client.cancel_replica_tasks_execution(
             ctxt, replica_id, execution_id, force)
 
-    def get_executions(self, ctxt, replica_id, include_tasks=False):
+    def get_executions(self, ctxt, replica_id, include_tasks=False,
+                       filters=None, marker=None, limit=None,
+                       sort_keys=None, sort_dirs=None):
         return self._rpc_client.get_replica_tasks_executions(
-            ctxt, replica_id, include_tasks)
+            ctxt, replica_id, include_tasks, filters=filters,
+            marker=marker, limit=limit, sort_keys=sort_keys,
+            sort_dirs=sort_dirs)
 
     def get_execution(self, ctxt, replica_id, execution_id):
         return self._rpc_client.get_replica_tasks_execution(
             ctxt, replica_id, execution_id)
+
+    def get_execution_status(self, ctxt, replica_id, execution_id,
+                             include_events=False):
+        return self._rpc_client.get_replica_tasks_execution_status(
+            ctxt, replica_id, execution_id, include_events=include_events)
@@ -1,15 +1,38 @@
 // Copyright 2016 Cloudbase Solutions Srl
 // All Rights Reserved.
 
+#define _GNU_SOURCE
+#include <fcntl.h>
+#include <linux/falloc.h>
 #include <stdio.h>
 #include <stdint.h>
 #include <stdlib.h>
 #include <string.h>
 #include <zlib.h>
+// The zstd and lz4 codecs are optional, messages using them being rejected
+// with ERR_COMPRESSION_FORMAT when they are not built in
+#ifdef WITH_ZSTD
+#include <zstd.h>
+#endif
+#ifdef WITH_LZ4
+#include <lz4frame.h>
+#endif
 
 #define MIN_MSG_SIZE (sizeof(uint64_t) + 1)
 #define MAX_MSG_SIZE (100 * 1024 * 1024)
 
+// The top bits of the inflated message size hold the compression format
+#define FORMAT_SHIFT            28
+#define FORMAT_SIZE_MASK        ((1U << FORMAT_SHIFT) - 1)
+#define FORMAT_ZLIB             0
+#define FORMAT_ZSTD             1
+#define FORMAT_LZ4              2
+// Uncompressed message holding the length of a range to zero out, instead
+// of the data to write
+#define FORMAT_ZERO             15
+
+#define ZERO_BUF_SIZE           (1024 * 1024)
+
 #define ERR_MORE_MSG            -1
 #define ERR_DONE                0
 #define ERR_READ_MSG_SIZE       1
@@ -27,8 +50,14 @@
 #define ERR_ZLIB                13
 #define ERR_WRITE_MSG_ID        14
 #define ERR_OUT_OF_BOUDS        15
+#define ERR_COMPRESSION_FORMAT  16
+#define ERR_DECOMPRESS          17
+#define ERR_IO_ZERO             18
 
 
+// Messages are handled strictly in the order they are received and each one
+// is acknowledged by echoing back its ID, so clients may pipeline multiple
+// messages before reading back their acknowledgements.
 int write_msg_id(uint32_t msg_id)
 {
     size_t c = fwrite(&msg_id, 1, sizeof(msg_id), stdout);
@@ -63,6 +92,90 @@ int inflate_buf(uint32_t msg_size, void* buf, uint32_t msg_size_inflated,
     return ERR_DONE;
 }
 
+#ifdef WITH_ZSTD
+int zstd_decompress_buf(uint32_t msg_size, void* buf,
+                        uint32_t msg_size_inflated, void* inflated_buf)
+{
+    size_t ret = ZSTD_decompress(inflated_buf, msg_size_inflated,
+                                 buf, msg_size);
+    if (ZSTD_isError(ret) || ret != msg_size_inflated)
+        return ERR_DECOMPRESS;
+
+    return ERR_DONE;
+}
+#endif
+
+#ifdef WITH_LZ4
+int lz4_decompress_buf(uint32_t msg_size, void* buf,
+                       uint32_t msg_size_inflated, void* inflated_buf)
+{
+    LZ4F_dctx* dctx = NULL;
+    if (LZ4F_isError(LZ4F_createDecompressionContext(&dctx, LZ4F_VERSION)))
+        return ERR_DECOMPRESS;
+
+    size_t dst_size = msg_size_inflated;
+    size_t src_size = msg_size;
+    size_t ret = LZ4F_decompress(dctx, inflated_buf, &dst_size,
+                                 buf, &src_size, NULL);
+    LZ4F_freeDecompressionContext(dctx);
+    // a zero return value means the whole frame was decoded
+    if (LZ4F_isError(ret) || ret != 0 || dst_size != msg_size_inflated)
+        return ERR_DECOMPRESS;
+
+    return ERR_DONE;
+}
+#endif
+
+int decompress_buf(uint32_t format, uint32_t msg_size, void* buf,
+                   uint32_t msg_size_inflated, void* inflated_buf)
+{
+    switch (format)
+    {
+    case FORMAT_ZLIB:
+        return inflate_buf(msg_size, buf, msg_size_inflated, inflated_buf);
+#ifdef WITH_ZSTD
+    case FORMAT_ZSTD:
+        return zstd_decompress_buf(
+            msg_size, buf, msg_size_inflated, inflated_buf);
+#endif
+#ifdef WITH_LZ4
+    case FORMAT_LZ4:
+        return lz4_decompress_buf(
+            msg_size, buf, msg_size_inflated, inflated_buf);
+#endif
+    default:
+        return ERR_COMPRESSION_FORMAT;
+    }
+}
+
+int zero_range(FILE* f, uint64_t offset, uint64_t length)
+{
+    // Works on both block devices and files, without allocating any space
+    if (!fallocate(fileno(f), FALLOC_FL_ZERO_RANGE | FALLOC_FL_KEEP_SIZE,
+                   (off_t)offset, (off_t)length))
+        return ERR_DONE;
+
+    // Fall back to writing zeros if the device does not support it
+    unsigned char* zero_buf = (unsigned char*)calloc(1, ZERO_BUF_SIZE);
+    if (!zero_buf)
+        return ERR_NO_MEM;
+
+    int err = ERR_DONE;
+    while (length)
+    {
+        size_t size = length < ZERO_BUF_SIZE ? length : ZERO_BUF_SIZE;
+        if (fwrite(zero_buf, 1, size, f) != size)
+        {
+            err = ERR_IO_ZERO;
+            break;
+        }
+        length -= size;
+    }
+
+    free(zero_buf);
+    return err;
+}
+
 int handle_msg(FILE* input_stream)
 {
     uint32_t msg_id = 0;
@@ -88,6 +201,8 @@ int handle_msg(FILE* input_stream)
     c = fread(&msg_size_inflated, 1, sizeof(uint32_t), input_stream);
     if (c != sizeof(uint32_t))
         return ERR_MSG_SIZE_INFLATED;
+    uint32_t format = msg_size_inflated >> FORMAT_SHIFT;
+    msg_size_inflated &= FORMAT_SIZE_MASK;
     if (msg_size_inflated != 0 && (msg_size_inflated < MIN_MSG_SIZE ||
             msg_size_inflated > MAX_MSG_SIZE))
         return ERR_MSG_SIZE_INFLATED;
@@ -106,7 +221,8 @@ int handle_msg(FILE* input_stream)
         if (!inflated_buf)
             return ERR_NO_MEM;
 
-        int err = inflate_buf(msg_size, buf, msg_size_inflated, inflated_buf);
+        int err = decompress_buf(format, msg_size, buf, msg_size_inflated,
+                                 inflated_buf);
         if(err != ERR_DONE)
         {
             free(inflated_buf);
@@ -142,15 +258,30 @@ int handle_msg(FILE* input_stream)
         return ERR_IO_SEEK;
 
     size_t data_size = msg_size - (data - buf);
+    if (format == FORMAT_ZERO)
+    {
+        if (data_size != sizeof(uint64_t))
+            return ERR_DATA;
+        data_size = *((uint64_t*)data);
+    }
     long end_write = (long)data_size + (long)offset;
 
     if (end_write > disk_size) {
         return ERR_OUT_OF_BOUDS;
     }
 
-    c = fwrite(data, 1, data_size, f);
-    if (c != data_size)
-        return ERR_IO_WRITE;
+    if (format == FORMAT_ZERO)
+    {
+        int err = zero_range(f, offset, data_size);
+        if (err)
+            return err;
+    }
+    else
+    {
+        c = fwrite(data, 1, data_size, f);
+        if (c != data_size)
+            return ERR_IO_WRITE;
+    }
     if (fclose(f))
         return ERR_IO_CLOSE;
 
@@ -1,11 +1,18 @@
 # Copyright 2016 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import bisect
+import collections
+import functools
+import os
+import time
+
 import coriolis.exception
 import oslo_messaging as messaging
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 
 from coriolis import context
 
@@ -16,7 +23,19 @@ rpc_opts = [
                help='Messaging transport url'),
     cfg.IntOpt('default_messaging_timeout',
                default=60,
-               help='Number of seconds for messaging timeouts.')
+               help='Number of seconds for messaging timeouts.'),
+    cfg.BoolOpt('rpc_instrumentation',
+                default=True,
+                help='Record the number of calls, errors and the latencies '
+                     'of the RPC methods called and served by each process, '
+                     'which are included in the diagnostics of the '
+                     'services.'),
+    cfg.BoolOpt('rpc_payload_size_instrumentation',
+                default=False,
+                help='Also record the serialized sizes of the arguments and '
+                     'results of the RPC methods called by each process. As '
+                     'this serializes the payloads once more, it adds to the '
+                     'cost of calls with large payloads.'),
 ]
 
 CONF = cfg.CONF
@@ -26,7 +45,43 @@ LOG = logging.getLogger(__name__)
 
 ALLOWED_EXMODS = [
     coriolis.exception.__name__]
+
+# NOTE: the transport and clients used by the RPC clients of this process are
+# instantiated once and reused by all the RPC clients with the same target.
+# As the eventlet thread queues of the transports are invalidated when
+# forking, they are always re-instantiated in child processes:
 _TRANSPORT = None
+_TRANSPORT_PID = None
+_rpc_clients = {}
+_rpc_clients_pid = None
+
+RPC_STATS_CLIENT = "client"
+RPC_STATS_SERVER = "server"
+
+# upper bounds (in seconds) of the buckets of the RPC latency histograms:
+RPC_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RPC_LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def _new_rpc_method_stats():
+    return {
+        "count": 0,
+        "errors": 0,
+        "total_time": 0.,
+        "max_time": 0.,
+        "latency_buckets": [0] * (len(RPC_LATENCY_BUCKETS) + 1),
+        "requests_measured": 0,
+        "total_request_bytes": 0,
+        "max_request_bytes": 0,
+        "responses_measured": 0,
+        "total_response_bytes": 0,
+        "max_response_bytes": 0}
+
+
+_rpc_stats = {
+    RPC_STATS_CLIENT: collections.defaultdict(_new_rpc_method_stats),
+    RPC_STATS_SERVER: collections.defaultdict(_new_rpc_method_stats)}
 
 
 class RequestContextSerializer(messaging.Serializer):
@@ -57,23 +112,170 @@ def _get_transport():
         allowed_remote_exmods=ALLOWED_EXMODS)
 
 
+class _InstrumentedEndpoint(object):
+    """ Proxy of an RPC server endpoint which records the calls of the
+    methods it serves.
+    """
+
+    def __init__(self, endpoint, topic):
+        self._endpoint = endpoint
+        self._topic = topic
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if (name.startswith("_") or not callable(attr) or
+                not CONF.rpc_instrumentation):
+            return attr
+
+        @functools.wraps(attr)
+        def _wrapper(ctxt, **kwargs):
+            return _call_instrumented(
+                RPC_STATS_SERVER, "%s.%s" % (self._topic, name), attr,
+                (ctxt,), kwargs)
+        return _wrapper
+
+
 def get_server(target, endpoints, serializer=None):
     serializer = RequestContextSerializer(serializer)
+    endpoints = [
+        _InstrumentedEndpoint(endpoint, target.topic)
+        for endpoint in endpoints]
     return messaging.get_rpc_server(_get_transport(), target, endpoints,
                                     executor='eventlet',
                                     serializer=serializer)
 
 
 def init():
+    """ Returns the transport of this process, instantiating it if needed. """
     global _TRANSPORT
-    if _TRANSPORT is None:
+    global _TRANSPORT_PID
+    pid = os.getpid()
+    if _TRANSPORT is None or _TRANSPORT_PID != pid:
         _TRANSPORT = _get_transport()
+        _TRANSPORT_PID = pid
     return _TRANSPORT
 
 
+def _get_client_transport():
+    return init()
+
+
+def _get_rpc_clients():
+    global _rpc_clients_pid
+    pid = os.getpid()
+    if _rpc_clients_pid != pid:
+        _rpc_clients.clear()
+        _rpc_clients_pid = pid
+    return _rpc_clients
+
+
+def _get_payload_size(payload):
+    try:
+        return len(jsonutils.dumps(payload))
+    except Exception:
+        return 0
+
+
+def _call_instrumented(side, name, func, args, kwargs, is_call=True):
+    """ Calls the given RPC function, recording its call, latency and errors
+    (as well as its payload sizes for the client side calls, if enabled)
+    under the given name.
+
+    :param kwargs: the arguments of the RPC method, which are passed to the
+    function after the positional 'args'.
+    """
+    if not CONF.rpc_instrumentation:
+        return func(*args, **kwargs)
+
+    stats = _rpc_stats[side][name]
+    measure_payloads = (
+        side == RPC_STATS_CLIENT and CONF.rpc_payload_size_instrumentation)
+    if measure_payloads:
+        request_bytes = _get_payload_size(kwargs)
+        stats["requests_measured"] += 1
+        stats["total_request_bytes"] += request_bytes
+        stats["max_request_bytes"] = max(
+            stats["max_request_bytes"], request_bytes)
+
+    start_time = time.monotonic()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        stats["errors"] += 1
+        raise
+    finally:
+        duration = time.monotonic() - start_time
+        stats["count"] += 1
+        stats["total_time"] += duration
+        stats["max_time"] = max(stats["max_time"], duration)
+        stats["latency_buckets"][
+            bisect.bisect_left(RPC_LATENCY_BUCKETS, duration)] += 1
+
+    if measure_payloads and is_call:
+        response_bytes = _get_payload_size(result)
+        stats["responses_measured"] += 1
+        stats["total_response_bytes"] += response_bytes
+        stats["max_response_bytes"] = max(
+            stats["max_response_bytes"], response_bytes)
+    return result
+
+
+def _get_latency_percentile(stats, percentile):
+    threshold = stats["count"] * percentile / 100.
+    counted = 0
+    for bound, count in zip(
+            RPC_LATENCY_BUCKETS + (None,), stats["latency_buckets"]):
+        counted += count
+        if counted >= threshold:
+            if bound is None:
+                break
+            return min(bound, stats["max_time"])
+    return stats["max_time"]
+
+
+def _format_rpc_method_stats(stats):
+    count = stats["count"]
+    formatted = {
+        "count": count,
+        "errors": stats["errors"],
+        "avg_time": stats["total_time"] / count if count else 0.,
+        "max_time": stats["max_time"],
+        "latency_buckets": dict(zip(
+            ["%s" % b for b in RPC_LATENCY_BUCKETS] + ["inf"],
+            stats["latency_buckets"]))}
+    for percentile in RPC_LATENCY_PERCENTILES:
+        formatted["p%d_time" % percentile] = (
+            _get_latency_percentile(stats, percentile) if count else 0.)
+
+    for payload in ("request", "response"):
+        measured = stats["%ss_measured" % payload]
+        if measured:
+            formatted["avg_%s_bytes" % payload] = (
+                stats["total_%s_bytes" % payload] // measured)
+            formatted["max_%s_bytes" % payload] = (
+                stats["max_%s_bytes" % payload])
+    return formatted
+
+
+def get_rpc_stats():
+    """ Returns the statistics of the RPC methods called ('client') and
+    served ('server') by this process, per '<topic>.<method>'.
+
+    The latency percentiles are estimated from the latency histograms, whose
+    buckets are keyed by the upper bound of the latencies they count, in
+    seconds.
+    """
+    return {
+        side: {
+            name: _format_rpc_method_stats(stats)
+            for name, stats in list(side_stats.items())}
+        for side, side_stats in _rpc_stats.items()}
+
+
 class BaseRPCClient(object):
-    """ Wrapper for 'oslo_messaging.RPCClient' which automatically
-    instantiates and cleans up transports for each call.
+    """ Wrapper for 'oslo_messaging.RPCClient' which reuses the transport and
+    clients of the process for all calls with the same target and timeout,
+    and records the statistics of each call.
     """
 
     def __init__(self, target, timeout=None, serializer=None):
@@ -81,8 +283,11 @@ class BaseRPCClient(object):
         self._timeout = timeout
         if self._timeout is None:
             self._timeout = CONF.default_messaging_timeout
+        self._serializer_base = serializer
         self._serializer = RequestContextSerializer(serializer)
-        self._transport_conn = None
+        # NOTE: the host-specific topics are aggregated under their main
+        # topic within the RPC statistics:
+        self._stats_topic = str(self._target.topic).split(".", 1)[0]
 
     def __repr__(self):
         return "<RPCClient(target=%s, timeout=%s)>" % (
@@ -90,34 +295,55 @@ class BaseRPCClient(object):
 
     @property
     def _transport(self):
-        global _TRANSPORT
-        if _TRANSPORT is None:
-            if self._transport_conn is None:
-                self._transport_conn = _get_transport()
-            return self._transport_conn
-        else:
-            return _TRANSPORT
-
-    def _rpc_client(self):
-        return messaging.RPCClient(
-            self._transport, self._target,
-            serializer=self._serializer,
-            timeout=self._timeout)
+        return _get_client_transport()
+
+    def _get_client_key(self, prepare_kwargs):
+        target = self._target
+        return (
+            self._transport, target.exchange, target.topic, target.namespace,
+            target.version, target.server, target.fanout, self._timeout,
+            self._serializer_base, tuple(sorted(prepare_kwargs.items())))
+
+    def _rpc_client(self, **prepare_kwargs):
+        """ Returns the client of the process for the target of this client,
+        prepared with the given options (e.g. 'server' or 'fanout').
+        """
+        clients = _get_rpc_clients()
+        key = self._get_client_key(prepare_kwargs)
+        client = clients.get(key)
+        if client is None:
+            if prepare_kwargs:
+                client = self._rpc_client().prepare(**prepare_kwargs)
+            else:
+                client = messaging.RPCClient(
+                    self._transport, self._target,
+                    serializer=self._serializer,
+                    timeout=self._timeout)
+            clients[key] = client
+        return client
+
+    def _send(self, send, ctxt, method, kwargs, is_call=True):
+        return _call_instrumented(
+            RPC_STATS_CLIENT, "%s.%s" % (self._stats_topic, method), send,
+            (ctxt, method), kwargs, is_call=is_call)
 
     def _call(self, ctxt, method, **kwargs):
-        client = self._rpc_client()
-        return client.call(ctxt, method, **kwargs)
+        return self._send(self._rpc_client().call, ctxt, method, kwargs)
 
     def _call_on_host(self, host, ctxt, method, **kwargs):
-        client = self._rpc_client()
-        cctxt = client.prepare(server=host)
-        return cctxt.call(ctxt, method, **kwargs)
+        return self._send(
+            self._rpc_client(server=host).call, ctxt, method, kwargs)
 
     def _cast(self, ctxt, method, **kwargs):
-        client = self._rpc_client()
-        client.cast(ctxt, method, **kwargs)
+        self._send(
+            self._rpc_client().cast, ctxt, method, kwargs, is_call=False)
 
     def _cast_for_host(self, host, ctxt, method, **kwargs):
-        client = self._rpc_client()
-        cctxt = client.prepare(server=host)
-        cctxt.cast(ctxt, method, **kwargs)
+        self._send(
+            self._rpc_client(server=host).cast, ctxt, method, kwargs,
+            is_call=False)
+
+    def _cast_fanout(self, ctxt, method, **kwargs):
+        self._send(
+            self._rpc_client(fanout=True).cast, ctxt, method, kwargs,
+            is_call=False)
@@ -0,0 +1,119 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import time
+
+from oslo_log import log as logging
+
+from coriolis.scheduler.filters import base
+
+
+LOG = logging.getLogger(__name__)
+
+# rating given to services which have not reported their capacity, which
+# ranks them alongside services with an average load:
+UNKNOWN_CAPACITY_RATING = 50
+
+# number of report intervals after which a capacity report is ignored:
+CAPACITY_REPORT_STALE_INTERVALS = 3
+
+
+def is_capacity_report_stale(report, now=None):
+    if now is None:
+        now = time.time()
+    max_age = report.get("report_interval", 0) * (
+        CAPACITY_REPORT_STALE_INTERVALS)
+    return now - report.get("reported_at", 0) > max_age
+
+
+def get_service_capacity(service, now=None):
+    """ Aggregates the capacity reports of all the processes of the given
+    service, as published in the 'capacity' field of its specs.
+
+    Returns None if the service has no recent capacity reports, or a dict
+    with the total 'running_tasks' and 'free_task_process_slots' of the
+    service, the host's latest 'cpu_percent', 'memory_percent' and
+    'nic_percent' usage, and the time of the latest report as 'reported_at'.
+    """
+    reports = (getattr(service, "specs", None) or {}).get("capacity") or {}
+    reports = [
+        report for report in reports.values()
+        if not is_capacity_report_stale(report, now=now)]
+    if not reports:
+        return None
+
+    latest = max(reports, key=lambda r: r["reported_at"])
+    return {
+        "running_tasks": sum(r.get("running_tasks", 0) for r in reports),
+        "free_task_process_slots": sum(
+            r.get("free_task_process_slots", 0) for r in reports),
+        "cpu_percent": latest.get("cpu_percent"),
+        "memory_percent": latest.get("memory_percent"),
+        "nic_percent": latest.get("nic_percent"),
+        "reported_at": latest["reported_at"]}
+
+
+class _BaseCapacityFilter(base.BaseServiceFilter):
+    """ Base class for filters which rate services by their available
+    capacity. These never reject a service, and their ratings are scaled by
+    their weight, so that they only decide the order of the services which
+    were accepted by the other filters.
+
+    :param pending_placements: dict of the form {"<service_id>": count}
+    with the number of tasks placed on each service since its last capacity
+    report.
+    :param weight: multiplier for the ratings of the filter.
+    """
+
+    def __init__(self, pending_placements=None, weight=1):
+        self._pending_placements = pending_placements or {}
+        self._weight = weight
+
+    def __repr__(self):
+        return "<%s(weight=%s)>" % (self.__class__.__name__, self._weight)
+
+    def _rate_capacity(self, service, capacity):
+        raise NotImplementedError()
+
+    def rate_service(self, service):
+        capacity = get_service_capacity(service)
+        if capacity is None:
+            rating = UNKNOWN_CAPACITY_RATING
+        else:
+            rating = self._rate_capacity(service, capacity)
+        return max(1, int(rating * self._weight))
+
+
+class RunningTasksFilter(_BaseCapacityFilter):
+    """ Rates services inversely to the number of tasks running on them. """
+
+    def _rate_capacity(self, service, capacity):
+        running_tasks = capacity["running_tasks"] + (
+            self._pending_placements.get(service.id, 0))
+        return 100 / (1 + running_tasks)
+
+
+class TaskProcessSlotsFilter(_BaseCapacityFilter):
+    """ Prefers services with idle pre-spawned task processes left. """
+
+    def _rate_capacity(self, service, capacity):
+        free_slots = capacity["free_task_process_slots"] - (
+            self._pending_placements.get(service.id, 0))
+        if free_slots > 0:
+            return 100
+        return UNKNOWN_CAPACITY_RATING
+
+
+class ResourceUsageFilter(_BaseCapacityFilter):
+    """ Rates services by the CPU, memory and network usage of their hosts,
+    based on the most used of the three.
+    """
+
+    def _rate_capacity(self, service, capacity):
+        usages = [
+            capacity[resource]
+            for resource in ("cpu_percent", "memory_percent", "nic_percent")
+            if capacity.get(resource) is not None]
+        if not usages:
+            return UNKNOWN_CAPACITY_RATING
+        return 100 - min(max(usages), 99)
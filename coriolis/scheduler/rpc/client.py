@@ -39,12 +39,21 @@ class SchedulerClient(rpc.BaseRPCClient):
     def get_diagnostics(self, ctxt):
         return self._call(ctxt, 'get_diagnostics')
 
+    def invalidate_topology_cache(self, ctxt):
+        self._cast_fanout(ctxt, 'invalidate_topology_cache')
+
+    def update_service_capacity(self, ctxt, service_id, capacity):
+        self._cast_fanout(
+            ctxt, 'update_service_capacity', service_id=service_id,
+            capacity=capacity)
+
     def get_workers_for_specs(
             self, ctxt, provider_requirements=None,
-            region_sets=None, enabled=None):
+            region_sets=None, enabled=None, for_placement=False):
         return self._call(
             ctxt, 'get_workers_for_specs', region_sets=region_sets,
-            enabled=enabled, provider_requirements=provider_requirements)
+            enabled=enabled, provider_requirements=provider_requirements,
+            for_placement=for_placement)
 
     def get_any_worker_service(
             self, ctxt, random_choice=False, raise_if_none=True):
@@ -66,6 +75,9 @@ class SchedulerClient(rpc.BaseRPCClient):
             enabled=True, random_choice=False, raise_on_no_matches=True):
         """Utility method which ensures at least one service matching
         the provided requirements exists and is usable.
+
+        If 'random_choice' is set, the scheduler picks the service, based on
+        the load of the services and at random between equally loaded ones.
         """
         requirements_str = (
             "enabled=%s; region_sets=%s; provider_requirements=%s" % (
@@ -75,7 +87,8 @@ class SchedulerClient(rpc.BaseRPCClient):
             "specifications: %s", requirements_str)
         services = self.get_workers_for_specs(
             ctxt, provider_requirements=provider_requirements,
-            region_sets=region_sets, enabled=enabled)
+            region_sets=region_sets, enabled=enabled,
+            for_placement=random_choice)
         if not services:
             if raise_on_no_matches:
                 raise exception.NoSuitableWorkerServiceError()
@@ -86,33 +99,18 @@ class SchedulerClient(rpc.BaseRPCClient):
             requirements_str, [s["id"] for s in services])
 
         selected_service = services[0]
-        if random_choice:
-            selected_service = random.choice(services)
 
         LOG.info(
             "Was offered Worker Service with ID '%s' for requirements: %s",
             selected_service['id'], requirements_str)
         return selected_service
 
-    def get_worker_service_for_task(
-            self, ctxt, task, origin_endpoint, destination_endpoint,
-            retry_count=5, retry_period=2, random_choice=True):
-        """ Gets a worker service for the task with the given properties
-        and source/target endpoints.
-
-        :param task: Dict of the form: {
-            "id": "<task_id>",
-            "task_type": "<constants.TASK_TYPE_*>"}
-        :param origin_endpoint: Dict of the form {
-            "id": "<ID>",
-            "mapped_regions": ["List of mapped endpoint regions"]}
-        :param destination_endpoint: Same as origin_endpoint
+    def _get_task_worker_specs(
+            self, task, origin_endpoint, destination_endpoint):
+        """ Returns the provider requirements and region sets a Worker
+        Service must satisfy to run the given task between the given
+        endpoints.
         """
-        LOG.debug(
-            "Compiling required Worker Service specs for task with "
-            "ID '%s' (type '%s') from endpoints '%s' to '%s'",
-            task['id'], task['task_type'], origin_endpoint['id'],
-            destination_endpoint['id'])
         task_cls = tasks_factory.get_task_runner_class(
             task['task_type'])
 
@@ -145,6 +143,31 @@ class SchedulerClient(rpc.BaseRPCClient):
                 required_provider_types[
                     constants.PROVIDER_PLATFORM_DESTINATION])
 
+        return provider_requirements, required_region_sets
+
+    def get_worker_service_for_task(
+            self, ctxt, task, origin_endpoint, destination_endpoint,
+            retry_count=5, retry_period=2, random_choice=True):
+        """ Gets a worker service for the task with the given properties
+        and source/target endpoints.
+
+        :param task: Dict of the form: {
+            "id": "<task_id>",
+            "task_type": "<constants.TASK_TYPE_*>"}
+        :param origin_endpoint: Dict of the form {
+            "id": "<ID>",
+            "mapped_regions": ["List of mapped endpoint regions"]}
+        :param destination_endpoint: Same as origin_endpoint
+        """
+        LOG.debug(
+            "Compiling required Worker Service specs for task with "
+            "ID '%s' (type '%s') from endpoints '%s' to '%s'",
+            task['id'], task['task_type'], origin_endpoint['id'],
+            destination_endpoint['id'])
+        provider_requirements, required_region_sets = (
+            self._get_task_worker_specs(
+                task, origin_endpoint, destination_endpoint))
+
         worker_service = None
         for i in range(retry_count):
             try:
@@ -182,3 +205,74 @@ class SchedulerClient(rpc.BaseRPCClient):
         #     ctxt, task.id, constants.TASK_STATUS_FAILED_TO_SCHEDULE,
         #     exception_details=message)
         raise exception.NoSuitableWorkerServiceError(message)
+
+    def get_worker_services_for_tasks(
+            self, ctxt, tasks, origin_endpoint, destination_endpoint,
+            retry_count=5, retry_period=2, raise_on_no_matches=True):
+        """ Gets a worker service for each of the given tasks between the
+        given source/target endpoints within a single scheduling request,
+        retrying for the tasks which could not be placed.
+
+        :param tasks: list of dicts of the form {
+            "id": "<task_id>",
+            "task_type": "<constants.TASK_TYPE_*>"}
+        :param origin_endpoint: see `get_worker_service_for_task`
+        :param destination_endpoint: see `get_worker_service_for_task`
+        Returns a dict of the form {"<task_id>": <service>}, with the
+        services of the tasks which could not be placed being None if
+        'raise_on_no_matches' is not set.
+        """
+        if not tasks:
+            return {}
+
+        task_specs = []
+        for task in tasks:
+            provider_requirements, required_region_sets = (
+                self._get_task_worker_specs(
+                    task, origin_endpoint, destination_endpoint))
+            task_specs.append({
+                "task_id": task['id'],
+                "provider_requirements": provider_requirements,
+                "region_sets": required_region_sets})
+
+        placements = {task['id']: None for task in tasks}
+        for i in range(retry_count):
+            try:
+                LOG.debug(
+                    "Requesting Worker Services for tasks %s from endpoints "
+                    "'%s' to '%s'", [spec['task_id'] for spec in task_specs],
+                    origin_endpoint['id'], destination_endpoint['id'])
+                placements.update(self._call(
+                    ctxt, 'get_workers_for_task_specs',
+                    task_specs=task_specs, enabled=True))
+                task_specs = [
+                    spec for spec in task_specs
+                    if not placements[spec['task_id']]]
+                if not task_specs:
+                    break
+                LOG.warn(
+                    "Failed to schedule tasks %s (attempt %d/%d). Waiting %d "
+                    "seconds and then retrying.",
+                    [spec['task_id'] for spec in task_specs], i + 1,
+                    retry_count, retry_period)
+            except Exception:
+                LOG.warn(
+                    "Failed to schedule tasks %s (attempt %d/%d). Waiting %d "
+                    "seconds and then retrying. Error was: %s",
+                    [spec['task_id'] for spec in task_specs], i + 1,
+                    retry_count, retry_period, utils.get_exception_details())
+            time.sleep(retry_period)
+
+        unplaced_tasks = [
+            task_id for (task_id, service) in placements.items()
+            if not service]
+        if unplaced_tasks and raise_on_no_matches:
+            raise exception.NoSuitableWorkerServiceError(
+                "Failed to schedule tasks %s after %d tries. This may "
+                "indicate that there are no Coriolis Worker services able to "
+                "perform the tasks on the platforms and in the Coriolis "
+                "Regions required by the selected source/destination "
+                "Coriolis Endpoints. Please review the Conductor and "
+                "Scheduler logs for more exact details." % (
+                    unplaced_tasks, retry_count))
+        return placements
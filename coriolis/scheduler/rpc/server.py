@@ -1,14 +1,18 @@
 # Copyright 2020 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import random
+
 from oslo_config import cfg
 from oslo_log import log as logging
 
 from coriolis.conductor.rpc import client as rpc_conductor_client
 from coriolis import constants
-from coriolis.db import api as db_api
 from coriolis import exception
+from coriolis import rpc
+from coriolis.scheduler.filters import capacity_filters
 from coriolis.scheduler.filters import trivial_filters
+from coriolis.scheduler import topology_cache
 from coriolis import utils
 
 
@@ -17,7 +21,35 @@ VERSION = "1.0"
 LOG = logging.getLogger(__name__)
 
 
-SCHEDULER_OPTS = []
+SCHEDULER_OPTS = [
+    cfg.BoolOpt("load_aware_scheduling",
+                default=True,
+                help="Whether or not to rank Worker services based on the "
+                     "capacity they periodically report when scheduling "
+                     "tasks, instead of picking one of them at random."),
+    cfg.FloatOpt("running_tasks_weight",
+                 default=2,
+                 min=0,
+                 help="Weight of the number of tasks running on a Worker "
+                      "service when ranking it."),
+    cfg.FloatOpt("resource_usage_weight",
+                 default=1,
+                 min=0,
+                 help="Weight of the CPU, memory and network usage of a "
+                      "Worker service's host when ranking it."),
+    cfg.FloatOpt("task_process_slots_weight",
+                 default=0.5,
+                 min=0,
+                 help="Weight of a Worker service having idle pre-spawned "
+                      "task processes when ranking it."),
+    cfg.IntOpt("topology_cache_ttl",
+               default=300,
+               min=0,
+               help="Number of seconds the scheduler caches the services "
+                    "and regions it places tasks on. The cache is also "
+                    "invalidated by the conductor whenever they change. "
+                    "Setting this to 0 disables the cache."),
+]
 
 CONF = cfg.CONF
 CONF.register_opts(SCHEDULER_OPTS, 'scheduler')
@@ -26,12 +58,26 @@ CONF.register_opts(SCHEDULER_OPTS, 'scheduler')
 class SchedulerServerEndpoint(object):
     def __init__(self):
         self._rpc_conductor_client = rpc_conductor_client.ConductorClient()
+        # number of placements on each service since its last capacity
+        # report, and the time of said report:
+        self._pending_placements = {}
+        self._pending_placements_report_times = {}
+        self._topology_cache = topology_cache.TopologyCache(
+            CONF.scheduler.topology_cache_ttl)
 
     def get_diagnostics(self, ctxt):
-        return utils.get_diagnostics_info()
+        diagnostics = utils.get_diagnostics_info()
+        diagnostics['rpc'] = rpc.get_rpc_stats()
+        return diagnostics
+
+    def invalidate_topology_cache(self, ctxt):
+        self._topology_cache.invalidate()
+
+    def update_service_capacity(self, ctxt, service_id, capacity):
+        self._topology_cache.update_service_capacity(service_id, capacity)
 
     def _get_all_worker_services(self, ctxt):
-        services = db_api.get_services(ctxt)
+        services = self._topology_cache.get_services(ctxt)
         services = trivial_filters.TopicFilter(
             constants.WORKER_MAIN_MESSAGING_TOPIC).filter_services(
                 services)
@@ -91,6 +137,34 @@ class SchedulerServerEndpoint(object):
         return sorted(
             scores, key=lambda s: s[1], reverse=True)
 
+    def _get_pending_placements(self, services):
+        """ Returns the number of placements on each of the given services
+        since their last capacity report, forgetting the ones which were
+        made before the latest report.
+        """
+        for service in services:
+            capacity = capacity_filters.get_service_capacity(service)
+            reported_at = capacity["reported_at"] if capacity else None
+            if reported_at != self._pending_placements_report_times.get(
+                    service.id):
+                self._pending_placements_report_times[service.id] = (
+                    reported_at)
+                self._pending_placements.pop(service.id, None)
+        return self._pending_placements
+
+    def _get_capacity_filters(self, services):
+        pending_placements = self._get_pending_placements(services)
+        return [
+            capacity_filters.RunningTasksFilter(
+                pending_placements=pending_placements,
+                weight=CONF.scheduler.running_tasks_weight),
+            capacity_filters.ResourceUsageFilter(
+                pending_placements=pending_placements,
+                weight=CONF.scheduler.resource_usage_weight),
+            capacity_filters.TaskProcessSlotsFilter(
+                pending_placements=pending_placements,
+                weight=CONF.scheduler.task_process_slots_weight)]
+
     def _filter_regions(
             self, ctxt, region_ids, enabled=True, check_all_exist=True,
             regions_cache=None):
@@ -98,7 +172,7 @@ class SchedulerServerEndpoint(object):
         filtered_regions = []
         regions = regions_cache
         if not regions:
-            regions = db_api.get_regions(ctxt)
+            regions = self._topology_cache.get_regions(ctxt)
         for region in regions:
             if region.id in region_ids:
                 found_regions.append(region.id)
@@ -117,25 +191,10 @@ class SchedulerServerEndpoint(object):
 
         return filtered_regions
 
-    def get_workers_for_specs(
-            self, ctxt, provider_requirements=None,
+    def _get_filters_for_specs(
+            self, ctxt, worker_services, provider_requirements=None,
             region_sets=None, enabled=None, filter_disabled_regions=True):
-        """ Returns a list of enabled Worker Services with the specified
-        parameters.
-        :param provider_requirements: dict of the form {
-            "<platform_type>": [constants.PROVIDER_TYPE_*, ...]}
-        param region_sets: list of lists of region IDs to filter for.
-        Services will be filtered unless they are associated with
-        at least one region in each region set.
-        """
         filters = []
-        worker_services = self._get_all_worker_services(ctxt)
-
-        LOG.debug(
-            "Searching for Worker Services with specs: %s" % {
-                "provider_requirements": provider_requirements,
-                "region_sets": region_sets, "enabled": enabled})
-
         if enabled is not None:
             filters.append(trivial_filters.EnabledFilter(enabled=enabled))
         if region_sets:
@@ -155,9 +214,61 @@ class SchedulerServerEndpoint(object):
         if provider_requirements:
             filters.append(
                 trivial_filters.ProviderTypesFilter(provider_requirements))
+        if CONF.scheduler.load_aware_scheduling:
+            filters.extend(self._get_capacity_filters(worker_services))
+        return filters
+
+    def _place_on_best_service(self, filtered_services, batch_placements=None):
+        """ Sorts the given list of services and their scores so that the
+        first one is the service to place a task on, and accounts for said
+        placement until the service next reports its capacity.
+
+        Equally scored services are shuffled, with the ones which got the
+        fewest of the other tasks placed within the same request first.
+        """
+        if batch_placements is None:
+            batch_placements = {}
+        random.shuffle(filtered_services)
+        filtered_services.sort(
+            key=lambda s: (-s[1], batch_placements.get(s[0].id, 0)))
+        selected_service = filtered_services[0][0]
+        self._pending_placements[selected_service.id] = (
+            self._pending_placements.get(selected_service.id, 0) + 1)
+        batch_placements[selected_service.id] = (
+            batch_placements.get(selected_service.id, 0) + 1)
+        return selected_service
 
+    def get_workers_for_specs(
+            self, ctxt, provider_requirements=None,
+            region_sets=None, enabled=None, filter_disabled_regions=True,
+            for_placement=False):
+        """ Returns a list of enabled Worker Services with the specified
+        parameters, ordered by how suitable they are.
+        :param provider_requirements: dict of the form {
+            "<platform_type>": [constants.PROVIDER_TYPE_*, ...]}
+        param region_sets: list of lists of region IDs to filter for.
+        Services will be filtered unless they are associated with
+        at least one region in each region set.
+        param for_placement: whether the first returned service will be used
+        to run a task, in which case equally suitable services are shuffled
+        and the placement is accounted for until the service next reports
+        its capacity.
+        """
+        worker_services = self._get_all_worker_services(ctxt)
+
+        LOG.debug(
+            "Searching for Worker Services with specs: %s" % {
+                "provider_requirements": provider_requirements,
+                "region_sets": region_sets, "enabled": enabled})
+
+        filters = self._get_filters_for_specs(
+            ctxt, worker_services, provider_requirements=provider_requirements,
+            region_sets=region_sets, enabled=enabled,
+            filter_disabled_regions=filter_disabled_regions)
         filtered_services = self._get_weighted_filtered_services(
             worker_services, filters)
+        if for_placement and filtered_services:
+            self._place_on_best_service(filtered_services)
         LOG.info(
             "Found Worker Services %s for specs: %s" % (
                 filtered_services, {
@@ -165,3 +276,50 @@ class SchedulerServerEndpoint(object):
                     "region_sets": region_sets, "enabled": enabled}))
 
         return [s[0] for s in filtered_services]
+
+    def get_workers_for_task_specs(self, ctxt, task_specs, enabled=True):
+        """ Places each of the given tasks on an enabled Worker Service.
+
+        The tasks are placed one after the other, with each placement being
+        accounted for when rating the services for the following tasks, so
+        that the tasks get spread across all suitable services.
+        :param task_specs: list of dicts of the form {
+            "task_id": "<ID>",
+            "provider_requirements": <see `get_workers_for_specs`>,
+            "region_sets": <see `get_workers_for_specs`>}
+        Returns a dict of the form {"<task_id>": <service or None>}, with
+        None for the tasks which could not be placed on any service.
+        """
+        worker_services = self._get_all_worker_services(ctxt)
+
+        placements = {}
+        batch_placements = {}
+        for task_spec in task_specs:
+            task_id = task_spec["task_id"]
+            try:
+                filters = self._get_filters_for_specs(
+                    ctxt, worker_services,
+                    provider_requirements=task_spec.get(
+                        "provider_requirements"),
+                    region_sets=task_spec.get("region_sets"),
+                    enabled=enabled)
+                filtered_services = self._get_weighted_filtered_services(
+                    worker_services, filters)
+            except (exception.NoSuitableWorkerServiceError,
+                    exception.NoSuitableRegionError,
+                    exception.RegionNotFound):
+                LOG.warn(
+                    "Could not find any Worker Service for task '%s' with "
+                    "specs %s. Error was: %s", task_id, task_spec,
+                    utils.get_exception_details())
+                placements[task_id] = None
+                continue
+
+            placements[task_id] = self._place_on_best_service(
+                filtered_services, batch_placements=batch_placements)
+
+        LOG.info(
+            "Placed tasks on the following Worker Services: %s",
+            {task_id: service.id if service else None
+             for (task_id, service) in placements.items()})
+        return placements
@@ -0,0 +1,85 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import time
+
+from oslo_log import log as logging
+
+from coriolis.db import api as db_api
+
+LOG = logging.getLogger(__name__)
+
+
+class TopologyCache(object):
+    """ In-memory cache of the services and regions the scheduler places
+    tasks on.
+
+    Each of them is loaded from the DB on first use, and reloaded whenever
+    the cache gets invalidated or the loaded entries are older than the
+    given TTL. Every invalidation bumps the version of the cache.
+
+    :param ttl: number of seconds after which the cached entries are
+    reloaded, with 0 disabling the caching altogether.
+    """
+
+    def __init__(self, ttl):
+        self._ttl = ttl
+        self._entries = {}
+        self._loaded_at = {}
+        self.version = 0
+
+    def _is_fresh(self, key):
+        loaded_at = self._loaded_at.get(key)
+        if not self._ttl or loaded_at is None:
+            return False
+        return time.time() - loaded_at < self._ttl
+
+    def _get(self, ctxt, key):
+        if self._is_fresh(key):
+            return self._entries[key]
+
+        version = self.version
+        values = getattr(db_api, "get_%s" % key)(ctxt)
+        # NOTE: values loaded while the cache was being invalidated might
+        # already be outdated, so they are only used for this call:
+        if version == self.version and self._ttl:
+            self._entries[key] = values
+            self._loaded_at[key] = time.time()
+            LOG.debug(
+                "Loaded %d %s into the scheduler cache (version %d).",
+                len(values), key, self.version)
+        return values
+
+    def get_services(self, ctxt):
+        return list(self._get(ctxt, "services"))
+
+    def get_regions(self, ctxt):
+        return list(self._get(ctxt, "regions"))
+
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+        self._loaded_at.clear()
+        LOG.debug(
+            "Invalidated the scheduler cache, now at version %d.",
+            self.version)
+
+    def update_service_capacity(self, service_id, capacity):
+        """ Sets the capacity reports within the specs of the given cached
+        service, without invalidating the rest of the cache.
+
+        Returns False if the service is not currently cached.
+        """
+        for service in self._entries.get("services") or []:
+            if service.id == service_id:
+                specs = dict(service.specs or {})
+                specs["capacity"] = capacity
+                service.specs = specs
+                return True
+        return False
+
+    def get_info(self):
+        return {
+            "version": self.version,
+            "ttl": self._ttl,
+            "loaded_at": dict(self._loaded_at)}
@@ -6,14 +6,40 @@ import json
 
 from barbicanclient import client as barbican_client
 import keystoneauth1
+from oslo_config import cfg
 from oslo_log import log as logging
 
+from coriolis import cache
 from coriolis import keystone
 from coriolis import utils
 
+opts = [
+    cfg.IntOpt('cache_time',
+               default=300, min=0,
+               help="Number of seconds for which the payloads of the secrets "
+                    "fetched from Barbican are cached in memory by each "
+                    "process, with 0 disabling the cache."),
+    cfg.IntOpt('cache_size',
+               default=256, min=1,
+               help="Maximum number of secret payloads cached by each "
+                    "process."),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(opts, 'secrets')
 
 LOG = logging.getLogger(__name__)
 
+_secret_payloads = None
+
+
+def _get_secret_payloads_cache():
+    global _secret_payloads
+    if _secret_payloads is None:
+        _secret_payloads = cache.LocalTTLCache(
+            max_entries=CONF.secrets.cache_size)
+    return _secret_payloads
+
 
 def _get_barbican_secret_payload(ctxt, secret_ref):
     session = keystone.create_keystone_session(ctxt)
@@ -24,19 +50,36 @@ def _get_barbican_secret_payload(ctxt, secret_ref):
     return payload
 
 
-def get_secret(ctxt, secret_ref):
-    payload = None
-
+def _fetch_secret_payload(ctxt, secret_ref):
     try:
-        payload = _get_barbican_secret_payload(ctxt, secret_ref)
+        return _get_barbican_secret_payload(ctxt, secret_ref)
     except keystoneauth1.exceptions.http.Unauthorized:
         LOG.debug(
             "Error occured while fetching secret with trust ID, retrying "
             "without. Error was: %s", utils.get_exception_details())
         ctxt = copy.deepcopy(ctxt)
         ctxt.trust_id = None
-        payload = _get_barbican_secret_payload(ctxt, secret_ref)
-    except Exception:
-        raise
+        return _get_barbican_secret_payload(ctxt, secret_ref)
+
+
+def get_secret(ctxt, secret_ref):
+    # NOTE: the payloads are cached per project, so that a secret which was
+    # fetched for a project is never served to another one without Barbican
+    # checking its access:
+    payload = _get_secret_payloads_cache().get(
+        (ctxt.project_id, secret_ref),
+        lambda: _fetch_secret_payload(ctxt, secret_ref),
+        CONF.secrets.cache_time)
 
     return json.loads(payload)
+
+
+def invalidate_secret(secret_ref):
+    """ Drops the cached payloads of the given secret for all projects. """
+    _get_secret_payloads_cache().invalidate_matching(
+        lambda key: key[1] == secret_ref)
+
+
+def clear_secrets_cache():
+    """ Drops all the cached secret payloads. """
+    _get_secret_payloads_cache().clear()
@@ -12,6 +12,7 @@ import oslo_messaging as messaging
 from oslo_service import service
 from oslo_service import wsgi
 
+from coriolis import locks
 from coriolis import rpc
 from coriolis import utils
 
@@ -66,6 +67,12 @@ def check_locks_dir_empty():
     descriptors so this check is not necessarily conclusive, though all freshly
     started/restarted conductor services should ideally be given a clean slate.
     """
+    if CONF.locks.backend != locks.LOCK_BACKEND_FILE:
+        LOG.info(
+            "Not checking the locks directory as the '%s' lock backend is "
+            "used.", CONF.locks.backend)
+        return
+
     oslo_concurrency_group = getattr(CONF, 'oslo_concurrency', {})
     if not oslo_concurrency_group:
         LOG.warn("No 'oslo_concurrency' group defined in config file!")
@@ -143,7 +150,11 @@ class WSGIService(service.ServiceBase):
 
 class MessagingService(service.ServiceBase):
     def __init__(self, topic, endpoints, version,
-                 worker_count=None, init_rpc=True):
+                 worker_count=None, init_rpc=True, start_hooks=None):
+        """ :param start_hooks: list of functions to be called whenever the
+        service starts in each of its processes.
+        """
+        self._start_hooks = start_hooks or []
         if init_rpc:
             rpc.init()
         target = messaging.Target(topic=topic,
@@ -164,6 +175,8 @@ class MessagingService(service.ServiceBase):
 
     def start(self):
         self._server.start()
+        for hook in self._start_hooks:
+            hook()
 
     def stop(self):
         self._server.stop()
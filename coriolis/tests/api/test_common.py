@@ -0,0 +1,101 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import datetime
+from unittest import mock
+
+import ddt
+
+from coriolis.api import common
+from coriolis import exception
+from coriolis.tests import test_base
+
+
+@ddt.ddt
+class CommonTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis API common functions."""
+
+    def _get_request(self, **params):
+        mock_req = mock.Mock()
+        mock_req.GET = params
+        return mock_req
+
+    def test_get_paging_params(self):
+        result = common.get_paging_params(
+            self._get_request(marker="marker-id", limit="10"))
+
+        self.assertEqual(("marker-id", 10), result)
+
+    def test_get_paging_params_negative_limit(self):
+        self.assertRaises(
+            exception.InvalidInput, common.get_paging_params,
+            self._get_request(limit="-1"))
+
+    @ddt.data(
+        ({}, False),
+        ({"refresh": "true"}, True),
+        ({"refresh": "0"}, False),
+    )
+    @ddt.unpack
+    def test_get_refresh_param(self, params, expected):
+        self.assertEqual(
+            expected, common.get_refresh_param(self._get_request(**params)))
+
+    @ddt.data(
+        ({}, ([], [])),
+        ({"sort_key": "created_at,id"},
+         (["created_at", "id"], ["asc", "asc"])),
+        ({"sort_key": "created_at, id", "sort_dir": "DESC"},
+         (["created_at", "id"], ["desc", "asc"])),
+    )
+    @ddt.unpack
+    def test_get_sort_params(self, params, expected):
+        result = common.get_sort_params(
+            self._get_request(**params), ["created_at", "id"])
+
+        self.assertEqual(expected, result)
+
+    @ddt.data(
+        {"sort_key": "invalid"},
+        {"sort_key": "id", "sort_dir": "invalid"},
+        {"sort_key": "id", "sort_dir": "asc,desc"},
+    )
+    def test_get_sort_params_invalid(self, params):
+        self.assertRaises(
+            exception.InvalidInput, common.get_sort_params,
+            self._get_request(**params), ["created_at", "id"])
+
+    def test_get_list_filters(self):
+        result = common.get_list_filters(
+            self._get_request(
+                status="COMPLETED", created_after="2026-01-02T03:04:05Z",
+                unknown="value"),
+            {"status": "last_execution_status",
+             "created_after": "created_after",
+             "created_before": "created_before"})
+
+        self.assertEqual(
+            {"last_execution_status": "COMPLETED",
+             "created_after": datetime.datetime(2026, 1, 2, 3, 4, 5)},
+            result)
+
+    def test_get_list_filters_invalid_timestamp(self):
+        self.assertRaises(
+            exception.InvalidInput, common.get_list_filters,
+            self._get_request(created_before="invalid"),
+            {"created_before": "created_before"})
+
+    def test_get_list_params(self):
+        result = common.get_list_params(
+            self._get_request(
+                marker="marker-id", limit="5", sort_key="id",
+                status="ERROR"),
+            ["id"], {"status": "status"})
+
+        self.assertEqual(
+            {"filters": {"status": "ERROR"},
+             "marker": "marker-id",
+             "limit": 5,
+             "sort_keys": ["id"],
+             "sort_dirs": ["asc"]},
+            result)
@@ -52,7 +52,8 @@ class EndpointDestinationOptionsControllerTestCase(
         mock_get_endpoint_destination_options.assert_called_once_with(
             mock_context, endpoint_id,
             env=env,
-            option_names=options)
+            option_names=options,
+            refresh=False)
         mock_destination_options_collection.assert_called_once_with(
             mock_get_endpoint_destination_options.return_value)
         self.assertEqual(
@@ -83,7 +84,8 @@ class EndpointDestinationOptionsControllerTestCase(
         mock_get_endpoint_destination_options.assert_called_once_with(
             mock_context, endpoint_id,
             env={},
-            option_names={})
+            option_names={},
+            refresh=False)
         mock_destination_options_collection.assert_called_once_with(
             mock_get_endpoint_destination_options.return_value)
         self.assertEqual(
@@ -21,10 +21,10 @@ class EndpointInstanceControllerTestCase(test_base.CoriolisBaseTestCase):
     @mock.patch.object(common, 'get_paging_params')
     @mock.patch.object(utils, 'decode_base64_param')
     @mock.patch.object(endpoint_resources_view, 'instances_collection')
-    @mock.patch.object(api.API, 'get_endpoint_instances')
+    @mock.patch.object(api.API, 'search_endpoint_instances')
     def test_index(
         self,
-        mock_get_endpoint_instances,
+        mock_search_endpoint_instances,
         mock_instances_collection,
         mock_decode_base64_param,
         mock_get_paging_params,
@@ -49,12 +49,14 @@ class EndpointInstanceControllerTestCase(test_base.CoriolisBaseTestCase):
             'migration:endpoints:list_instances')
         mock_get_paging_params.assert_called_once_with(mock_req)
         mock_decode_base64_param.assert_called_once_with(env, is_json=True)
-        mock_get_endpoint_instances.assert_called_once_with(
+        mock_search_endpoint_instances.assert_called_once_with(
             mock_context, endpoint_id,
             mock_decode_base64_param.return_value,
-            marker, limit, instance_name_pattern)
+            marker, limit, instance_name_pattern, refresh=False)
         mock_instances_collection.assert_called_once_with(
-            mock_get_endpoint_instances.return_value)
+            mock_search_endpoint_instances.return_value["instances"],
+            synced_at=mock_search_endpoint_instances.return_value[
+                "synced_at"])
         self.assertEqual(
             mock_instances_collection.return_value,
             result
@@ -63,10 +65,10 @@ class EndpointInstanceControllerTestCase(test_base.CoriolisBaseTestCase):
     @mock.patch.object(common, 'get_paging_params')
     @mock.patch.object(utils, 'decode_base64_param')
     @mock.patch.object(endpoint_resources_view, 'instances_collection')
-    @mock.patch.object(api.API, 'get_endpoint_instances')
+    @mock.patch.object(api.API, 'search_endpoint_instances')
     def test_index_no_env_and_options(
         self,
-        mock_get_endpoint_instances,
+        mock_search_endpoint_instances,
         mock_instances_collection,
         mock_decode_base64_param,
         mock_get_paging_params,
@@ -82,11 +84,13 @@ class EndpointInstanceControllerTestCase(test_base.CoriolisBaseTestCase):
 
         mock_get_paging_params.assert_called_once_with(mock_req)
         mock_decode_base64_param.assert_not_called()
-        mock_get_endpoint_instances.assert_called_once_with(
+        mock_search_endpoint_instances.assert_called_once_with(
             mock_context, endpoint_id,
-            {}, None, None, None)
+            {}, None, None, None, refresh=False)
         mock_instances_collection.assert_called_once_with(
-            mock_get_endpoint_instances.return_value)
+            mock_search_endpoint_instances.return_value["instances"],
+            synced_at=mock_search_endpoint_instances.return_value[
+                "synced_at"])
         self.assertEqual(
             mock_instances_collection.return_value,
             result
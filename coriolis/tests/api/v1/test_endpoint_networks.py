@@ -42,7 +42,7 @@ class EndpointNetworkControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_decode_base64_param.assert_called_once_with(env, is_json=True)
         mock_get_endpoint_networks.assert_called_once_with(
             mock_context, endpoint_id,
-            mock_decode_base64_param.return_value)
+            mock_decode_base64_param.return_value, refresh=False)
         mock_networks_collection.assert_called_once_with(
             mock_get_endpoint_networks.return_value)
         self.assertEqual(
@@ -69,7 +69,7 @@ class EndpointNetworkControllerTestCase(test_base.CoriolisBaseTestCase):
 
         mock_decode_base64_param.assert_not_called()
         mock_get_endpoint_networks.assert_called_once_with(
-            mock_context, endpoint_id, {})
+            mock_context, endpoint_id, {}, refresh=False)
         mock_networks_collection.assert_called_once_with(
             mock_get_endpoint_networks.return_value)
         self.assertEqual(
@@ -52,7 +52,8 @@ class EndpointSourceOptionsControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_get_endpoint_source_options.assert_called_once_with(
             mock_context, endpoint_id,
             env=env,
-            option_names=options)
+            option_names=options,
+            refresh=False)
         mock_source_options_collection.assert_called_once_with(
             mock_get_endpoint_source_options.return_value)
         self.assertEqual(
@@ -81,7 +82,8 @@ class EndpointSourceOptionsControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_get_endpoint_source_options.assert_called_once_with(
             mock_context, endpoint_id,
             env={},
-            option_names={})
+            option_names={},
+            refresh=False)
         mock_source_options_collection.assert_called_once_with(
             mock_get_endpoint_source_options.return_value)
         self.assertEqual(
@@ -42,7 +42,7 @@ class EndpointStorageControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_decode_base64_param.assert_called_once_with(env, is_json=True)
         mock_storage_collection.assert_called_once_with(
             mock_context, endpoint_id,
-            mock_decode_base64_param.return_value)
+            mock_decode_base64_param.return_value, refresh=False)
         mock_get_endpoint_storage.assert_called_once_with(
             mock_storage_collection.return_value)
         self.assertEqual(
@@ -69,7 +69,7 @@ class EndpointStorageControllerTestCase(test_base.CoriolisBaseTestCase):
 
         mock_decode_base64_param.assert_not_called()
         mock_storage_collection.assert_called_once_with(
-            mock_context, endpoint_id, {})
+            mock_context, endpoint_id, {}, refresh=False)
         mock_get_endpoint_storage.assert_called_once_with(
             mock_storage_collection.return_value)
         self.assertEqual(
@@ -6,6 +6,7 @@ from webob import exc
 
 import ddt
 
+from coriolis.api import common
 from coriolis.api.v1 import migrations
 from coriolis.api.v1 import utils as api_utils
 from coriolis.api.v1.views import migration_view
@@ -36,6 +37,7 @@ class MigrationControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
+        mock_req.GET = {}
         id = mock.sentinel.id
         mock_conf.api.include_task_info_in_migrations_api = False
 
@@ -62,6 +64,7 @@ class MigrationControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
+        mock_req.GET = {}
         id = mock.sentinel.id
         mock_conf.api.include_task_info_in_migrations_api = False
         mock_get_migration.return_value = None
@@ -78,17 +81,49 @@ class MigrationControllerTestCase(test_base.CoriolisBaseTestCase):
             mock_context, id, include_task_info=False
         )
 
+    @mock.patch.object(migration_view, 'single')
+    @mock.patch.object(api.API, 'get_migration')
+    @mock.patch.object(api.API, 'get_migration_status')
+    def test_show_status(
+        self,
+        mock_get_migration_status,
+        mock_get_migration,
+        mock_single
+    ):
+        mock_req = mock.Mock()
+        mock_context = mock.Mock()
+        mock_req.environ = {'coriolis.context': mock_context}
+        mock_req.GET = {"fields": "last_execution_status,tasks"}
+        id = mock.sentinel.id
+
+        result = self.migrations.show(mock_req, id)
+
+        self.assertEqual(
+            mock_single.return_value,
+            result
+        )
+        mock_get_migration_status.assert_called_once_with(
+            mock_context, id, include_events=False)
+        mock_get_migration.assert_not_called()
+        mock_single.assert_called_once_with(
+            mock_get_migration_status.return_value,
+            keys=["last_execution_status", "tasks", "executions"])
+
     @mock.patch.object(migration_view, 'collection')
     @mock.patch.object(api.API, 'get_migrations')
+    @mock.patch.object(common, 'get_list_params')
     @mock.patch.object(api_utils, '_get_show_deleted')
     @mock.patch('coriolis.api.v1.migrations.CONF')
     def test__list(
         self,
         mock_conf,
         mock__get_show_deleted,
+        mock_get_list_params,
         mock_get_migrations,
         mock_collection
     ):
+        mock_get_list_params.return_value = {
+            "marker": mock.sentinel.marker, "limit": mock.sentinel.limit}
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
@@ -108,10 +143,15 @@ class MigrationControllerTestCase(test_base.CoriolisBaseTestCase):
         mock__get_show_deleted.assert_called_once_with(
             mock_req.GET.get.return_value)
         mock_context.can.assert_called_once_with("migration:migrations:list")
+        mock_get_list_params.assert_called_once_with(
+            mock_req, migrations.MIGRATION_LIST_SORT_KEYS,
+            migrations.MIGRATION_LIST_FILTERS)
         mock_get_migrations.assert_called_once_with(
             mock_context,
             include_tasks=False,
-            include_task_info=False
+            include_task_info=False,
+            marker=mock.sentinel.marker,
+            limit=mock.sentinel.limit
         )
 
     @mock.patch.object(api_utils, 'validate_storage_mappings')
@@ -5,6 +5,7 @@ from unittest import mock
 
 from webob import exc
 
+from coriolis.api import common
 from coriolis.api.v1 import replica_tasks_executions as replica_api
 from coriolis.api.v1.views import replica_tasks_execution_view
 from coriolis import exception
@@ -29,6 +30,7 @@ class ReplicaTasksExecutionControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
+        mock_req.GET = {}
         replica_id = mock.sentinel.replica_id
         id = mock.sentinel.id
 
@@ -55,6 +57,7 @@ class ReplicaTasksExecutionControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
+        mock_req.GET = {}
         replica_id = mock.sentinel.replica_id
         id = mock.sentinel.id
         mock_get_execution.return_value = None
@@ -73,13 +76,46 @@ class ReplicaTasksExecutionControllerTestCase(test_base.CoriolisBaseTestCase):
             mock_context, replica_id, id)
         mock_single.assert_not_called()
 
+    @mock.patch.object(replica_tasks_execution_view, 'single')
+    @mock.patch.object(api.API, 'get_execution')
+    @mock.patch.object(api.API, 'get_execution_status')
+    def test_show_status(
+        self,
+        mock_get_execution_status,
+        mock_get_execution,
+        mock_single
+    ):
+        mock_req = mock.Mock()
+        mock_context = mock.Mock()
+        mock_req.environ = {'coriolis.context': mock_context}
+        mock_req.GET = {"fields": "status, tasks", "include": "events"}
+        replica_id = mock.sentinel.replica_id
+        id = mock.sentinel.id
+
+        result = self.replica_api.show(mock_req, replica_id, id)
+
+        self.assertEqual(
+            mock_single.return_value,
+            result
+        )
+        mock_get_execution_status.assert_called_once_with(
+            mock_context, replica_id, id, include_events=True)
+        mock_get_execution.assert_not_called()
+        mock_single.assert_called_once_with(
+            mock_get_execution_status.return_value,
+            keys=["status", "tasks"])
+
     @mock.patch.object(replica_tasks_execution_view, 'collection')
     @mock.patch.object(api.API, 'get_executions')
+    @mock.patch.object(common, 'get_list_params')
     def test_index(
         self,
+        mock_get_list_params,
         mock_get_executions,
         mock_collection
     ):
+        mock_get_list_params.return_value = {
+            "marker": mock.sentinel.marker, "limit": mock.sentinel.limit}
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
@@ -94,18 +130,26 @@ class ReplicaTasksExecutionControllerTestCase(test_base.CoriolisBaseTestCase):
 
         mock_context.can.assert_called_once_with(
             "migration:replica_executions:list")
+        mock_get_list_params.assert_called_once_with(
+            mock_req, replica_api.EXECUTION_LIST_SORT_KEYS,
+            replica_api.EXECUTION_LIST_FILTERS)
         mock_get_executions.assert_called_once_with(
-            mock_context, replica_id, include_tasks=False)
+            mock_context, replica_id, include_tasks=False,
+            marker=mock.sentinel.marker, limit=mock.sentinel.limit)
         mock_collection.assert_called_once_with(
             mock_get_executions.return_value)
 
     @mock.patch.object(replica_tasks_execution_view, 'collection')
     @mock.patch.object(api.API, 'get_executions')
+    @mock.patch.object(common, 'get_list_params')
     def test_detail(
         self,
+        mock_get_list_params,
         mock_get_executions,
         mock_collection
     ):
+        mock_get_list_params.return_value = {
+            "marker": mock.sentinel.marker, "limit": mock.sentinel.limit}
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
@@ -120,8 +164,12 @@ class ReplicaTasksExecutionControllerTestCase(test_base.CoriolisBaseTestCase):
 
         mock_context.can.assert_called_once_with(
             "migration:replica_executions:show")
+        mock_get_list_params.assert_called_once_with(
+            mock_req, replica_api.EXECUTION_LIST_SORT_KEYS,
+            replica_api.EXECUTION_LIST_FILTERS)
         mock_get_executions.assert_called_once_with(
-            mock_context, replica_id, include_tasks=True)
+            mock_context, replica_id, include_tasks=True,
+            marker=mock.sentinel.marker, limit=mock.sentinel.limit)
         mock_collection.assert_called_once_with(
             mock_get_executions.return_value)
 
@@ -6,6 +6,7 @@ from unittest import mock
 import ddt
 from webob import exc
 
+from coriolis.api import common
 from coriolis.api.v1 import replicas
 from coriolis.api.v1 import utils as api_utils
 from coriolis.api.v1.views import replica_tasks_execution_view
@@ -83,14 +84,18 @@ class ReplicaControllerTestCase(test_base.CoriolisBaseTestCase):
     @mock.patch('coriolis.api.v1.replicas.CONF')
     @mock.patch.object(replica_view, 'collection')
     @mock.patch.object(api.API, 'get_replicas')
+    @mock.patch.object(common, 'get_list_params')
     @mock.patch.object(api_utils, '_get_show_deleted')
     def test_list(
         self,
         mock_get_show_deleted,
+        mock_get_list_params,
         mock_get_replicas,
         mock_collection,
         mock_conf
     ):
+        mock_get_list_params.return_value = {
+            "marker": mock.sentinel.marker, "limit": mock.sentinel.limit}
         mock_req = mock.Mock()
         mock_context = mock.Mock()
         mock_req.environ = {'coriolis.context': mock_context}
@@ -105,11 +110,15 @@ class ReplicaControllerTestCase(test_base.CoriolisBaseTestCase):
         mock_get_show_deleted.assert_called_once_with(
             mock_req.GET.get.return_value)
         mock_context.can.assert_called_once_with("migration:replicas:list")
+        mock_get_list_params.assert_called_once_with(
+            mock_req, replicas.REPLICA_LIST_SORT_KEYS,
+            replicas.REPLICA_LIST_FILTERS)
         mock_get_replicas.assert_called_once_with(
             mock_context,
             include_tasks_executions=
             mock_conf.api.include_task_info_in_replicas_api,
-            include_task_info=mock_conf.api.include_task_info_in_replicas_api
+            include_task_info=mock_conf.api.include_task_info_in_replicas_api,
+            marker=mock.sentinel.marker, limit=mock.sentinel.limit
         )
         mock_collection.assert_called_once_with(mock_get_replicas.return_value)
 
@@ -51,6 +51,28 @@ class UtilsTestCase(test_base.CoriolisBaseTestCase):
             result
         )
 
+    @ddt.data(
+        ({}, (None, False)),
+        ({"fields": ""}, ([], False)),
+        ({"fields": "status, tasks,"}, (["status", "tasks"], False)),
+        ({"include": "events"}, (None, True)),
+        ({"fields": "status", "include": "events"}, (["status"], True)),
+    )
+    @ddt.unpack
+    def test_get_status_projection_options(self, params, expected):
+        mock_req = mock.Mock(GET=params)
+
+        result = utils.get_status_projection_options(mock_req)
+
+        self.assertEqual(expected, result)
+
+    def test_get_status_projection_options_unsupported_include(self):
+        mock_req = mock.Mock(GET={"include": "events,info"})
+
+        self.assertRaises(
+            exc.HTTPBadRequest, utils.get_status_projection_options,
+            mock_req)
+
     @mock.patch.object(schemas, 'validate_value')
     def test_validate_network_map(
         self,
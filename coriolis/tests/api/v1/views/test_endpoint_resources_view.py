@@ -1,6 +1,8 @@
 # Copyright 2023 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+from unittest import mock
+
 from coriolis.api.v1.views import endpoint_resources_view
 from coriolis.tests import test_base
 
@@ -17,6 +19,15 @@ class EndpointResourcesViewTestCase(test_base.CoriolisApiViewsTestCase):
                       'instances_collection')
         self._collection_view_test(fun, "instances")
 
+    def test_instances_collection_synced_at(self):
+        result = endpoint_resources_view.instances_collection(
+            [{"id": "instance_id"}], synced_at=mock.sentinel.synced_at)
+
+        self.assertEqual(
+            {"instances": [{"id": "instance_id"}],
+             "synced_at": mock.sentinel.synced_at},
+            result)
+
     def test_network_single(self):
         fun = getattr(endpoint_resources_view,
                       'network_single')
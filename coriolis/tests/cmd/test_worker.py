@@ -45,7 +45,9 @@ class WorkerTestCase(test_base.CoriolisBaseTestCase):
         mock_MessagingService.assert_called_once_with(
             constants.WORKER_MAIN_MESSAGING_TOPIC,
             [mock_WorkerServerEndpoint.return_value],
-            rpc_server.VERSION, worker_count=worker_count, init_rpc=False)
+            rpc_server.VERSION, worker_count=worker_count, init_rpc=False,
+            start_hooks=[
+                mock_WorkerServerEndpoint.return_value.start_background_tasks])
         mock_service.launch.assert_called_once_with(
             mock_conf, mock_MessagingService.return_value,
             workers=mock_MessagingService.return_value.
@@ -83,7 +85,8 @@ class WorkerTestCase(test_base.CoriolisBaseTestCase):
             constants.WORKER_MAIN_MESSAGING_TOPIC,
             [mock_WorkerServerEndpoint.return_value],
             rpc_server.VERSION, worker_count=mock_conf.worker.worker_count,
-            init_rpc=False)
+            init_rpc=False, start_hooks=[
+                mock_WorkerServerEndpoint.return_value.start_background_tasks])
         mock_service.launch.assert_called_once_with(
             mock_conf, mock_MessagingService.return_value,
             workers=mock_MessagingService.return_value.
@@ -0,0 +1,139 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+from coriolis.conductor.rpc import client
+from coriolis import constants
+from coriolis.tests import test_base
+
+
+class ConductorTaskRpcEventHandlerTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis ConductorTaskRpcEventHandler class."""
+
+    def setUp(self):
+        super(ConductorTaskRpcEventHandlerTestCase, self).setUp()
+        self.handler = client.ConductorTaskRpcEventHandler(
+            mock.sentinel.ctxt, mock.sentinel.task_id, batch_interval=5,
+            batch_size=2)
+        self.conductor_client = mock.Mock()
+        self.handler._rpc_conductor_client_instance = self.conductor_client
+
+    def _get_event(self, message):
+        return {
+            "task_id": mock.sentinel.task_id,
+            "type": constants.TASK_EVENTS_BATCH_ITEM_EVENT,
+            "level": constants.TASK_EVENT_INFO,
+            "message": message}
+
+    @mock.patch.object(client.eventlet, 'spawn')
+    def test_add_event_buffered(self, mock_spawn):
+        self.handler.add_event("event 1")
+
+        mock_spawn.assert_called_once_with(
+            self.handler._flush_task_events_after_interval,
+            self.handler._task_events_flush_due)
+        self.assertFalse(self.handler._task_events_flush_due.ready())
+        self.assertEqual(
+            [self._get_event("event 1")], self.handler._pending_task_events)
+        self.conductor_client.add_task_events_batch.assert_not_called()
+
+    @mock.patch.object(client.eventlet, 'spawn')
+    def test_add_event_batch_size_reached(self, mock_spawn):
+        self.handler.add_event("event 1")
+        self.handler.add_event("event 2")
+
+        # NOTE: full batches are sent by the flusher, never concurrently
+        # with the batches it may already be sending:
+        mock_spawn.assert_called_once()
+        self.assertTrue(self.handler._task_events_flush_due.ready())
+        self.conductor_client.add_task_events_batch.assert_not_called()
+
+    def test_flush_task_events_after_interval(self):
+        flush_due = mock.Mock()
+        self.handler._task_events_flusher = mock.sentinel.flusher
+        self.handler._task_events_flush_due = flush_due
+        self.handler._pending_task_events = [self._get_event("event 1")]
+
+        self.handler._flush_task_events_after_interval(flush_due)
+
+        flush_due.wait.assert_called_once_with(timeout=5)
+        self.assertIsNone(self.handler._task_events_flusher)
+        self.assertIsNone(self.handler._task_events_flush_due)
+        self.assertEqual([], self.handler._pending_task_events)
+        self.conductor_client.add_task_events_batch.assert_called_once_with(
+            mock.sentinel.ctxt, [self._get_event("event 1")])
+
+    @mock.patch.object(client.eventlet, 'spawn')
+    def test_flush_task_events_after_interval_error(self, mock_spawn):
+        flush_due = mock.Mock()
+        self.handler._pending_task_events = [self._get_event("event 1")]
+
+        def _add_task_events_batch(ctxt, task_events):
+            # NOTE: events buffered while the batch is being sent:
+            self.handler._pending_task_events.append(
+                self._get_event("event 2"))
+            raise Exception("RPC failed")
+        self.conductor_client.add_task_events_batch.side_effect = (
+            _add_task_events_batch)
+
+        with self.assertLogs('coriolis.conductor.rpc.client', level='WARN'):
+            self.handler._flush_task_events_after_interval(flush_due)
+
+        self.assertEqual(
+            [self._get_event("event 1"), self._get_event("event 2")],
+            self.handler._pending_task_events)
+        self.assertEqual(1, self.handler._task_events_send_failures)
+        mock_spawn.assert_called_once_with(
+            self.handler._flush_task_events_after_interval,
+            self.handler._task_events_flush_due)
+
+    @mock.patch.object(client, 'CONF')
+    @mock.patch.object(client.eventlet, 'spawn')
+    def test_flush_task_events_after_interval_error_last_attempt(
+            self, mock_spawn, mock_conf):
+        mock_conf.conductor.task_events_batch_send_attempts = 2
+        flush_due = mock.Mock()
+        self.handler._pending_task_events = [self._get_event("event 1")]
+        self.handler._task_events_send_failures = 1
+        self.conductor_client.add_task_events_batch.side_effect = (
+            Exception("RPC failed"))
+
+        with self.assertLogs(
+                'coriolis.conductor.rpc.client', level='ERROR'):
+            self.handler._flush_task_events_after_interval(flush_due)
+
+        self.assertEqual([], self.handler._pending_task_events)
+        self.assertEqual(0, self.handler._task_events_send_failures)
+        mock_spawn.assert_not_called()
+
+    def test_flush_error(self):
+        self.handler._pending_task_events = [self._get_event("event 1")]
+        self.conductor_client.add_task_events_batch.side_effect = (
+            Exception("RPC failed"))
+
+        self.assertRaises(Exception, self.handler.flush)
+
+        self.assertEqual(
+            [self._get_event("event 1")], self.handler._pending_task_events)
+
+    def test_flush_waits_for_inflight_batch(self):
+        calls = mock.MagicMock()
+        self.handler._task_events_send_lock = calls.lock
+        self.handler._rpc_conductor_client_instance = calls.client
+        self.handler._pending_task_events = [self._get_event("event 1")]
+
+        self.handler.flush()
+
+        self.assertEqual([
+            mock.call.lock.__enter__(),
+            mock.call.client.add_task_events_batch(
+                mock.sentinel.ctxt, [self._get_event("event 1")]),
+            mock.call.lock.__exit__(None, None, None)],
+            calls.mock_calls)
+        self.assertEqual([], self.handler._pending_task_events)
+
+    def test_flush_nothing_pending(self):
+        self.handler.flush()
+
+        self.conductor_client.add_task_events_batch.assert_not_called()
@@ -0,0 +1,55 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+from coriolis.conductor.rpc import execution_graph
+from coriolis.tests import test_base
+
+
+def _get_task(index, task_id, instance, depends_on=None, on_error=False):
+    return mock.Mock(
+        index=index, id=task_id, instance=instance,
+        depends_on=depends_on, on_error=on_error)
+
+
+class ExecutionGraphTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis ExecutionGraph class."""
+
+    def setUp(self):
+        super(ExecutionGraphTestCase, self).setUp()
+        self.tasks = [
+            _get_task(3, "task4", "instance1", ["task2", "task3"],
+                      on_error=True),
+            _get_task(0, "task1", "instance1"),
+            _get_task(2, "task3", "instance1", ["task1"]),
+            _get_task(1, "task2", "instance1", ["task1"]),
+            _get_task(4, "task5", "instance2")]
+        self.graph = execution_graph.ExecutionGraph(self.tasks)
+
+    def test_init(self):
+        self.assertEqual(
+            ["task1", "task2", "task3", "task4", "task5"],
+            self.graph.task_ids)
+        self.assertEqual([], self.graph.parents["task1"])
+        self.assertEqual(["task2", "task3"], self.graph.parents["task4"])
+        self.assertEqual({"task4"}, self.graph.on_error_task_ids)
+
+    def test_matches(self):
+        self.assertTrue(self.graph.matches(self.tasks))
+        self.assertFalse(self.graph.matches(self.tasks[:-1]))
+        self.assertFalse(self.graph.matches(
+            self.tasks[:-1] + [_get_task(4, "task6", "instance2")]))
+
+    def test_get_task_ids(self):
+        self.assertEqual(
+            ["task5"], self.graph.get_task_ids(instance="instance2"))
+
+    def test_get_children(self):
+        self.assertEqual(
+            ["task2", "task3"], self.graph.get_children(["task1"]))
+        self.assertEqual(
+            ["task4"], self.graph.get_children(["task2", "task3"]))
+        self.assertEqual(
+            [], self.graph.get_children(["task1"], instance="instance2"))
+        self.assertEqual([], self.graph.get_children(["task5"]))
@@ -2,11 +2,13 @@
 # All Rights Reserved.
 
 import copy
+import datetime
 import ddt
 import uuid
 
 from unittest import mock
 
+from coriolis import cache
 from coriolis.conductor.rpc import server
 from coriolis import constants
 from coriolis.db import api as db_api
@@ -80,12 +82,42 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             random_choice=False,
             raise_on_no_matches=True,
         )
-        mock_get_service.assert_called_once_with(
-            mock.sentinel.context, mock.sentinel.worker_id
-        )
+        mock_get_service.assert_not_called()
+        mock_from_service_definition.assert_called_once_with(
+            worker_service.return_value)
 
         self.assertEqual(result, mock_from_service_definition.return_value)
 
+    @mock.patch.object(server.ConductorServerEndpoint, "_scheduler_client")
+    def test_invalidate_scheduler_cache(self, mock_scheduler_client):
+        mock_scheduler_client.invalidate_topology_cache.side_effect = (
+            CoriolisTestException())
+
+        self.server._invalidate_scheduler_cache(mock.sentinel.context)
+
+        invalidate_topology_cache = (
+            mock_scheduler_client.invalidate_topology_cache)
+        invalidate_topology_cache.assert_called_once_with(
+            mock.sentinel.context)
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_invalidate_scheduler_cache")
+    @mock.patch.object(db_api, "get_service")
+    @mock.patch.object(db_api, "update_service")
+    def test_update_service(
+            self, mock_update_service, mock_get_service,
+            mock_invalidate_scheduler_cache):
+        result = testutils.get_wrapped_function(self.server.update_service)(
+            self.server, mock.sentinel.context, mock.sentinel.service_id,
+            mock.sentinel.updated_values)
+
+        mock_update_service.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.service_id,
+            mock.sentinel.updated_values)
+        mock_invalidate_scheduler_cache.assert_called_once_with(
+            mock.sentinel.context)
+        self.assertEqual(mock_get_service.return_value, result)
+
     @mock.patch.object(server.ConductorServerEndpoint, "get_endpoint")
     @mock.patch.object(db_api, "delete_endpoint")
     @mock.patch.object(db_api, "update_endpoint")
@@ -164,9 +196,18 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.context, str(mock_uuid4.return_value)
         )
 
+    @mock.patch.object(server, "_invalidate_endpoint_secret")
+    @mock.patch.object(cache, "invalidate_endpoint_inventory")
     @mock.patch.object(db_api, "get_endpoint")
     @mock.patch.object(db_api, "update_endpoint")
-    def test_update_endpoint(self, mock_update_endpoint, mock_get_endpoint):
+    def test_update_endpoint(
+            self, mock_update_endpoint, mock_get_endpoint,
+            mock_invalidate_endpoint_inventory,
+            mock_invalidate_endpoint_secret):
+        original_endpoint = mock.sentinel.original_endpoint
+        mock_get_endpoint.side_effect = [
+            original_endpoint, mock.sentinel.updated_endpoint]
+
         endpoint = testutils.get_wrapped_function(self.server.update_endpoint)(
             self,
             mock.sentinel.context,
@@ -179,10 +220,43 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.endpoint_id,
             mock.sentinel.updated_values,
         )
-        mock_get_endpoint.assert_called_once_with(
-            mock.sentinel.context, mock.sentinel.endpoint_id
-        )
-        self.assertEqual(endpoint, mock_get_endpoint.return_value)
+        mock_invalidate_endpoint_inventory.assert_called_once_with(
+            mock.sentinel.endpoint_id)
+        mock_invalidate_endpoint_secret.assert_called_once_with(
+            mock.sentinel.context, original_endpoint)
+        mock_get_endpoint.assert_has_calls([
+            mock.call(mock.sentinel.context, mock.sentinel.endpoint_id),
+            mock.call(mock.sentinel.context, mock.sentinel.endpoint_id)])
+        self.assertEqual(mock.sentinel.updated_endpoint, endpoint)
+
+    @mock.patch.object(rpc_worker_client.WorkerClient, "invalidate_secret")
+    def test_invalidate_endpoint_secret(self, mock_invalidate_secret):
+        endpoint = mock.Mock(
+            connection_info={"secret_ref": mock.sentinel.secret_ref})
+
+        server._invalidate_endpoint_secret(mock.sentinel.context, endpoint)
+
+        mock_invalidate_secret.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.secret_ref)
+
+    @mock.patch.object(rpc_worker_client.WorkerClient, "invalidate_secret")
+    def test_invalidate_endpoint_secret_no_secret(
+            self, mock_invalidate_secret):
+        server._invalidate_endpoint_secret(
+            mock.sentinel.context, mock.Mock(connection_info={}))
+        server._invalidate_endpoint_secret(mock.sentinel.context, None)
+
+        mock_invalidate_secret.assert_not_called()
+
+    @mock.patch.object(rpc_worker_client.WorkerClient, "invalidate_secret")
+    def test_invalidate_endpoint_secret_error(self, mock_invalidate_secret):
+        endpoint = mock.Mock(
+            connection_info={"secret_ref": mock.sentinel.secret_ref})
+        mock_invalidate_secret.side_effect = CoriolisTestException()
+
+        with self.assertLogs('coriolis.conductor.rpc.server', level='WARN'):
+            server._invalidate_endpoint_secret(
+                mock.sentinel.context, endpoint)
 
     @mock.patch.object(db_api, "get_endpoints")
     def test_get_endpoints(self, mock_get_endpoints):
@@ -208,14 +282,22 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mock_get_endpoint.side_effect = exception.NotFound()
         self.assertRaises(exception.NotFound, call_get_endpoint)
 
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_delete_endpoint_instances_sync_trust")
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(server, "_invalidate_endpoint_secret")
+    @mock.patch.object(db_api, "get_endpoint")
     @mock.patch.object(db_api, "delete_endpoint")
     @mock.patch.object(db_api, "get_endpoint_replicas_count")
     def test_delete_endpoint(
-            self, mock_get_endpoint_replicas_count, mock_delete_endpoint
+            self, mock_get_endpoint_replicas_count, mock_delete_endpoint,
+            mock_get_endpoint, mock_invalidate_endpoint_secret,
+            mock_get_endpoint_instances_sync, mock_delete_sync_trust
     ):
         def call_delete_endpoint():
             return testutils.get_wrapped_function(self.server.delete_endpoint)(
-                self, mock.sentinel.context,
+                self.server, mock.sentinel.context,
                 mock.sentinel.endpoint_id  # type: ignore
             )
 
@@ -224,11 +306,43 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mock_delete_endpoint.assert_called_once_with(
             mock.sentinel.context, mock.sentinel.endpoint_id
         )
+        mock_invalidate_endpoint_secret.assert_called_once_with(
+            mock.sentinel.context, mock_get_endpoint.return_value)
+        mock_delete_sync_trust.assert_called_once_with(
+            mock_get_endpoint_instances_sync.return_value.trust_id)
 
         # endpoint has replicas
         mock_get_endpoint_replicas_count.return_value = 1
         self.assertRaises(exception.NotAuthorized, call_delete_endpoint)
 
+    @mock.patch.object(cache, "get_endpoint_inventory")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_get_worker_service_rpc_for_specs"
+    )
+    @mock.patch.object(server.ConductorServerEndpoint, "get_endpoint")
+    def test_get_endpoint_instances_cached(
+            self, mock_get_endpoint, mock_get_worker_service_rpc_for_specs,
+            mock_get_endpoint_inventory
+    ):
+        instances = self.server.get_endpoint_instances(
+            mock.sentinel.context,
+            mock.sentinel.endpoint_id,
+            mock.sentinel.source_environment,
+            mock.sentinel.marker,
+            mock.sentinel.limit,
+            mock.sentinel.instance_name_pattern,
+            refresh=True,
+        )
+
+        self.assertEqual(
+            mock_get_endpoint_inventory.return_value, instances)
+        mock_get_endpoint_inventory.assert_called_once_with(
+            mock.sentinel.endpoint_id, "instances",
+            [mock.sentinel.source_environment, mock.sentinel.marker,
+             mock.sentinel.limit, mock.sentinel.instance_name_pattern],
+            mock.ANY, refresh=True)
+        mock_get_worker_service_rpc_for_specs.assert_not_called()
+
     @mock.patch.object(
         server.ConductorServerEndpoint, "_get_worker_service_rpc_for_specs"
     )
@@ -264,6 +378,362 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             instances, rpc_return_value.get_endpoint_instances.return_value
         )
 
+    @mock.patch.object(server.timeutils, "utcnow")
+    @mock.patch.object(db_api, "get_indexed_endpoint_instances")
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "get_endpoint_instances")
+    @mock.patch.object(server.ConductorServerEndpoint, "get_endpoint")
+    def test_search_endpoint_instances_indexed(
+            self, mock_get_endpoint, mock_get_endpoint_instances, mock_conf,
+            mock_get_endpoint_instances_sync,
+            mock_get_indexed_endpoint_instances, mock_utcnow
+    ):
+        mock_conf.endpoint_instances_sync_enabled = True
+        mock_conf.endpoint_instances_sync_max_age = 3600
+        synced_at = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        mock_utcnow.return_value = synced_at + datetime.timedelta(minutes=30)
+        mock_get_endpoint_instances_sync.return_value.synced_at = synced_at
+
+        result = self.server.search_endpoint_instances(
+            mock.sentinel.context, mock.sentinel.endpoint_id, {},
+            mock.sentinel.marker, mock.sentinel.limit,
+            mock.sentinel.instance_name_pattern)
+
+        self.assertEqual(
+            {"instances": mock_get_indexed_endpoint_instances.return_value,
+             "synced_at": synced_at},
+            result)
+        mock_get_endpoint.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.endpoint_id)
+        mock_get_indexed_endpoint_instances.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            marker=mock.sentinel.marker, limit=mock.sentinel.limit,
+            name_pattern=mock.sentinel.instance_name_pattern)
+        mock_get_endpoint_instances.assert_not_called()
+
+    @ddt.data(
+        # sync enabled, refresh, environment, minutes since last sync
+        (False, False, {}, 1),
+        (True, True, {}, 1),
+        (True, False, {"region": "mock_region"}, 1),
+        (True, False, {}, 120),
+        (True, False, {}, None),
+    )
+    @ddt.unpack
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_add_endpoint_instances_sync_trust")
+    @mock.patch.object(server.timeutils, "utcnow")
+    @mock.patch.object(db_api, "get_indexed_endpoint_instances")
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "get_endpoint_instances")
+    @mock.patch.object(server.ConductorServerEndpoint, "get_endpoint")
+    def test_search_endpoint_instances_live(
+            self, sync_enabled, refresh, source_environment, sync_age,
+            mock_get_endpoint, mock_get_endpoint_instances, mock_conf,
+            mock_get_endpoint_instances_sync,
+            mock_get_indexed_endpoint_instances, mock_utcnow,
+            mock_add_sync_trust
+    ):
+        mock_conf.endpoint_instances_sync_enabled = sync_enabled
+        mock_conf.endpoint_instances_sync_max_age = 3600
+        synced_at = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        if sync_age is None:
+            mock_get_endpoint_instances_sync.return_value = None
+        else:
+            mock_get_endpoint_instances_sync.return_value.synced_at = (
+                synced_at)
+            mock_utcnow.return_value = synced_at + datetime.timedelta(
+                minutes=sync_age)
+
+        result = self.server.search_endpoint_instances(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            source_environment, mock.sentinel.marker, mock.sentinel.limit,
+            mock.sentinel.instance_name_pattern, refresh=refresh)
+
+        self.assertEqual(
+            {"instances": mock_get_endpoint_instances.return_value,
+             "synced_at": None},
+            result)
+        mock_get_endpoint_instances.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            source_environment, mock.sentinel.marker, mock.sentinel.limit,
+            mock.sentinel.instance_name_pattern, refresh=refresh)
+        mock_get_indexed_endpoint_instances.assert_not_called()
+        if sync_enabled and not refresh and not source_environment and (
+                sync_age is None):
+            # NOTE: the endpoint had never been synced:
+            mock_add_sync_trust.assert_called_once_with(
+                mock.sentinel.context, mock.sentinel.endpoint_id)
+        else:
+            mock_add_sync_trust.assert_not_called()
+
+    @ddt.data(True, False)
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_delete_endpoint_instances_sync_trust")
+    @mock.patch.object(db_api, "set_endpoint_instances_sync_trust")
+    @mock.patch.object(server.keystone, "create_trust")
+    def test_add_endpoint_instances_sync_trust(
+            self, trust_set, mock_create_trust, mock_set_sync_trust,
+            mock_delete_sync_trust
+    ):
+        ctxt = mock.Mock(trust_id=None)
+
+        def _create_trust(ctxt):
+            ctxt.trust_id = mock.sentinel.trust_id
+        mock_create_trust.side_effect = _create_trust
+        mock_set_sync_trust.return_value = trust_set
+
+        self.server._add_endpoint_instances_sync_trust(
+            ctxt, mock.sentinel.endpoint_id)
+
+        mock_set_sync_trust.assert_called_once_with(
+            ctxt, mock.sentinel.endpoint_id, mock.sentinel.trust_id)
+        # NOTE: the request itself does not use the trust:
+        self.assertIsNone(ctxt.trust_id)
+        if trust_set:
+            mock_delete_sync_trust.assert_not_called()
+        else:
+            # NOTE: another request has set a trust already:
+            mock_delete_sync_trust.assert_called_once_with(
+                mock.sentinel.trust_id)
+
+    @mock.patch.object(db_api, "set_endpoint_instances_sync_trust")
+    @mock.patch.object(server.keystone, "create_trust")
+    def test_add_endpoint_instances_sync_trust_create_error(
+            self, mock_create_trust, mock_set_sync_trust
+    ):
+        ctxt = mock.Mock(trust_id=None)
+        mock_create_trust.side_effect = exception.CoriolisException()
+
+        with self.assertLogs('coriolis.conductor.rpc.server', level='WARN'):
+            self.server._add_endpoint_instances_sync_trust(
+                ctxt, mock.sentinel.endpoint_id)
+
+        mock_set_sync_trust.assert_not_called()
+
+    @mock.patch.object(server.keystone, "create_trust")
+    def test_add_endpoint_instances_sync_trust_request_trust(
+            self, mock_create_trust
+    ):
+        ctxt = mock.Mock(trust_id=mock.sentinel.trust_id)
+
+        self.server._add_endpoint_instances_sync_trust(
+            ctxt, mock.sentinel.endpoint_id)
+
+        mock_create_trust.assert_not_called()
+        self.assertEqual(mock.sentinel.trust_id, ctxt.trust_id)
+
+    @mock.patch.object(server.keystone, "delete_trust")
+    @mock.patch.object(server.context, "get_admin_context")
+    def test_delete_endpoint_instances_sync_trust(
+            self, mock_get_admin_context, mock_delete_trust
+    ):
+        mock_delete_trust.side_effect = exception.CoriolisException()
+
+        with self.assertLogs('coriolis.conductor.rpc.server', level='WARN'):
+            self.server._delete_endpoint_instances_sync_trust(
+                mock.sentinel.trust_id)
+
+        mock_get_admin_context.assert_called_once_with(
+            trust_id=mock.sentinel.trust_id)
+        mock_delete_trust.assert_called_once_with(
+            mock_get_admin_context.return_value)
+
+    @mock.patch.object(server.context, "get_admin_context")
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(server.timeutils, "utcnow")
+    @mock.patch.object(db_api, "complete_endpoint_instances_sync")
+    @mock.patch.object(db_api, "update_endpoint_instances")
+    @mock.patch.object(db_api, "claim_endpoint_instances_sync")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_get_worker_rpc_for_endpoint_instances"
+    )
+    def test_sync_endpoint_instances(
+            self, mock_get_worker_rpc, mock_conf, mock_claim,
+            mock_update_endpoint_instances, mock_complete, mock_utcnow,
+            mock_get_endpoint_instances_sync, mock_get_admin_context
+    ):
+        mock_conf.endpoint_instances_sync_interval = 900
+        mock_conf.endpoint_instances_sync_timeout = 3600
+        mock_conf.endpoint_instances_sync_page_size = 2
+        now = datetime.datetime(2026, 1, 1, 12, 0, 0)
+        mock_utcnow.return_value = now
+        endpoint = mock.Mock()
+        worker_rpc = mock_get_worker_rpc.return_value
+        pages = [
+            [{"id": "instance1"}, {"id": "instance2"}],
+            [{"id": "instance3"}]]
+        worker_rpc.get_endpoint_instances.side_effect = pages
+
+        result = self.server._sync_endpoint_instances(
+            mock.sentinel.context, endpoint)
+
+        self.assertTrue(result)
+        # NOTE: the instances are listed on behalf of the user:
+        trust_ctxt = mock_get_admin_context.return_value
+        mock_get_admin_context.assert_called_once_with(
+            trust_id=mock_get_endpoint_instances_sync.return_value.trust_id)
+        mock_claim.assert_called_once_with(
+            mock.sentinel.context, endpoint.id,
+            now - datetime.timedelta(seconds=900),
+            now - datetime.timedelta(seconds=3600))
+        worker_rpc.get_endpoint_instances.assert_has_calls([
+            mock.call(
+                trust_ctxt, endpoint.type,
+                endpoint.connection_info, {}, None, 2, None),
+            mock.call(
+                trust_ctxt, endpoint.type,
+                endpoint.connection_info, {}, "instance2", 2, None)])
+        mock_update_endpoint_instances.assert_has_calls([
+            mock.call(mock.sentinel.context, endpoint.id, pages[0], now),
+            mock.call(mock.sentinel.context, endpoint.id, pages[1], now)])
+        mock_complete.assert_called_once_with(
+            mock.sentinel.context, endpoint.id, now)
+
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(db_api, "complete_endpoint_instances_sync")
+    @mock.patch.object(db_api, "update_endpoint_instances")
+    @mock.patch.object(db_api, "claim_endpoint_instances_sync")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_get_worker_rpc_for_endpoint_instances"
+    )
+    def test_sync_endpoint_instances_unpaged(
+            self, mock_get_worker_rpc, mock_conf, mock_claim,
+            mock_update_endpoint_instances, mock_complete,
+            mock_get_endpoint_instances_sync
+    ):
+        mock_conf.endpoint_instances_sync_interval = 900
+        mock_conf.endpoint_instances_sync_timeout = 3600
+        mock_conf.endpoint_instances_sync_page_size = 2
+        worker_rpc = mock_get_worker_rpc.return_value
+        worker_rpc.get_endpoint_instances.return_value = [
+            {"id": "instance1"}, {"id": "instance2"}]
+
+        self.server._sync_endpoint_instances(
+            mock.sentinel.context, mock.Mock())
+
+        self.assertEqual(2, worker_rpc.get_endpoint_instances.call_count)
+        self.assertEqual(2, mock_update_endpoint_instances.call_count)
+        mock_complete.assert_called_once()
+
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(db_api, "complete_endpoint_instances_sync")
+    @mock.patch.object(db_api, "claim_endpoint_instances_sync")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_get_worker_rpc_for_endpoint_instances"
+    )
+    def test_sync_endpoint_instances_not_claimed(
+            self, mock_get_worker_rpc, mock_conf, mock_claim, mock_complete,
+            mock_get_endpoint_instances_sync
+    ):
+        mock_conf.endpoint_instances_sync_interval = 900
+        mock_conf.endpoint_instances_sync_timeout = 3600
+        mock_claim.return_value = False
+
+        result = self.server._sync_endpoint_instances(
+            mock.sentinel.context, mock.Mock())
+
+        self.assertTrue(result)
+        mock_get_worker_rpc.assert_not_called()
+        mock_complete.assert_not_called()
+
+    @ddt.data(None, mock.Mock(trust_id=None))
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(db_api, "claim_endpoint_instances_sync")
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_get_worker_rpc_for_endpoint_instances"
+    )
+    def test_sync_endpoint_instances_no_trust(
+            self, sync, mock_get_worker_rpc, mock_claim,
+            mock_get_endpoint_instances_sync
+    ):
+        mock_get_endpoint_instances_sync.return_value = sync
+
+        result = self.server._sync_endpoint_instances(
+            mock.sentinel.context, mock.Mock())
+
+        self.assertFalse(result)
+        mock_claim.assert_not_called()
+        mock_get_worker_rpc.assert_not_called()
+
+    @mock.patch.object(db_api, "get_endpoint_instances_sync")
+    @mock.patch.object(server.timeutils, "utcnow")
+    @mock.patch.object(db_api, "complete_endpoint_instances_sync")
+    @mock.patch.object(db_api, "claim_endpoint_instances_sync")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_get_worker_rpc_for_endpoint_instances"
+    )
+    def test_sync_endpoint_instances_error(
+            self, mock_get_worker_rpc, mock_conf, mock_claim, mock_complete,
+            mock_utcnow, mock_get_endpoint_instances_sync
+    ):
+        mock_conf.endpoint_instances_sync_interval = 900
+        mock_conf.endpoint_instances_sync_timeout = 3600
+        endpoint = mock.Mock()
+        worker_rpc = mock_get_worker_rpc.return_value
+        worker_rpc.get_endpoint_instances.side_effect = (
+            exception.CoriolisException("mock_error"))
+
+        self.assertRaises(
+            exception.CoriolisException,
+            self.server._sync_endpoint_instances,
+            mock.sentinel.context, endpoint)
+
+        mock_complete.assert_called_once_with(
+            mock.sentinel.context, endpoint.id, mock_utcnow.return_value,
+            error="mock_error")
+
+    @mock.patch.object(db_api, "get_endpoints")
+    @mock.patch.object(cfg.CONF, "conductor")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_sync_endpoint_instances")
+    def test_sync_stale_endpoints_instances(
+            self, mock_sync_endpoint_instances, mock_conf, mock_get_endpoints
+    ):
+        mock_conf.endpoint_instances_sync_enabled = True
+        endpoints = [mock.Mock(), mock.Mock(), mock.Mock()]
+        mock_get_endpoints.return_value = endpoints
+        mock_sync_endpoint_instances.side_effect = [
+            exception.CoriolisException("mock_error"), False, True]
+
+        with self.assertLogs(
+                'coriolis.conductor.rpc.server', level='DEBUG') as logs:
+            self.server.sync_stale_endpoints_instances(mock.sentinel.context)
+
+        mock_sync_endpoint_instances.assert_has_calls([
+            mock.call(mock.sentinel.context, endpoint)
+            for endpoint in endpoints])
+        # NOTE: the failed sync is warned about, while the endpoint without
+        # a trust is only reported as skipped:
+        self.assertEqual(
+            ["WARNING", "DEBUG"], [r.levelname for r in logs.records])
+        self.assertIn(str(endpoints[1].id), logs.records[1].getMessage())
+
+    @mock.patch.object(db_api, "get_endpoints")
+    @mock.patch.object(cfg.CONF, "conductor")
+    def test_sync_stale_endpoints_instances_disabled(
+            self, mock_conf, mock_get_endpoints
+    ):
+        mock_conf.endpoint_instances_sync_enabled = False
+
+        self.server.sync_stale_endpoints_instances(mock.sentinel.context)
+
+        mock_get_endpoints.assert_not_called()
+
     @mock.patch.object(
         server.ConductorServerEndpoint, "_get_worker_service_rpc_for_specs"
     )
@@ -681,54 +1151,159 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
     )
     @mock.patch.object(db_api, "set_task_status")
     @mock.patch.object(server.ConductorServerEndpoint, "_scheduler_client")
-    def test_get_worker_service_rpc_for_task(
+    def test_get_worker_service_rpcs_for_tasks(
             self,
             mock_scheduler_client,
             mock_set_task_status,
             mock_service_definition,
     ):
-        task_mock = mock.Mock()
-        service = self.server._get_worker_service_rpc_for_task(
+        task1 = mock.Mock(id="task1")
+        task2 = mock.Mock(id="task2")
+        get_worker_services = (
+            mock_scheduler_client.get_worker_services_for_tasks)
+        get_worker_services.return_value = {
+            "task1": mock.sentinel.service1, "task2": mock.sentinel.service2}
+
+        result = self.server._get_worker_service_rpcs_for_tasks(
             mock.sentinel.context,
-            task_mock,
+            [task1, task2],
             mock.sentinel.origin_endpoint,
             mock.sentinel.destination_endpoint,
         )
-        mock_scheduler_client.get_worker_service_for_task\
-            .assert_called_once_with(
-                mock.sentinel.context,
-                {"id": task_mock.id, "task_type": task_mock.task_type},
-                mock.sentinel.origin_endpoint,
-                mock.sentinel.destination_endpoint,
-                retry_count=5,
-                retry_period=2,
-                random_choice=True,
-            )
-        mock_service_definition.assert_called_once_with(
-            mock_scheduler_client.get_worker_service_for_task.return_value
+
+        get_worker_services.assert_called_once_with(
+            mock.sentinel.context,
+            [{"id": "task1", "task_type": task1.task_type},
+             {"id": "task2", "task_type": task2.task_type}],
+            mock.sentinel.origin_endpoint,
+            mock.sentinel.destination_endpoint,
+            retry_count=5,
+            retry_period=2,
+            raise_on_no_matches=False,
         )
-        self.assertEqual(service, mock_service_definition.return_value)
+        mock_service_definition.assert_has_calls([
+            mock.call(mock.sentinel.service1),
+            mock.call(mock.sentinel.service2)])
+        self.assertEqual(
+            {"task1": mock_service_definition.return_value,
+             "task2": mock_service_definition.return_value},
+            result)
         mock_set_task_status.assert_not_called()
 
-        # Handles exception
-        mock_scheduler_client.get_worker_service_for_task.side_effect = (
-            CoriolisTestException("test")
-        )
+        # marks only the unplaced tasks as unscheduleable
+        get_worker_services.return_value = {
+            "task1": mock.sentinel.service1, "task2": None}
         self.assertRaises(
-            CoriolisTestException,
-            self.server._get_worker_service_rpc_for_task,
+            exception.NoSuitableWorkerServiceError,
+            self.server._get_worker_service_rpcs_for_tasks,
             mock.sentinel.context,
-            task_mock,
+            [task1, task2],
             mock.sentinel.origin_endpoint,
             mock.sentinel.destination_endpoint,
         )
         mock_set_task_status.assert_called_once_with(
             mock.sentinel.context,
-            task_mock.id,
+            "task2",
             constants.TASK_STATUS_FAILED_TO_SCHEDULE,
-            exception_details="test",
+            exception_details=mock.ANY,
         )
 
+        # handles scheduler exceptions
+        mock_set_task_status.reset_mock()
+        get_worker_services.side_effect = CoriolisTestException("test")
+        self.assertRaises(
+            CoriolisTestException,
+            self.server._get_worker_service_rpcs_for_tasks,
+            mock.sentinel.context,
+            [task1, task2],
+            mock.sentinel.origin_endpoint,
+            mock.sentinel.destination_endpoint,
+        )
+        mock_set_task_status.assert_has_calls([
+            mock.call(
+                mock.sentinel.context, "task1",
+                constants.TASK_STATUS_FAILED_TO_SCHEDULE,
+                exception_details="test"),
+            mock.call(
+                mock.sentinel.context, "task2",
+                constants.TASK_STATUS_FAILED_TO_SCHEDULE,
+                exception_details="test")])
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_cancel_tasks_execution")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_get_worker_service_rpcs_for_tasks")
+    def test_start_tasks_on_workers(
+            self, mock_get_worker_service_rpcs_for_tasks,
+            mock_cancel_tasks_execution):
+        task1 = mock.Mock(id="task1")
+        task2 = mock.Mock(id="task2")
+        worker_rpc = mock.Mock()
+        mock_get_worker_service_rpcs_for_tasks.return_value = {
+            "task1": worker_rpc, "task2": worker_rpc}
+        task_infos = {
+            "task1": mock.sentinel.task_info1,
+            "task2": mock.sentinel.task_info2}
+
+        result = self.server._start_tasks_on_workers(
+            mock.sentinel.context, mock.sentinel.execution, [task1, task2],
+            task_infos, mock.sentinel.origin, mock.sentinel.destination,
+            mock.sentinel.origin_endpoint, mock.sentinel.destination_endpoint)
+
+        self.assertEqual(["task1", "task2"], result)
+        mock_get_worker_service_rpcs_for_tasks.assert_called_once_with(
+            mock.sentinel.context, [task1, task2],
+            mock.sentinel.origin_endpoint, mock.sentinel.destination_endpoint,
+            retry_count=5, retry_period=2)
+        worker_rpc.begin_task.assert_has_calls([
+            mock.call(
+                mock.sentinel.context, task_id="task1",
+                task_type=task1.task_type, origin=mock.sentinel.origin,
+                destination=mock.sentinel.destination,
+                instance=task1.instance, task_info=mock.sentinel.task_info1),
+            mock.call(
+                mock.sentinel.context, task_id="task2",
+                task_type=task2.task_type, origin=mock.sentinel.origin,
+                destination=mock.sentinel.destination,
+                instance=task2.instance, task_info=mock.sentinel.task_info2)])
+        mock_cancel_tasks_execution.assert_not_called()
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_cancel_tasks_execution")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_get_worker_service_rpcs_for_tasks")
+    def test_start_tasks_on_workers_no_tasks(
+            self, mock_get_worker_service_rpcs_for_tasks,
+            mock_cancel_tasks_execution):
+        result = self.server._start_tasks_on_workers(
+            mock.sentinel.context, mock.sentinel.execution, [], {},
+            mock.sentinel.origin, mock.sentinel.destination,
+            mock.sentinel.origin_endpoint, mock.sentinel.destination_endpoint)
+
+        self.assertEqual([], result)
+        mock_get_worker_service_rpcs_for_tasks.assert_not_called()
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_cancel_tasks_execution")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_get_worker_service_rpcs_for_tasks")
+    def test_start_tasks_on_workers_error(
+            self, mock_get_worker_service_rpcs_for_tasks,
+            mock_cancel_tasks_execution):
+        mock_get_worker_service_rpcs_for_tasks.side_effect = (
+            CoriolisTestException())
+
+        self.assertRaises(
+            CoriolisTestException,
+            self.server._start_tasks_on_workers,
+            mock.sentinel.context, mock.sentinel.execution,
+            [mock.Mock(id="task1")], {"task1": {}}, mock.sentinel.origin,
+            mock.sentinel.destination, mock.sentinel.origin_endpoint,
+            mock.sentinel.destination_endpoint)
+
+        mock_cancel_tasks_execution.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.execution, requery=True)
+
     @mock.patch.object(server.ConductorServerEndpoint, "_create_task")
     @mock.patch.object(
         server.ConductorServerEndpoint, "_check_replica_running_executions"
@@ -1042,6 +1617,40 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         self.assertEqual(
             result, mock_get_replica_tasks_execution.return_value)
 
+    @mock.patch.object(db_api, 'get_tasks_execution_status')
+    def test_get_replica_tasks_execution_status(
+            self, mock_get_tasks_execution_status):
+        result = self.server.get_replica_tasks_execution_status(
+            mock.sentinel.context, mock.sentinel.replica_id,
+            mock.sentinel.execution_id, include_events=True)
+
+        self.assertEqual(mock_get_tasks_execution_status.return_value, result)
+        mock_get_tasks_execution_status.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.replica_id,
+            execution_id=mock.sentinel.execution_id, include_events=True)
+
+        mock_get_tasks_execution_status.return_value = None
+        self.assertRaises(
+            exception.NotFound,
+            self.server.get_replica_tasks_execution_status,
+            mock.sentinel.context, mock.sentinel.replica_id,
+            mock.sentinel.execution_id)
+
+    @mock.patch.object(db_api, 'get_migration_status')
+    def test_get_migration_status(self, mock_get_migration_status):
+        result = self.server.get_migration_status(
+            mock.sentinel.context, mock.sentinel.migration_id)
+
+        self.assertEqual(mock_get_migration_status.return_value, result)
+        mock_get_migration_status.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.migration_id,
+            include_events=False)
+
+        mock_get_migration_status.return_value = None
+        self.assertRaises(
+            exception.NotFound, self.server.get_migration_status,
+            mock.sentinel.context, mock.sentinel.migration_id)
+
     @mock.patch.object(
         server.ConductorServerEndpoint,
         '_get_replica_tasks_execution'
@@ -1907,6 +2516,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.context,
             execution,
             constants.EXECUTION_STATUS_CANCELLING,
+            expected_status=constants.EXECUTION_STATUS_RUNNING,
         )
 
         mock_advance_execution_state.reset_mock()
@@ -1957,8 +2567,22 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             execution.tasks[0].id,
             constants.TASK_STATUS_FAILED_TO_CANCEL,
             exception_details=mock.ANY,
+            expected_statuses=[constants.TASK_STATUS_CANCELLING],
         )
 
+        # tasks which were concurrently transitioned are left as they are
+        mock_set_task_status.reset_mock()
+        mock_worker_client.return_value.cancel_task.reset_mock()
+        mock_set_task_status.return_value = False
+        call_cancel_tasks_execution()
+        mock_set_task_status.assert_called_once_with(
+            mock.sentinel.context,
+            execution.tasks[0].id,
+            constants.TASK_STATUS_CANCELLING,
+            expected_statuses=[constants.TASK_STATUS_RUNNING],
+        )
+        mock_worker_client.return_value.cancel_task.assert_not_called()
+
     @mock.patch.object(db_api, 'get_tasks_execution')
     @mock.patch.object(
         server.ConductorServerEndpoint,
@@ -2021,6 +2645,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             kwargs = {'exception_details': mock.ANY}
             if hides_exception_details:
                 kwargs = {}
+            kwargs['expected_statuses'] = [execution_task.status]
             mock_set_task_status.assert_has_calls([
                 mock.call(
                     mock.sentinel.context,
@@ -2197,18 +2822,27 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
                 mock.sentinel.task_1,
                 constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
                 exception_details=mock.ANY,
+                expected_statuses=[
+                    constants.TASK_STATUS_SCHEDULED,
+                    constants.TASK_STATUS_ON_ERROR_ONLY],
             ),
             mock.call(
                 mock.sentinel.context,
                 mock.sentinel.task_2,
                 constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
                 exception_details=mock.ANY,
+                expected_statuses=[
+                    constants.TASK_STATUS_SCHEDULED,
+                    constants.TASK_STATUS_ON_ERROR_ONLY],
             ),
-        ])
+        # NOTE: the results of the calls are checked in between them:
+        ], any_order=True)
+        self.assertEqual(2, mock_set_task_status.call_count)
         mock_set_tasks_execution_status.assert_called_once_with(
             mock.sentinel.context,
             execution,
             constants.EXECUTION_STATUS_DEADLOCKED,
+            expected_status=execution.status,
         )
         self.assertEqual(
             determined_state,
@@ -2245,21 +2879,125 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.task_1,
             constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
             exception_details=mock.ANY,
+            expected_statuses=[
+                constants.TASK_STATUS_SCHEDULED,
+                constants.TASK_STATUS_ON_ERROR_ONLY],
         )
         mock_set_tasks_execution_status.assert_called_once_with(
             mock.sentinel.context,
             execution,
             constants.EXECUTION_STATUS_DEADLOCKED,
+            expected_status=execution.status,
         )
         self.assertEqual(
             determined_state,
             constants.EXECUTION_STATUS_DEADLOCKED
         )
 
-    @mock.patch.object(db_api, 'get_tasks_execution')
+    @mock.patch.object(
+        server.ConductorServerEndpoint, '_set_tasks_execution_status')
+    @mock.patch.object(server.ConductorServerEndpoint, '_get_execution_status')
+    @mock.patch.object(db_api, 'set_task_status')
+    def test_check_clean_execution_deadlock_instance(
+            self, mock_set_task_status, mock_get_execution_status,
+            mock_set_tasks_execution_status):
+        execution = mock.Mock(
+            id=mock.sentinel.execution_id,
+            status=constants.EXECUTION_STATUS_RUNNING,
+            tasks=[
+                mock.Mock(id="task1", instance="instance1"),
+                mock.Mock(id="task2", instance="instance2")])
+        # NOTE: the tasks of the other instance are not taken into account:
+        task_statuses = {
+            "task1": constants.TASK_STATUS_SCHEDULED,
+            "task2": constants.TASK_STATUS_RUNNING}
+        mock_get_execution_status.return_value = (
+            constants.EXECUTION_STATUS_RUNNING)
+
+        determined_state = self.server._check_clean_execution_deadlock(
+            mock.sentinel.context, execution, task_statuses=task_statuses,
+            requery=False, instance="instance1")
+
+        mock_set_task_status.assert_called_once_with(
+            mock.sentinel.context, "task1",
+            constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
+            exception_details=mock.ANY,
+            expected_statuses=[
+                constants.TASK_STATUS_SCHEDULED,
+                constants.TASK_STATUS_ON_ERROR_ONLY])
+        mock_get_execution_status.assert_called_once_with(
+            mock.sentinel.context, execution, requery=True,
+            instance="instance1")
+        mock_set_tasks_execution_status.assert_not_called()
+        self.assertEqual(
+            constants.EXECUTION_STATUS_RUNNING, determined_state)
+
+        # the execution is deadlocked once no other tasks are active:
+        mock_get_execution_status.return_value = (
+            constants.EXECUTION_STATUS_DEADLOCKED)
+        determined_state = self.server._check_clean_execution_deadlock(
+            mock.sentinel.context, execution, task_statuses=task_statuses,
+            requery=False, instance="instance1")
+
+        mock_set_tasks_execution_status.assert_called_once_with(
+            mock.sentinel.context, execution,
+            constants.EXECUTION_STATUS_DEADLOCKED,
+            expected_status=constants.EXECUTION_STATUS_RUNNING)
+        self.assertEqual(
+            constants.EXECUTION_STATUS_DEADLOCKED, determined_state)
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, '_set_tasks_execution_status')
+    @mock.patch.object(db_api, 'set_task_status')
+    def test_check_clean_execution_deadlock_task_changed(
+            self, mock_set_task_status, mock_set_tasks_execution_status):
+        execution = mock.Mock(id=mock.sentinel.execution_id)
+        mock_set_task_status.return_value = False
+
+        determined_state = self.server._check_clean_execution_deadlock(
+            mock.sentinel.context, execution,
+            task_statuses={"task1": constants.TASK_STATUS_SCHEDULED},
+            requery=False)
+
+        # NOTE: the task was concurrently started:
+        mock_set_task_status.assert_called_once()
+        mock_set_tasks_execution_status.assert_not_called()
+        self.assertEqual(
+            constants.EXECUTION_STATUS_RUNNING, determined_state)
+
+    @ddt.data(
+        ([constants.TASK_STATUS_SCHEDULED, constants.TASK_STATUS_COMPLETED],
+         constants.EXECUTION_STATUS_RUNNING),
+        ([constants.TASK_STATUS_SCHEDULED, constants.TASK_STATUS_RUNNING],
+         constants.EXECUTION_STATUS_RUNNING),
+        ([constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
+          constants.TASK_STATUS_COMPLETED],
+         constants.EXECUTION_STATUS_DEADLOCKED),
+        # NOTE: a deadlocked instance does not affect the running ones:
+        ([constants.TASK_STATUS_CANCELED_FROM_DEADLOCK,
+          constants.TASK_STATUS_RUNNING],
+         constants.EXECUTION_STATUS_RUNNING),
+        ([constants.TASK_STATUS_CANCELED, constants.TASK_STATUS_RUNNING],
+         constants.EXECUTION_STATUS_CANCELLING),
+        ([constants.TASK_STATUS_COMPLETED],
+         constants.EXECUTION_STATUS_COMPLETED),
+    )
+    @ddt.unpack
+    def test_get_execution_status_instance(self, tasks, expected_status):
+        execution = mock.Mock(
+            id=mock.sentinel.execution_id,
+            status=constants.EXECUTION_STATUS_RUNNING,
+            tasks=[mock.Mock(status=status) for status in tasks])
+
+        status = self.server._get_execution_status(
+            mock.sentinel.context, execution, instance=mock.sentinel.instance)
+
+        self.assertEqual(expected_status, status)
+
+    @mock.patch.object(db_api, 'get_tasks_execution_status_counts')
     def test_get_execution_status_no_config(
             self,
-            mock_get_tasks_execution,
+            mock_get_tasks_execution_status_counts,
     ):
         execution = mock.Mock(
             id=mock.sentinel.execution_id,
@@ -2274,9 +3012,10 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
                 requery=requery,
             )
 
-        # task is requeried
+        # task status counts are requeried
+        mock_get_tasks_execution_status_counts.return_value = {}
         status = call_get_execution_status(requery=True)
-        mock_get_tasks_execution.assert_called_once_with(
+        mock_get_tasks_execution_status_counts.assert_called_once_with(
             mock.sentinel.context,
             mock.sentinel.execution_id,
         )
@@ -2324,11 +3063,11 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
     )
     @mock.patch.object(
         server.ConductorServerEndpoint,
-        '_get_worker_service_rpc_for_task'
+        '_get_worker_service_rpcs_for_tasks'
     )
     @mock.patch.object(db_api, 'set_task_status')
     @mock.patch.object(db_api, 'get_endpoint')
-    @mock.patch.object(db_api, 'get_action')
+    @mock.patch.object(db_api, 'get_transfer_action_info_for_instance')
     @mock.patch.object(
         server.ConductorServerEndpoint,
         '_get_task_destination'
@@ -2348,10 +3087,10 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock_check_clean_execution_deadlock,
             mock_get_task_origin,
             mock_get_task_destination,
-            mock_get_action,
+            mock_get_transfer_action_info,
             mock_get_endpoint,
             mock_set_task_status,
-            mock_get_worker_service_rpc_for_task,
+            mock_get_worker_service_rpcs_for_tasks,
             mock_cancel_tasks_execution,
             mock_get_execution_status,
             mock_set_tasks_execution_status,
@@ -2372,6 +3111,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock_get_tasks_execution.return_value,
             task_statuses=None,
             requery=False,
+            instance=None,
         )
         self.assertEqual(started_tasks, [])
 
@@ -2415,11 +3155,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.context,
             execution.action
         )
-        mock_get_action.assert_called_once_with(
-            mock.sentinel.context,
-            execution.action_id,
-            include_task_info=True,
-        )
+        mock_get_transfer_action_info.assert_not_called()
         mock_get_endpoint.assert_has_calls([
             mock.call(
                 mock.sentinel.context,
@@ -2434,16 +3170,19 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.context,
             execution,
             task_statuses={mock.sentinel.task_1: constants.TASK_STATUS_ERROR},
+            instance=None,
         )
         mock_get_execution_status.assert_called_once_with(
             mock.sentinel.context,
             execution,
             requery=True,
+            instance=None,
         )
         mock_set_tasks_execution_status.assert_called_once_with(
             mock.sentinel.context,
             execution,
             mock_get_execution_status.return_value,
+            expected_status=constants.EXECUTION_STATUS_RUNNING,
         )
         self.assertEqual(started_tasks, [])
 
@@ -2473,34 +3212,39 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         )
         execution.tasks = [task]
         task_info = {
-            mock.sentinel.instance: {
-                'test': 'info',
-            },
+            'test': 'info',
         }
-        mock_get_action.return_value = mock.Mock(
-            info=task_info
-        )
+        mock_get_transfer_action_info.return_value = task_info
+        worker_rpc = mock.Mock()
+        mock_get_worker_service_rpcs_for_tasks.return_value = {
+            mock.sentinel.task_1: worker_rpc}
         started_tasks = call_advance_execution_state()
-        mock_get_worker_service_rpc_for_task.assert_called_once_with(
+        mock_get_worker_service_rpcs_for_tasks.assert_called_once_with(
             mock.sentinel.context,
-            task,
+            [task],
             mock.ANY,
             mock.ANY,
+            retry_count=5,
+            retry_period=2,
+        )
+        worker_rpc.begin_task.assert_called_once_with(
+            mock.sentinel.context,
+            task_id=mock.sentinel.task_1,
+            task_type=mock.sentinel.task_type,
+            origin=mock_get_task_origin.return_value,
+            destination=mock_get_task_destination.return_value,
+            instance=mock.sentinel.instance,
+            task_info=task_info,
+        )
+        mock_get_transfer_action_info.assert_called_once_with(
+            mock.sentinel.context,
+            execution.action_id,
+            mock.sentinel.instance,
         )
-        mock_get_worker_service_rpc_for_task.return_value\
-            .begin_task.assert_called_once_with(
-                mock.sentinel.context,
-                task_id=mock.sentinel.task_1,
-                task_type=mock.sentinel.task_type,
-                origin=mock_get_task_origin.return_value,
-                destination=mock_get_task_destination.return_value,
-                instance=mock.sentinel.instance,
-                task_info=task_info[mock.sentinel.instance],
-            )
         self.assertEqual(started_tasks, [task.id])
 
         # handles worker service rpc error
-        mock_get_worker_service_rpc_for_task.side_effect = (
+        mock_get_worker_service_rpcs_for_tasks.side_effect = (
             CoriolisTestException())
         self.assertRaises(
             CoriolisTestException,
@@ -2526,11 +3270,11 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
     )
     @mock.patch.object(
         server.ConductorServerEndpoint,
-        '_get_worker_service_rpc_for_task'
+        '_get_worker_service_rpcs_for_tasks'
     )
     @mock.patch.object(db_api, 'set_task_status')
     @mock.patch.object(db_api, 'get_endpoint')
-    @mock.patch.object(db_api, 'get_action')
+    @mock.patch.object(db_api, 'get_transfer_action_info_for_instance')
     @mock.patch.object(
         server.ConductorServerEndpoint,
         '_get_task_destination'
@@ -2552,14 +3296,17 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock_check_clean_execution_deadlock,
             mock_get_task_origin,
             mock_get_task_destination,
-            mock_get_action,
+            mock_get_transfer_action_info,
             mock_get_endpoint,
             mock_set_task_status,
-            mock_get_worker_service_rpc_for_task,
+            mock_get_worker_service_rpcs_for_tasks,
             mock_cancel_tasks_execution,
             mock_get_execution_status,
             mock_set_tasks_execution_status,
             config):
+        mock_get_worker_service_rpcs_for_tasks.side_effect = (
+            lambda ctxt, tasks, *args, **kwargs: {
+                task.id: mock.Mock() for task in tasks})
         tasks = config.get('tasks', [])
         execution = mock.Mock(
             status=constants.EXECUTION_STATUS_RUNNING,
@@ -2587,6 +3334,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             kwargs = {'exception_details': mock.ANY}
             if task['expected_status'] == constants.TASK_STATUS_PENDING:
                 kwargs = {}
+            kwargs['expected_statuses'] = [constants.TASK_STATUS_SCHEDULED]
             mock_set_task_status.assert_has_calls([
                 mock.call(
                     mock.sentinel.context,
@@ -2603,6 +3351,59 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
                 constants.TASK_STATUS_PENDING]
         )
 
+    @mock.patch.object(
+        server.ConductorServerEndpoint, '_set_tasks_execution_status')
+    @mock.patch.object(server.ConductorServerEndpoint, '_get_execution_status')
+    @mock.patch.object(
+        server.ConductorServerEndpoint, '_get_worker_service_rpcs_for_tasks')
+    @mock.patch.object(db_api, 'set_task_status')
+    @mock.patch.object(db_api, 'get_endpoint')
+    @mock.patch.object(db_api, 'get_transfer_action_info_for_instance')
+    @mock.patch.object(server.ConductorServerEndpoint, '_get_task_destination')
+    @mock.patch.object(server.ConductorServerEndpoint, '_get_task_origin')
+    @mock.patch.object(
+        server.ConductorServerEndpoint, '_check_clean_execution_deadlock')
+    def test_advance_execution_state_changed_tasks(
+            self, mock_check_clean_execution_deadlock, mock_get_task_origin,
+            mock_get_task_destination, mock_get_transfer_action_info,
+            mock_get_endpoint, mock_set_task_status,
+            mock_get_worker_service_rpcs_for_tasks,
+            mock_get_execution_status, mock_set_tasks_execution_status):
+        mock_get_worker_service_rpcs_for_tasks.side_effect = (
+            lambda ctxt, tasks, *args, **kwargs: {
+                task.id: mock.Mock() for task in tasks})
+
+        def _get_task(index, task_id, status, depends_on=None):
+            return mock.Mock(
+                index=index, id=task_id, status=status, on_error=False,
+                instance="instance1", depends_on=depends_on or [])
+
+        execution = mock.Mock(
+            id="execution1", status=constants.EXECUTION_STATUS_RUNNING,
+            tasks=[
+                _get_task(0, "task1", constants.TASK_STATUS_ERROR),
+                _get_task(
+                    1, "task2", constants.TASK_STATUS_SCHEDULED, ["task1"]),
+                _get_task(
+                    2, "task3", constants.TASK_STATUS_SCHEDULED, ["task2"]),
+                _get_task(3, "task4", constants.TASK_STATUS_SCHEDULED)])
+
+        started_tasks = self.server._advance_execution_state(
+            mock.sentinel.context, execution, requery=False,
+            instance="instance1", changed_task_ids=["task1"])
+
+        # the children of the unscheduled 'task2' are processed too, while
+        # the unrelated 'task4' is left as is:
+        self.assertEqual([], started_tasks)
+        self.assertEqual(
+            [mock.call(
+                mock.sentinel.context, task_id,
+                constants.TASK_STATUS_UNSCHEDULED,
+                exception_details=mock.ANY,
+                expected_statuses=[constants.TASK_STATUS_SCHEDULED])
+             for task_id in ["task2", "task3"]],
+            mock_set_task_status.call_args_list)
+
     @mock.patch.object(
         server.ConductorServerEndpoint,
         '_minion_manager_client'
@@ -2897,7 +3698,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
     @mock.patch.object(db_api, "get_task")
     @mock.patch.object(db_api, "set_task_status")
     @mock.patch.object(db_api, "get_tasks_execution")
-    @mock.patch.object(db_api, "get_action")
+    @mock.patch.object(db_api, "get_transfer_action_info_for_instance")
     @mock.patch.object(db_api, "update_transfer_action_info_for_instance")
     @mock.patch.object(lockutils, "lock")
     @ddt.file_data("data/task_completed_config.yml")
@@ -2906,7 +3707,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             self,
             mock_lock,
             mock_update_transfer_action_info,
-            mock_get_action,
+            mock_get_transfer_action_info,
             mock_get_tasks_execution,
             mock_set_task_status,
             mock_get_task,
@@ -2942,25 +3743,22 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock_set_task_status.assert_not_called()
             return
         else:
-            kwargs = {'exception_details': mock.ANY}
+            exception_details = mock.ANY
             if has_exception_details is False:
-                kwargs = {}
+                exception_details = None
             mock_set_task_status.assert_called_once_with(
                 mock.sentinel.context,
                 mock.sentinel.task_id,
                 expected_status,
-                **kwargs,
+                exception_details=exception_details,
+                expected_statuses=[task_status],
             )
 
         mock_get_tasks_execution.assert_called_with(
             mock.sentinel.context,
             mock.sentinel.execution_id,
         )
-        mock_get_action.assert_called_once_with(
-            mock.sentinel.context,
-            mock.sentinel.action_id,
-            include_task_info=True,
-        )
+        mock_get_transfer_action_info.assert_not_called()
         mock_update_transfer_action_info.assert_called_once_with(
             mock.sentinel.context,
             mock.sentinel.action_id,
@@ -2968,7 +3766,6 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.sentinel.task_result,
         )
 
-        mock_get_action.reset_mock()
         mock_update_transfer_action_info.reset_mock()
 
         # no task result
@@ -2978,8 +3775,128 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             None
         )
         mock_update_transfer_action_info.assert_not_called()
-        self.assertEqual(2, mock_get_action.call_count)
+        mock_get_transfer_action_info.assert_called_once_with(
+            mock.sentinel.context,
+            mock.sentinel.action_id,
+            mock.sentinel.instance,
+        )
+
+    @mock.patch.object(lockutils, "lock")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_advance_execution_state")
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_handle_post_task_actions")
+    @mock.patch.object(db_api, "get_tasks_execution")
+    @mock.patch.object(db_api, "update_transfer_action_info_for_instance")
+    @mock.patch.object(db_api, "set_task_status")
+    @mock.patch.object(db_api, "get_task")
+    def test_task_completed_status_conflict(
+            self, mock_get_task, mock_set_task_status,
+            mock_update_transfer_action_info, mock_get_tasks_execution,
+            mock_handle_post_task_actions, mock_advance_execution_state,
+            mock_lock):
+        running_task = mock.Mock(
+            status=constants.TASK_STATUS_RUNNING,
+            instance=mock.sentinel.instance)
+        cancelling_task = mock.Mock(
+            status=constants.TASK_STATUS_CANCELLING,
+            instance=mock.sentinel.instance)
+        # NOTE: the first task is returned to the lock decorator:
+        mock_get_task.side_effect = [
+            running_task, running_task, cancelling_task]
+        mock_set_task_status.side_effect = [False, True]
+
+        self.server.task_completed(
+            mock.sentinel.context, mock.sentinel.task_id,
+            mock.sentinel.task_result)
+
+        mock_set_task_status.assert_has_calls([
+            mock.call(
+                mock.sentinel.context, mock.sentinel.task_id,
+                constants.TASK_STATUS_COMPLETED, exception_details=None,
+                expected_statuses=[constants.TASK_STATUS_RUNNING]),
+            mock.call(
+                mock.sentinel.context, mock.sentinel.task_id,
+                constants.TASK_STATUS_CANCELED_AFTER_COMPLETION,
+                exception_details=mock.ANY,
+                expected_statuses=[constants.TASK_STATUS_CANCELLING])])
+        mock_advance_execution_state.assert_called_once_with(
+            mock.sentinel.context, mock_get_tasks_execution.return_value,
+            instance=mock.sentinel.instance, requery=False)
+
+    @mock.patch.object(db_api, "get_tasks_execution_instances")
+    @mock.patch.object(lockutils, "lock")
+    def test_execution_lock(
+            self, mock_lock, mock_get_tasks_execution_instances):
+        mock_get_tasks_execution_instances.return_value = [
+            "instance1", "instance2"]
+
+        with server.execution_lock(
+                mock.sentinel.context, mock.sentinel.execution_id):
+            pass
+
+        mock_get_tasks_execution_instances.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.execution_id)
+        self.assertEqual([
+            mock.call(
+                constants.EXECUTION_LOCK_NAME_FORMAT % (
+                    mock.sentinel.execution_id), external=True),
+            mock.call(
+                server._get_execution_instance_lock_name(
+                    mock.sentinel.execution_id, "instance1"),
+                external=True),
+            mock.call(
+                server._get_execution_instance_lock_name(
+                    mock.sentinel.execution_id, "instance2"),
+                external=True)],
+            mock_lock.call_args_list)
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_get_replica_tasks_execution")
+    @mock.patch.object(lockutils, "lock")
+    def test_get_replica_tasks_execution_not_locked(
+            self, mock_lock, mock_get_replica_tasks_execution):
+        result = self.server.get_replica_tasks_execution(
+            mock.sentinel.context, mock.sentinel.replica_id,
+            mock.sentinel.execution_id,
+            include_task_info=mock.sentinel.include_task_info)
+
+        self.assertEqual(
+            mock_get_replica_tasks_execution.return_value, result)
+        mock_get_replica_tasks_execution.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.replica_id,
+            mock.sentinel.execution_id,
+            include_task_info=mock.sentinel.include_task_info, to_dict=True)
+        mock_lock.assert_not_called()
+
+    def test_get_execution_instance_lock_name(self):
+        result = server._get_execution_instance_lock_name(
+            "execution_id", "folder/instance")
+
+        self.assertTrue(result.startswith("execution-execution_id-instance-"))
+        self.assertNotIn("/", result)
 
+    @mock.patch.object(
+        server.ConductorServerEndpoint,
+        "_deallocate_minion_machines_for_action")
+    @mock.patch.object(db_api, "set_execution_status")
+    def test_set_tasks_execution_status_concurrently_changed(
+            self, mock_set_execution_status, mock_deallocate_minions):
+        mock_set_execution_status.return_value = None
+        execution = mock.Mock(status=constants.EXECUTION_STATUS_RUNNING)
+
+        self.server._set_tasks_execution_status(
+            mock.sentinel.context, execution,
+            constants.EXECUTION_STATUS_COMPLETED,
+            expected_status=constants.EXECUTION_STATUS_RUNNING)
+
+        mock_set_execution_status.assert_called_once_with(
+            mock.sentinel.context, execution.id,
+            constants.EXECUTION_STATUS_COMPLETED,
+            expected_statuses=[constants.EXECUTION_STATUS_RUNNING])
+        mock_deallocate_minions.assert_not_called()
+
+    @mock.patch.object(db_api, "get_tasks_execution_instances")
     @mock.patch.object(
         server.ConductorServerEndpoint,
         "_check_delete_reservation_for_transfer"
@@ -3014,6 +3931,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock_set_tasks_execution_status,
             mock_cancel_tasks_execution,
             mock_check_delete_reservation_for_transfer,
+            mock_get_tasks_execution_instances,
             config,
             expected_status,
     ):
@@ -3047,6 +3965,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock.ANY,
         )
 
+    @mock.patch.object(db_api, "get_tasks_execution_instances")
     @mock.patch.object(cfg.CONF, "conductor")
     @mock.patch.object(
         server.ConductorServerEndpoint,
@@ -3081,6 +4000,7 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             mock_cancel_tasks_execution,
             mock_check_delete_reservation_for_transfer,
             mock_conf_conductor,
+            mock_get_tasks_execution_instances,
     ):
         execution = mock.Mock(
             type=constants.EXECUTION_TYPE_REPLICA_UPDATE,
@@ -3141,3 +4061,153 @@ class ConductorServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mock_check_delete_reservation_for_transfer.assert_called_once_with(
             mock_get_action.return_value,
         )
+
+    @mock.patch.object(db_api, "add_task_events_batch")
+    @mock.patch.object(db_api, "get_task")
+    @mock.patch.object(lockutils, "lock")
+    def test_add_task_events_batch(
+            self, mock_lock, mock_get_task, mock_add_task_events_batch):
+        tasks = {
+            "task1": mock.Mock(status=constants.TASK_STATUS_RUNNING),
+            "task2": mock.Mock(status=constants.TASK_STATUS_COMPLETED),
+        }
+        mock_get_task.side_effect = lambda ctxt, task_id: tasks[task_id]
+        task_events = [
+            {"task_id": "task2",
+             "type": constants.TASK_EVENTS_BATCH_ITEM_EVENT},
+            {"task_id": "task1",
+             "type": constants.TASK_EVENTS_BATCH_ITEM_EVENT},
+            {"task_id": "task1",
+             "type": constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE},
+            {"task_id": "task2",
+             "type": constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE},
+        ]
+
+        self.server.add_task_events_batch(
+            mock.sentinel.context, task_events)
+
+        self.assertEqual(
+            [mock.call(constants.TASK_LOCK_NAME_FORMAT % "task1",
+                       external=True),
+             mock.call(constants.TASK_LOCK_NAME_FORMAT % "task2",
+                       external=True)],
+            mock_lock.call_args_list)
+        mock_add_task_events_batch.assert_called_once_with(
+            mock.sentinel.context, task_events[1:])
+
+    @mock.patch.object(db_api, "add_task_events_batch")
+    @mock.patch.object(db_api, "get_task")
+    @mock.patch.object(lockutils, "lock")
+    def test_add_task_events_batch_all_refused(
+            self, mock_lock, mock_get_task, mock_add_task_events_batch):
+        mock_get_task.return_value = None
+        task_events = [
+            {"task_id": "task1",
+             "type": constants.TASK_EVENTS_BATCH_ITEM_EVENT}]
+
+        self.server.add_task_events_batch(
+            mock.sentinel.context, task_events)
+
+        mock_add_task_events_batch.assert_not_called()
+
+    @mock.patch.object(
+        server.ConductorServerEndpoint, "_invalidate_scheduler_cache")
+    @mock.patch.object(rpc_worker_client, "WorkerClient")
+    @mock.patch.object(db_api, "update_service")
+    @mock.patch.object(db_api, "get_service")
+    def test_refresh_service_status(
+            self, mock_get_service, mock_update_service, mock_worker_client,
+            mock_invalidate_scheduler_cache):
+        service = mock.Mock(
+            specs={"cpus": 2, "capacity": mock.sentinel.capacity})
+        mock_get_service.return_value = service
+        status = {
+            "providers": mock.sentinel.providers,
+            "specs": {"cpus": 4}}
+        worker_rpc = mock_worker_client.return_value
+        worker_rpc.get_service_status.return_value = status
+
+        result = testutils.get_wrapped_function(
+            self.server.refresh_service_status)(
+                self.server, mock.sentinel.context, mock.sentinel.service_id)
+
+        self.assertEqual(mock_get_service.return_value, result)
+        mock_worker_client.assert_called_once_with(host=service.host)
+        worker_rpc.get_service_status.assert_called_once_with(
+            mock.sentinel.context)
+        mock_update_service.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.service_id,
+            {"providers": mock.sentinel.providers,
+             "specs": {"cpus": 4, "capacity": mock.sentinel.capacity},
+             "status": constants.SERVICE_STATUS_UP})
+        self.assertEqual({"cpus": 4}, status["specs"])
+        mock_invalidate_scheduler_cache.assert_called_once_with(
+            mock.sentinel.context)
+
+    @mock.patch.object(server.ConductorServerEndpoint, "_scheduler_client")
+    @mock.patch.object(server.time, "time")
+    @mock.patch.object(db_api, "update_service")
+    @mock.patch.object(db_api, "get_service")
+    def test_report_service_capacity(
+            self, mock_get_service, mock_update_service, mock_time,
+            mock_scheduler_client):
+        mock_time.return_value = 100
+        fresh_report = {"reported_at": 90, "report_interval": 10}
+        stale_report = {"reported_at": 10, "report_interval": 10}
+        specs = {
+            "providers": mock.sentinel.providers,
+            "capacity": {"host:1": fresh_report, "host:2": stale_report}}
+        mock_get_service.return_value = mock.Mock(specs=specs)
+
+        testutils.get_wrapped_function(self.server.report_service_capacity)(
+            self.server, mock.sentinel.context, mock.sentinel.service_id,
+            "host:3", mock.sentinel.capacity)
+
+        mock_update_service.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.service_id,
+            {"specs": {
+                "providers": mock.sentinel.providers,
+                "capacity": {
+                    "host:1": fresh_report,
+                    "host:3": mock.sentinel.capacity}}})
+        self.assertEqual(
+            {"host:1": fresh_report, "host:2": stale_report},
+            specs["capacity"])
+        mock_scheduler_client.update_service_capacity.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.service_id,
+            {"host:1": fresh_report, "host:3": mock.sentinel.capacity})
+
+    @mock.patch.object(server.ConductorServerEndpoint, "_scheduler_client")
+    @mock.patch.object(db_api, "update_service")
+    @mock.patch.object(db_api, "get_service")
+    def test_report_service_capacity_scheduler_error(
+            self, mock_get_service, mock_update_service,
+            mock_scheduler_client):
+        mock_get_service.return_value = mock.Mock(specs={})
+        mock_scheduler_client.update_service_capacity.side_effect = (
+            CoriolisTestException())
+
+        with self.assertLogs('coriolis.conductor.rpc.server', level='WARN'):
+            testutils.get_wrapped_function(
+                self.server.report_service_capacity)(
+                    self.server, mock.sentinel.context,
+                    mock.sentinel.service_id, "host:1",
+                    mock.sentinel.capacity)
+
+        mock_update_service.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.service_id,
+            {"specs": {"capacity": {"host:1": mock.sentinel.capacity}}})
+
+    @mock.patch.object(db_api, "update_service")
+    @mock.patch.object(db_api, "get_service")
+    def test_report_service_capacity_not_found(
+            self, mock_get_service, mock_update_service):
+        mock_get_service.return_value = None
+
+        self.assertRaises(
+            exception.NotFound,
+            testutils.get_wrapped_function(
+                self.server.report_service_capacity),
+            self, mock.sentinel.context, mock.sentinel.service_id,
+            "host:1", mock.sentinel.capacity)
+        mock_update_service.assert_not_called()
@@ -1,8 +1,12 @@
 # Copyright 2017 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import datetime
 from unittest import mock
 
+from oslo_db import exception as db_exc
+
+from coriolis import constants
 from coriolis.db import api
 from coriolis import exception
 from coriolis.tests import test_base
@@ -27,3 +31,592 @@ class DBAPITestCase(test_base.CoriolisBaseTestCase):
 
         mock_get_endpoint.assert_called_once_with(mock.sentinel.context,
                                                   mock.sentinel.endpoint_id)
+
+    @mock.patch.object(
+        api, '_task_progress_update_indexes',
+        api._ProgressUpdateIndexAllocator())
+    @mock.patch.object(api, 'update_task_progress_update')
+    @mock.patch.object(api, '_add_task_progress_update')
+    @mock.patch.object(api, 'add_task_event')
+    @mock.patch.object(api, '_get_last_task_progress_update')
+    @mock.patch.object(api, '_get_last_task_event')
+    def test_add_task_events_batch(
+            self, mock_get_last_task_event,
+            mock_get_last_task_progress_update, mock_add_task_event,
+            mock_add_task_progress_update, mock_update_task_progress_update):
+        mock_get_last_task_event.return_value = mock.Mock(index=4)
+        mock_get_last_task_progress_update.return_value = None
+        add_task_events_batch = testutils.get_wrapped_function(
+            api.add_task_events_batch)
+
+        add_task_events_batch(mock.sentinel.context, [
+            {"task_id": mock.sentinel.task_id,
+             "type": constants.TASK_EVENTS_BATCH_ITEM_EVENT,
+             "level": mock.sentinel.level, "message": mock.sentinel.msg1},
+            {"task_id": mock.sentinel.task_id,
+             "type": constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE,
+             "message": mock.sentinel.msg2, "total_steps": 10},
+            {"task_id": mock.sentinel.task_id,
+             "type": constants.TASK_EVENTS_BATCH_ITEM_EVENT,
+             "level": mock.sentinel.level, "message": mock.sentinel.msg3},
+            {"task_id": mock.sentinel.task_id,
+             "type": constants.TASK_EVENTS_BATCH_ITEM_PROGRESS_UPDATE_CHANGE,
+             "progress_update_index": 0, "new_current_step": 5},
+        ])
+
+        mock_get_last_task_event.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id)
+        mock_get_last_task_progress_update.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id)
+        mock_add_task_event.assert_has_calls([
+            mock.call(mock.sentinel.context, mock.sentinel.task_id,
+                      mock.sentinel.level, mock.sentinel.msg1, index=5),
+            mock.call(mock.sentinel.context, mock.sentinel.task_id,
+                      mock.sentinel.level, mock.sentinel.msg3, index=6)])
+        mock_add_task_progress_update.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id, mock.sentinel.msg2,
+            0, initial_step=0, total_steps=10)
+        mock_update_task_progress_update.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id, 0, 5,
+            new_total_steps=None, new_message=None)
+
+    def test_add_task_events_batch_invalid_type(self):
+        add_task_events_batch = testutils.get_wrapped_function(
+            api.add_task_events_batch)
+
+        self.assertRaises(
+            exception.InvalidInput, add_task_events_batch,
+            mock.sentinel.context,
+            [{"task_id": mock.sentinel.task_id, "type": "invalid"}])
+
+    @mock.patch.object(api.models, 'TransferActionInstanceInfo')
+    @mock.patch.object(api, '_session')
+    def test_add_replica(self, mock_session, mock_instance_info):
+        replica = mock.Mock(
+            info={"instance1": {"key": "value"}}, legacy_info=None)
+        context = mock.Mock(user="user", project_id="project")
+        add_replica = testutils.get_wrapped_function(api.add_replica)
+
+        add_replica(context, replica)
+
+        mock_instance_info.assert_called_once_with(
+            instance="instance1", info={"key": "value"})
+        self.assertEqual(
+            {"instance1": mock_instance_info.return_value},
+            replica.instance_infos)
+        self.assertEqual({}, replica.legacy_info)
+        mock_session.return_value.add.assert_called_once_with(replica)
+
+    @mock.patch.object(api, '_get_transfer_action_instance_info')
+    @mock.patch.object(api, 'get_action')
+    def test_get_transfer_action_info_for_instance(
+            self, mock_get_action, mock_get_instance_info):
+        get_info = testutils.get_wrapped_function(
+            api.get_transfer_action_info_for_instance)
+
+        result = get_info(
+            mock.sentinel.context, mock.sentinel.action_id,
+            mock.sentinel.instance)
+
+        self.assertEqual(mock_get_instance_info.return_value.info, result)
+        mock_get_action.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.action_id)
+        mock_get_instance_info.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.action_id,
+            mock.sentinel.instance)
+
+    @mock.patch.object(api, '_get_transfer_action_instance_info')
+    @mock.patch.object(api, 'get_action')
+    def test_get_transfer_action_info_for_instance_legacy(
+            self, mock_get_action, mock_get_instance_info):
+        mock_get_instance_info.return_value = None
+        mock_get_action.return_value = mock.Mock(
+            instance_infos={},
+            legacy_info={"instance1": mock.sentinel.instance_info})
+        get_info = testutils.get_wrapped_function(
+            api.get_transfer_action_info_for_instance)
+
+        result = get_info(
+            mock.sentinel.context, mock.sentinel.action_id, "instance1")
+
+        self.assertEqual(mock.sentinel.instance_info, result)
+
+    @mock.patch.object(api, '_get_transfer_action_instance_info')
+    @mock.patch.object(api, 'get_action')
+    def test_update_transfer_action_info_for_instance(
+            self, mock_get_action, mock_get_instance_info):
+        old_info = {"key1": "value1", "key2": "value2"}
+        mock_get_instance_info.return_value = mock.Mock(info=old_info)
+        update_info = testutils.get_wrapped_function(
+            api.update_transfer_action_info_for_instance)
+
+        result = update_info(
+            mock.sentinel.context, mock.sentinel.action_id,
+            mock.sentinel.instance, {"key2": "new", "key3": "value3"})
+
+        expected = {"key1": "value1", "key2": "new", "key3": "value3"}
+        self.assertEqual(expected, result)
+        self.assertEqual(
+            expected, mock_get_instance_info.return_value.info)
+        self.assertEqual({"key1": "value1", "key2": "value2"}, old_info)
+        mock_get_action.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.action_id)
+
+    @mock.patch.object(api, '_get_transfer_action_instance_info')
+    @mock.patch.object(api, 'get_action')
+    def test_update_transfer_action_info_for_instance_no_new_info(
+            self, mock_get_action, mock_get_instance_info):
+        instance_info = mock.Mock(info={"key": "value"})
+        mock_get_instance_info.return_value = instance_info
+        update_info = testutils.get_wrapped_function(
+            api.update_transfer_action_info_for_instance)
+
+        result = update_info(
+            mock.sentinel.context, mock.sentinel.action_id,
+            mock.sentinel.instance, {})
+
+        self.assertEqual({"key": "value"}, result)
+        self.assertEqual({"key": "value"}, instance_info.info)
+
+    @mock.patch.object(api.models, 'TransferActionInstanceInfo')
+    @mock.patch.object(api, '_get_transfer_action_instance_info')
+    @mock.patch.object(api, 'get_action')
+    def test_update_transfer_action_info_for_instance_new_instance(
+            self, mock_get_action, mock_get_instance_info,
+            mock_instance_info):
+        mock_get_instance_info.return_value = None
+        action = mock.Mock(
+            instance_infos={"instance1": mock.sentinel.instance1_info})
+        mock_get_action.return_value = action
+        update_info = testutils.get_wrapped_function(
+            api.update_transfer_action_info_for_instance)
+
+        result = update_info(
+            mock.sentinel.context, mock.sentinel.action_id, "instance2",
+            {"key": "value"})
+
+        self.assertEqual({"key": "value"}, result)
+        mock_instance_info.assert_called_once_with(instance="instance2")
+        self.assertEqual({
+            "instance1": mock.sentinel.instance1_info,
+            "instance2": mock_instance_info.return_value},
+            action.instance_infos)
+        self.assertEqual(
+            {"key": "value"}, mock_instance_info.return_value.info)
+
+    @mock.patch.object(api, '_get_task')
+    def test_set_task_status(self, mock_get_task):
+        set_task_status = testutils.get_wrapped_function(api.set_task_status)
+
+        result = set_task_status(
+            mock.sentinel.context, mock.sentinel.task_id,
+            mock.sentinel.status, exception_details=mock.sentinel.details)
+
+        self.assertTrue(result)
+        task = mock_get_task.return_value
+        self.assertEqual(mock.sentinel.status, task.status)
+        self.assertEqual(mock.sentinel.details, task.exception_details)
+
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_set_task_status_expected_statuses(self, mock_query):
+        update = mock_query.return_value.filter.return_value.update
+        update.return_value = 0
+        set_task_status = testutils.get_wrapped_function(api.set_task_status)
+
+        result = set_task_status(
+            mock.sentinel.context, mock.sentinel.task_id,
+            constants.TASK_STATUS_COMPLETED,
+            expected_statuses=[constants.TASK_STATUS_RUNNING])
+
+        self.assertFalse(result)
+        update.assert_called_once_with(
+            {"status": constants.TASK_STATUS_COMPLETED,
+             "exception_details": None},
+            synchronize_session=False)
+
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_get_tasks_execution_instances(self, mock_query):
+        distinct = mock_query.return_value.filter.return_value.distinct
+        distinct.return_value.all.return_value = [
+            ("instance2",), ("instance1",)]
+        get_instances = testutils.get_wrapped_function(
+            api.get_tasks_execution_instances)
+
+        result = get_instances(
+            mock.sentinel.context, mock.sentinel.execution_id)
+
+        self.assertEqual(["instance1", "instance2"], result)
+
+    @mock.patch.object(api, '_session')
+    def test_get_database_time(self, mock_session):
+        result = api._get_database_time(mock.sentinel.context)
+
+        query = mock_session.return_value.query
+        self.assertEqual(query.return_value.scalar.return_value, result)
+        mock_session.assert_called_once_with(mock.sentinel.context)
+
+    @mock.patch.object(api, '_get_database_time')
+    @mock.patch.object(api, '_session')
+    @mock.patch.object(api, '_model_query')
+    def test_acquire_lock_expired(
+            self, mock_model_query, mock_session, mock_get_database_time):
+        mock_get_database_time.return_value = datetime.datetime(2026, 1, 1)
+        update = mock_model_query.return_value.filter.return_value.update
+        update.return_value = 1
+        acquire_lock = testutils.get_wrapped_function(api._acquire_lock)
+
+        with self.assertLogs('coriolis.db.api', level='WARN'):
+            acquire_lock(
+                mock.sentinel.context, "lock-name", "holder", 30)
+
+        # NOTE: the lease is computed with the time of the database server:
+        mock_get_database_time.assert_called_once_with(mock.sentinel.context)
+        update.assert_called_once_with(
+            {"holder": "holder",
+             "expires_at": datetime.datetime(2026, 1, 1, 0, 0, 30),
+             "updated_at": mock.ANY},
+            synchronize_session=False)
+        mock_session.return_value.add.assert_not_called()
+
+    @mock.patch.object(api, '_get_database_time')
+    @mock.patch.object(api, '_session')
+    @mock.patch.object(api, '_model_query')
+    def test_acquire_lock_new(
+            self, mock_model_query, mock_session, mock_get_database_time):
+        mock_get_database_time.return_value = datetime.datetime(2026, 1, 1)
+        update = mock_model_query.return_value.filter.return_value.update
+        update.return_value = 0
+        acquire_lock = testutils.get_wrapped_function(api._acquire_lock)
+
+        acquire_lock(mock.sentinel.context, "lock-name", "holder", 30)
+
+        mock_session.assert_called_once_with(mock.sentinel.context)
+        lock = mock_session.return_value.add.call_args[0][0]
+        self.assertEqual(
+            ("lock-name", "holder", datetime.datetime(2026, 1, 1, 0, 0, 30)),
+            (lock.name, lock.holder, lock.expires_at))
+
+    @mock.patch.object(api, '_acquire_lock')
+    def test_acquire_lock_held(self, mock_acquire_lock):
+        mock_acquire_lock.side_effect = db_exc.DBDuplicateEntry()
+
+        result = api.acquire_lock(
+            mock.sentinel.context, "lock-name", "holder", 30)
+
+        self.assertFalse(result)
+        mock_acquire_lock.assert_called_once_with(
+            mock.sentinel.context, "lock-name", "holder", 30)
+
+    @mock.patch.object(api, '_get_database_time')
+    @mock.patch.object(api, '_model_query')
+    def test_refresh_lock(self, mock_model_query, mock_get_database_time):
+        mock_get_database_time.return_value = datetime.datetime(2026, 1, 1)
+        update = mock_model_query.return_value.filter.return_value.update
+        update.return_value = 1
+        refresh_lock = testutils.get_wrapped_function(api.refresh_lock)
+
+        result = refresh_lock(
+            mock.sentinel.context, "lock-name", "holder", 30)
+
+        self.assertTrue(result)
+        update.assert_called_once_with(
+            {"expires_at": datetime.datetime(2026, 1, 1, 0, 0, 30),
+             "updated_at": mock.ANY},
+            synchronize_session=False)
+
+    @mock.patch.object(api, '_get_database_time')
+    @mock.patch.object(api, '_model_query')
+    def test_refresh_lock_lost(self, mock_model_query, mock_get_database_time):
+        mock_get_database_time.return_value = datetime.datetime(2026, 1, 1)
+        update = mock_model_query.return_value.filter.return_value.update
+        update.return_value = 0
+        refresh_lock = testutils.get_wrapped_function(api.refresh_lock)
+
+        result = refresh_lock(
+            mock.sentinel.context, "lock-name", "holder", 30)
+
+        self.assertFalse(result)
+
+    @mock.patch.object(api, '_model_query')
+    def test_release_lock_not_held(self, mock_model_query):
+        delete = mock_model_query.return_value.filter.return_value.delete
+        delete.return_value = 0
+        release_lock = testutils.get_wrapped_function(api.release_lock)
+
+        with self.assertLogs('coriolis.db.api', level='WARN'):
+            result = release_lock(
+                mock.sentinel.context, "lock-name", "holder")
+
+        self.assertFalse(result)
+
+    @mock.patch.object(api, '_get_tasks_progress_percentages')
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_get_tasks_execution_status(
+            self, mock_query, mock_get_percentages):
+        execution = mock.Mock(
+            id="execution_id", action_id="action_id", status="RUNNING",
+            number=1, type="replica_execution", created_at=None,
+            updated_at=None)
+        task = mock.Mock(
+            id="task_id", instance="instance", task_type="task_type",
+            index=0, status="RUNNING", host="host")
+        event = mock.Mock(task_id="task_id")
+        execution_query = mock_query.return_value.join.return_value.filter
+        execution_query.return_value.filter.return_value.first.\
+            return_value = execution
+        tasks_query = mock_query.return_value.filter.return_value.order_by
+        tasks_query.return_value.all.return_value = [task]
+        events_query = mock_query.return_value.join.return_value.filter.\
+            return_value.order_by
+        events_query.return_value = [event]
+        mock_get_percentages.return_value = {"task_id": 50}
+        context = mock.Mock(is_admin=True)
+        get_status = testutils.get_wrapped_function(
+            api.get_tasks_execution_status)
+
+        result = get_status(
+            context, "action_id", execution_id="execution_id",
+            include_events=True)
+
+        self.assertEqual("RUNNING", result["status"])
+        self.assertEqual([{
+            "id": "task_id",
+            "instance": "instance",
+            "task_type": "task_type",
+            "index": 0,
+            "status": "RUNNING",
+            "host": "host",
+            "progress_percentage": 50,
+            "events": [event.to_dict.return_value]}], result["tasks"])
+        mock_get_percentages.assert_called_once_with(
+            context, "execution_id")
+
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_get_tasks_execution_status_not_found(self, mock_query):
+        mock_query.return_value.join.return_value.filter.return_value.\
+            order_by.return_value.first.return_value = None
+        get_status = testutils.get_wrapped_function(
+            api.get_tasks_execution_status)
+
+        result = get_status(mock.Mock(is_admin=True), "action_id")
+
+        self.assertIsNone(result)
+
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_get_tasks_progress_percentages(self, mock_query):
+        mock_query.return_value.join.return_value.all.return_value = [
+            ("task1", 5, 10), ("task2", 5, None), ("task3", 12, 10)]
+
+        result = api._get_tasks_progress_percentages(
+            mock.sentinel.context, "execution_id")
+
+        self.assertEqual(
+            {"task1": 50, "task2": None, "task3": 100}, result)
+
+    def test_apply_list_filters(self):
+        query = mock.Mock()
+        query.filter.return_value = query
+
+        result = api._apply_list_filters(
+            query, api.models.TasksExecution,
+            {"status": mock.sentinel.status,
+             "created_after": mock.sentinel.created_after})
+
+        self.assertEqual(query, result)
+        self.assertEqual(2, query.filter.call_count)
+
+    def test_apply_list_filters_invalid(self):
+        self.assertRaises(
+            exception.InvalidInput, api._apply_list_filters,
+            mock.Mock(), api.models.TasksExecution, {"invalid": "value"})
+
+    @mock.patch.object(api.sqlalchemyutils, 'paginate_query')
+    def test_paginate_query(self, mock_paginate_query):
+        query = mock.Mock()
+        marker_query = query.filter.return_value
+
+        result = api._paginate_query(
+            query, api.models.TasksExecution, marker=mock.sentinel.marker,
+            limit=10, sort_keys=["status"], sort_dirs=["desc"])
+
+        self.assertEqual(mock_paginate_query.return_value, result)
+        # NOTE: the marker is looked up with the filters of the query:
+        query.filter.assert_called_once()
+        mock_paginate_query.assert_called_once_with(
+            query, api.models.TasksExecution, 10,
+            ["status", "id"], marker=marker_query.first.return_value,
+            sort_dirs=["desc", "desc"])
+
+    @mock.patch.object(api.sqlalchemyutils, 'paginate_query')
+    def test_paginate_query_defaults(self, mock_paginate_query):
+        api._paginate_query(mock.sentinel.query, api.models.Replica)
+
+        mock_paginate_query.assert_called_once_with(
+            mock.sentinel.query, api.models.Replica, None,
+            ["created_at", "id"], marker=None, sort_dirs=["asc", "asc"])
+
+    def test_paginate_query_marker_not_found(self):
+        query = mock.Mock()
+        query.filter.return_value.first.return_value = None
+
+        self.assertRaises(
+            exception.InvalidInput, api._paginate_query,
+            query, api.models.Replica, marker=mock.sentinel.marker)
+
+    def test_progress_update_index_allocator(self):
+        allocator = api._ProgressUpdateIndexAllocator(max_entries=2)
+        get_next_index = mock.Mock(return_value=3)
+
+        self.assertEqual(3, allocator.allocate("task1", get_next_index))
+        self.assertEqual(4, allocator.allocate("task1", get_next_index))
+        get_next_index.assert_called_once_with()
+
+        allocator.allocate("task2", mock.Mock(return_value=0))
+        allocator.allocate("task3", mock.Mock(return_value=0))
+        # the counter of the least recently used task was evicted:
+        self.assertEqual(3, allocator.allocate("task1", get_next_index))
+
+        allocator.reset()
+        self.assertEqual(3, allocator.allocate("task1", get_next_index))
+        self.assertEqual(3, get_next_index.call_count)
+
+    def test_retry_on_progress_update_index_conflict(self):
+        allocator = mock.Mock()
+        func = mock.Mock(__name__="func")
+        func.side_effect = [db_exc.DBDuplicateEntry(), mock.sentinel.result]
+        wrapped = api._retry_on_progress_update_index_conflict(
+            allocator)(func)
+
+        result = wrapped(mock.sentinel.arg, kwarg=mock.sentinel.kwarg)
+
+        self.assertEqual(mock.sentinel.result, result)
+        allocator.reset.assert_called_once_with()
+        func.assert_has_calls([
+            mock.call(mock.sentinel.arg, kwarg=mock.sentinel.kwarg),
+            mock.call(mock.sentinel.arg, kwarg=mock.sentinel.kwarg)])
+
+    @mock.patch.object(
+        api, '_task_progress_update_indexes',
+        api._ProgressUpdateIndexAllocator())
+    @mock.patch.object(api, '_session')
+    @mock.patch.object(api, '_get_last_task_progress_update')
+    def test_add_task_progress_update(
+            self, mock_get_last_task_progress_update, mock_session):
+        mock_get_last_task_progress_update.return_value = mock.Mock(index=2)
+        add_task_progress_update = testutils.get_wrapped_function(
+            api.add_task_progress_update)
+
+        first = add_task_progress_update(
+            mock.sentinel.context, mock.sentinel.task_id, "message1")
+        second = add_task_progress_update(
+            mock.sentinel.context, mock.sentinel.task_id, "message2",
+            total_steps=5)
+
+        self.assertEqual((3, 4), (first.index, second.index))
+        self.assertEqual(5, second.total_steps)
+        mock_get_last_task_progress_update.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id)
+        mock_session.return_value.add.assert_has_calls(
+            [mock.call(first), mock.call(second)])
+
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_update_task_progress_update(self, mock_query):
+        mock_update = mock_query.return_value.filter.return_value.update
+        mock_update.return_value = 1
+        update_task_progress_update = testutils.get_wrapped_function(
+            api.update_task_progress_update)
+
+        update_task_progress_update(
+            mock.sentinel.context, mock.sentinel.task_id, 2, 5,
+            new_message="message")
+
+        mock_update.assert_called_once_with(
+            {"current_step": 5, "message": "message"},
+            synchronize_session=False)
+
+    @mock.patch.object(api, '_soft_delete_aware_query')
+    def test_update_task_progress_update_not_found(self, mock_query):
+        mock_query.return_value.filter.return_value.update.return_value = 0
+        update_task_progress_update = testutils.get_wrapped_function(
+            api.update_task_progress_update)
+
+        self.assertRaises(
+            exception.NotFound, update_task_progress_update,
+            mock.sentinel.context, mock.sentinel.task_id, 2, 5)
+
+    def test_get_like_pattern(self):
+        self.assertEqual("%web%", api._get_like_pattern("web"))
+        self.assertEqual("web%", api._get_like_pattern("web*"))
+        self.assertEqual("%-db-%", api._get_like_pattern("*-db-*"))
+        self.assertEqual(
+            "%100\\%\\_disk\\\\%", api._get_like_pattern("100%_disk\\"))
+
+    def test_get_endpoint_instance_id(self):
+        self.assertEqual("id", api._get_endpoint_instance_id(
+            {"id": "id", "instance_name": "instance_name", "name": "name"}))
+        self.assertEqual("instance_name", api._get_endpoint_instance_id(
+            {"instance_name": "instance_name", "name": "name"}))
+        self.assertEqual(
+            "name", api._get_endpoint_instance_id({"name": "name"}))
+
+    @mock.patch.object(api, '_claim_endpoint_instances_sync')
+    def test_claim_endpoint_instances_sync(self, mock_claim):
+        result = api.claim_endpoint_instances_sync(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            mock.sentinel.stale_before, mock.sentinel.stalled_before)
+
+        self.assertEqual(mock_claim.return_value, result)
+        mock_claim.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            mock.sentinel.stale_before, mock.sentinel.stalled_before)
+
+    @mock.patch.object(api, '_claim_endpoint_instances_sync')
+    def test_claim_endpoint_instances_sync_concurrent_insert(
+            self, mock_claim):
+        mock_claim.side_effect = db_exc.DBDuplicateEntry()
+
+        self.assertFalse(api.claim_endpoint_instances_sync(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            mock.sentinel.stale_before, mock.sentinel.stalled_before))
+
+    @mock.patch.object(api, 'get_endpoint_instances_sync')
+    @mock.patch.object(api, '_session')
+    @mock.patch.object(api, '_model_query')
+    def test_set_endpoint_instances_sync_trust(
+            self, mock_model_query, mock_session, mock_get_sync):
+        update = mock_model_query.return_value.filter.return_value.update
+        update.return_value = 0
+        mock_get_sync.return_value = None
+        set_trust = testutils.get_wrapped_function(
+            api._set_endpoint_instances_sync_trust)
+
+        self.assertTrue(set_trust(
+            mock.sentinel.context, "endpoint-id", "trust-id"))
+
+        sync = mock_session.return_value.add.call_args[0][0]
+        self.assertEqual(
+            ("endpoint-id", "trust-id"), (sync.endpoint_id, sync.trust_id))
+
+    @mock.patch.object(api, 'get_endpoint_instances_sync')
+    @mock.patch.object(api, '_session')
+    @mock.patch.object(api, '_model_query')
+    def test_set_endpoint_instances_sync_trust_already_set(
+            self, mock_model_query, mock_session, mock_get_sync):
+        update = mock_model_query.return_value.filter.return_value.update
+        update.return_value = 0
+        set_trust = testutils.get_wrapped_function(
+            api._set_endpoint_instances_sync_trust)
+
+        self.assertFalse(set_trust(
+            mock.sentinel.context, "endpoint-id", "trust-id"))
+
+        mock_session.return_value.add.assert_not_called()
+
+    @mock.patch.object(api, '_set_endpoint_instances_sync_trust')
+    def test_set_endpoint_instances_sync_trust_concurrent_insert(
+            self, mock_set_trust):
+        mock_set_trust.side_effect = db_exc.DBDuplicateEntry()
+
+        self.assertFalse(api.set_endpoint_instances_sync_trust(
+            mock.sentinel.context, mock.sentinel.endpoint_id,
+            mock.sentinel.trust_id))
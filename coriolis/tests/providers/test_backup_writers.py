@@ -0,0 +1,242 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import struct
+from unittest import mock
+
+import ddt
+
+from coriolis import data_transfer
+from coriolis import exception
+from coriolis.providers import backup_writers
+from coriolis.tests import test_base
+
+
+def _ack(msg_id):
+    return struct.pack("<I", msg_id)
+
+
+class BackupWritersTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis backup writers helpers."""
+
+    @mock.patch.object(backup_writers, 'CONF')
+    def test_get_write_extents(self, mock_conf):
+        block_size = data_transfer.ZERO_BLOCK_SIZE
+        mock_conf.zero_extents_min_length = block_size * 2
+        data = (b'a' * block_size + bytes(block_size) +
+                b'b' * block_size + bytes(block_size * 2))
+
+        result = backup_writers._get_write_extents(data)
+
+        self.assertEqual(
+            [(0, data[:block_size * 3], block_size * 3),
+             (block_size * 3, None, block_size * 2)],
+            result)
+
+    @mock.patch.object(backup_writers, 'CONF')
+    def test_get_write_extents_short_zero_runs(self, mock_conf):
+        block_size = data_transfer.ZERO_BLOCK_SIZE
+        mock_conf.zero_extents_min_length = block_size * 2
+        data = (b'a' * block_size + bytes(block_size)) * 4
+
+        result = backup_writers._get_write_extents(data)
+
+        self.assertEqual([(0, data, len(data))], result)
+
+
+@ddt.ddt
+class SSHBackupWriterImplTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis SSHBackupWriterImpl class."""
+
+    def setUp(self):
+        super(SSHBackupWriterImplTestCase, self).setUp()
+        self.writer = backup_writers.SSHBackupWriterImpl(
+            "/dev/sdb", mock.sentinel.disk_id, compress_transfer=False,
+            encoder_count=1, ack_window=2)
+        self.writer._stdin = mock.Mock()
+        self.writer._stdout = mock.Mock()
+        self.writer._stdout.channel.exit_status_ready.return_value = False
+
+    @ddt.data((None, 3), (1, 1))
+    @ddt.unpack
+    @mock.patch.object(backup_writers, 'CONF')
+    def test_init_encoder_count(self, encoder_count, expected, mock_conf):
+        mock_conf.transfer_compression_workers = 3
+        mock_conf.ssh_writer_ack_window = 8
+
+        writer = backup_writers.SSHBackupWriterImpl(
+            "/dev/sdb", mock.sentinel.disk_id, encoder_count=encoder_count)
+
+        self.assertEqual(expected, writer._encoder_cnt)
+
+    def test_send_msg(self):
+        self.writer._send_msg(0, mock.sentinel.data_0)
+        self.writer._send_msg(1, mock.sentinel.data_1)
+
+        self.assertEqual([0, 1], list(self.writer._unacked_msg_ids))
+        self.writer._stdin.write.assert_has_calls([
+            mock.call(mock.sentinel.data_0),
+            mock.call(mock.sentinel.data_1)])
+        self.assertEqual(2, self.writer._stdin.flush.call_count)
+        # NOTE: both messages are awaiting acknowledgement:
+        self.assertFalse(self.writer._ack_window.acquire(blocking=False))
+
+    def test_send_msg_waits_for_ack_window(self):
+        self.writer._ack_window = mock.Mock()
+        self.writer._ack_window.acquire.side_effect = [False, False, True]
+
+        self.writer._send_msg(0, mock.sentinel.data)
+
+        self.assertEqual(3, self.writer._ack_window.acquire.call_count)
+        self.writer._stdin.write.assert_called_once_with(mock.sentinel.data)
+
+    def test_send_msg_ack_window_exhausted_on_error(self):
+        self.writer._ack_window = mock.Mock()
+        self.writer._ack_window.acquire.return_value = False
+        self.writer._exception = Exception("Ack reader failed")
+
+        self.assertRaises(
+            exception.CoriolisException, self.writer._send_msg,
+            0, mock.sentinel.data)
+
+        self.writer._stdin.write.assert_not_called()
+        self.assertEqual([], list(self.writer._unacked_msg_ids))
+
+    def test_send_msg_helper_exited(self):
+        self.writer._stdout.channel.exit_status_ready.return_value = True
+        self.writer._stdout.channel.recv_exit_status.return_value = 7
+
+        self.assertRaisesRegex(
+            exception.CoriolisException, "ERR_IO_WRITE",
+            self.writer._send_msg, 0, mock.sentinel.data)
+
+        self.writer._stdin.write.assert_not_called()
+
+    def test_ack_reader_in_order(self):
+        for msg_id in range(2):
+            self.writer._send_msg(msg_id, mock.sentinel.data)
+        self.writer._closing = True
+        self.writer._stdout.read.side_effect = [_ack(0), _ack(1), b""]
+
+        self.writer._ack_reader()
+
+        self.assertEqual([], list(self.writer._unacked_msg_ids))
+        self.assertIsNone(self.writer._exception)
+        # NOTE: the whole window is available again:
+        self.assertTrue(self.writer._ack_window.acquire(blocking=False))
+        self.assertTrue(self.writer._ack_window.acquire(blocking=False))
+
+    def test_ack_reader_unexpected_ack(self):
+        for msg_id in range(2):
+            self.writer._send_msg(msg_id, mock.sentinel.data)
+        self.writer._stdout.read.side_effect = [_ack(1)]
+
+        self.assertRaisesRegex(
+            exception.CoriolisException,
+            "acknowledged message 1 while expecting an acknowledgement "
+            "for message 0", self.writer._ack_reader)
+
+        self.assertIsInstance(
+            self.writer._exception, exception.CoriolisException)
+
+    def test_ack_reader_output_closed(self):
+        self.writer._send_msg(0, mock.sentinel.data)
+        self.writer._stdout.read.side_effect = [b""]
+
+        self.assertRaisesRegex(
+            exception.CoriolisException, "1 message",
+            self.writer._ack_reader)
+
+        self.assertEqual([0], list(self.writer._unacked_msg_ids))
+        self.assertIsNotNone(self.writer._exception)
+
+    def test_ack_reader_helper_error(self):
+        self.writer._send_msg(0, mock.sentinel.data)
+        self.writer._stdout.read.side_effect = [b""]
+        self.writer._stdout.channel.exit_status_ready.return_value = True
+        self.writer._stdout.channel.recv_exit_status.return_value = 3
+
+        self.assertRaisesRegex(
+            exception.CoriolisException, "ERR_OPEN_FILE",
+            self.writer._ack_reader)
+
+
+@ddt.ddt
+class HTTPBackupWriterImplTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis HTTPBackupWriterImpl class."""
+
+    @ddt.data((None, 3), (1, 1))
+    @ddt.unpack
+    @mock.patch.object(backup_writers, 'CONF')
+    def test_init_compressor_count(
+            self, compressor_count, expected, mock_conf):
+        mock_conf.transfer_compression_workers = 3
+        mock_conf.http_writer_senders = 3
+
+        writer = backup_writers.HTTPBackupWriterImpl(
+            "/dev/sdb", mock.sentinel.disk_id,
+            compressor_count=compressor_count)
+
+        self.assertEqual(expected, writer._compressor_count)
+
+    def _get_writer(self, info=None):
+        writer = backup_writers.HTTPBackupWriterImpl(
+            "/dev/sdb", mock.sentinel.disk_id, compress_transfer=False,
+            compressor_count=1, sender_count=2)
+        writer._set_info(info or {
+            "ip": "10.0.0.1", "port": 6677, "client_crt": "crt",
+            "client_key": "key", "ca_crt": "ca", "id": "writer-id"})
+        return writer
+
+    @mock.patch.object(backup_writers.requests, 'Session')
+    @mock.patch.object(backup_writers.HTTPBackupWriterImpl, '_release')
+    def test_close_owned_session(self, mock_release, mock_session):
+        writer = self._get_writer()
+        writer._init_session()
+
+        writer.close()
+
+        mock_release.assert_called_once_with()
+        mock_session.return_value.close.assert_called_once_with()
+        self.assertIsNone(writer._session)
+
+    @mock.patch.object(backup_writers.requests, 'Session')
+    @mock.patch.object(backup_writers.HTTPBackupWriterImpl, '_release')
+    def test_close_shared_session(self, mock_release, mock_session):
+        session = mock.Mock()
+        writer = self._get_writer(info={
+            "ip": "10.0.0.1", "port": 6677, "client_crt": "crt",
+            "client_key": "key", "ca_crt": "ca", "id": "writer-id",
+            "session": session})
+
+        writer._write_error = True
+        writer._ensure_session()
+        writer.close()
+
+        mock_release.assert_called_once_with()
+        mock_session.assert_not_called()
+        session.close.assert_not_called()
+        self.assertFalse(writer._owns_session)
+
+    @mock.patch.object(backup_writers.HTTPBackupWriterImpl, '_release')
+    def test_sender_error_propagates(self, mock_release):
+        writer = self._get_writer()
+        writer._session = mock.Mock()
+        writer._session.post.return_value.raise_for_status.side_effect = (
+            Exception("HTTP 500"))
+        writer._sender_q.put({"offset": 0, "chunk": b"data"})
+
+        self.assertRaisesRegex(Exception, "HTTP 500", writer._sender)
+
+        self.assertEqual(0, writer._sender_q.unfinished_tasks)
+        self.assertTrue(writer._write_error)
+        writer._session.post.assert_called_with(
+            writer._uri, headers={
+                "X-Write-Offset": "0", "X-Client-Token": "writer-id"},
+            data=b"data", timeout=mock.ANY)
+        writer.seek(0)
+        self.assertRaises(
+            exception.CoriolisException, writer.write, b"more data")
+        self.assertRaises(exception.CoriolisException, writer.close)
+        # NOTE: the disk is still released after a failed transfer:
+        mock_release.assert_called_once_with()
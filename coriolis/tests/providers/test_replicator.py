@@ -0,0 +1,164 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+import ddt
+import eventlet
+
+from coriolis.providers import replicator
+from coriolis.tests import test_base
+
+
+def _chunk(offset, length):
+    return {"offset": offset, "length": length}
+
+
+@ddt.ddt
+class ChunkRangesTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the coalescing of replicator chunks."""
+
+    @ddt.data(
+        # adjacent chunks:
+        ([_chunk(0, 10), _chunk(10, 10), _chunk(20, 5)], 0, 100,
+         [(0, 25, 3)]),
+        # gaps within and beyond the maximum gap:
+        ([_chunk(0, 10), _chunk(15, 10), _chunk(40, 10)], 5, 100,
+         [(0, 25, 2), (40, 10, 1)]),
+        # the maximum span is never exceeded:
+        ([_chunk(0, 10), _chunk(10, 10), _chunk(20, 10)], 0, 20,
+         [(0, 20, 2), (20, 10, 1)]),
+        # chunks larger than the maximum span are still downloaded:
+        ([_chunk(0, 30), _chunk(30, 10)], 0, 20,
+         [(0, 30, 1), (30, 10, 1)]),
+        # coalescing disabled:
+        ([_chunk(0, 10), _chunk(10, 10)], 0, 0,
+         [(0, 10, 1), (10, 10, 1)]),
+        # unsorted chunks, with the offsets given as strings:
+        ([_chunk("20", "10"), _chunk(0, 10), _chunk("10", 10)], 0, 100,
+         [(0, 30, 3)]),
+        ([], 0, 100, []),
+    )
+    @ddt.unpack
+    def test_coalesce_chunks(self, chunks, max_gap, max_span, expected):
+        result = replicator._coalesce_chunks(
+            chunks, max_gap=max_gap, max_span=max_span)
+
+        self.assertEqual(
+            expected,
+            [(r["offset"], r["length"], len(r["chunks"])) for r in result])
+        self.assertEqual(
+            sorted(chunks, key=lambda c: int(c["offset"])),
+            [chunk for r in result for chunk in r["chunks"]])
+
+    @ddt.data(
+        ([_chunk(10, 2), _chunk(12, 3)], [(10, b"abcde")]),
+        ([_chunk(10, 2), _chunk(14, 1)], [(10, b"ab"), (14, b"e")]),
+        ([_chunk(10, 1), _chunk(12, 1), _chunk(14, 1)],
+         [(10, b"a"), (12, b"c"), (14, b"e")]),
+    )
+    @ddt.unpack
+    def test_split_range_data(self, chunks, expected):
+        chunks_range = {"offset": 10, "length": 5, "chunks": chunks}
+
+        result = list(replicator._split_range_data(chunks_range, b"abcde"))
+
+        self.assertEqual(expected, result)
+
+
+class ReplicatorTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis Replicator class."""
+
+    def setUp(self):
+        super(ReplicatorTestCase, self).setUp()
+        for patcher in (
+                mock.patch.object(replicator, 'CONF'),
+                mock.patch.object(replicator.Replicator, '_setup_ssh')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        replicator.CONF.replicator.chunk_download_concurrency = 2
+
+        self.replicator = replicator.Replicator(
+            mock.sentinel.conn_info, mock.MagicMock(), [], None,
+            use_compression=False)
+        self.replicator._cli = mock.Mock()
+        self.chunks = [
+            {"offset": offset, "length": 1} for offset in range(5)]
+
+    @mock.patch.object(replicator, '_coalesce_chunks')
+    def test_get_chunk_ranges(self, mock_coalesce_chunks):
+        replicator.CONF.replicator.coalesce_chunks_max_gap = 4096
+        replicator.CONF.replicator.coalesce_chunks_max_span = 8192
+
+        result = self.replicator._get_chunk_ranges(self.chunks)
+
+        self.assertEqual(mock_coalesce_chunks.return_value, result)
+        mock_coalesce_chunks.assert_called_once_with(
+            self.chunks, max_gap=4096, max_span=8192)
+
+    @mock.patch.object(replicator, '_coalesce_chunks')
+    def test_get_chunk_ranges_default_span(self, mock_coalesce_chunks):
+        replicator.CONF.replicator.coalesce_chunks_max_gap = 0
+        replicator.CONF.replicator.coalesce_chunks_max_span = None
+
+        self.replicator._get_chunk_ranges(self.chunks)
+
+        mock_coalesce_chunks.assert_called_once_with(
+            self.chunks, max_gap=0,
+            max_span=self.replicator._chunk_size * 4)
+
+    def test_download_pool_size(self):
+        self.assertEqual(2, self.replicator._download_pool.size)
+
+    def test_download_chunks_out_of_order_completion(self):
+        downloading = []
+        max_downloading = []
+
+        def _download_chunk(disk, chunk):
+            downloading.append(chunk)
+            max_downloading.append(len(downloading))
+            # NOTE: the later chunks of each batch finish downloading first:
+            eventlet.sleep(0.01 * (len(self.chunks) - chunk["offset"]))
+            downloading.remove(chunk)
+            return "data-%s" % chunk["offset"]
+        self.replicator._cli.download_chunk.side_effect = _download_chunk
+
+        result = list(self.replicator._download_chunks(
+            mock.sentinel.disk, self.chunks))
+
+        self.assertEqual(
+            [(chunk, "data-%s" % chunk["offset"]) for chunk in self.chunks],
+            result)
+        self.assertEqual(2, max(max_downloading))
+        self.replicator._cli.download_chunk.assert_has_calls(
+            [mock.call(mock.sentinel.disk, chunk) for chunk in self.chunks],
+            any_order=True)
+
+    def test_download_chunks_failing_chunk(self):
+        def _download_chunk(disk, chunk):
+            if chunk["offset"] == 1:
+                raise Exception("Download failed")
+            return "data-%s" % chunk["offset"]
+        self.replicator._cli.download_chunk.side_effect = _download_chunk
+
+        downloads = self.replicator._download_chunks(
+            mock.sentinel.disk, self.chunks)
+
+        self.assertEqual((self.chunks[0], "data-0"), next(downloads))
+        self.assertRaisesRegex(Exception, "Download failed", next, downloads)
+        # NOTE: no more chunks get downloaded once one of them failed:
+        self.assertLessEqual(
+            self.replicator._cli.download_chunk.call_count, 3)
+        self.assertRaises(StopIteration, next, downloads)
+
+    def test_download_chunks_consumer_stops(self):
+        self.replicator._download_pool = mock.Mock(size=2)
+        downloads = self.replicator._download_chunks(
+            mock.sentinel.disk, self.chunks)
+
+        next(downloads)
+        downloads.close()
+
+        spawned = self.replicator._download_pool.spawn.return_value
+        self.assertEqual(2, self.replicator._download_pool.spawn.call_count)
+        spawned.kill.assert_called_once_with()
@@ -0,0 +1,143 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+import ddt
+
+from coriolis.scheduler.filters import capacity_filters
+from coriolis.tests import test_base
+
+
+def _get_report(reported_at=100, **kwargs):
+    report = {
+        "reported_at": reported_at,
+        "report_interval": 10,
+        "running_tasks": 0,
+        "free_task_process_slots": 0,
+        "cpu_percent": None,
+        "memory_percent": None,
+        "nic_percent": None}
+    report.update(kwargs)
+    return report
+
+
+@ddt.ddt
+class CapacityFunctionsTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the capacity report helper functions."""
+
+    @ddt.data(
+        (100, 130, False),
+        (100, 131, True),
+    )
+    @ddt.unpack
+    def test_is_capacity_report_stale(self, reported_at, now, expected):
+        result = capacity_filters.is_capacity_report_stale(
+            _get_report(reported_at=reported_at), now=now)
+
+        self.assertEqual(expected, result)
+
+    def test_get_service_capacity(self):
+        service = mock.Mock(specs={"capacity": {
+            "host:1": _get_report(
+                reported_at=100, running_tasks=2, free_task_process_slots=1,
+                cpu_percent=10),
+            "host:2": _get_report(
+                reported_at=105, running_tasks=1, free_task_process_slots=2,
+                cpu_percent=20, memory_percent=30),
+            "host:3": _get_report(
+                reported_at=10, running_tasks=5, free_task_process_slots=5,
+                cpu_percent=90)}})
+
+        result = capacity_filters.get_service_capacity(service, now=110)
+
+        self.assertEqual({
+            "running_tasks": 3,
+            "free_task_process_slots": 3,
+            "cpu_percent": 20,
+            "memory_percent": 30,
+            "nic_percent": None,
+            "reported_at": 105}, result)
+
+    @ddt.data(
+        None,
+        {},
+        {"capacity": {"host:1": _get_report(reported_at=10)}},
+    )
+    def test_get_service_capacity_no_reports(self, specs):
+        service = mock.Mock(specs=specs)
+
+        result = capacity_filters.get_service_capacity(service, now=110)
+
+        self.assertIsNone(result)
+
+
+@ddt.ddt
+class CapacityFiltersTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the capacity based service filters."""
+
+    @mock.patch.object(capacity_filters, 'get_service_capacity')
+    def test_rate_service_unknown_capacity(self, mock_get_service_capacity):
+        mock_get_service_capacity.return_value = None
+        capacity_filter = capacity_filters.RunningTasksFilter(weight=2)
+
+        result = capacity_filter.rate_service(mock.sentinel.service)
+
+        self.assertEqual(
+            capacity_filters.UNKNOWN_CAPACITY_RATING * 2, result)
+
+    @ddt.data(
+        (0, 0, 100),
+        (1, 0, 50),
+        (1, 3, 20),
+    )
+    @ddt.unpack
+    @mock.patch.object(capacity_filters, 'get_service_capacity')
+    def test_running_tasks_filter(
+            self, running_tasks, pending_placements, expected,
+            mock_get_service_capacity):
+        mock_get_service_capacity.return_value = {
+            "running_tasks": running_tasks}
+        service = mock.Mock(id="service_id")
+        capacity_filter = capacity_filters.RunningTasksFilter(
+            pending_placements={"service_id": pending_placements})
+
+        result = capacity_filter.rate_service(service)
+
+        self.assertEqual(expected, result)
+
+    @ddt.data(
+        (2, 1, 100),
+        (2, 2, capacity_filters.UNKNOWN_CAPACITY_RATING),
+    )
+    @ddt.unpack
+    @mock.patch.object(capacity_filters, 'get_service_capacity')
+    def test_task_process_slots_filter(
+            self, free_slots, pending_placements, expected,
+            mock_get_service_capacity):
+        mock_get_service_capacity.return_value = {
+            "free_task_process_slots": free_slots}
+        service = mock.Mock(id="service_id")
+        capacity_filter = capacity_filters.TaskProcessSlotsFilter(
+            pending_placements={"service_id": pending_placements})
+
+        result = capacity_filter.rate_service(service)
+
+        self.assertEqual(expected, result)
+
+    @ddt.data(
+        ({"cpu_percent": 10, "memory_percent": 40, "nic_percent": None}, 60),
+        ({"cpu_percent": 100, "memory_percent": 40, "nic_percent": 5}, 1),
+        ({"cpu_percent": None, "memory_percent": None, "nic_percent": None},
+         capacity_filters.UNKNOWN_CAPACITY_RATING),
+    )
+    @ddt.unpack
+    @mock.patch.object(capacity_filters, 'get_service_capacity')
+    def test_resource_usage_filter(
+            self, capacity, expected, mock_get_service_capacity):
+        mock_get_service_capacity.return_value = capacity
+        capacity_filter = capacity_filters.ResourceUsageFilter()
+
+        result = capacity_filter.rate_service(mock.sentinel.service)
+
+        self.assertEqual(expected, result)
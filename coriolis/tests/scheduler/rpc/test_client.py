@@ -2,6 +2,7 @@
 # All Rights Reserved.
 
 import logging
+import time
 from unittest import mock
 
 import oslo_messaging
@@ -60,6 +61,24 @@ class SchedulerClientTestCase(test_base.CoriolisBaseTestCase):
         mock_call.assert_called_once_with(ctxt, 'get_diagnostics')
         self.assertEqual(result, mock_call.return_value)
 
+    @mock.patch.object(client.SchedulerClient, '_cast_fanout')
+    def test_invalidate_topology_cache(self, mock_cast_fanout):
+        self.client.invalidate_topology_cache(mock.sentinel.ctxt)
+
+        mock_cast_fanout.assert_called_once_with(
+            mock.sentinel.ctxt, 'invalidate_topology_cache')
+
+    @mock.patch.object(client.SchedulerClient, '_cast_fanout')
+    def test_update_service_capacity(self, mock_cast_fanout):
+        self.client.update_service_capacity(
+            mock.sentinel.ctxt, mock.sentinel.service_id,
+            mock.sentinel.capacity)
+
+        mock_cast_fanout.assert_called_once_with(
+            mock.sentinel.ctxt, 'update_service_capacity',
+            service_id=mock.sentinel.service_id,
+            capacity=mock.sentinel.capacity)
+
     @mock.patch.object(client.SchedulerClient, '_call')
     def test_get_workers_for_specs(self, mock_call):
         ctxt = mock.sentinel.ctxt
@@ -73,7 +92,8 @@ class SchedulerClientTestCase(test_base.CoriolisBaseTestCase):
 
         mock_call.assert_called_once_with(
             ctxt, 'get_workers_for_specs', region_sets=region_sets,
-            enabled=enabled, provider_requirements=provider_requirements)
+            enabled=enabled, provider_requirements=provider_requirements,
+            for_placement=False)
         self.assertEqual(result, mock_call.return_value)
 
     @mock.patch('random.choice')
@@ -134,7 +154,8 @@ class SchedulerClientTestCase(test_base.CoriolisBaseTestCase):
 
         mock_call.assert_called_once_with(
             ctxt, 'get_workers_for_specs', region_sets=region_sets,
-            enabled=enabled, provider_requirements=provider_requirements)
+            enabled=enabled, provider_requirements=provider_requirements,
+            for_placement=False)
 
     @mock.patch.object(client.SchedulerClient, 'get_workers_for_specs')
     def test_get_worker_service_for_specs_no_services_no_raise(
@@ -158,16 +179,14 @@ class SchedulerClientTestCase(test_base.CoriolisBaseTestCase):
         service_mock1 = {'id': 'test_id1'}
         service_mock2 = {'id': 'test_id2'}
         mock_get_workers.return_value = [service_mock1, service_mock2]
-        mock_random_choice.return_value = service_mock1
 
         result = self.client.get_worker_service_for_specs(
             mock.sentinel.ctxt, random_choice=True)
 
-        mock_random_choice.assert_called_once_with([
-            service_mock1, service_mock2])
+        mock_random_choice.assert_not_called()
         mock_get_workers.assert_called_once_with(
             mock.sentinel.ctxt, provider_requirements=None, region_sets=None,
-            enabled=True)
+            enabled=True, for_placement=True)
         self.assertEqual(result, service_mock1)
 
     @mock.patch('random.choice')
@@ -183,7 +202,7 @@ class SchedulerClientTestCase(test_base.CoriolisBaseTestCase):
         mock_random_choice.assert_not_called()
         get_workers_for_specs.assert_called_once_with(
             mock.sentinel.ctxt, provider_requirements=None, region_sets=None,
-            enabled=True)
+            enabled=True, for_placement=False)
         self.assertEqual(result, mock_service)
 
     @mock.patch.object(client.SchedulerClient, 'get_worker_service_for_specs')
@@ -240,3 +259,93 @@ class SchedulerClientTestCase(test_base.CoriolisBaseTestCase):
             self.client.get_worker_service_for_task, mock.sentinel.ctxt,
             self.task, self.origin_endpoint, self.destination_endpoint,
             retry_period=0, retry_count=0)
+
+    @mock.patch.object(tasks_factory, 'get_task_runner_class')
+    def test_get_task_worker_specs(self, mock_get_task_runner_class):
+        task_cls = mock_get_task_runner_class.return_value
+        task_cls.get_required_platform.return_value = (
+            constants.TASK_PLATFORM_BILATERAL)
+        task_cls.get_required_provider_types.return_value = {
+            constants.PROVIDER_PLATFORM_SOURCE: ['source_provider'],
+            constants.PROVIDER_PLATFORM_DESTINATION: ['dest_provider']}
+
+        result = self.client._get_task_worker_specs(
+            self.task, self.origin_endpoint, self.destination_endpoint)
+
+        mock_get_task_runner_class.assert_called_once_with('task_type')
+        self.assertEqual(
+            ({'origin_type': ['source_provider'],
+              'destination_type': ['dest_provider']},
+             [['region1', 'region2'], ['region3', 'region4']]),
+            result)
+
+    @mock.patch.object(time, 'sleep')
+    @mock.patch.object(client.SchedulerClient, '_call')
+    @mock.patch.object(client.SchedulerClient, '_get_task_worker_specs')
+    def test_get_worker_services_for_tasks(
+            self, mock_get_task_worker_specs, mock_call, mock_sleep):
+        task2 = {'id': 'task2', 'task_type': 'task_type'}
+        mock_get_task_worker_specs.return_value = (
+            mock.sentinel.provider_requirements, mock.sentinel.region_sets)
+        mock_call.side_effect = [
+            {'task_id': mock.sentinel.service1, 'task2': None},
+            {'task2': mock.sentinel.service2}]
+
+        result = self.client.get_worker_services_for_tasks(
+            mock.sentinel.ctxt, [self.task, task2], self.origin_endpoint,
+            self.destination_endpoint, retry_period=0)
+
+        self.assertEqual(
+            {'task_id': mock.sentinel.service1,
+             'task2': mock.sentinel.service2}, result)
+        mock_call.assert_has_calls([
+            mock.call(
+                mock.sentinel.ctxt, 'get_workers_for_task_specs',
+                task_specs=[
+                    {'task_id': 'task_id',
+                     'provider_requirements': (
+                         mock.sentinel.provider_requirements),
+                     'region_sets': mock.sentinel.region_sets},
+                    {'task_id': 'task2',
+                     'provider_requirements': (
+                         mock.sentinel.provider_requirements),
+                     'region_sets': mock.sentinel.region_sets}],
+                enabled=True),
+            mock.call(
+                mock.sentinel.ctxt, 'get_workers_for_task_specs',
+                task_specs=[
+                    {'task_id': 'task2',
+                     'provider_requirements': (
+                         mock.sentinel.provider_requirements),
+                     'region_sets': mock.sentinel.region_sets}],
+                enabled=True)])
+        mock_sleep.assert_called_once_with(0)
+
+    @mock.patch.object(time, 'sleep')
+    @mock.patch.object(client.SchedulerClient, '_call')
+    @mock.patch.object(client.SchedulerClient, '_get_task_worker_specs')
+    def test_get_worker_services_for_tasks_no_suitable_worker(
+            self, mock_get_task_worker_specs, mock_call, mock_sleep):
+        mock_get_task_worker_specs.return_value = ({}, [])
+        mock_call.side_effect = [Exception(), {'task_id': None}]
+
+        self.assertRaises(
+            exception.NoSuitableWorkerServiceError,
+            self.client.get_worker_services_for_tasks, mock.sentinel.ctxt,
+            [self.task], self.origin_endpoint, self.destination_endpoint,
+            retry_count=2, retry_period=0)
+
+        result = self.client.get_worker_services_for_tasks(
+            mock.sentinel.ctxt, [self.task], self.origin_endpoint,
+            self.destination_endpoint, retry_count=0, retry_period=0,
+            raise_on_no_matches=False)
+        self.assertEqual({'task_id': None}, result)
+
+    @mock.patch.object(client.SchedulerClient, '_call')
+    def test_get_worker_services_for_tasks_no_tasks(self, mock_call):
+        result = self.client.get_worker_services_for_tasks(
+            mock.sentinel.ctxt, [], self.origin_endpoint,
+            self.destination_endpoint)
+
+        self.assertEqual({}, result)
+        mock_call.assert_not_called()
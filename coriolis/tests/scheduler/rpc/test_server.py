@@ -9,6 +9,8 @@ import ddt
 from coriolis import constants
 from coriolis.db import api as db_api
 from coriolis import exception
+from coriolis import rpc
+from coriolis.scheduler.filters import capacity_filters
 from coriolis.scheduler.filters import trivial_filters
 from coriolis.scheduler.rpc import server
 from coriolis.tests import test_base
@@ -24,18 +26,43 @@ class SchedulerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         super(SchedulerServerEndpointTestCase, self).setUp()
         self.server = server.SchedulerServerEndpoint()
 
+    @mock.patch.object(rpc, "get_rpc_stats")
     @mock.patch.object(utils, "get_diagnostics_info")
-    def test_get_diagnostics(self, mock_get_diagnostics_info):
+    def test_get_diagnostics(
+            self, mock_get_diagnostics_info, mock_get_rpc_stats):
+        mock_get_diagnostics_info.return_value = {"hostname": "host"}
+
         result = self.server.get_diagnostics(mock.sentinel.context)
 
         mock_get_diagnostics_info.assert_called_once_with()
-        self.assertEqual(result, mock_get_diagnostics_info.return_value)
+        self.assertEqual(
+            {"hostname": "host", "rpc": mock_get_rpc_stats.return_value},
+            result)
+
+    def test_invalidate_topology_cache(self):
+        self.server._topology_cache = mock.Mock()
+
+        self.server.invalidate_topology_cache(mock.sentinel.context)
+
+        self.server._topology_cache.invalidate.assert_called_once_with()
+
+    def test_update_service_capacity(self):
+        self.server._topology_cache = mock.Mock()
+
+        self.server.update_service_capacity(
+            mock.sentinel.context, mock.sentinel.service_id,
+            mock.sentinel.capacity)
+
+        (self.server._topology_cache.update_service_capacity.
+            assert_called_once_with(
+                mock.sentinel.service_id, mock.sentinel.capacity))
 
     @mock.patch.object(trivial_filters, 'TopicFilter', autospec=True)
     @mock.patch.object(db_api, 'get_services')
     def test_get_all_worker_services(self, mock_get_services,
                                      mock_topic_filter_cls):
-        mock_get_services.return_value = mock.sentinel.services
+        # NOTE: the services are loaded through the topology cache:
+        mock_get_services.return_value = [mock.sentinel.service]
 
         mock_topic_filter_cls.return_value.filter_services.return_value = \
             mock.sentinel.filtered_services
@@ -46,7 +73,7 @@ class SchedulerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mock_topic_filter_cls.assert_called_once_with(
             constants.WORKER_MAIN_MESSAGING_TOPIC)
         mock_topic_filter_cls.return_value.filter_services.\
-            assert_called_once_with(mock.sentinel.services)
+            assert_called_once_with([mock.sentinel.service])
 
         self.assertEqual(result, mock.sentinel.filtered_services)
 
@@ -234,3 +261,125 @@ class SchedulerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         if provider_requirements:
             mock_provider_types_filter_cls.assert_called_once_with(
                 provider_requirements)
+
+    @mock.patch.object(capacity_filters, 'get_service_capacity')
+    def test_get_pending_placements(self, mock_get_service_capacity):
+        service1 = mock.Mock(id="service1")
+        service2 = mock.Mock(id="service2")
+        self.server._pending_placements = {"service1": 2, "service2": 3}
+        self.server._pending_placements_report_times = {
+            "service1": 100, "service2": 100}
+        mock_get_service_capacity.side_effect = [
+            {"reported_at": 100}, {"reported_at": 110}]
+
+        result = self.server._get_pending_placements([service1, service2])
+
+        self.assertEqual({"service1": 2}, result)
+        self.assertEqual(
+            {"service1": 100, "service2": 110},
+            self.server._pending_placements_report_times)
+
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_weighted_filtered_services')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_capacity_filters')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_all_worker_services')
+    def test_get_workers_for_specs_for_placement(
+            self, mock_get_all_worker_services, mock_get_capacity_filters,
+            mock_get_weighted_filtered_services):
+        service1 = mock.Mock(id="service1")
+        service2 = mock.Mock(id="service2")
+        mock_get_capacity_filters.return_value = []
+        mock_get_weighted_filtered_services.return_value = [
+            (service1, 50), (service2, 100)]
+        self.server._pending_placements = {"service2": 1}
+
+        result = self.server.get_workers_for_specs(
+            mock.sentinel.context, for_placement=True)
+
+        self.assertEqual([service2, service1], result)
+        self.assertEqual({"service2": 2}, self.server._pending_placements)
+        mock_get_capacity_filters.assert_called_once_with(
+            mock_get_all_worker_services.return_value)
+
+    @mock.patch.object(server, 'CONF')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_weighted_filtered_services')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_capacity_filters')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_all_worker_services')
+    def test_get_workers_for_specs_not_load_aware(
+            self, mock_get_all_worker_services, mock_get_capacity_filters,
+            mock_get_weighted_filtered_services, mock_conf):
+        mock_conf.scheduler.load_aware_scheduling = False
+        mock_get_weighted_filtered_services.return_value = [
+            (mock.sentinel.service, 100)]
+
+        result = self.server.get_workers_for_specs(mock.sentinel.context)
+
+        self.assertEqual([mock.sentinel.service], result)
+        mock_get_capacity_filters.assert_not_called()
+        mock_get_weighted_filtered_services.assert_called_once_with(
+            mock_get_all_worker_services.return_value, [])
+
+    def test_place_on_best_service(self):
+        service1 = mock.Mock(id="service1")
+        service2 = mock.Mock(id="service2")
+        service3 = mock.Mock(id="service3")
+        filtered_services = [(service1, 100), (service2, 100), (service3, 50)]
+        batch_placements = {"service1": 1}
+
+        result = self.server._place_on_best_service(
+            filtered_services, batch_placements=batch_placements)
+
+        self.assertEqual(service2, result)
+        self.assertEqual(
+            [(service2, 100), (service1, 100), (service3, 50)],
+            filtered_services)
+        self.assertEqual({"service2": 1}, self.server._pending_placements)
+        self.assertEqual(
+            {"service1": 1, "service2": 1}, batch_placements)
+
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_weighted_filtered_services')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_filters_for_specs')
+    @mock.patch.object(
+        server.SchedulerServerEndpoint, '_get_all_worker_services')
+    def test_get_workers_for_task_specs(
+            self, mock_get_all_worker_services, mock_get_filters_for_specs,
+            mock_get_weighted_filtered_services):
+        service1 = mock.Mock(id="service1")
+        service2 = mock.Mock(id="service2")
+        mock_get_weighted_filtered_services.side_effect = (
+            lambda services, filters: [(service1, 100), (service2, 100)])
+        mock_get_filters_for_specs.side_effect = [
+            mock.sentinel.filters, mock.sentinel.filters,
+            exception.NoSuitableRegionError()]
+        task_specs = [
+            {"task_id": "task1",
+             "provider_requirements": mock.sentinel.provider_requirements,
+             "region_sets": mock.sentinel.region_sets},
+            {"task_id": "task2"},
+            {"task_id": "task3"}]
+
+        result = self.server.get_workers_for_task_specs(
+            mock.sentinel.context, task_specs)
+
+        self.assertEqual(
+            {service1, service2}, {result["task1"], result["task2"]})
+        self.assertIsNone(result["task3"])
+        self.assertEqual(
+            {"service1": 1, "service2": 1}, self.server._pending_placements)
+        mock_get_filters_for_specs.assert_has_calls([
+            mock.call(
+                mock.sentinel.context,
+                mock_get_all_worker_services.return_value,
+                provider_requirements=mock.sentinel.provider_requirements,
+                region_sets=mock.sentinel.region_sets, enabled=True),
+            mock.call(
+                mock.sentinel.context,
+                mock_get_all_worker_services.return_value,
+                provider_requirements=None, region_sets=None, enabled=True)])
@@ -0,0 +1,84 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+from coriolis.db import api as db_api
+from coriolis.scheduler import topology_cache
+from coriolis.tests import test_base
+
+
+class TopologyCacheTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis scheduler TopologyCache class."""
+
+    def setUp(self):
+        super(TopologyCacheTestCase, self).setUp()
+        self.cache = topology_cache.TopologyCache(60)
+
+    @mock.patch.object(topology_cache.time, 'time')
+    @mock.patch.object(db_api, 'get_services')
+    def test_get_services(self, mock_get_services, mock_time):
+        mock_get_services.return_value = [mock.sentinel.service]
+        mock_time.return_value = 100
+
+        self.assertEqual(
+            [mock.sentinel.service],
+            self.cache.get_services(mock.sentinel.context))
+        self.assertEqual(
+            [mock.sentinel.service],
+            self.cache.get_services(mock.sentinel.context))
+        mock_get_services.assert_called_once_with(mock.sentinel.context)
+
+        # expired entries are reloaded:
+        mock_time.return_value = 160
+        self.cache.get_services(mock.sentinel.context)
+        self.assertEqual(2, mock_get_services.call_count)
+
+    @mock.patch.object(db_api, 'get_regions')
+    def test_get_regions_invalidated(self, mock_get_regions):
+        mock_get_regions.return_value = [mock.sentinel.region]
+
+        self.cache.get_regions(mock.sentinel.context)
+        self.cache.invalidate()
+        result = self.cache.get_regions(mock.sentinel.context)
+
+        self.assertEqual([mock.sentinel.region], result)
+        self.assertEqual(2, mock_get_regions.call_count)
+        self.assertEqual(1, self.cache.version)
+
+    @mock.patch.object(db_api, 'get_services')
+    def test_get_services_invalidated_while_loading(self, mock_get_services):
+        def _get_services(ctxt):
+            self.cache.invalidate()
+            return [mock.sentinel.service]
+        mock_get_services.side_effect = _get_services
+
+        result = self.cache.get_services(mock.sentinel.context)
+
+        self.assertEqual([mock.sentinel.service], result)
+        self.assertEqual({}, self.cache._entries)
+
+    @mock.patch.object(db_api, 'get_services')
+    def test_get_services_no_ttl(self, mock_get_services):
+        self.cache = topology_cache.TopologyCache(0)
+
+        self.cache.get_services(mock.sentinel.context)
+        self.cache.get_services(mock.sentinel.context)
+
+        self.assertEqual(2, mock_get_services.call_count)
+
+    @mock.patch.object(db_api, 'get_services')
+    def test_update_service_capacity(self, mock_get_services):
+        service = mock.Mock(id="service1", specs={"providers": {}})
+        mock_get_services.return_value = [service]
+        self.cache.get_services(mock.sentinel.context)
+
+        result = self.cache.update_service_capacity(
+            "service1", mock.sentinel.capacity)
+
+        self.assertTrue(result)
+        self.assertEqual(
+            {"providers": {}, "capacity": mock.sentinel.capacity},
+            service.specs)
+        self.assertFalse(self.cache.update_service_capacity(
+            "service2", mock.sentinel.capacity))
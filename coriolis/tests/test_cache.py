@@ -8,11 +8,97 @@ from coriolis import exception
 from coriolis.tests import test_base
 
 
+@mock.patch.object(cache, 'CONF')
+@mock.patch.object(cache, '_get_cache_region')
+class EndpointInventoryCacheTestCase(test_base.CoriolisBaseTestCase):
+    """Collection of tests for the Coriolis endpoint inventory cache."""
+
+    def setUp(self):
+        super(EndpointInventoryCacheTestCase, self).setUp()
+        cache._endpoint_inventory_stats.clear()
+
+    def test_get_endpoint_inventory_disabled(
+            self, mock_get_cache_region, mock_conf):
+        mock_conf.cache.enabled = False
+        get_inventory = mock.Mock()
+
+        result = cache.get_endpoint_inventory(
+            "endpoint-id", "networks", [{}], get_inventory)
+
+        self.assertEqual(get_inventory.return_value, result)
+        mock_get_cache_region.assert_not_called()
+
+    def test_get_endpoint_inventory_hit(
+            self, mock_get_cache_region, mock_conf):
+        mock_conf.endpoint_inventory.cache_time = 60
+        region = mock_get_cache_region.return_value
+        region.get.side_effect = ["generation", mock.sentinel.inventory]
+        get_inventory = mock.Mock()
+
+        result = cache.get_endpoint_inventory(
+            "endpoint-id", "networks", [{"env": "value"}], get_inventory)
+
+        self.assertEqual(mock.sentinel.inventory, result)
+        get_inventory.assert_not_called()
+        region.get.assert_called_with(mock.ANY, expiration_time=60)
+        key = region.get.call_args[0][0]
+        self.assertTrue(
+            key.startswith("endpoint_inventory:endpoint-id:generation:"))
+        self.assertEqual(
+            {"networks": {"hits": 1, "misses": 0, "refreshes": 0}},
+            cache.get_endpoint_inventory_stats())
+
+    def test_get_endpoint_inventory_miss(
+            self, mock_get_cache_region, mock_conf):
+        region = mock_get_cache_region.return_value
+        region.get.side_effect = ["generation", cache.cache.NO_VALUE]
+        get_inventory = mock.Mock()
+
+        result = cache.get_endpoint_inventory(
+            "endpoint-id", "storage", [{}], get_inventory)
+
+        self.assertEqual(get_inventory.return_value, result)
+        region.set.assert_called_once_with(
+            region.get.call_args[0][0], get_inventory.return_value)
+        self.assertEqual(
+            {"storage": {"hits": 0, "misses": 1, "refreshes": 0}},
+            cache.get_endpoint_inventory_stats())
+
+    def test_get_endpoint_inventory_refresh(
+            self, mock_get_cache_region, mock_conf):
+        region = mock_get_cache_region.return_value
+        region.get.return_value = "generation"
+        get_inventory = mock.Mock()
+
+        result = cache.get_endpoint_inventory(
+            "endpoint-id", "instances", [{}, None, None, None],
+            get_inventory, refresh=True)
+
+        self.assertEqual(get_inventory.return_value, result)
+        # only the generation of the endpoint was looked up:
+        region.get.assert_called_once_with(
+            "endpoint_inventory_generation:endpoint-id", expiration_time=-1)
+        region.set.assert_called_once_with(
+            mock.ANY, get_inventory.return_value)
+        self.assertEqual(
+            {"instances": {"hits": 0, "misses": 0, "refreshes": 1}},
+            cache.get_endpoint_inventory_stats())
+
+    def test_invalidate_endpoint_inventory(
+            self, mock_get_cache_region, mock_conf):
+        cache.invalidate_endpoint_inventory("endpoint-id")
+
+        mock_get_cache_region.return_value.set.assert_called_once_with(
+            "endpoint_inventory_generation:endpoint-id", mock.ANY)
+
+
 class CacheTestCase(test_base.CoriolisBaseTestCase):
     """Collection of tests for the Coriolis cache package."""
 
+    @mock.patch.object(cache, '_get_cache_region')
     @mock.patch.object(cache.cache, 'get_memoization_decorator')
-    def test_get_cache_decorator(self, mock_get_memoization_decorator):
+    def test_get_cache_decorator(
+            self, mock_get_memoization_decorator, mock_get_cache_region):
         provider = 'ValidProviderName'
         result = cache.get_cache_decorator(provider)
 
@@ -30,3 +116,60 @@ class CacheTestCase(test_base.CoriolisBaseTestCase):
             self.assertRaises(exception.CoriolisException,
                               cache.get_cache_decorator,
                               provider)
+
+
+class LocalTTLCacheTestCase(test_base.CoriolisBaseTestCase):
+    """Collection of tests for the Coriolis process-local TTL cache."""
+
+    def setUp(self):
+        super(LocalTTLCacheTestCase, self).setUp()
+        self.local_cache = cache.LocalTTLCache(max_entries=2)
+
+    @mock.patch.object(cache.time, 'monotonic')
+    def test_get_expires(self, mock_monotonic):
+        get_value = mock.Mock(side_effect=["value1", "value2"])
+        mock_monotonic.side_effect = [100, 109, 111]
+
+        self.assertEqual("value1", self.local_cache.get("key", get_value, 10))
+        self.assertEqual("value1", self.local_cache.get("key", get_value, 10))
+        self.assertEqual("value2", self.local_cache.get("key", get_value, 10))
+        self.assertEqual(2, get_value.call_count)
+
+    def test_get_disabled(self):
+        get_value = mock.Mock(side_effect=["value1", "value2"])
+
+        self.assertEqual("value1", self.local_cache.get("key", get_value, 0))
+        self.assertEqual("value2", self.local_cache.get("key", get_value, 0))
+
+    def test_get_evicts_least_recently_used(self):
+        self.local_cache.get("key1", lambda: "value1", 60)
+        self.local_cache.get("key2", lambda: "value2", 60)
+        self.local_cache.get("key1", mock.Mock(), 60)
+        self.local_cache.get("key3", lambda: "value3", 60)
+
+        get_value = mock.Mock(return_value="new_value")
+        self.assertEqual(
+            "value1", self.local_cache.get("key1", get_value, 60))
+        self.assertEqual(
+            "new_value", self.local_cache.get("key2", get_value, 60))
+
+    def test_invalidate_matching(self):
+        self.local_cache.get(("a", 1), lambda: "value1", 60)
+        self.local_cache.get(("b", 1), lambda: "value2", 60)
+        get_value = mock.Mock(return_value="new_value")
+
+        self.local_cache.invalidate_matching(lambda key: key[0] == "a")
+
+        self.assertEqual(
+            "new_value", self.local_cache.get(("a", 1), get_value, 60))
+        self.assertEqual(
+            "value2", self.local_cache.get(("b", 1), get_value, 60))
+
+    def test_clear(self):
+        self.local_cache.get("key", lambda: "value", 60)
+        get_value = mock.Mock(return_value="new_value")
+
+        self.local_cache.clear()
+
+        self.assertEqual(
+            "new_value", self.local_cache.get("key", get_value, 60))
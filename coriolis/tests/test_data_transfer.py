@@ -1,6 +1,7 @@
 # Copyright 2023 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import os
 import stat
 import struct
 from unittest import mock
@@ -30,6 +31,33 @@ class DataTranferTestCase(test_base.CoriolisBaseTestCase):
         self.path = 'test-path'
         self.offset = 0
 
+    @mock.patch.object(data_transfer.tpool, 'execute')
+    @mock.patch.object(data_transfer, '_COMPRESS_FUNC')
+    @mock.patch.object(data_transfer, 'CONF')
+    def test_compress_native_threads(self, mock_conf, mock_compress_func,
+                                     mock_execute):
+        mock_conf.compress_in_native_threads = True
+
+        result = data_transfer._compress(self.data_content, self.fmt)
+
+        mock_execute.assert_called_once_with(
+            mock_compress_func[self.fmt], self.data_content)
+        self.assertEqual(result, mock_execute.return_value)
+
+    @mock.patch.object(data_transfer.tpool, 'execute')
+    @mock.patch.object(data_transfer, '_COMPRESS_FUNC')
+    @mock.patch.object(data_transfer, 'CONF')
+    def test_compress_inline(self, mock_conf, mock_compress_func,
+                             mock_execute):
+        mock_conf.compress_in_native_threads = False
+
+        result = data_transfer._compress(self.data_content, self.fmt)
+
+        mock_compress_func[self.fmt].assert_called_once_with(
+            self.data_content)
+        mock_execute.assert_not_called()
+        self.assertEqual(result, mock_compress_func[self.fmt].return_value)
+
     @mock.patch.object(data_transfer, 'CONF')
     def test_get_session_and_address(self, mock_conf):
         mock_conf.compressor_address = 'localhost:8000'
@@ -138,6 +166,90 @@ class DataTranferTestCase(test_base.CoriolisBaseTestCase):
             data_transfer.constants.COMPRESSION_FORMAT_ZLIB)
         self.assertEqual(result, expected_result + self.data_content)
 
+    @mock.patch.object(data_transfer, 'compress_chunk')
+    def test_encode_data_compression_format(self, mock_compress_chunk):
+        mock_compress_chunk.return_value = (
+            self.data_content, data_transfer.constants.COMPRESSION_FORMAT_ZSTD)
+
+        result = data_transfer.encode_data(
+            self.msg_id, self.path, self.offset, self.data_content,
+            compression_formats=[
+                data_transfer.constants.COMPRESSION_FORMAT_GZIP,
+                data_transfer.constants.COMPRESSION_FORMAT_ZSTD])
+        inflated_len = len(self.path) + 1 + 8 + len(self.data_content)
+        expected_result = struct.pack(
+            '<III', self.msg_id, len(self.data_content),
+            inflated_len | (1 << 28))
+
+        mock_compress_chunk.assert_called_once_with(
+            mock.ANY, [data_transfer.constants.COMPRESSION_FORMAT_ZSTD])
+        self.assertEqual(result, expected_result + self.data_content)
+
+    @mock.patch.object(data_transfer, 'compression_proxy')
+    def test_compress_chunk_no_available_formats(self,
+                                                 mock_compression_proxy):
+        result = data_transfer.compress_chunk(
+            self.data_content, ['unavailable'])
+
+        mock_compression_proxy.assert_not_called()
+        self.assertEqual(result, (self.data_content, None))
+
+    @mock.patch.object(data_transfer, 'compression_proxy')
+    def test_compress_chunk(self, mock_compression_proxy):
+        mock_compression_proxy.return_value = (mock.sentinel.data, True)
+
+        result = data_transfer.compress_chunk(
+            self.data_content,
+            [data_transfer.constants.COMPRESSION_FORMAT_ZLIB],
+            adaptive=True)
+
+        mock_compression_proxy.assert_called_once_with(
+            self.data_content,
+            data_transfer.constants.COMPRESSION_FORMAT_ZLIB)
+        self.assertEqual(
+            result,
+            (mock.sentinel.data,
+             data_transfer.constants.COMPRESSION_FORMAT_ZLIB))
+
+    @mock.patch.object(data_transfer, 'compression_proxy')
+    def test_compress_chunk_not_compressed(self, mock_compression_proxy):
+        mock_compression_proxy.return_value = (self.data_content, False)
+
+        result = data_transfer.compress_chunk(
+            self.data_content,
+            [data_transfer.constants.COMPRESSION_FORMAT_ZLIB])
+
+        self.assertEqual(result, (self.data_content, None))
+
+    @mock.patch.object(data_transfer, 'compression_proxy')
+    def test_compress_chunk_adaptive_incompressible(
+            self, mock_compression_proxy):
+        content = os.urandom(1024 * 1024)
+
+        result = data_transfer.compress_chunk(
+            content, [data_transfer.constants.COMPRESSION_FORMAT_ZLIB],
+            adaptive=True)
+
+        mock_compression_proxy.assert_not_called()
+        self.assertEqual(result, (content, None))
+
+    @mock.patch.object(data_transfer, 'compression_proxy')
+    def test_compress_chunk_adaptive_compressible(
+            self, mock_compression_proxy):
+        content = b'\0' * 1024 * 1024
+        mock_compression_proxy.return_value = (mock.sentinel.data, True)
+
+        result = data_transfer.compress_chunk(
+            content, [data_transfer.constants.COMPRESSION_FORMAT_ZLIB],
+            adaptive=True)
+
+        mock_compression_proxy.assert_called_once_with(
+            content, data_transfer.constants.COMPRESSION_FORMAT_ZLIB)
+        self.assertEqual(
+            result,
+            (mock.sentinel.data,
+             data_transfer.constants.COMPRESSION_FORMAT_ZLIB))
+
     @mock.patch.object(data_transfer, 'struct')
     def test_encode_data_uncompressed(self, mock_struct):
         mock_struct.pack.side_effect = (lambda fmt,
@@ -154,6 +266,58 @@ class DataTranferTestCase(test_base.CoriolisBaseTestCase):
                            inflated_content)
         self.assertEqual(result, expected_result)
 
+    def test_get_data_extents(self):
+        block_size = data_transfer.ZERO_BLOCK_SIZE
+        data = (b'a' * 10 + bytes(block_size * 3) + b'b' * 5)
+
+        result = data_transfer.get_data_extents(data)
+
+        self.assertEqual(
+            result,
+            [(0, block_size, False),
+             (block_size, block_size * 2, True),
+             (block_size * 3, 15, False)])
+
+    def test_get_data_extents_min_zero_length(self):
+        block_size = data_transfer.ZERO_BLOCK_SIZE
+        data = (b'a' * block_size + bytes(block_size) +
+                b'b' * block_size + bytes(block_size * 3) +
+                b'c' * block_size + bytes(block_size))
+
+        result = data_transfer.get_data_extents(
+            data, min_zero_length=block_size * 2)
+
+        self.assertEqual(
+            result,
+            [(0, block_size * 3, False),
+             (block_size * 3, block_size * 3, True),
+             (block_size * 6, block_size * 2, False)])
+
+    def test_get_data_extents_all_zeros_min_zero_length(self):
+        data = bytes(data_transfer.ZERO_BLOCK_SIZE)
+
+        result = data_transfer.get_data_extents(
+            data, min_zero_length=len(data) * 2)
+
+        self.assertEqual(result, [(0, len(data), True)])
+
+    def test_get_data_extents_all_zeros(self):
+        data = bytes(data_transfer.ZERO_BLOCK_SIZE * 2 + 7)
+
+        result = data_transfer.get_data_extents(data)
+
+        self.assertEqual(result, [(0, len(data), True)])
+
+    def test_encode_zero(self):
+        result = data_transfer.encode_zero(
+            self.msg_id, self.path, self.offset, 4096)
+
+        content = (self.path.encode() + b'\0' +
+                   struct.pack("<QQ", self.offset, 4096))
+        expected_result = struct.pack(
+            "<III", self.msg_id, len(content), 15 << 28) + content
+        self.assertEqual(result, expected_result)
+
     @mock.patch.object(data_transfer, 'struct')
     def test_encode_eod(self, mock_struct):
         self.msg_id = 1
@@ -111,6 +111,112 @@ class EventManagerTestCase(test_base.CoriolisBaseTestCase):
                 mock.sentinel.progress_update_id, 60, 0, 100)}
         self.assertEqual(self.event_manager._perc_steps, expected_perc_steps)
 
+    def test_set_percentage_step_synchronous(self):
+        event_manager = events.EventManager(
+            self.mock_event_handler, progress_update_interval=0)
+        perc_step_data = events._PercStepData(
+            mock.sentinel.progress_update_id, 50, 0, 100)
+        event_manager._perc_steps[
+            mock.sentinel.progress_update_id] = perc_step_data
+
+        event_manager.set_percentage_step(perc_step_data, 60)
+
+        self.mock_event_handler.update_progress_update.assert_called_once_with(
+            mock.sentinel.progress_update_id, 60)
+
+    @mock.patch.object(events.eventlet, 'spawn')
+    def test_set_percentage_step_coalesced(self, mock_spawn):
+        event_manager = events.EventManager(
+            self.mock_event_handler, progress_update_interval=5)
+        perc_step_data = events._PercStepData(
+            mock.sentinel.progress_update_id, 50, 0, 100)
+        event_manager._perc_steps[
+            mock.sentinel.progress_update_id] = perc_step_data
+
+        event_manager.set_percentage_step(perc_step_data, 60)
+        event_manager.set_percentage_step(perc_step_data, 70)
+
+        mock_spawn.assert_called_once_with(
+            event_manager._progress_update_sender,
+            mock.sentinel.progress_update_id, mock.ANY)
+        self.mock_event_handler.update_progress_update.assert_not_called()
+        self.assertEqual(
+            event_manager._pending_progress_updates,
+            {mock.sentinel.progress_update_id: 70})
+
+    @mock.patch.object(events.eventlet, 'kill')
+    @mock.patch.object(events.eventlet, 'spawn')
+    def test_flush_progress_updates(self, mock_spawn, mock_kill):
+        # NOTE: the senders only run once they are waited for:
+        mock_spawn.side_effect = lambda func, *args: mock.Mock(
+            wait=lambda: func(*args))
+        event_manager = events.EventManager(
+            self.mock_event_handler, progress_update_interval=5)
+        perc_step_data = events._PercStepData(
+            mock.sentinel.progress_update_id, 50, 0, 100)
+        event_manager._perc_steps[
+            mock.sentinel.progress_update_id] = perc_step_data
+        event_manager.set_percentage_step(perc_step_data, 60)
+        event_manager.set_percentage_step(perc_step_data, 70)
+        flushed = event_manager._progress_update_senders[
+            mock.sentinel.progress_update_id][1]
+
+        event_manager.flush_progress_updates()
+
+        mock_kill.assert_not_called()
+        self.assertTrue(flushed.ready())
+        self.mock_event_handler.update_progress_update.assert_called_once_with(
+            mock.sentinel.progress_update_id, 70)
+        self.assertEqual(event_manager._pending_progress_updates, {})
+        self.assertEqual(event_manager._progress_update_senders, {})
+
+    @mock.patch.object(events.EventManager, 'flush_progress_updates')
+    def test_flush_events(self, mock_flush_progress_updates):
+        self.event_manager.flush_events()
+
+        mock_flush_progress_updates.assert_called_once_with()
+        self.mock_event_handler.flush.assert_called_once_with()
+
+    @mock.patch.object(events.EventManager, 'flush_events')
+    def test_reset_event_managers(self, mock_flush_events):
+        events.reset_event_managers()
+        events.flush_events()
+
+        mock_flush_events.assert_not_called()
+
+    def test_progress_update_sender(self):
+        event_manager = events.EventManager(
+            self.mock_event_handler, progress_update_interval=5)
+        flushed = mock.Mock()
+        event_manager._pending_progress_updates[
+            mock.sentinel.progress_update_id] = 70
+        event_manager._progress_update_senders[
+            mock.sentinel.progress_update_id] = (
+                mock.sentinel.sender, flushed)
+
+        event_manager._progress_update_sender(
+            mock.sentinel.progress_update_id, flushed)
+
+        self.mock_event_handler.update_progress_update.assert_called_once_with(
+            mock.sentinel.progress_update_id, 70)
+        flushed.wait.assert_called_once_with(timeout=5)
+        self.assertEqual(event_manager._progress_update_senders, {})
+
+    def test_progress_update_sender_replaced(self):
+        event_manager = events.EventManager(
+            self.mock_event_handler, progress_update_interval=5)
+        new_sender = (mock.sentinel.new_sender, mock.Mock())
+        event_manager._progress_update_senders[
+            mock.sentinel.progress_update_id] = new_sender
+
+        event_manager._progress_update_sender(
+            mock.sentinel.progress_update_id, mock.Mock())
+
+        self.mock_event_handler.update_progress_update.assert_not_called()
+        self.assertEqual(
+            event_manager._progress_update_senders,
+            {mock.sentinel.progress_update_id: new_sender})
+
     def test_set_percentage_step_no_perc_step(self):
         self.event_manager.set_percentage_step(
             events._PercStepData(
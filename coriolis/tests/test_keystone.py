@@ -6,6 +6,7 @@ from unittest import mock
 
 from keystoneauth1 import exceptions as ks_exceptions
 
+from coriolis import cache
 from coriolis import exception
 from coriolis import keystone
 from coriolis.tests import test_base
@@ -42,6 +43,11 @@ class KeystoneTestCase(test_base.CoriolisBaseTestCase):
         self.trust.id = 'test_trust_id'
         self.client.trusts.create.return_value = self.trust
 
+        sessions_patcher = mock.patch.object(
+            keystone, '_sessions', cache.LocalTTLCache())
+        sessions_patcher.start()
+        self.addCleanup(sessions_patcher.stop)
+
     @mock.patch.object(keystone.loading, 'load_auth_from_conf_options')
     def test_get_trusts_auth_plugin(self, mock_load_auth_from_conf_options):
         mock_load_auth_from_conf_options.return_value = self.trusts_auth_plugin
@@ -295,3 +301,67 @@ class KeystoneTestCase(test_base.CoriolisBaseTestCase):
         self.assertRaises(exception.CoriolisException,
                           keystone.create_keystone_session,
                           self.ctxt, self.connection_info)
+
+    @mock.patch('coriolis.keystone._get_trusts_auth_plugin')
+    @mock.patch.object(keystone.ks_session, 'Session')
+    def test_create_keystone_session_reused(
+            self, mock_session, mock_get_trusts_auth_plugin):
+        self.ctxt.trust_id = 'test_trust_id'
+
+        first = keystone.create_keystone_session(self.ctxt)
+        second = keystone.create_keystone_session(self.ctxt)
+
+        self.assertEqual(mock_session.return_value, first)
+        self.assertEqual(first, second)
+        mock_get_trusts_auth_plugin.assert_called_once_with('test_trust_id')
+        mock_session.assert_called_once_with(
+            auth=mock_get_trusts_auth_plugin.return_value, verify=True)
+
+    @mock.patch.object(keystone.ks_session, 'Session')
+    @mock.patch.object(keystone.loading, 'get_plugin_loader')
+    def test_create_keystone_session_password_not_reused(
+            self, mock_get_plugin_loader, mock_session):
+        keystone.create_keystone_session(self.ctxt, self.connection_info)
+        keystone.create_keystone_session(self.ctxt, self.connection_info)
+
+        self.assertEqual(2, mock_session.call_count)
+
+    @mock.patch.object(keystone.ks_session, 'Session')
+    @mock.patch.object(keystone.loading, 'get_plugin_loader')
+    def test_clear_sessions_cache(
+            self, mock_get_plugin_loader, mock_session):
+        connection_info = {'auth_url': 'test_auth_url'}
+
+        keystone.create_keystone_session(self.ctxt, connection_info)
+        keystone.clear_sessions_cache()
+        keystone.create_keystone_session(self.ctxt, connection_info)
+
+        self.assertEqual(2, mock_session.call_count)
+
+    @mock.patch.object(keystone.ks_session, 'Session')
+    @mock.patch.object(keystone.loading, 'get_plugin_loader')
+    def test_create_keystone_session_token_changed(
+            self, mock_get_plugin_loader, mock_session):
+        connection_info = {'auth_url': 'test_auth_url'}
+
+        keystone.create_keystone_session(self.ctxt, connection_info)
+        keystone.create_keystone_session(self.ctxt, connection_info)
+        self.ctxt.auth_token = 'new_test_token'
+        keystone.create_keystone_session(self.ctxt, connection_info)
+
+        self.assertEqual(2, mock_session.call_count)
+
+    @mock.patch('coriolis.keystone._get_trusts_auth_plugin')
+    @mock.patch.object(keystone.kc_v3, 'Client')
+    @mock.patch.object(keystone.ks_session, 'Session')
+    def test_delete_trust_drops_reused_sessions(
+            self, mock_session, mock_client, mock_get_trusts_auth_plugin):
+        self.ctxt.trust_id = 'test_trust_id'
+        keystone.create_keystone_session(self.ctxt)
+
+        keystone.delete_trust(self.ctxt)
+        self.ctxt.trust_id = 'test_trust_id'
+        keystone.create_keystone_session(self.ctxt)
+
+        # the deletion uses its own session and the reused one was dropped:
+        self.assertEqual(3, mock_session.call_count)
@@ -0,0 +1,249 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+import ddt
+from oslo_concurrency import lockutils
+
+from coriolis.db import api as db_api
+from coriolis import exception
+from coriolis import locks
+from coriolis.tests import test_base
+
+
+@ddt.ddt
+class LocksTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis locks."""
+
+    def setUp(self):
+        super(LocksTestCase, self).setUp()
+        locks._lock_stats.clear()
+
+    @ddt.data(
+        ("replica-%s" % ("a" * 8 + "-aaaa-aaaa-aaaa-" + "a" * 12),
+         "replica-*"),
+        ("execution-%s-instance-%s" % (
+            "b" * 8 + "-bbbb-bbbb-bbbb-" + "b" * 12, "c" * 64),
+         "execution-*-instance-*"),
+        ("task-not-a-uuid", "task-not-a-uuid"),
+    )
+    @ddt.unpack
+    def test_get_lock_type(self, name, expected):
+        self.assertEqual(expected, locks._get_lock_type(name))
+
+    @ddt.data(
+        (locks.LOCK_BACKEND_FILE, True, {"external": True}),
+        (locks.LOCK_BACKEND_FILE, False, {}),
+        (locks.LOCK_BACKEND_DATABASE, False, {}),
+    )
+    @ddt.unpack
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(lockutils, 'lock')
+    def test_lock_local_backends(
+            self, backend, external, expected_kwargs, mock_lock, mock_conf):
+        mock_conf.locks.backend = backend
+        mock_conf.locks.lock_wait_warning_threshold = 0
+
+        with locks.lock("lock-name", external=external) as held_lock:
+            mock_lock.assert_called_once_with(
+                "lock-name", **expected_kwargs)
+            mock_lock.return_value.__exit__.assert_not_called()
+            held_lock.check()
+
+        mock_lock.return_value.__exit__.assert_called_once()
+        self.assertEqual(1, locks.get_lock_stats()["lock-name"]["acquired"])
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks, '_DatabaseLock')
+    @mock.patch.object(lockutils, 'lock')
+    def test_lock_database_backend(
+            self, mock_lock, mock_database_lock, mock_conf):
+        mock_conf.locks.backend = locks.LOCK_BACKEND_DATABASE
+        mock_conf.locks.lock_wait_warning_threshold = 0
+        db_lock = mock_database_lock.return_value
+
+        with locks.lock("lock-name") as held_lock:
+            self.assertEqual(db_lock, held_lock)
+            mock_lock.assert_called_once_with("lock-name")
+            mock_database_lock.assert_called_once_with("lock-name")
+            db_lock.acquire.assert_called_once_with()
+            db_lock.release.assert_not_called()
+
+        db_lock.release.assert_called_once_with()
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks, '_DatabaseLock')
+    @mock.patch.object(lockutils, 'lock')
+    def test_lock_database_backend_error(
+            self, mock_lock, mock_database_lock, mock_conf):
+        mock_conf.locks.backend = locks.LOCK_BACKEND_DATABASE
+        mock_conf.locks.lock_wait_warning_threshold = 0
+        db_lock = mock_database_lock.return_value
+
+        def _run_locked():
+            with locks.lock("lock-name"):
+                raise exception.CoriolisException("body error")
+
+        self.assertRaisesRegex(
+            exception.CoriolisException, "body error", _run_locked)
+        db_lock.release.assert_called_once_with()
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks, 'time')
+    @mock.patch.object(lockutils, 'lock')
+    def test_lock_wait_stats(self, mock_lock, mock_time, mock_conf):
+        mock_conf.locks.backend = locks.LOCK_BACKEND_FILE
+        mock_conf.locks.lock_wait_warning_threshold = 5
+        mock_time.time.side_effect = [100, 110, 113, 200, 201, 202]
+
+        with self.assertLogs('coriolis.locks', level='WARN'):
+            with locks.lock("lock-name"):
+                pass
+        with locks.lock("lock-name"):
+            pass
+
+        self.assertEqual({"lock-name": {
+            "acquired": 2,
+            "total_wait": 11.,
+            "max_wait": 10.,
+            "total_held": 4.}}, locks.get_lock_stats())
+
+    @mock.patch.object(locks, 'lock')
+    def test_synchronized(self, mock_lock):
+        @locks.synchronized("lock-name", external=False)
+        def func(arg, kwarg=None):
+            mock_lock.return_value.__exit__.assert_not_called()
+            return arg, kwarg
+
+        result = func(mock.sentinel.arg, kwarg=mock.sentinel.kwarg)
+
+        self.assertEqual((mock.sentinel.arg, mock.sentinel.kwarg), result)
+        mock_lock.assert_called_once_with("lock-name", external=False)
+        mock_lock.return_value.__exit__.assert_called_once()
+
+
+class DatabaseLockTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis database locks."""
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks.eventlet, 'spawn')
+    @mock.patch.object(locks, 'time')
+    @mock.patch.object(db_api, 'release_lock')
+    @mock.patch.object(db_api, 'acquire_lock')
+    def test_acquire_release(
+            self, mock_acquire_lock, mock_release_lock, mock_time,
+            mock_spawn, mock_conf):
+        mock_conf.locks.database_lock_lease_time = 30
+        mock_conf.locks.database_lock_poll_interval = 0.5
+        mock_acquire_lock.side_effect = [False, False, True]
+        db_lock = locks._DatabaseLock("lock-name")
+
+        db_lock.acquire()
+
+        self.assertEqual(3, mock_acquire_lock.call_count)
+        mock_acquire_lock.assert_called_with(
+            mock.ANY, "lock-name", db_lock._holder, 30)
+        self.assertEqual(
+            [mock.call(0.5), mock.call(0.5)],
+            mock_time.sleep.call_args_list)
+        mock_spawn.assert_called_once_with(db_lock._refresh)
+
+        db_lock.release()
+
+        mock_spawn.return_value.kill.assert_called_once_with()
+        mock_release_lock.assert_called_once_with(
+            mock.ANY, "lock-name", db_lock._holder)
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks, 'time')
+    @mock.patch.object(db_api, 'refresh_lock')
+    def test_refresh(self, mock_refresh_lock, mock_time, mock_conf):
+        mock_conf.locks.database_lock_lease_time = 30
+        mock_time.time.return_value = 100
+        mock_refresh_lock.side_effect = [True, Exception("DB down"), False]
+        db_lock = locks._DatabaseLock("lock-name")
+
+        with self.assertLogs('coriolis.locks', level='ERROR'):
+            db_lock._refresh()
+
+        self.assertEqual(3, mock_refresh_lock.call_count)
+        mock_refresh_lock.assert_called_with(
+            mock.ANY, "lock-name", db_lock._holder, 30)
+        mock_time.sleep.assert_called_with(10.)
+        # NOTE: the lock was taken over by another holder:
+        self.assertTrue(db_lock._lost)
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks, 'time')
+    @mock.patch.object(db_api, 'refresh_lock')
+    def test_refresh_lease_expired(
+            self, mock_refresh_lock, mock_time, mock_conf):
+        mock_conf.locks.database_lock_lease_time = 30
+        mock_time.time.side_effect = [100, 110, 120, 130]
+        mock_refresh_lock.side_effect = Exception("DB down")
+        db_lock = locks._DatabaseLock("lock-name")
+
+        with self.assertLogs('coriolis.locks', level='ERROR'):
+            db_lock._refresh()
+
+        self.assertEqual(3, mock_refresh_lock.call_count)
+        self.assertTrue(db_lock._lost)
+
+    @mock.patch.object(locks.eventlet, 'spawn')
+    @mock.patch.object(db_api, 'release_lock')
+    def test_release_lost(self, mock_release_lock, mock_spawn):
+        db_lock = locks._DatabaseLock("lock-name")
+        db_lock._refresher = mock_spawn.return_value
+        db_lock._lost = True
+
+        with self.assertLogs('coriolis.locks', level='ERROR'):
+            db_lock.release()
+
+        mock_spawn.return_value.kill.assert_called_once_with()
+        mock_release_lock.assert_called_once_with(
+            mock.ANY, "lock-name", db_lock._holder)
+
+    @mock.patch.object(db_api, 'release_lock')
+    def test_release_taken_over(self, mock_release_lock):
+        mock_release_lock.return_value = False
+        db_lock = locks._DatabaseLock("lock-name")
+
+        with self.assertLogs('coriolis.locks', level='ERROR'):
+            db_lock.release()
+
+    def test_check(self):
+        db_lock = locks._DatabaseLock("lock-name")
+        db_lock.check()
+
+        db_lock._lost = True
+
+        self.assertRaises(exception.LockLost, db_lock.check)
+
+    @mock.patch.object(locks, 'CONF')
+    @mock.patch.object(locks.eventlet, 'spawn')
+    @mock.patch.object(db_api, 'release_lock')
+    @mock.patch.object(db_api, 'refresh_lock')
+    @mock.patch.object(db_api, 'acquire_lock')
+    def test_lock_taken_over(
+            self, mock_acquire_lock, mock_refresh_lock, mock_release_lock,
+            mock_spawn, mock_conf):
+        mock_conf.locks.backend = locks.LOCK_BACKEND_DATABASE
+        mock_conf.locks.database_lock_lease_time = 30
+        mock_conf.locks.lock_wait_warning_threshold = 0
+        mock_acquire_lock.return_value = True
+        mock_refresh_lock.return_value = False
+        mock_release_lock.return_value = False
+
+        with self.assertLogs('coriolis.locks', level='ERROR'):
+            with locks.lock("lock-name") as held_lock:
+                held_lock.check()
+                # NOTE: the lease could not be refreshed while the lock was
+                # being held:
+                refresh = mock_spawn.call_args[0][0]
+                with mock.patch.object(locks.time, 'sleep'):
+                    refresh()
+                self.assertRaises(exception.LockLost, held_lock.check)
+
+        mock_release_lock.assert_called_once_with(
+            mock.ANY, "lock-name", mock.ANY)
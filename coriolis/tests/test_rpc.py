@@ -1,8 +1,11 @@
 # Copyright 2023 Cloudbase Solutions Srl
 # All Rights Reserved.
 
+import os
 from unittest import mock
 
+import oslo_messaging as messaging
+
 from coriolis import context
 from coriolis import rpc
 from coriolis.tests import test_base
@@ -72,34 +75,244 @@ class RpcTestCase(test_base.CoriolisBaseTestCase):
     def test_get_server(self, mock_context_serializer, mock_get_transport,
                         mock_get_rpc_server):
         target = mock.Mock()
-        endpoints = mock.Mock()
+        endpoint = mock.Mock()
         serializer = mock.Mock()
         mock_context_serializer.return_value = serializer
 
-        result = rpc.get_server(target, endpoints, serializer)
+        result = rpc.get_server(target, [endpoint], serializer)
 
         mock_context_serializer.assert_called_once_with(serializer)
         mock_get_rpc_server.assert_called_once_with(
-            mock_get_transport.return_value, target, endpoints,
+            mock_get_transport.return_value, target, mock.ANY,
             executor='eventlet', serializer=serializer)
+        (instrumented_endpoint,) = mock_get_rpc_server.call_args[0][2]
+        self.assertIsInstance(
+            instrumented_endpoint, rpc._InstrumentedEndpoint)
+        self.assertEqual(endpoint, instrumented_endpoint._endpoint)
+        self.assertEqual(target.topic, instrumented_endpoint._topic)
         self.assertEqual(result, mock_get_rpc_server.return_value)
 
+    @mock.patch.object(rpc, '_TRANSPORT_PID', None)
+    @mock.patch.object(rpc, '_TRANSPORT', None)
     @mock.patch('coriolis.rpc.messaging.get_transport')
     def test_init(self, mock_get_transport):
-        rpc._TRANSPORT = None
         result = rpc.init()
 
         mock_get_transport.assert_called_once()
         self.assertEqual(result, mock_get_transport.return_value)
         self.assertEqual(rpc._TRANSPORT, mock_get_transport.return_value)
+        self.assertEqual(os.getpid(), rpc._TRANSPORT_PID)
 
+    @mock.patch.object(rpc, '_TRANSPORT_PID', None)
+    @mock.patch.object(rpc, '_TRANSPORT', None)
     @mock.patch('coriolis.rpc.messaging.get_transport')
     def test_init_already_initialized(self, mock_get_transport):
-        rpc._TRANSPORT = mock.Mock()
+        rpc._TRANSPORT = mock.sentinel.transport
+        rpc._TRANSPORT_PID = os.getpid()
+
         result = rpc.init()
-        self.assertEqual(result, rpc._TRANSPORT)
+
+        self.assertEqual(mock.sentinel.transport, result)
         mock_get_transport.assert_not_called()
 
+    @mock.patch.object(rpc, '_TRANSPORT_PID', None)
+    @mock.patch.object(rpc, '_TRANSPORT', None)
+    @mock.patch.object(rpc.os, 'getpid')
+    @mock.patch.object(rpc, '_get_transport')
+    def test_get_client_transport(self, mock_get_transport, mock_getpid):
+        mock_get_transport.side_effect = [
+            mock.sentinel.transport, mock.sentinel.forked_transport]
+        mock_getpid.return_value = 1
+
+        first = rpc._get_client_transport()
+        second = rpc._get_client_transport()
+        mock_getpid.return_value = 2
+        forked = rpc._get_client_transport()
+
+        self.assertEqual(mock.sentinel.transport, first)
+        self.assertEqual(mock.sentinel.transport, second)
+        self.assertEqual(mock.sentinel.forked_transport, forked)
+
+    @mock.patch.object(rpc, '_TRANSPORT_PID', None)
+    @mock.patch.object(rpc, '_TRANSPORT', None)
+    @mock.patch.object(rpc.os, 'getpid')
+    @mock.patch.object(rpc, '_get_transport')
+    def test_init_forked(self, mock_get_transport, mock_getpid):
+        # NOTE: the services initialize the transport before forking:
+        mock_get_transport.side_effect = [
+            mock.sentinel.transport, mock.sentinel.forked_transport]
+        mock_getpid.return_value = 1
+        rpc.init()
+
+        mock_getpid.return_value = 2
+        result = rpc._get_client_transport()
+
+        self.assertEqual(mock.sentinel.forked_transport, result)
+        self.assertEqual(mock.sentinel.forked_transport, rpc.init())
+        self.assertEqual(2, mock_get_transport.call_count)
+
+    @mock.patch.object(rpc, '_rpc_clients_pid', None)
+    @mock.patch.dict(rpc._rpc_clients, clear=True)
+    @mock.patch.object(rpc.os, 'getpid')
+    def test_get_rpc_clients_forked(self, mock_getpid):
+        mock_getpid.return_value = 1
+        rpc._get_rpc_clients()["key"] = mock.sentinel.client
+
+        self.assertEqual(
+            {"key": mock.sentinel.client}, rpc._get_rpc_clients())
+        mock_getpid.return_value = 2
+        self.assertEqual({}, rpc._get_rpc_clients())
+
+
+class RPCStatsTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis RPC statistics."""
+
+    def setUp(self):
+        super(RPCStatsTestCase, self).setUp()
+        for side in (rpc.RPC_STATS_CLIENT, rpc.RPC_STATS_SERVER):
+            patcher = mock.patch.dict(rpc._rpc_stats[side], clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @mock.patch.object(rpc, 'CONF')
+    @mock.patch.object(rpc, 'time')
+    def test_call_instrumented(self, mock_time, mock_conf):
+        mock_conf.rpc_instrumentation = True
+        mock_conf.rpc_payload_size_instrumentation = False
+        mock_time.monotonic.side_effect = [0, 0.003, 10, 10.2, 20, 140]
+        func = mock.Mock()
+
+        for _ in range(3):
+            result = rpc._call_instrumented(
+                rpc.RPC_STATS_CLIENT, "topic.method", func,
+                (mock.sentinel.ctxt, "method"), {"arg": "value"})
+
+        self.assertEqual(func.return_value, result)
+        func.assert_called_with(
+            mock.sentinel.ctxt, "method", arg="value")
+        stats = rpc.get_rpc_stats()[rpc.RPC_STATS_CLIENT]["topic.method"]
+        self.assertEqual(3, stats["count"])
+        self.assertEqual(0, stats["errors"])
+        self.assertAlmostEqual(120.203 / 3, stats["avg_time"])
+        self.assertEqual(120, stats["max_time"])
+        self.assertEqual(1, stats["latency_buckets"]["0.005"])
+        self.assertEqual(1, stats["latency_buckets"]["0.25"])
+        self.assertEqual(1, stats["latency_buckets"]["inf"])
+        self.assertEqual(3, sum(stats["latency_buckets"].values()))
+        self.assertEqual(0.25, stats["p50_time"])
+        self.assertEqual(120, stats["p99_time"])
+        self.assertNotIn("avg_request_bytes", stats)
+        self.assertEqual({}, rpc.get_rpc_stats()[rpc.RPC_STATS_SERVER])
+
+    @mock.patch.object(rpc, 'CONF')
+    def test_call_instrumented_error(self, mock_conf):
+        mock_conf.rpc_instrumentation = True
+        mock_conf.rpc_payload_size_instrumentation = True
+        func = mock.Mock(side_effect=messaging.MessagingTimeout())
+
+        self.assertRaises(
+            messaging.MessagingTimeout, rpc._call_instrumented,
+            rpc.RPC_STATS_SERVER, "topic.method", func,
+            (mock.sentinel.ctxt,), {})
+
+        stats = rpc.get_rpc_stats()[rpc.RPC_STATS_SERVER]["topic.method"]
+        self.assertEqual(1, stats["count"])
+        self.assertEqual(1, stats["errors"])
+        self.assertNotIn("avg_request_bytes", stats)
+
+    @mock.patch.object(rpc, 'CONF')
+    def test_call_instrumented_payload_sizes(self, mock_conf):
+        mock_conf.rpc_instrumentation = True
+        mock_conf.rpc_payload_size_instrumentation = True
+        func = mock.Mock(side_effect=[{"result": "value"}, None])
+
+        rpc._call_instrumented(
+            rpc.RPC_STATS_CLIENT, "topic.method", func,
+            (mock.sentinel.ctxt, "method"), {"arg": "value"})
+        rpc._call_instrumented(
+            rpc.RPC_STATS_CLIENT, "topic.method", func,
+            (mock.sentinel.ctxt, "method"), {"arg": "longer value"},
+            is_call=False)
+
+        stats = rpc.get_rpc_stats()[rpc.RPC_STATS_CLIENT]["topic.method"]
+        self.assertEqual(2, stats["count"])
+        self.assertEqual(
+            (len('{"arg": "value"}') + len('{"arg": "longer value"}')) // 2,
+            stats["avg_request_bytes"])
+        self.assertEqual(
+            len('{"arg": "longer value"}'), stats["max_request_bytes"])
+        self.assertEqual(
+            len('{"result": "value"}'), stats["avg_response_bytes"])
+        self.assertEqual(
+            len('{"result": "value"}'), stats["max_response_bytes"])
+
+    @mock.patch.object(rpc, 'CONF')
+    def test_call_instrumented_disabled(self, mock_conf):
+        mock_conf.rpc_instrumentation = False
+        func = mock.Mock()
+
+        result = rpc._call_instrumented(
+            rpc.RPC_STATS_CLIENT, "topic.method", func,
+            (mock.sentinel.ctxt, "method"), {"arg": "value"})
+
+        self.assertEqual(func.return_value, result)
+        func.assert_called_once_with(
+            mock.sentinel.ctxt, "method", arg="value")
+        self.assertEqual(
+            {rpc.RPC_STATS_CLIENT: {}, rpc.RPC_STATS_SERVER: {}},
+            rpc.get_rpc_stats())
+
+    def test_get_latency_percentile(self):
+        stats = rpc._new_rpc_method_stats()
+        stats["count"] = 100
+        stats["max_time"] = 0.07
+        stats["latency_buckets"][0] = 90
+        stats["latency_buckets"][3] = 9
+        stats["latency_buckets"][4] = 1
+
+        self.assertEqual(0.005, rpc._get_latency_percentile(stats, 50))
+        self.assertEqual(0.05, rpc._get_latency_percentile(stats, 95))
+        self.assertEqual(0.05, rpc._get_latency_percentile(stats, 99))
+        self.assertEqual(0.07, rpc._get_latency_percentile(stats, 100))
+
+
+class InstrumentedEndpointTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis _InstrumentedEndpoint class."""
+
+    def setUp(self):
+        super(InstrumentedEndpointTestCase, self).setUp()
+        self.endpoint = mock.Mock()
+        self.endpoint.target = mock.sentinel.target
+        self.instrumented = rpc._InstrumentedEndpoint(
+            self.endpoint, "coriolis_worker")
+
+    def test_getattr_passthrough(self):
+        self.assertEqual(mock.sentinel.target, self.instrumented.target)
+        self.assertEqual(
+            self.endpoint._private_method,
+            self.instrumented._private_method)
+
+    @mock.patch.object(rpc, 'CONF')
+    def test_getattr_disabled(self, mock_conf):
+        mock_conf.rpc_instrumentation = False
+
+        self.assertEqual(
+            self.endpoint.mock_method, self.instrumented.mock_method)
+
+    @mock.patch.object(rpc, 'CONF')
+    @mock.patch.object(rpc, '_call_instrumented')
+    def test_getattr_method(self, mock_call_instrumented, mock_conf):
+        mock_conf.rpc_instrumentation = True
+
+        result = self.instrumented.mock_method(
+            mock.sentinel.ctxt, arg=mock.sentinel.arg)
+
+        self.assertEqual(mock_call_instrumented.return_value, result)
+        mock_call_instrumented.assert_called_once_with(
+            rpc.RPC_STATS_SERVER, "coriolis_worker.mock_method",
+            self.endpoint.mock_method, (mock.sentinel.ctxt,),
+            {"arg": mock.sentinel.arg})
+
 
 class BaseRPCClientTestCase(test_base.CoriolisBaseTestCase):
     """Test suite for the Coriolis BaseRPCClient class."""
@@ -107,13 +320,21 @@ class BaseRPCClientTestCase(test_base.CoriolisBaseTestCase):
     def setUp(self):
         super(BaseRPCClientTestCase, self).setUp()
         self.target = mock.Mock()
+        self.target.topic = "coriolis_worker.mock_host"
         self.timeout = 60
         self.serializer = mock.Mock()
-        self.method = mock.Mock()
+        self.method = "mock_method"
         self.host = mock.Mock()
         self.args = {'foo': 'bar'}
         self.client = rpc.BaseRPCClient(self.target, timeout=self.timeout)
 
+        for patcher in (
+                mock.patch.dict(rpc._rpc_clients, clear=True),
+                mock.patch.dict(
+                    rpc._rpc_stats[rpc.RPC_STATS_CLIENT], clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
     def test_init(self):
         with mock.patch.object(rpc, 'RequestContextSerializer') as mock_ser:
             client = rpc.BaseRPCClient(self.target, timeout=self.timeout,
@@ -122,7 +343,7 @@ class BaseRPCClientTestCase(test_base.CoriolisBaseTestCase):
             self.assertEqual(client._serializer, mock_ser.return_value)
         self.assertEqual(client._target, self.target)
         self.assertEqual(client._timeout, self.timeout)
-        self.assertEqual(client._transport_conn, None)
+        self.assertEqual(client._stats_topic, "coriolis_worker")
 
     def test_init_timeout_is_None(self):
         with mock.patch.object(rpc, 'RequestContextSerializer') as mock_ser:
@@ -133,92 +354,119 @@ class BaseRPCClientTestCase(test_base.CoriolisBaseTestCase):
         self.assertEqual(client._target, self.target)
         self.assertEqual(client._timeout,
                          rpc.CONF.default_messaging_timeout)
-        self.assertEqual(client._transport_conn, None)
 
     def test_repr(self):
         result = self.client.__repr__()
         self.assertEqual(result, "<RPCClient(target=%s, timeout=%s)>" % (
             self.target, self.timeout))
 
-    @mock.patch.object(rpc, '_get_transport')
-    def test_transport_property_when_transport_is_None(self,
-                                                       mock_get_transport):
-        with mock.patch.object(rpc, '_TRANSPORT', None):
-            result = self.client._transport
-
-        mock_get_transport.assert_called_once()
-        self.assertEqual(result, mock_get_transport.return_value)
-
-    @mock.patch.object(rpc, '_get_transport')
-    def test_transport_property_when_transport_conn_is_not_None(
-            self, mock_get_transport):
-        with mock.patch.object(rpc, '_TRANSPORT', None):
-            self.client._transport_conn = mock.Mock()
-            result = self.client._transport
-
-        mock_get_transport.assert_not_called()
-        self.assertEqual(result, self.client._transport_conn)
-
-    @mock.patch.object(rpc, '_TRANSPORT')
-    def test_transport_property_when_transport_is_not_None(self,
-                                                           mock_transport):
+    @mock.patch.object(rpc, '_get_client_transport')
+    def test_transport_property(self, mock_get_client_transport):
         result = self.client._transport
 
-        self.assertEqual(result, mock_transport)
-        self.assertEqual(self.client._transport_conn, None)
+        self.assertEqual(result, mock_get_client_transport.return_value)
 
     @mock.patch('oslo_messaging.RPCClient')
-    @mock.patch('coriolis.rpc.messaging.get_transport')
-    def test_rpc_client(self, mock_get_transport, mock_rpc_client):
-        mock_get_transport.return_value = mock.MagicMock()
+    @mock.patch.object(rpc, '_get_client_transport')
+    def test_rpc_client(self, mock_get_client_transport, mock_rpc_client):
         result = self.client._rpc_client()
 
         mock_rpc_client.assert_called_once_with(
-            self.client._transport, self.client._target,
+            mock_get_client_transport.return_value, self.client._target,
             serializer=self.client._serializer, timeout=self.client._timeout)
         self.assertEqual(result, mock_rpc_client.return_value)
 
+    @mock.patch('oslo_messaging.RPCClient')
+    @mock.patch.object(rpc, '_get_client_transport')
+    def test_rpc_client_reused(
+            self, mock_get_client_transport, mock_rpc_client):
+        other_client = rpc.BaseRPCClient(self.target, timeout=self.timeout)
+        other_timeout_client = rpc.BaseRPCClient(
+            self.target, timeout=self.timeout + 1)
+
+        result = self.client._rpc_client()
+
+        self.assertEqual(result, other_client._rpc_client())
+        other_timeout_client._rpc_client()
+        self.assertEqual(2, mock_rpc_client.call_count)
+
+    @mock.patch('oslo_messaging.RPCClient')
+    @mock.patch.object(rpc, '_get_client_transport')
+    def test_rpc_client_prepared(
+            self, mock_get_client_transport, mock_rpc_client):
+        result = self.client._rpc_client(server=self.host)
+
+        self.assertEqual(
+            result, self.client._rpc_client(server=self.host))
+        self.assertEqual(
+            mock_rpc_client.return_value.prepare.return_value, result)
+        mock_rpc_client.assert_called_once()
+        mock_rpc_client.return_value.prepare.assert_called_once_with(
+            server=self.host)
+
+    def _check_stats_recorded(self, errors=0):
+        stats = rpc.get_rpc_stats()[rpc.RPC_STATS_CLIENT][
+            "coriolis_worker.%s" % self.method]
+        self.assertEqual(1, stats["count"])
+        self.assertEqual(errors, stats["errors"])
+
     def test_call(self):
         with mock.patch('coriolis.rpc.BaseRPCClient._rpc_client') as rpc_mock:
             result = self.client._call(mock.sentinel.ctxt, self.method,
                                        **self.args)
 
-            rpc_mock.assert_called_once()
+            rpc_mock.assert_called_once_with()
             rpc_mock.return_value.call.assert_called_once_with(
                 mock.sentinel.ctxt, self.method, **self.args)
             self.assertEqual(
                 result, rpc_mock.return_value.call.return_value)
+        self._check_stats_recorded()
+
+    def test_call_error(self):
+        with mock.patch('coriolis.rpc.BaseRPCClient._rpc_client') as rpc_mock:
+            rpc_mock.return_value.call.side_effect = (
+                messaging.MessagingTimeout())
+            self.assertRaises(
+                messaging.MessagingTimeout, self.client._call,
+                mock.sentinel.ctxt, self.method, **self.args)
+        self._check_stats_recorded(errors=1)
 
     def test_call_on_host(self):
         with mock.patch('coriolis.rpc.BaseRPCClient._rpc_client') as rpc_mock:
             result = self.client._call_on_host(self.host, mock.sentinel.ctxt,
                                                self.method, **self.args)
 
-            rpc_mock.assert_called_once()
-            rpc_mock.return_value.prepare.assert_called_once_with(
-                server=self.host)
-            rpc_mock.return_value.prepare.return_value.call.\
-                assert_called_once_with(mock.sentinel.ctxt, self.method,
-                                        **self.args)
-            self.assertEqual(result, rpc_mock.return_value.prepare.
-                             return_value.call.return_value)
+            rpc_mock.assert_called_once_with(server=self.host)
+            rpc_mock.return_value.call.assert_called_once_with(
+                mock.sentinel.ctxt, self.method, **self.args)
+            self.assertEqual(result, rpc_mock.return_value.call.return_value)
+        self._check_stats_recorded()
 
     def test_cast(self):
         with mock.patch('coriolis.rpc.BaseRPCClient._rpc_client') as rpc_mock:
             self.client._cast(mock.sentinel.ctxt, self.method, **self.args)
 
-            rpc_mock.assert_called_once()
+            rpc_mock.assert_called_once_with()
             rpc_mock.return_value.cast.assert_called_once_with(
                 mock.sentinel.ctxt, self.method, **self.args)
+        self._check_stats_recorded()
 
     def test_cast_for_host(self):
         with mock.patch('coriolis.rpc.BaseRPCClient._rpc_client') as rpc_mock:
             self.client._cast_for_host(self.host, mock.sentinel.ctxt,
                                        self.method, **self.args)
 
-            rpc_mock.assert_called_once()
-            rpc_mock.return_value.prepare.assert_called_once_with(
-                server=self.host)
-            rpc_mock.return_value.prepare.return_value.cast.\
-                assert_called_once_with(mock.sentinel.ctxt, self.method,
-                                        **self.args)
+            rpc_mock.assert_called_once_with(server=self.host)
+            rpc_mock.return_value.cast.assert_called_once_with(
+                mock.sentinel.ctxt, self.method, **self.args)
+        self._check_stats_recorded()
+
+    def test_cast_fanout(self):
+        with mock.patch('coriolis.rpc.BaseRPCClient._rpc_client') as rpc_mock:
+            self.client._cast_fanout(mock.sentinel.ctxt, self.method,
+                                     **self.args)
+
+            rpc_mock.assert_called_once_with(fanout=True)
+            rpc_mock.return_value.cast.assert_called_once_with(
+                mock.sentinel.ctxt, self.method, **self.args)
+        self._check_stats_recorded()
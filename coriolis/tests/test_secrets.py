@@ -7,6 +7,7 @@ from unittest import mock
 from barbicanclient import client as barbican_client
 import keystoneauth1
 
+from coriolis import cache
 from coriolis import keystone
 from coriolis import secrets
 from coriolis.tests import test_base
@@ -15,6 +16,14 @@ from coriolis.tests import test_base
 class SecretsTestCase(test_base.CoriolisBaseTestCase):
     """Test suite for the Coriolis secrets module."""
 
+    def setUp(self):
+        super(SecretsTestCase, self).setUp()
+        self.ctxt = mock.Mock(project_id=mock.sentinel.project_id)
+        payloads_patcher = mock.patch.object(
+            secrets, '_secret_payloads', cache.LocalTTLCache())
+        payloads_patcher.start()
+        self.addCleanup(payloads_patcher.stop)
+
     @mock.patch.object(keystone, 'create_keystone_session')
     @mock.patch.object(barbican_client, 'Client')
     def test_get_barbican_secret_payload(self, mock_client, mock_session):
@@ -38,12 +47,11 @@ class SecretsTestCase(test_base.CoriolisBaseTestCase):
     def test_get_secret_success(self, mock_get_payload):
         mock_get_payload.return_value = json.dumps({'key': 'value'})
 
-        result = secrets.get_secret(mock.sentinel.ctxt,
-                                    mock.sentinel.secret_ref)
+        result = secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
 
         self.assertEqual({'key': 'value'}, result)
         mock_get_payload.assert_called_once_with(
-            mock.sentinel.ctxt, mock.sentinel.secret_ref)
+            self.ctxt, mock.sentinel.secret_ref)
 
     @mock.patch.object(secrets, '_get_barbican_secret_payload')
     def test_get_secret_unauthorized(self, mock_get_payload):
@@ -65,8 +73,46 @@ class SecretsTestCase(test_base.CoriolisBaseTestCase):
     def test_get_secret_raises_value_error(self, mock_get_payload):
         mock_get_payload.side_effect = ValueError("Test exception")
 
-        self.assertRaises(ValueError, secrets.get_secret, mock.sentinel.ctxt,
+        self.assertRaises(ValueError, secrets.get_secret, self.ctxt,
                           mock.sentinel.secret_ref)
 
         mock_get_payload.assert_called_once_with(
-            mock.sentinel.ctxt, mock.sentinel.secret_ref)
+            self.ctxt, mock.sentinel.secret_ref)
+
+    @mock.patch.object(secrets, '_get_barbican_secret_payload')
+    def test_get_secret_cached(self, mock_get_payload):
+        mock_get_payload.return_value = json.dumps({'key': 'value'})
+        other_project_ctxt = mock.Mock(
+            project_id=mock.sentinel.other_project_id)
+
+        secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
+        result = secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
+        secrets.get_secret(other_project_ctxt, mock.sentinel.secret_ref)
+
+        self.assertEqual({'key': 'value'}, result)
+        mock_get_payload.assert_has_calls([
+            mock.call(self.ctxt, mock.sentinel.secret_ref),
+            mock.call(other_project_ctxt, mock.sentinel.secret_ref)])
+        self.assertEqual(2, mock_get_payload.call_count)
+
+    @mock.patch.object(secrets, '_get_barbican_secret_payload')
+    def test_invalidate_secret(self, mock_get_payload):
+        mock_get_payload.return_value = json.dumps({'key': 'value'})
+
+        secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
+        secrets.get_secret(self.ctxt, mock.sentinel.other_secret_ref)
+        secrets.invalidate_secret(mock.sentinel.secret_ref)
+        secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
+        secrets.get_secret(self.ctxt, mock.sentinel.other_secret_ref)
+
+        self.assertEqual(3, mock_get_payload.call_count)
+
+    @mock.patch.object(secrets, '_get_barbican_secret_payload')
+    def test_clear_secrets_cache(self, mock_get_payload):
+        mock_get_payload.return_value = json.dumps({'key': 'value'})
+
+        secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
+        secrets.clear_secrets_cache()
+        secrets.get_secret(self.ctxt, mock.sentinel.secret_ref)
+
+        self.assertEqual(2, mock_get_payload.call_count)
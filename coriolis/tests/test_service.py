@@ -7,6 +7,7 @@ from unittest import mock
 
 import ddt
 
+from coriolis import locks
 from coriolis import service
 from coriolis.tests import test_base
 
@@ -64,6 +65,15 @@ class ServiceTestCase(test_base.CoriolisBaseTestCase):
             with self.assertLogs('coriolis.service', level=expected_log_level):
                 service.check_locks_dir_empty()
 
+    @mock.patch.object(os, 'listdir')
+    def test_check_locks_dir_empty_database_backend(self, mock_listdir):
+        with mock.patch.object(service.CONF, 'locks') as mock_locks_conf:
+            mock_locks_conf.backend = locks.LOCK_BACKEND_DATABASE
+            with self.assertLogs('coriolis.service', level=logging.INFO):
+                service.check_locks_dir_empty()
+
+        mock_listdir.assert_not_called()
+
 
 class WSGIServiceTestCase(test_base.CoriolisBaseTestCase):
     """Test suite for the Coriolis WSGIService class."""
@@ -279,3 +289,21 @@ class MessagingServiceTestCase(test_base.CoriolisBaseTestCase):
 
         result.reset()
         mock_server.reset.assert_called_once()
+
+    @mock.patch.object(service, 'rpc')
+    @mock.patch.object(service, 'CONF')
+    @mock.patch.object(service.utils, 'get_hostname')
+    def test_start_hooks(self, mock_get_hostname, mock_conf, mock_rpc):
+        mock_hook = mock.Mock()
+        mock_server = mock.MagicMock()
+        mock_rpc.get_server.return_value = mock_server
+        mock_server.start.side_effect = lambda: mock_hook.assert_not_called()
+
+        result = service.MessagingService(
+            mock.sentinel.topic, mock.sentinel.endpoints,
+            mock.sentinel.version, worker_count=1, init_rpc=False,
+            start_hooks=[mock_hook])
+        result.start()
+
+        mock_server.start.assert_called_once_with()
+        mock_hook.assert_called_once_with()
@@ -164,6 +164,11 @@ class WorkerClientTestCase(test_base.CoriolisRPCClientTestCase):
     def test_get_diagnostics(self):
         self._test(self.client.get_diagnostics, {})
 
+    def test_invalidate_secret(self):
+        args = {"secret_ref": "mock_secret_ref"}
+        self._test(self.client.invalidate_secret, args,
+                   rpc_op='_cast_fanout')
+
     def test_get_service_status(self):
         self._test(self.client.get_service_status, {})
 
@@ -10,6 +10,7 @@ from unittest import mock
 import ddt
 import eventlet
 from oslo_log import log as logging
+from oslo_utils import units
 import psutil
 from six.moves import queue
 
@@ -20,7 +21,9 @@ from coriolis import context
 from coriolis import exception
 from coriolis.minion_manager.rpc import client as minion_client
 from coriolis.providers import factory as providers_factory
+from coriolis import rpc
 from coriolis import schemas
+from coriolis import secrets
 from coriolis.tasks import factory as task_runners_factory
 from coriolis.tests import test_base
 from coriolis import utils
@@ -128,6 +131,8 @@ class WorkerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mock_get_diagnostics.assert_called_once()
         self.assertEqual(result, expected_result)
 
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool",
+                       return_value=None)
     @mock.patch.object(server.WorkerServerEndpoint,
                        "_start_process_with_custom_library_paths")
     @mock.patch.object(server, "_task_process")
@@ -145,6 +150,7 @@ class WorkerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mock_spawn,
         mock_task_process,
         mock_start_process,
+        mock_get_task_process_pool,
     ):
         def call_exec_task_process(report_to_conductor=True):
             return self.server._exec_task_process(
@@ -237,6 +243,187 @@ class WorkerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             exception.TaskProcessException, call_exec_task_process
         )
 
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool")
+    @mock.patch.object(server.WorkerServerEndpoint, "_rpc_conductor_client")
+    @mock.patch.object(
+        server.WorkerServerEndpoint, "_get_extra_library_paths_for_providers"
+    )
+    def test_exec_task_process_pooled(
+            self, mock_get_extra_lib_paths, mock_rpc_client,
+            mock_get_task_process_pool):
+        mock_pool = mock_get_task_process_pool.return_value
+        mock_process = mock_pool.get_process.return_value
+
+        result = self.server._exec_task_process(
+            mock.sentinel.context, mock.sentinel.task_id,
+            mock.sentinel.task_type, mock.sentinel.origin,
+            mock.sentinel.destination, mock.sentinel.instance,
+            mock.sentinel.task_info)
+
+        mock_pool.get_process.assert_called_once_with(
+            mock_get_extra_lib_paths.return_value)
+        mock_process.start_task.assert_called_once_with(
+            (mock.sentinel.context, mock.sentinel.task_id,
+             mock.sentinel.task_type, mock.sentinel.origin,
+             mock.sentinel.destination, mock.sentinel.instance,
+             mock.sentinel.task_info))
+        mock_rpc_client.set_task_process.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id, mock_process.pid)
+        self.assertEqual(result, mock_process.wait_for_result.return_value)
+        # the process is only released once the result gets reported:
+        mock_pool.release_process.assert_not_called()
+        self.assertEqual(
+            {mock.sentinel.task_id: mock_process},
+            self.server._pooled_task_processes)
+
+        # if the process died without a result, the task was cancelled
+        mock_process.wait_for_result.return_value = None
+        self.assertRaises(
+            exception.TaskProcessCanceledException,
+            self.server._exec_task_process,
+            mock.sentinel.context, mock.sentinel.task_id,
+            mock.sentinel.task_type, mock.sentinel.origin,
+            mock.sentinel.destination, mock.sentinel.instance,
+            mock.sentinel.task_info)
+
+    @mock.patch.object(server.WorkerServerEndpoint, "_exec_task_process")
+    @mock.patch.object(server.WorkerServerEndpoint, "_rpc_conductor_client")
+    def test_exec_task_releases_pooled_process(
+            self, mock_rpc_client, mock_exec_task_process):
+        self.server._task_process_pool = mock.Mock()
+        self.server._pooled_task_processes = {
+            mock.sentinel.task_id: mock.sentinel.process}
+
+        self.server.exec_task(
+            mock.sentinel.context, mock.sentinel.task_id,
+            mock.sentinel.task_type, mock.sentinel.origin,
+            mock.sentinel.destination, mock.sentinel.instance,
+            mock.sentinel.task_info)
+
+        mock_rpc_client.task_completed.assert_called_once_with(
+            mock.sentinel.context, mock.sentinel.task_id,
+            mock_exec_task_process.return_value)
+        self.server._task_process_pool.release_process.assert_called_once_with(
+            mock.sentinel.process)
+        self.assertEqual({}, self.server._pooled_task_processes)
+        self.assertEqual(set(), self.server._running_task_ids)
+
+    @mock.patch.object(server, "CONF")
+    @mock.patch.object(server.eventlet, "spawn")
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool")
+    def test_start_background_tasks(
+            self, mock_get_task_process_pool, mock_spawn, mock_conf):
+        mock_conf.worker.capacity_report_interval = 30
+
+        self.server.start_background_tasks()
+        self.server.start_background_tasks()
+
+        mock_get_task_process_pool.return_value.prewarm.assert_called_with(
+            [])
+        mock_spawn.assert_called_once_with(
+            self.server._report_capacity_periodically, 30)
+
+    @mock.patch.object(server, "CONF")
+    @mock.patch.object(server.eventlet, "spawn")
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool")
+    def test_start_background_tasks_disabled(
+            self, mock_get_task_process_pool, mock_spawn, mock_conf):
+        mock_conf.worker.capacity_report_interval = 0
+        mock_get_task_process_pool.return_value = None
+
+        self.server.start_background_tasks()
+
+        mock_spawn.assert_not_called()
+
+    @mock.patch.object(psutil, "net_if_stats")
+    @mock.patch.object(psutil, "net_io_counters")
+    @mock.patch.object(server.time, "time")
+    def test_get_nic_usage_percent(
+            self, mock_time, mock_net_io_counters, mock_net_if_stats):
+        mock_time.side_effect = [100, 110]
+        mock_net_io_counters.side_effect = [
+            mock.Mock(bytes_sent=0, bytes_recv=0),
+            mock.Mock(bytes_sent=125 * units.Mi, bytes_recv=125 * units.Mi)]
+        mock_net_if_stats.return_value = {
+            "eth0": mock.Mock(isup=True, speed=1000),
+            "eth1": mock.Mock(isup=False, speed=1000),
+            "lo": mock.Mock(isup=True, speed=0)}
+
+        self.assertIsNone(self.server._get_nic_usage_percent())
+        result = self.server._get_nic_usage_percent()
+
+        self.assertEqual(20, result)
+
+    @mock.patch.object(psutil, "virtual_memory")
+    @mock.patch.object(psutil, "cpu_percent")
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_nic_usage_percent")
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool")
+    @mock.patch.object(server.time, "time")
+    @mock.patch.object(server, "CONF")
+    def test_get_capacity_report(
+            self, mock_conf, mock_time, mock_get_task_process_pool,
+            mock_get_nic_usage_percent, mock_cpu_percent,
+            mock_virtual_memory):
+        mock_conf.worker.capacity_report_interval = 30
+        self.server._running_task_ids = {"task1", "task2"}
+
+        result = self.server._get_capacity_report()
+
+        self.assertEqual({
+            "reported_at": mock_time.return_value,
+            "report_interval": 30,
+            "running_tasks": 2,
+            "free_task_process_slots": (
+                mock_get_task_process_pool.return_value.
+                get_idle_process_count.return_value),
+            "cpu_percent": mock_cpu_percent.return_value,
+            "memory_percent": mock_virtual_memory.return_value.percent,
+            "nic_percent": mock_get_nic_usage_percent.return_value}, result)
+
+    @mock.patch.object(server.eventlet, "sleep")
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_capacity_report")
+    @mock.patch.object(server.WorkerServerEndpoint, "_rpc_conductor_client")
+    def test_report_capacity_periodically(
+            self, mock_rpc_client, mock_get_capacity_report, mock_sleep):
+        self.server._service_registration = {"id": mock.sentinel.service_id}
+        mock_rpc_client.report_service_capacity.side_effect = [
+            Exception("failed"), None]
+        mock_sleep.side_effect = [None, StopIteration]
+
+        self.assertRaises(
+            StopIteration, self.server._report_capacity_periodically, 30)
+
+        mock_rpc_client.report_service_capacity.assert_called_with(
+            mock.ANY, mock.sentinel.service_id,
+            "%s:%d" % (self.server._server, os.getpid()),
+            mock_get_capacity_report.return_value)
+        self.assertEqual(2, mock_rpc_client.report_service_capacity.call_count)
+        mock_sleep.assert_called_with(30)
+
+    @mock.patch.object(server, "CONF")
+    @mock.patch.object(server.process_pool, "TaskProcessPool")
+    def test_get_task_process_pool(self, mock_pool_class, mock_conf):
+        mock_conf.worker.task_process_pool_size = 2
+        mock_conf.worker.task_process_max_tasks = 10
+        mock_pool_class.return_value.owner_pid = os.getpid()
+
+        result = self.server._get_task_process_pool()
+        self.assertEqual(result, self.server._get_task_process_pool())
+
+        self.assertEqual(result, mock_pool_class.return_value)
+        mock_pool_class.assert_called_once_with(
+            server._pooled_task_process,
+            self.server._start_process_with_custom_library_paths,
+            self.server._handle_mp_log_events, 2, max_tasks_per_process=10)
+
+        # pools created before forking are not reused
+        mock_pool_class.return_value.owner_pid = None
+        self.server._get_task_process_pool()
+        self.assertEqual(2, mock_pool_class.call_count)
+
+        mock_conf.worker.task_process_pool_size = 0
+        self.assertIsNone(self.server._get_task_process_pool())
+
     @mock.patch.object(psutil, "Process")
     def test_cancel_task(self, mock_process):
         self.server.cancel_task(
@@ -293,6 +480,42 @@ class WorkerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
             )
             mock_client.confirm_task_cancellation.assert_called_once()
 
+    @mock.patch.object(server, "_write_task_process_file")
+    @mock.patch.object(server, "_read_task_process_file")
+    @mock.patch.object(psutil, "Process")
+    def test_cancel_task_pooled_process(
+            self, mock_process, mock_read_task_process_file,
+            mock_write_task_process_file):
+        mock_read_task_process_file.return_value = "task-id"
+
+        self.server.cancel_task(
+            mock.sentinel.context, "task-id", 1234, False)
+
+        mock_read_task_process_file.assert_called_once_with(
+            server._get_running_task_file(1234))
+        mock_write_task_process_file.assert_called_once_with(
+            server._get_task_cancellation_file(1234), "task-id")
+        mock_process.return_value.send_signal.assert_called_once_with(
+            signal.SIGINT)
+
+    @ddt.data(True, False)
+    @mock.patch.object(server, "_write_task_process_file")
+    @mock.patch.object(server, "_read_task_process_file")
+    @mock.patch.object(psutil, "Process")
+    def test_cancel_task_pooled_process_running_other_task(
+            self, force, mock_process, mock_read_task_process_file,
+            mock_write_task_process_file):
+        # NOTE: the process is idle or already running another task:
+        for running_task_id in ("", "other-task-id"):
+            mock_read_task_process_file.return_value = running_task_id
+
+            self.server.cancel_task(
+                mock.sentinel.context, "task-id", 1234, force)
+
+        mock_write_task_process_file.assert_not_called()
+        mock_process.return_value.send_signal.assert_not_called()
+        mock_process.return_value.kill.assert_not_called()
+
     @mock.patch.object(logging, 'getLogger')
     def test__handle_mp_log_events(self, mock_get_logger):
         mock_mp_log_q = mock.MagicMock()
@@ -1167,10 +1390,62 @@ class WorkerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
 
         assert schema_type[1] in provider_schemas
 
+    @mock.patch.object(rpc, "get_rpc_stats")
     @mock.patch.object(utils, "get_diagnostics_info")
-    def test_get_diagnostics(self, mock_get_diagnostics_info):
+    def test_get_diagnostics(
+            self, mock_get_diagnostics_info, mock_get_rpc_stats):
+        mock_get_diagnostics_info.return_value = {"hostname": "host"}
+
         result = self.server.get_diagnostics(mock.sentinel.context)
-        self.assertEqual(result, mock_get_diagnostics_info.return_value)
+
+        self.assertEqual(
+            {"hostname": "host", "rpc": mock_get_rpc_stats.return_value},
+            result)
+
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool")
+    @mock.patch.object(secrets, "invalidate_secret")
+    def test_invalidate_secret(
+            self, mock_invalidate_secret, mock_get_task_process_pool):
+        self.server.invalidate_secret(
+            mock.sentinel.context, mock.sentinel.secret_ref)
+        mock_invalidate_secret.assert_called_once_with(
+            mock.sentinel.secret_ref)
+        send_message = mock_get_task_process_pool.return_value.send_message
+        send_message.assert_called_once_with(
+            (server.TASK_PROCESS_MESSAGE_INVALIDATE_SECRET,
+             mock.sentinel.secret_ref))
+
+    @mock.patch.object(server.WorkerServerEndpoint, "_get_task_process_pool")
+    @mock.patch.object(secrets, "invalidate_secret")
+    def test_invalidate_secret_no_pool(
+            self, mock_invalidate_secret, mock_get_task_process_pool):
+        mock_get_task_process_pool.return_value = None
+
+        self.server.invalidate_secret(
+            mock.sentinel.context, mock.sentinel.secret_ref)
+
+        mock_invalidate_secret.assert_called_once_with(
+            mock.sentinel.secret_ref)
+
+    @mock.patch.object(secrets, "invalidate_secret")
+    def test__handle_task_process_messages(self, mock_invalidate_secret):
+        message_q = mock.Mock()
+        message_q.get.side_effect = [
+            (server.TASK_PROCESS_MESSAGE_INVALIDATE_SECRET,
+             mock.sentinel.secret_ref1),
+            ("unknown", None),
+            mock.sentinel.invalid_message,
+            (server.TASK_PROCESS_MESSAGE_INVALIDATE_SECRET,
+             mock.sentinel.secret_ref2),
+            None]
+
+        with self.assertLogs('coriolis.worker.rpc.server', level='WARN'):
+            server._handle_task_process_messages(message_q)
+
+        mock_invalidate_secret.assert_has_calls([
+            mock.call(mock.sentinel.secret_ref1),
+            mock.call(mock.sentinel.secret_ref2)])
+        self.assertEqual(2, mock_invalidate_secret.call_count)
 
     @mock.patch('coriolis.service.get_worker_count_from_args')
     @mock.patch('sys.argv')
@@ -1230,6 +1505,127 @@ class WorkerServerEndpointTestCase(test_base.CoriolisBaseTestCase):
         mp_q.put.assert_called_once_with(mock_task_result)
         mp_log_q.put.assert_called_once_with(None)
 
+    @mock.patch.object(server.threading, 'Thread')
+    @mock.patch.object(server, '_remove_task_process_file')
+    @mock.patch.object(server, '_write_task_process_file')
+    @mock.patch.object(server, '_get_task_cancellation_handler')
+    @mock.patch.object(server, '_reset_task_process_state')
+    @mock.patch.object(signal, 'signal')
+    @mock.patch.object(server, '_run_task')
+    @mock.patch.object(providers_factory, 'get_available_providers')
+    @mock.patch.object(server, '_setup_task_process')
+    def test__pooled_task_process(
+            self, mock_setup_task_process, mock_get_available_providers,
+            mock_run_task, mock_signal, mock_reset_task_process_state,
+            mock_get_task_cancellation_handler, mock_write_task_process_file,
+            mock_remove_task_process_file, mock_thread):
+        task_q = mock.MagicMock()
+        task_q.get.side_effect = [
+            (mock.sentinel.ctxt, mock.sentinel.task_id1),
+            (mock.sentinel.ctxt, mock.sentinel.task_id2),
+            (mock.sentinel.ctxt, mock.sentinel.task_id3)]
+        mp_q = mock.MagicMock()
+        mp_log_q = mock.MagicMock()
+
+        server._pooled_task_process(
+            task_q, mp_q, mp_log_q, mock.sentinel.message_q, 2)
+
+        mock_setup_task_process.assert_called_once_with(mp_log_q)
+        mock_thread.assert_called_once_with(
+            target=server._handle_task_process_messages,
+            args=(mock.sentinel.message_q,), daemon=True)
+        mock_thread.return_value.start.assert_called_once_with()
+        mock_get_available_providers.assert_called_once_with()
+        mock_run_task.assert_has_calls([
+            mock.call(mock.sentinel.ctxt, mock.sentinel.task_id1, mp_q),
+            mock.call(mock.sentinel.ctxt, mock.sentinel.task_id2, mp_q)])
+        self.assertEqual(2, mock_run_task.call_count)
+        self.assertEqual(2, mock_reset_task_process_state.call_count)
+        mock_get_task_cancellation_handler.assert_has_calls([
+            mock.call(mock.sentinel.task_id1),
+            mock.call(mock.sentinel.task_id2)])
+        mock_signal.assert_has_calls([
+            mock.call(signal.SIGINT, signal.SIG_IGN),
+            mock.call(
+                signal.SIGINT,
+                mock_get_task_cancellation_handler.return_value),
+            mock.call(signal.SIGINT, signal.SIG_IGN)])
+        running_task_file = server._get_running_task_file(os.getpid())
+        mock_write_task_process_file.assert_has_calls([
+            mock.call(running_task_file, ""),
+            mock.call(running_task_file, mock.sentinel.task_id1),
+            mock.call(running_task_file, ""),
+            mock.call(running_task_file, mock.sentinel.task_id2),
+            mock.call(running_task_file, "")])
+        mock_remove_task_process_file.assert_has_calls([
+            mock.call(running_task_file),
+            mock.call(server._get_task_cancellation_file(os.getpid()))])
+        mp_log_q.put.assert_called_once_with(None)
+
+    @mock.patch.object(server, '_read_task_process_file')
+    def test__get_task_cancellation_handler(
+            self, mock_read_task_process_file):
+        handler = server._get_task_cancellation_handler("task-id")
+
+        mock_read_task_process_file.return_value = "task-id"
+        self.assertRaises(
+            KeyboardInterrupt, handler, signal.SIGINT, None)
+        mock_read_task_process_file.assert_called_once_with(
+            server._get_task_cancellation_file(os.getpid()))
+
+        # NOTE: late cancellation requests for the previous tasks are ignored:
+        for cancelled_task_id in ("other-task-id", None):
+            mock_read_task_process_file.return_value = cancelled_task_id
+            self.assertIsNone(handler(signal.SIGINT, None))
+
+    def test__task_process_files(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "task")
+
+        self.assertIsNone(server._read_task_process_file(path))
+        server._write_task_process_file(path, "task-id")
+        self.assertEqual("task-id", server._read_task_process_file(path))
+        server._write_task_process_file(path, "")
+        self.assertEqual("", server._read_task_process_file(path))
+        server._remove_task_process_file(path)
+        self.assertIsNone(server._read_task_process_file(path))
+        server._remove_task_process_file(path)
+        self.assertEqual([], os.listdir(tmp_dir))
+
+    @mock.patch.object(server.keystone, 'clear_sessions_cache')
+    @mock.patch.object(secrets, 'clear_secrets_cache')
+    @mock.patch.object(server.events, 'reset_event_managers')
+    def test__reset_task_process_state(
+            self, mock_reset_event_managers, mock_clear_secrets_cache,
+            mock_clear_sessions_cache):
+        server._reset_task_process_state()
+
+        mock_reset_event_managers.assert_called_once_with()
+        mock_clear_secrets_cache.assert_called_once_with()
+        mock_clear_sessions_cache.assert_called_once_with()
+
+    @mock.patch.object(server.threading, 'Thread')
+    @mock.patch.object(server, '_remove_task_process_file')
+    @mock.patch.object(server, '_write_task_process_file')
+    @mock.patch.object(signal, 'signal')
+    @mock.patch.object(server, '_run_task')
+    @mock.patch.object(providers_factory, 'get_available_providers')
+    @mock.patch.object(server, '_setup_task_process')
+    def test__pooled_task_process_stopped(
+            self, mock_setup_task_process, mock_get_available_providers,
+            mock_run_task, mock_signal, mock_write_task_process_file,
+            mock_remove_task_process_file, mock_thread):
+        task_q = mock.MagicMock()
+        task_q.get.return_value = None
+        mp_log_q = mock.MagicMock()
+
+        server._pooled_task_process(
+            task_q, mock.sentinel.mp_q, mp_log_q, mock.sentinel.message_q, 0)
+
+        mock_run_task.assert_not_called()
+        mp_log_q.put.assert_called_once_with(None)
+
     @mock.patch.object(server, '_setup_task_process')
     def test__task_process_raise(self, mock_setup_task_process):
         mock_setup_task_process.side_effect = Exception('YOLO')
@@ -0,0 +1,174 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+from unittest import mock
+
+from six.moves import queue
+
+from coriolis.tests import test_base
+from coriolis.worker import process_pool
+
+
+class PooledTaskProcessTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis PooledTaskProcess class."""
+
+    def setUp(self):
+        super(PooledTaskProcessTestCase, self).setUp()
+        self.process = mock.Mock()
+        self.task_q = mock.Mock()
+        self.mp_q = mock.Mock()
+        self.message_q = mock.Mock()
+        self.pooled_process = process_pool.PooledTaskProcess(
+            self.process, self.task_q, self.mp_q, self.message_q, ("/lib",))
+
+    def test_start_task(self):
+        self.pooled_process.start_task(mock.sentinel.task_args)
+
+        self.task_q.put.assert_called_once_with(mock.sentinel.task_args)
+        self.assertEqual(1, self.pooled_process.tasks_run)
+
+    def test_send_message(self):
+        self.process.is_alive.return_value = True
+
+        self.pooled_process.send_message(mock.sentinel.message)
+
+        self.message_q.put.assert_called_once_with(mock.sentinel.message)
+
+    def test_send_message_process_died(self):
+        self.process.is_alive.return_value = False
+
+        self.pooled_process.send_message(mock.sentinel.message)
+
+        self.message_q.put.assert_not_called()
+
+    def test_wait_for_result(self):
+        self.mp_q.get.side_effect = [queue.Empty, mock.sentinel.result]
+        self.process.is_alive.return_value = True
+
+        result = self.pooled_process.wait_for_result()
+
+        self.assertEqual(mock.sentinel.result, result)
+
+    def test_wait_for_result_process_died(self):
+        self.mp_q.get.side_effect = [queue.Empty, queue.Empty]
+        self.process.is_alive.return_value = False
+
+        result = self.pooled_process.wait_for_result()
+
+        self.assertIsNone(result)
+        self.mp_q.get.assert_has_calls([
+            mock.call(timeout=1), mock.call(False)])
+
+    @mock.patch.object(process_pool.eventlet, 'spawn')
+    def test_stop(self, mock_spawn):
+        self.process.is_alive.return_value = True
+
+        self.pooled_process.stop()
+
+        self.task_q.put.assert_called_once_with(None)
+        mock_spawn.assert_called_once_with(self.process.join)
+
+
+class TaskProcessPoolTestCase(test_base.CoriolisBaseTestCase):
+    """Test suite for the Coriolis TaskProcessPool class."""
+
+    def setUp(self):
+        super(TaskProcessPoolTestCase, self).setUp()
+        self.start_process = mock.Mock()
+        self.handle_log_events = mock.Mock()
+        self.pool = process_pool.TaskProcessPool(
+            mock.sentinel.target, self.start_process, self.handle_log_events,
+            2, max_tasks_per_process=3)
+
+    @mock.patch.object(process_pool.eventlet, 'spawn')
+    def test__spawn_process(self, mock_spawn):
+        mp_ctx = mock.Mock()
+        self.pool._mp_ctx = mp_ctx
+
+        result = self.pool._spawn_process(("/lib",))
+
+        mp_ctx.Process.assert_called_once_with(
+            target=mock.sentinel.target,
+            args=(mp_ctx.Queue.return_value, mp_ctx.Queue.return_value,
+                  mp_ctx.Queue.return_value, mp_ctx.Queue.return_value, 3))
+        self.start_process.assert_called_once_with(
+            mp_ctx.Process.return_value, ["/lib"])
+        mock_spawn.assert_called_once_with(
+            self.handle_log_events, mp_ctx.Process.return_value,
+            mp_ctx.Queue.return_value)
+        self.assertEqual(("/lib",), result.extra_library_paths)
+
+    @mock.patch.object(process_pool.TaskProcessPool, 'prewarm')
+    @mock.patch.object(process_pool.TaskProcessPool, '_spawn_process')
+    def test_get_process(self, mock_spawn_process, mock_prewarm):
+        dead_process = mock.Mock()
+        dead_process.is_alive.return_value = False
+        idle_process = mock.Mock()
+        idle_process.is_alive.return_value = True
+        self.pool._idle_processes[("/lib",)] = [dead_process, idle_process]
+
+        result = self.pool.get_process(["/lib"])
+
+        self.assertEqual(idle_process, result)
+        self.assertEqual({idle_process}, self.pool._busy_processes)
+        dead_process.stop.assert_called_once_with()
+        mock_spawn_process.assert_not_called()
+        mock_prewarm.assert_called_once_with(("/lib",))
+
+    @mock.patch.object(process_pool.TaskProcessPool, 'prewarm')
+    @mock.patch.object(process_pool.TaskProcessPool, '_spawn_process')
+    def test_get_process_none_idle(self, mock_spawn_process, mock_prewarm):
+        result = self.pool.get_process(["/lib"])
+
+        self.assertEqual(mock_spawn_process.return_value, result)
+        mock_spawn_process.assert_called_once_with(("/lib",))
+
+    @mock.patch.object(process_pool.TaskProcessPool, '_spawn_process')
+    def test__prewarm(self, mock_spawn_process):
+        self.pool._prewarmers[("/lib",)] = mock.sentinel.prewarmer
+
+        self.pool._prewarm(("/lib",))
+
+        self.assertEqual(
+            [mock_spawn_process.return_value] * 2,
+            self.pool._idle_processes[("/lib",)])
+        self.assertEqual({}, self.pool._prewarmers)
+
+    @mock.patch.object(process_pool.TaskProcessPool, 'prewarm')
+    def test_release_process(self, mock_prewarm):
+        process = mock.Mock(extra_library_paths=("/lib",), tasks_run=1)
+        process.is_alive.return_value = True
+        self.pool._busy_processes.add(process)
+
+        self.pool.release_process(process)
+
+        self.assertEqual([process], self.pool._idle_processes[("/lib",)])
+        self.assertEqual(set(), self.pool._busy_processes)
+        process.stop.assert_not_called()
+
+    def test_send_message(self):
+        busy_process = mock.Mock()
+        idle_process = mock.Mock()
+        failing_process = mock.Mock()
+        failing_process.send_message.side_effect = Exception("Queue closed")
+        self.pool._busy_processes.add(busy_process)
+        self.pool._idle_processes[("/lib",)] = [
+            failing_process, idle_process]
+
+        with self.assertLogs('coriolis.worker.process_pool', level='WARN'):
+            self.pool.send_message(mock.sentinel.message)
+
+        for process in (busy_process, idle_process, failing_process):
+            process.send_message.assert_called_once_with(
+                mock.sentinel.message)
+
+    @mock.patch.object(process_pool.TaskProcessPool, 'prewarm')
+    def test_release_process_recycled(self, mock_prewarm):
+        process = mock.Mock(extra_library_paths=("/lib",), tasks_run=3)
+        process.is_alive.return_value = True
+
+        self.pool.release_process(process)
+
+        self.assertEqual([], self.pool._idle_processes[("/lib",)])
+        process.stop.assert_called_once_with()
+        mock_prewarm.assert_called_once_with(("/lib",))
@@ -0,0 +1,207 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+import collections
+import multiprocessing
+import os
+
+import eventlet
+from oslo_log import log as logging
+from six.moves import queue
+
+LOG = logging.getLogger(__name__)
+
+
+class PooledTaskProcess(object):
+    """ Task process which runs the tasks it receives one after the other,
+    until it gets recycled.
+    """
+
+    def __init__(self, process, task_q, mp_q, message_q,
+                 extra_library_paths):
+        self._process = process
+        self._task_q = task_q
+        self._mp_q = mp_q
+        self._message_q = message_q
+        self.extra_library_paths = extra_library_paths
+        self.tasks_run = 0
+
+    def __repr__(self):
+        return "<PooledTaskProcess(pid=%s, tasks_run=%s)>" % (
+            self.pid, self.tasks_run)
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def start_task(self, task_args):
+        self.tasks_run += 1
+        self._task_q.put(task_args)
+
+    def send_message(self, message):
+        """ Sends the given message to the process, which handles it even
+        while running a task.
+        """
+        if self._process.is_alive():
+            self._message_q.put(message)
+
+    def wait_for_result(self):
+        """ Waits for the result of the current task. Returns None if the
+        process died before sending a result back, as happens when the task
+        gets cancelled.
+        """
+        while True:
+            try:
+                return self._mp_q.get(timeout=1)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    break
+        # NOTE: the process might have exited right after sending its result:
+        try:
+            return self._mp_q.get(False)
+        except BaseException:
+            return None
+
+    def stop(self):
+        if self._process.is_alive():
+            self._task_q.put(None)
+        # reap the process in the background:
+        eventlet.spawn(self._process.join)
+
+
+class TaskProcessPool(object):
+    """ Pool of pre-spawned task processes.
+
+    As the extra library paths needed by the providers must be set in the
+    'LD_LIBRARY_PATH' of a task process before it starts, the idle processes
+    are grouped by the library paths they were started with.
+
+    :param target: function run by the task processes, which receives the
+    task queue, result queue, log queue, message queue and maximum number of
+    tasks to run.
+    :param start_process: function which starts a given process with the
+    given extra library paths.
+    :param handle_log_events: function which handles the log events of a
+    given process received through the given log queue until it exits.
+    :param size: number of idle processes kept for each set of extra
+    library paths.
+    :param max_tasks_per_process: number of tasks run by a process before it
+    is recycled, with 0 meaning no limit.
+    """
+
+    def __init__(self, target, start_process, handle_log_events, size,
+                 max_tasks_per_process=0):
+        self._target = target
+        self._start_process = start_process
+        self._handle_log_events = handle_log_events
+        self._size = size
+        self._max_tasks_per_process = max_tasks_per_process
+        self._mp_ctx = multiprocessing.get_context('spawn')
+        self._idle_processes = collections.defaultdict(list)
+        self._busy_processes = set()
+        self._prewarmers = {}
+        self.owner_pid = os.getpid()
+
+    def _spawn_process(self, extra_library_paths):
+        task_q = self._mp_ctx.Queue()
+        mp_q = self._mp_ctx.Queue()
+        mp_log_q = self._mp_ctx.Queue()
+        message_q = self._mp_ctx.Queue()
+        process = self._mp_ctx.Process(
+            target=self._target,
+            args=(task_q, mp_q, mp_log_q, message_q,
+                  self._max_tasks_per_process))
+        self._start_process(process, list(extra_library_paths))
+        eventlet.spawn(self._handle_log_events, process, mp_log_q)
+        LOG.debug(
+            "Started pooled task process %s with extra libraries: %s",
+            process.pid, extra_library_paths)
+        return PooledTaskProcess(
+            process, task_q, mp_q, message_q, tuple(extra_library_paths))
+
+    def _prewarm(self, key):
+        try:
+            idle = self._idle_processes[key]
+            idle[:] = [p for p in idle if p.is_alive()]
+            while len(idle) < self._size:
+                idle.append(self._spawn_process(key))
+        except Exception as ex:
+            LOG.warn(
+                "Failed to pre-spawn task processes with extra libraries "
+                "%s: %s", key, ex)
+        finally:
+            self._prewarmers.pop(key, None)
+
+    def prewarm(self, extra_library_paths):
+        """ Spawns the missing idle processes for the given extra library
+        paths in the background.
+        """
+        key = tuple(extra_library_paths)
+        if key not in self._prewarmers:
+            self._prewarmers[key] = eventlet.spawn(self._prewarm, key)
+
+    def get_process(self, extra_library_paths):
+        """ Returns an idle process started with the given extra library
+        paths, spawning a new one if none is available.
+        """
+        key = tuple(extra_library_paths)
+        idle = self._idle_processes[key]
+        process = None
+        while idle and process is None:
+            process = idle.pop(0)
+            if not process.is_alive():
+                process.stop()
+                process = None
+        if process is None:
+            process = self._spawn_process(key)
+
+        self._busy_processes.add(process)
+        self.prewarm(key)
+        return process
+
+    def get_idle_process_count(self):
+        return sum(
+            len([p for p in idle if p.is_alive()])
+            for idle in self._idle_processes.values())
+
+    def release_process(self, process):
+        """ Returns the given process to the pool, or stops it if it has
+        run its maximum number of tasks or if the pool is full.
+        """
+        self._busy_processes.discard(process)
+        idle = self._idle_processes[process.extra_library_paths]
+        recycle = (
+            self._max_tasks_per_process and (
+                process.tasks_run >= self._max_tasks_per_process))
+        if not process.is_alive() or recycle or len(idle) >= self._size:
+            LOG.debug("Stopping pooled task process: %s", process)
+            process.stop()
+            self.prewarm(process.extra_library_paths)
+        else:
+            idle.append(process)
+
+    def send_message(self, message):
+        """ Sends the given message to all the processes of the pool, be
+        they idle or running a task.
+        """
+        processes = list(self._busy_processes)
+        for idle in self._idle_processes.values():
+            processes.extend(idle)
+        for process in processes:
+            try:
+                process.send_message(message)
+            except Exception as ex:
+                LOG.warn(
+                    "Failed to send message to pooled task process %s: %s",
+                    process, ex)
+
+    def close(self):
+        for prewarmer in list(self._prewarmers.values()):
+            eventlet.kill(prewarmer)
+        for idle in self._idle_processes.values():
+            for process in idle:
+                process.stop()
+        self._idle_processes.clear()
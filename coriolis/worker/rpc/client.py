@@ -158,6 +158,9 @@ class WorkerClient(rpc.BaseRPCClient):
     def get_diagnostics(self, ctxt):
         return self._call(ctxt, 'get_diagnostics')
 
+    def invalidate_secret(self, ctxt, secret_ref):
+        self._cast_fanout(ctxt, 'invalidate_secret', secret_ref=secret_ref)
+
     def get_service_status(self, ctxt):
         return self._call(ctxt, 'get_service_status')
 
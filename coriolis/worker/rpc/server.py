@@ -7,10 +7,14 @@ import os
 import shutil
 import signal
 import sys
+import tempfile
+import threading
+import time
 
 import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import units
 import psutil
 from six.moves import queue
 
@@ -18,21 +22,50 @@ from coriolis.conductor.rpc import client as rpc_conductor_client
 from coriolis.conductor.rpc import utils as conductor_rpc_utils
 from coriolis import constants
 from coriolis import context
+from coriolis import events
 from coriolis import exception
+from coriolis import keystone
 from coriolis.minion_manager.rpc import client as rpc_minion_manager_client
 from coriolis.providers import factory as providers_factory
+from coriolis import rpc
 from coriolis import schemas
+from coriolis import secrets
 from coriolis import service
 from coriolis.tasks import factory as task_runners_factory
 from coriolis import utils
+from coriolis.worker import process_pool
+
+worker_opts = [
+    cfg.IntOpt('task_process_pool_size',
+               default=2,
+               min=0,
+               help='Number of pre-spawned idle task processes kept ready by '
+                    'each worker process, for each set of extra library '
+                    'paths required by the providers. Setting this to 0 '
+                    'spawns a new process for every task.'),
+    cfg.IntOpt('task_process_max_tasks',
+               default=20,
+               min=0,
+               help='Number of tasks run by a pooled task process before it '
+                    'gets replaced by a new one. 0 means no limit.'),
+    cfg.IntOpt('capacity_report_interval',
+               default=30,
+               min=0,
+               help='Number of seconds between the reports of the running '
+                    'tasks and resource usage of each worker process to the '
+                    'conductor, which the scheduler uses for placing tasks. '
+                    'Setting this to 0 disables the reports.'),
+]
 
 CONF = cfg.CONF
-CONF.register_opts([], 'worker')
+CONF.register_opts(worker_opts, 'worker')
 
 LOG = logging.getLogger(__name__)
 
 VERSION = "1.0"
 
+TASK_PROCESS_MESSAGE_INVALIDATE_SECRET = "invalidate_secret"
+
 
 # TODO(aznashwan): parametrize the event handler provided during task execution
 # to decouple what gets notified from the task running logic itself:
@@ -49,14 +82,19 @@ class WorkerServerEndpoint(object):
         self._server = utils.get_hostname()
         self._service_registration = self._register_worker_service()
         self._rpc_conductor_client_instance = None
+        self._task_process_pool = None
+        self._pooled_task_processes = {}
+        self._running_task_ids = set()
+        self._capacity_reporter = None
+        self._last_net_io = None
 
     @property
     def _rpc_conductor_client(self):
         # NOTE(aznashwan): it is unsafe to fork processes with pre-instantiated
         # oslo_messaging clients as the underlying eventlet thread queues will
-        # be invalidated. Considering this class both serves from a "main
-        # process" as well as forking child processes, it is safest to
-        # re-instantiate the client every time:
+        # be invalidated. The transport and oslo_messaging clients backing
+        # this client are re-instantiated by `coriolis.rpc` in each process,
+        # so it can be shared once instantiated:
         if self._rpc_conductor_client_instance is None:
             self._rpc_conductor_client_instance = (
                 rpc_conductor_client.ConductorClient())
@@ -84,6 +122,66 @@ class WorkerServerEndpoint(object):
         self._service_registration = service_registration
         return service_registration
 
+    def start_background_tasks(self):
+        """ Starts the background jobs of the worker process the service is
+        running in. Must be called after the service forks its processes.
+        """
+        pool = self._get_task_process_pool()
+        if pool:
+            pool.prewarm([])
+        interval = CONF.worker.capacity_report_interval
+        if interval and self._capacity_reporter is None:
+            self._capacity_reporter = eventlet.spawn(
+                self._report_capacity_periodically, interval)
+
+    def _get_nic_usage_percent(self):
+        """ Returns the usage of the host's network interfaces since the
+        previous call, relative to their combined link speed.
+        """
+        now = time.time()
+        counters = psutil.net_io_counters()
+        total_bytes = counters.bytes_sent + counters.bytes_recv
+        last_net_io = self._last_net_io
+        self._last_net_io = (now, total_bytes)
+        if not last_net_io or now <= last_net_io[0]:
+            return None
+
+        # NOTE: speeds are reported in megabits per second:
+        link_speed = sum(
+            stats.speed for (nic, stats) in psutil.net_if_stats().items()
+            if stats.isup and stats.speed > 0) * units.Mi / 8
+        if not link_speed:
+            return None
+        bytes_per_second = (total_bytes - last_net_io[1]) / (
+            now - last_net_io[0])
+        return min(100, round(bytes_per_second * 100 / link_speed, 2))
+
+    def _get_capacity_report(self):
+        pool = self._get_task_process_pool()
+        return {
+            "reported_at": time.time(),
+            "report_interval": CONF.worker.capacity_report_interval,
+            "running_tasks": len(self._running_task_ids),
+            "free_task_process_slots": (
+                pool.get_idle_process_count() if pool else 0),
+            "cpu_percent": psutil.cpu_percent(),
+            "memory_percent": psutil.virtual_memory().percent,
+            "nic_percent": self._get_nic_usage_percent()}
+
+    def _report_capacity_periodically(self, interval):
+        ctxt = context.RequestContext("coriolis", "admin")
+        reporter_id = "%s:%d" % (self._server, os.getpid())
+        while True:
+            try:
+                self._rpc_conductor_client.report_service_capacity(
+                    ctxt, self._service_registration['id'], reporter_id,
+                    self._get_capacity_report())
+            except Exception:
+                LOG.warn(
+                    "Failed to report worker capacity to conductor. Error "
+                    "was: %s", utils.get_exception_details())
+            eventlet.sleep(interval)
+
     def _check_remove_dir(self, path):
         try:
             if os.path.exists(path):
@@ -116,9 +214,25 @@ class WorkerServerEndpoint(object):
         try:
             p = psutil.Process(process_id)
 
+            # NOTE: pooled task processes run several tasks one after the
+            # other, so they must be told which task is to be cancelled:
+            running_task_id = _read_task_process_file(
+                _get_running_task_file(process_id))
+            if running_task_id is not None:
+                if running_task_id != task_id:
+                    LOG.warn(
+                        "Not cancelling process %s as it is not running "
+                        "task '%s' anymore.", process_id, task_id)
+                    return
+                _write_task_process_file(
+                    _get_task_cancellation_file(process_id), task_id)
+
             if force:
                 LOG.warn("Killing process: %s", process_id)
                 p.kill()
+                _remove_task_process_file(_get_running_task_file(process_id))
+                _remove_task_process_file(
+                    _get_task_cancellation_file(process_id))
             else:
                 LOG.info("Sending SIGINT to process: %s", process_id)
                 p.send_signal(signal.SIGINT)
@@ -212,20 +326,52 @@ class WorkerServerEndpoint(object):
                 break
         return result
 
+    def _get_task_process_pool(self):
+        if not CONF.worker.task_process_pool_size:
+            return None
+        # NOTE: the endpoint is instantiated before the service forks its
+        # worker processes, each of which must have its own pool:
+        pool = self._task_process_pool
+        if pool is None or pool.owner_pid != os.getpid():
+            pool = process_pool.TaskProcessPool(
+                _pooled_task_process,
+                self._start_process_with_custom_library_paths,
+                self._handle_mp_log_events,
+                CONF.worker.task_process_pool_size,
+                max_tasks_per_process=CONF.worker.task_process_max_tasks)
+            self._task_process_pool = pool
+            self._pooled_task_processes = {}
+        return pool
+
+    def _release_task_process(self, task_id):
+        process = self._pooled_task_processes.pop(task_id, None)
+        if process is not None:
+            self._task_process_pool.release_process(process)
+
     def _exec_task_process(
             self, ctxt, task_id, task_type, origin, destination, instance,
             task_info, report_to_conductor=True):
-        mp_ctx = multiprocessing.get_context('spawn')
-        mp_q = mp_ctx.Queue()
-        mp_log_q = mp_ctx.Queue()
-        p = mp_ctx.Process(
-            target=_task_process,
-            args=(ctxt, task_id, task_type, origin, destination, instance,
-                  task_info, mp_q, mp_log_q))
-
         extra_library_paths = self._get_extra_library_paths_for_providers(
             ctxt, task_id, task_type, origin, destination)
 
+        task_args = (
+            ctxt, task_id, task_type, origin, destination, instance,
+            task_info)
+        pool = self._get_task_process_pool()
+        if pool:
+            p = pool.get_process(extra_library_paths)
+            # NOTE: the process is only released once the task's result is
+            # reported, so that a late cancellation request cannot affect the
+            # next task it would run:
+            self._pooled_task_processes[task_id] = p
+        else:
+            mp_ctx = multiprocessing.get_context('spawn')
+            mp_q = mp_ctx.Queue()
+            mp_log_q = mp_ctx.Queue()
+            p = mp_ctx.Process(
+                target=_task_process,
+                args=task_args + (mp_q, mp_log_q))
+
         try:
             if report_to_conductor:
                 LOG.debug(
@@ -235,8 +381,11 @@ class WorkerServerEndpoint(object):
                     ctxt, task_id, self._server)
             LOG.debug(
                 "Attempting to start process for task with ID '%s'", task_id)
-            self._start_process_with_custom_library_paths(
-                p, extra_library_paths)
+            if pool:
+                p.start_task(task_args)
+            else:
+                self._start_process_with_custom_library_paths(
+                    p, extra_library_paths)
             LOG.info("Task process started: %s", task_id)
             if report_to_conductor:
                 LOG.debug(
@@ -262,11 +411,14 @@ class WorkerServerEndpoint(object):
                     "Task '%s' was already in cancelling status." % task_id)
             raise
 
-        evt = eventlet.spawn(self._wait_for_process, p, mp_q)
-        eventlet.spawn(self._handle_mp_log_events, p, mp_log_q)
+        if pool:
+            result = p.wait_for_result()
+        else:
+            evt = eventlet.spawn(self._wait_for_process, p, mp_q)
+            eventlet.spawn(self._handle_mp_log_events, p, mp_log_q)
 
-        result = evt.wait()
-        p.join()
+            result = evt.wait()
+            p.join()
 
         if result is None:
             LOG.debug(
@@ -285,6 +437,7 @@ class WorkerServerEndpoint(object):
 
     def exec_task(self, ctxt, task_id, task_type, origin, destination,
                   instance, task_info, report_to_conductor=True):
+        self._running_task_ids.add(task_id)
         try:
             task_result = self._exec_task_process(
                 ctxt, task_id, task_type, origin, destination,
@@ -329,6 +482,9 @@ class WorkerServerEndpoint(object):
                     ctxt, task_id, str(ex))
             else:
                 raise
+        finally:
+            self._running_task_ids.discard(task_id)
+            self._release_task_process(task_id)
 
     def get_endpoint_instances(self, ctxt, platform_name, connection_info,
                                source_environment, marker, limit,
@@ -627,7 +783,18 @@ class WorkerServerEndpoint(object):
         return schemas
 
     def get_diagnostics(self, ctxt):
-        return utils.get_diagnostics_info()
+        diagnostics = utils.get_diagnostics_info()
+        diagnostics['rpc'] = rpc.get_rpc_stats()
+        return diagnostics
+
+    def invalidate_secret(self, ctxt, secret_ref):
+        secrets.invalidate_secret(secret_ref)
+        # NOTE: the pooled task processes may be running tasks which cached
+        # the payload of the secret:
+        pool = self._get_task_process_pool()
+        if pool:
+            pool.send_message(
+                (TASK_PROCESS_MESSAGE_INVALIDATE_SECRET, secret_ref))
 
 
 def _setup_task_process(mp_log_q):
@@ -643,11 +810,10 @@ def _setup_task_process(mp_log_q):
     log_root.addHandler(handlers.QueueHandler(mp_log_q))
 
 
-def _task_process(ctxt, task_id, task_type, origin, destination, instance,
-                  task_info, mp_q, mp_log_q):
+def _run_task(ctxt, task_id, task_type, origin, destination, instance,
+              task_info, mp_q):
+    event_handler = None
     try:
-        _setup_task_process(mp_log_q)
-
         task_runner = task_runners_factory.get_task_runner_class(
             task_type)()
         event_handler = _get_event_handler_for_task_type(
@@ -664,12 +830,159 @@ def _task_process(ctxt, task_id, task_type, origin, destination, instance,
 
         task_result = task_runner.run(
             ctxt, instance, origin, destination, task_info, event_handler)
+        # NOTE: progress updates and events are sent asynchronously, so make
+        # sure the latest ones get sent before the task is reported as
+        # finished:
+        events.flush_events()
+        event_handler.flush()
         # mq_p.put() doesn't raise if new_task_info is not serializable
         utils.is_serializable(task_result)
         mp_q.put(task_result)
     except Exception as ex:
+        utils.ignore_exceptions(events.flush_events)()
+        if event_handler:
+            utils.ignore_exceptions(event_handler.flush)()
         mp_q.put(str(ex))
         LOG.exception(ex)
+
+
+def _task_process(ctxt, task_id, task_type, origin, destination, instance,
+                  task_info, mp_q, mp_log_q):
+    try:
+        # NOTE: the PID might have belonged to a pooled task process which
+        # was killed before it could clean up after itself:
+        _remove_task_process_file(_get_running_task_file(os.getpid()))
+        _setup_task_process(mp_log_q)
+        _run_task(
+            ctxt, task_id, task_type, origin, destination, instance,
+            task_info, mp_q)
+    except Exception as ex:
+        mp_q.put(str(ex))
+        LOG.exception(ex)
+    finally:
+        # Signal the log event handler that there are no more events
+        mp_log_q.put(None)
+
+
+def _get_running_task_file(process_id):
+    return os.path.join(
+        tempfile.gettempdir(), "coriolis-task-process-%s.running" % (
+            process_id))
+
+
+def _get_task_cancellation_file(process_id):
+    return os.path.join(
+        tempfile.gettempdir(), "coriolis-task-process-%s.cancel" % (
+            process_id))
+
+
+def _read_task_process_file(path):
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+def _write_task_process_file(path, content):
+    # NOTE: the file is replaced atomically, so that its readers never see
+    # partial contents:
+    tmp_path = "%s.%s" % (path, os.getpid())
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _remove_task_process_file(path):
+    try:
+        os.remove(path)
+    except (IOError, OSError):
+        pass
+
+
+def _get_task_cancellation_handler(task_id):
+    def _handle_task_cancellation(signum, frame):
+        cancelled_task_id = _read_task_process_file(
+            _get_task_cancellation_file(os.getpid()))
+        if cancelled_task_id != task_id:
+            LOG.warn(
+                "Ignoring cancellation request for task '%s' received while "
+                "running task '%s'.", cancelled_task_id, task_id)
+            return
+        raise KeyboardInterrupt()
+    return _handle_task_cancellation
+
+
+def _reset_task_process_state():
+    """ Resets the module-level state left behind by the previous task run
+    by a pooled task process.
+    """
+    events.reset_event_managers()
+    secrets.clear_secrets_cache()
+    keystone.clear_sessions_cache()
+
+
+def _handle_task_process_messages(message_q):
+    """ Handles the messages sent to a pooled task process by the worker
+    service, until None is received.
+    """
+    while True:
+        message = message_q.get()
+        if message is None:
+            break
+        try:
+            message_type, payload = message
+            if message_type == TASK_PROCESS_MESSAGE_INVALIDATE_SECRET:
+                secrets.invalidate_secret(payload)
+            else:
+                LOG.warn(
+                    "Ignoring unknown task process message: %s",
+                    message_type)
+        except Exception:
+            LOG.warn(
+                "Failed to handle task process message: %s",
+                utils.get_exception_details())
+
+
+def _pooled_task_process(task_q, mp_q, mp_log_q, message_q, max_tasks):
+    """ Runs the tasks received through 'task_q' one after the other, until
+    'max_tasks' tasks were run (if set) or None is received. The messages
+    received through 'message_q' are handled meanwhile.
+    """
+    # NOTE: cancellation requests are only honoured while running the task
+    # they are meant for, so that late ones can not interrupt an idle process
+    # or the next task it runs:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    running_task_file = _get_running_task_file(os.getpid())
+    try:
+        _write_task_process_file(running_task_file, "")
+        _setup_task_process(mp_log_q)
+        threading.Thread(
+            target=_handle_task_process_messages, args=(message_q,),
+            daemon=True).start()
+        # load all the providers beforehand, instead of for each task:
+        utils.ignore_exceptions(providers_factory.get_available_providers)()
+
+        tasks_run = 0
+        while not max_tasks or tasks_run < max_tasks:
+            task_args = task_q.get()
+            if task_args is None:
+                break
+            tasks_run += 1
+            task_id = task_args[1]
+            _reset_task_process_state()
+            _write_task_process_file(running_task_file, task_id)
+            signal.signal(
+                signal.SIGINT, _get_task_cancellation_handler(task_id))
+            try:
+                _run_task(*task_args, mp_q)
+            finally:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                _write_task_process_file(running_task_file, "")
+    except Exception as ex:
+        LOG.exception(ex)
     finally:
+        _remove_task_process_file(running_task_file)
+        _remove_task_process_file(_get_task_cancellation_file(os.getpid()))
         # Signal the log event handler that there are no more events
         mp_log_q.put(None)
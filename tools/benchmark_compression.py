@@ -0,0 +1,75 @@
+# Copyright 2026 Cloudbase Solutions Srl
+# All Rights Reserved.
+
+"""Measures the throughput of disk transfer chunk compression.
+
+Compresses the same set of chunks through `data_transfer.compression_proxy`
+from an increasing number of greenthreads, the same way the backup writers'
+compressors do, both with and without offloading to native threads:
+
+    python tools/benchmark_compression.py --chunks 64 --max-workers 8
+"""
+
+import argparse
+import os
+import time
+
+import eventlet
+from eventlet import tpool
+eventlet.monkey_patch()
+
+from oslo_config import cfg  # noqa: E402
+from oslo_utils import units  # noqa: E402
+
+from coriolis import constants  # noqa: E402
+from coriolis import data_transfer  # noqa: E402
+
+CONF = cfg.CONF
+
+
+def _get_chunks(count, chunk_size):
+    # half random, half zeroed data, so that it compresses roughly 2:1
+    return [os.urandom(chunk_size // 2) + b'\0' * (chunk_size // 2)
+            for _ in range(count)]
+
+
+def _run(chunks, workers, fmt):
+    pool = eventlet.GreenPool(workers)
+    start = time.monotonic()
+    for _ in pool.imap(
+            lambda chunk: data_transfer.compression_proxy(chunk, fmt),
+            chunks):
+        pass
+    return time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=64)
+    parser.add_argument("--chunk-size-mb", type=int, default=10)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--format", default=constants.COMPRESSION_FORMAT_ZLIB,
+        choices=constants.VALID_COMPRESSION_FORMATS)
+    args = parser.parse_args()
+
+    CONF([], project="coriolis")
+    tpool.set_num_threads(args.max_workers)
+    chunks = _get_chunks(args.chunks, args.chunk_size_mb * units.Mi)
+    total_mb = args.chunks * args.chunk_size_mb
+
+    print("%-16s %8s %10s %8s" % ("mode", "workers", "MB/s", "speedup"))
+    for native_threads in (False, True):
+        CONF.set_override("compress_in_native_threads", native_threads)
+        mode = "native threads" if native_threads else "greenthreads"
+        baseline = None
+        for workers in range(1, args.max_workers + 1):
+            elapsed = _run(chunks, workers, args.format)
+            if baseline is None:
+                baseline = elapsed
+            print("%-16s %8d %10.2f %7.2fx" % (
+                mode, workers, total_mb / elapsed, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main()